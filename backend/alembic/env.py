@@ -25,6 +25,7 @@ from app.models import (
     ProductMaterial,
     ProductProcess,
     QuoteSummary,
+    ColumnMappingProfile,
 )
 
 # this is the Alembic Config object
@@ -0,0 +1,49 @@
+"""添加 BOM 列映射模板表
+
+- column_mapping_profiles: 按表头签名保存的列映射
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '007'
+down_revision: Union[str, None] = '006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """创建列映射模板表."""
+
+    op.create_table(
+        'column_mapping_profiles',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('header_signature', sa.String(length=40), nullable=False),
+        sa.Column('header_cells', sa.JSON(), nullable=False),
+        sa.Column('mapping', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_column_mapping_profiles_header_signature',
+        'column_mapping_profiles',
+        ['header_signature'],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """删除列映射模板表."""
+
+    op.drop_index('ix_column_mapping_profiles_header_signature', table_name='column_mapping_profiles')
+    op.drop_table('column_mapping_profiles')
@@ -0,0 +1,35 @@
+"""添加项目 BOM 修订号字段
+
+- bom_revision: 产品 / 物料 / 工艺行每次写入时递增，成本汇总缓存据此判断 BOM 是否变化
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '009'
+down_revision: Union[str, None] = '008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """添加 BOM 修订号字段."""
+
+    op.add_column(
+        'projects',
+        sa.Column('bom_revision', sa.Integer(), nullable=False, server_default='0')
+    )
+
+
+def downgrade() -> None:
+    """移除 BOM 修订号字段."""
+
+    op.drop_column('projects', 'bom_revision')
@@ -0,0 +1,35 @@
+"""添加工序明细价格簿版本字段
+
+- price_book_version: 费率快照所用价格簿版本
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '008'
+down_revision: Union[str, None] = '007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """添加价格簿版本字段."""
+
+    op.add_column(
+        'process_route_items',
+        sa.Column('price_book_version', sa.String(length=16), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    """移除价格簿版本字段."""
+
+    op.drop_column('process_route_items', 'price_book_version')
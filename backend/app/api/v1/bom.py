@@ -1,20 +1,53 @@
 """BOM API 路由."""
 
 from sqlalchemy import select
-from fastapi import APIRouter, Depends, UploadFile, File, Form, Query
-from fastapi.responses import JSONResponse
+from fastapi import (
+    APIRouter, Depends, HTTPException, UploadFile, File, Form, Header, Query, Request,
+)
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
-from asyncio import to_thread
-import pymysql
-
-from app.db.session import get_db
-from app.services.bom_parser import BOMParser, MultiProductBOMParser
+from typing import AsyncIterator, Callable, Iterator, Literal
+import asyncio
+import json
+
+from app.db.session import AsyncSessionLocal, get_db
+from app.services.bom_parser import (
+    BOMTreeBuilder, MultiProductBOMParser, MultiProductBOMParseResult, ProductBOMResult,
+    SubassemblyRollup,
+)
+from app.services.bom_parse_cache import BOMParseCache, parse_cache_stats
+from app.services.bom_preview_store import (
+    BOMPreviewEditError, BOMPreviewStore, apply_material_edits,
+)
+from app.services.bom_source import BOMSource, source_size
+from app.services.bom_tabular import TabularBOMParser, is_tabular_file
+from app.services.cache_service import get_cache_service
+from app.services.chunked_upload import ChunkedUploadError, ChunkedUploadStore
+from app.services.pipeline_trace import (
+    SPAN_BUILD, SPAN_CACHE, SPAN_MATERIAL_LOOKUP, SPAN_PARSE, SPAN_PROCESS_LOOKUP, SPAN_READ,
+    PipelineTrace, pipeline_metrics,
+)
+from app.services.bom_revision import BOMRevisionMerger
+from app.services.column_mapping_service import ColumnMappingProfileService
+from app.services.lookup_planner import lookup_planner_stats
+from app.services.master_data_lookup import connection_reuse_stats
+from app.services.price_book import price_book_registry
+from app.services.project_cost_service import bump_bom_revision
+from app.services.project_bom_service import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, FieldProjection, PageCursor, ProjectBOMService,
+)
+from app.services.bom_bulk_writer import BOMBulkWriter
+from app.services.bom_import_jobs import (
+    JOB_COMPLETED, STAGE_CACHE, STAGE_LOOKUP, STAGE_PARSE, ProgressCallback, job_store,
+)
 from app.schemas.bom import (
     BOMMaterialResponse, BOMProcessResponse,
     ProductInfoSchema, MaterialSchema, ProcessSchema,
     ProductBOMResultSchema, MultiProductBOMParseResultSchema,
-    BOMConfirmCreateRequest, BOMPreviewResponse
+    BOMConfirmCreateRequest, BOMPreviewResponse,
+    BOMUploadInitRequest, BOMUploadCompleteRequest,
+    ColumnMappingProfileCreate, ColumnMappingProfileResponse
 )
 from app.schemas.common import StatusLight
 from app.models.material import Material
@@ -24,114 +57,8 @@ from app.config import get_settings
 router = APIRouter()
 settings = get_settings()
 
-
-def _query_materials_sync(material_codes: list[str]) -> dict:
-    """同步查询物料价格（在线程池中执行）."""
-    materials_with_price = {}
-    if not material_codes:
-        return materials_with_price
-
-    conn = pymysql.connect(
-        host=settings.MYSQL_HOST,
-        port=settings.MYSQL_PORT,
-        user=settings.MYSQL_USER,
-        password=settings.MYSQL_PASSWORD,
-        database=settings.MYSQL_DATABASE,
-        charset='utf8mb4',
-        cursorclass=pymysql.cursors.DictCursor
-    )
-
-    try:
-        with conn.cursor() as cursor:
-            placeholders = ','.join(['%s'] * len(material_codes))
-            query = f"""
-                SELECT item_code, std_price, vave_price, supplier_tier, category
-                FROM materials
-                WHERE item_code IN ({placeholders})
-            """
-            cursor.execute(query, material_codes)
-            results = cursor.fetchall()
-
-            for row in results:
-                materials_with_price[row['item_code']] = {
-                    "unit_price": float(row['std_price']) if row['std_price'] else None,
-                    "vave_price": float(row['vave_price']) if row['vave_price'] else None,
-                    "supplier": row['supplier_tier'] or "",
-                    "material": row['category'] or "",
-                    "has_history_data": True,
-                }
-    finally:
-        conn.close()
-
-    return materials_with_price
-
-
-def _query_processes_sync(process_names: list[str]) -> dict:
-    """同步查询工艺费率（在线程池中执行）.
-
-    使用新的 MHR 拆分费率结构：
-    - 单价 = (std_mhr_var + std_mhr_fix) × standard_time
-    - VAVE单价 = (vave_mhr_var + vave_mhr_fix) × standard_time
-    """
-    processes_with_rate = {}
-    if not process_names:
-        return processes_with_rate
-
-    conn = pymysql.connect(
-        host=settings.MYSQL_HOST,
-        port=settings.MYSQL_PORT,
-        user=settings.MYSQL_USER,
-        password=settings.MYSQL_PASSWORD,
-        database=settings.MYSQL_DATABASE,
-        charset='utf8mb4',
-        cursorclass=pymysql.cursors.DictCursor
-    )
-
-    try:
-        with conn.cursor() as cursor:
-            # 使用新的 MHR 拆分字段，同时支持按工艺名称或编码匹配
-            # 分别为 process_name 和 process_code 构建占位符
-            name_placeholders = ','.join(['%s'] * len(process_names))
-            code_placeholders = ','.join(['%s'] * len(process_names))
-            query = f"""
-                SELECT process_code, process_name, equipment, work_center,
-                       std_mhr_var, std_mhr_fix, vave_mhr_var, vave_mhr_fix,
-                       std_hourly_rate, vave_hourly_rate, efficiency_factor
-                FROM process_rates
-                WHERE process_name IN ({name_placeholders}) OR process_code IN ({code_placeholders})
-            """
-            all_params = process_names + process_names
-            cursor.execute(query, all_params)
-            results = cursor.fetchall()
-
-            for row in results:
-                # 优先使用新的 MHR 拆分费率
-                if row['std_mhr_var'] is not None and row['std_mhr_fix'] is not None:
-                    std_rate = float(row['std_mhr_var']) + float(row['std_mhr_fix'])
-                else:
-                    std_rate = float(row['std_hourly_rate']) if row['std_hourly_rate'] else None
-
-                if row['vave_mhr_var'] is not None and row['vave_mhr_fix'] is not None:
-                    vave_rate = float(row['vave_mhr_var']) + float(row['vave_mhr_fix'])
-                else:
-                    vave_rate = float(row['vave_hourly_rate']) if row['vave_hourly_rate'] else None
-
-                processes_with_rate[row['process_name']] = {
-                    "process_code": row['process_code'],
-                    "equipment": row['equipment'] or "",
-                    "work_center": row['work_center'] or "",
-                    "std_mhr_var": float(row['std_mhr_var']) if row['std_mhr_var'] else None,
-                    "std_mhr_fix": float(row['std_mhr_fix']) if row['std_mhr_fix'] else None,
-                    "vave_mhr_var": float(row['vave_mhr_var']) if row['vave_mhr_var'] else None,
-                    "vave_mhr_fix": float(row['vave_mhr_fix']) if row['vave_mhr_fix'] else None,
-                    "unit_price": std_rate,
-                    "vave_price": vave_rate,
-                    "has_history_data": True,
-                }
-    finally:
-        conn.close()
-
-    return processes_with_rate
+# 流式响应的媒体类型（通过 Accept 头选择）
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
 
 
 @router.post("/parse-test")
@@ -141,8 +68,7 @@ async def parse_bom_test(
     """测试BOM解析（包含测试价格数据）"""
     content = await file.read()
 
-    parser = BOMParser()
-    parse_result = parser.parse_excel_file(content)
+    parse_result = await BOMParseCache(get_cache_service()).parse_single(content)
 
     # 测试工艺价格数据
     test_process_prices = {
@@ -190,201 +116,776 @@ async def parse_bom_test(
 
 @router.post("/upload")
 async def upload_bom(
+    request: Request,
     file: UploadFile = File(...),
     project_id: str = Form(...),
+    mode: Literal["sync", "async"] = Query("sync", description="async 时立即返回任务 ID，后台执行"),
     db: AsyncSession = Depends(get_db),
 ):
     """上传并解析 BOM 文件，支持多产品 BOM，自动关联历史价格数据.
 
     解析流程：
-    1. 使用 MultiProductBOMParser 解析 Excel 文件（支持多 Sheet）
-    2. 根据物料编码查询历史价格（std_price, vave_price）
-    3. 根据工艺名称查询历史费率（std_hourly_rate, vave_hourly_rate）
+    1. 使用 MultiProductBOMParser 流式解析 Excel 文件（支持多 Sheet，按批产出）；
+       CSV/TSV/Arrow/Parquet 文件使用 TabularBOMParser 按块解析
+    2. 根据物料编码查询历史价格（std_price, vave_price）、根据工艺名称查询历史费率
+       （std_hourly_rate, vave_hourly_rate）：跨批次和产品攒够 BOM_UPLOAD_LOOKUP_ROWS
+       行后统一查询一次
+    3. 同一物料编码 / 工艺名称在一次上传内只查询一次
     4. 设置状态：GREEN=完全匹配，YELLOW=AI估算，RED=无数据
-    5. 汇总所有产品的物料和工艺返回
+    5. 按层级列构建 BOM 树，计算展开数量和逐级汇总的物料成本
+       （相同子装配在一次上传内只汇总一次）
+    6. 汇总所有产品的物料和工艺返回
+
+    mode=async 时返回 202 和任务 ID，流水线在后台执行，进度和结果通过
+    GET /bom/jobs/{job_id}（轮询）或 GET /bom/jobs/{job_id}/events（SSE）获取。
+
+    请求头 Accept 含 application/x-ndjson 时以 NDJSON 流式返回：每行一个事件
+    （product / materials / processes / product_end / summary），首字节时间和
+    峰值内存与 BOM 总行数无关。同步完整 JSON 响应限于 BOM_SYNC_UPLOAD_MAX_BYTES
+    以内的文件（0 为不限制），更大的文件返回 413。
+
+    各阶段（read / parse / material_lookup / process_lookup / build / cache）的耗时
+    通过 Server-Timing 响应头返回（NDJSON 流的响应头先于流水线发送，不含该头），
+    并汇总到 GET /bom/pipeline/stats 的直方图。
 
     Args:
-        file: Excel BOM 文件（可以是单产品或多产品）
+        request: 请求对象（用于读取 Accept 头）
+        file: Excel BOM 文件（可以是单产品或多产品），或 CSV/TSV/Arrow/Parquet 导出文件
         project_id: 项目 ID
+        mode: sync=同步返回解析结果，async=后台任务
         db: 数据库会话
 
     Returns:
-        解析结果，包含所有产品的物料和工艺列表（含价格）
+        解析结果，包含所有产品的物料和工艺列表（含价格）；async 模式返回任务信息
     """
-    import time
-    start_time = time.time()
+    trace = PipelineTrace()
 
     # 读取文件内容
-    content = await file.read()
-    print(f"[DEBUG] File read time: {time.time() - start_time:.3f}s")
-
-    # 使用多产品解析器解析 Excel
-    parser = MultiProductBOMParser()
-    parse_result = parser.parse_excel_file(content)
-    print(f"[DEBUG] Parse Excel time: {time.time() - start_time:.3f}s")
-    print(f"[DEBUG] Detected {parse_result.total_products} products, {parse_result.total_materials} materials")
-
-    # 汇总所有产品的物料和工艺
-    all_materials = []
-    all_processes = []
-    material_idx = 0
-    process_idx = 0
-
-    for product in parse_result.products:
-        # 收集所有物料
-        for m in product.materials:
-            all_materials.append(m)
-        # 收集所有工艺
-        for p in product.processes:
-            all_processes.append(p)
-
-    # 批量查询物料历史价格
-    material_codes = [m.part_number for m in all_materials if m.part_number]
-    print(f"[DEBUG] Querying materials: {material_codes}")
-
-    materials_with_price = await to_thread(_query_materials_sync, material_codes)
-    print(f"[DEBUG] Materials query time: {time.time() - start_time:.3f}s, found: {len(materials_with_price)}")
-
-    # 转换物料响应，自动填充价格
-    materials = []
-    for idx, m in enumerate(all_materials):
-        # 尝试从历史数据获取价格
-        price_data = materials_with_price.get(m.part_number, {})
-
-        # 判断状态
-        if price_data.get("has_history_data"):
-            status = StatusLight.GREEN
-        elif m.comments:  # 有备注但无历史数据，可能需要AI估算
-            status = StatusLight.YELLOW
+    with trace.span(SPAN_READ) as span:
+        content = await file.read()
+        span.bytes += len(content)
+
+    _check_sync_response_size(request, mode, len(content))
+    return await _respond_upload(
+        request, content, file.filename, project_id, mode, db, trace=trace
+    )
+
+
+async def _respond_upload(
+    request: Request,
+    content: BOMSource,
+    filename: str | None,
+    project_id: str,
+    mode: str,
+    db: AsyncSession,
+    on_done: Callable[[], None] | None = None,
+    trace: PipelineTrace | None = None,
+):
+    """按 mode 和 Accept 头执行上传流水线：后台任务 / NDJSON 流 / 完整 JSON.
+
+    Args:
+        request: 请求对象（用于读取 Accept 头）
+        content: 文件内容或落盘文件路径
+        filename: 文件名
+        project_id: 项目 ID
+        mode: sync 或 async
+        db: 数据库会话（仅同步完整 JSON 响应使用）
+        on_done: 流水线结束（含失败）后的回调，用于清理落盘文件
+        trace: 分阶段计时，None 时新建
+
+    Returns:
+        Response: 202 任务信息、NDJSON 流式响应或 JSON 响应
+    """
+    if trace is None:
+        trace = PipelineTrace()
+    callback = on_done
+
+    def on_done() -> None:
+        trace.finish()
+        if callback is not None:
+            callback()
+
+    if mode == "async":
+        job = job_store.create(project_id, filename)
+
+        async def pipeline(progress):
+            # 请求结束后会话随之关闭，后台任务使用独立会话
+            try:
+                async with AsyncSessionLocal() as job_db:
+                    return await _run_upload_pipeline(
+                        content, filename, project_id, job_db, progress, trace
+                    )
+            finally:
+                on_done()
+
+        job_store.submit(job, pipeline)
+        return JSONResponse(status_code=202, content=job.to_dict())
+
+    if _wants_ndjson(request):
+        async def events():
+            # 响应体在端点返回后才生成，使用独立会话而不依赖请求级会话的生命周期
+            try:
+                async with AsyncSessionLocal() as stream_db:
+                    async for event in _iter_upload_events(
+                        content, filename, project_id, stream_db, trace=trace
+                    ):
+                        yield event
+            finally:
+                on_done()
+
+        return StreamingResponse(_ndjson_lines(events()), media_type=NDJSON_MEDIA_TYPE)
+
+    try:
+        result = await _run_upload_pipeline(content, filename, project_id, db, trace=trace)
+    finally:
+        on_done()
+    return JSONResponse(content=result, headers={"Server-Timing": trace.server_timing()})
+
+
+def _check_sync_response_size(request: Request, mode: str, size: int) -> None:
+    """同步完整 JSON 响应的文件大小限制（BOM_SYNC_UPLOAD_MAX_BYTES，0 为不限制）.
+
+    完整 JSON 响应需要在内存中拼出全部结果，超大文件只能走 NDJSON 流或后台任务。
+    在开始处理前检查，被拒绝的分块上传仍保留落盘文件，可用同一 uploadId 重新 complete。
+    """
+    limit = settings.BOM_SYNC_UPLOAD_MAX_BYTES
+    if mode == "async" or _wants_ndjson(request) or limit <= 0 or size <= limit:
+        return
+    raise HTTPException(
+        status_code=413,
+        detail="BOM file too large for a synchronous response; "
+               "use Accept: application/x-ndjson or mode=async",
+    )
+
+
+def _wants_ndjson(request: Request) -> bool:
+    """Accept 头包含 application/x-ndjson 时使用 NDJSON 流式响应."""
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+async def _ndjson_lines(events: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    """将事件流序列化为 NDJSON（每个事件一行）."""
+    async for event in events:
+        yield (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+async def _iter_upload_events(
+    content: BOMSource,
+    filename: str | None,
+    project_id: str,
+    db: AsyncSession,
+    progress: ProgressCallback | None = None,
+    trace: PipelineTrace | None = None,
+) -> AsyncIterator[dict]:
+    """执行 BOM 上传流水线（解析 → 查价 → 写缓存），按产生顺序产出响应事件.
+
+    事件类型（type）：
+    - product: 产品开始（产品元数据）
+    - materials / processes: 一批物料 / 该产品全部工艺（已关联历史价格）
+    - product_end: 产品结束（行数、逐级汇总的物料成本）
+    - summary: 全部产品处理完毕后的汇总
+
+    Args:
+        content: 文件内容或落盘文件路径
+        filename: 文件名（用于识别 CSV/TSV/Arrow/Parquet）
+        project_id: 项目 ID
+        db: 数据库会话
+        progress: 进度回调 progress(stage, **计数器增量)，后台任务使用
+        trace: 分阶段计时（由调用方结束），None 时不对外暴露
+
+    Yields:
+        dict: 响应事件
+    """
+    if progress is None:
+        def progress(stage: str, **counters: int) -> None:
+            pass
+    if trace is None:
+        trace = PipelineTrace()
+
+    progress(STAGE_PARSE)
+
+    # 加载已保存的列映射模板（节流刷新）
+    await ColumnMappingProfileService(db).ensure_registry_loaded()
+
+    # 使用多产品解析器流式解析 Excel：解析 → 查价 → 序列化按批进行，
+    # Pydantic 对象用完即弃，每行只序列化一次。
+    # 同一文件已解析过（如 parse-preview 之后）则直接复用缓存的解析结果。
+    parse_cache = BOMParseCache(get_cache_service())
+    with trace.span(SPAN_PARSE, bytes=source_size(content)):
+        cached = await parse_cache.get_multi(content, filename)
+    if cached is not None:
+        products = cached.iter_products()
+        parsed_products = None
+    else:
+        if is_tabular_file(filename):
+            # CSV/TSV/Arrow/Parquet 导出文件：按块列式解析，整个文件为一个产品
+            products = TabularBOMParser().iter_products(content, filename)
         else:
-            status = StatusLight.RED
+            products = MultiProductBOMParser().iter_products(content)
+        # 仅在可缓存大小内保留解析行用于写缓存，超大文件保持纯流式
+        parsed_products = [] if parse_cache.cacheable(content) else None
+
+    # 主数据查询走价格簿快照，整个上传使用同一版本
+    lookup = await price_book_registry.get()
+    builder = _UploadEventBuilder(lookup, progress, trace, keep_parsed=parsed_products is not None)
+
+    # 攒够 BOM_UPLOAD_LOOKUP_ROWS 行物料（可跨批次和产品）后统一查价一次，
+    # 再按解析顺序产出这一窗口的事件：查询次数与解析批次数无关，内存仍有上限。
+    # 解析在线程池中逐批进行，事件循环只负责查价和写缓存，解析期间仍可响应
+    # 进度轮询、SSE 和其他请求
+    window: list[tuple] = []
+    window_rows = 0
+    async for item in _iter_in_thread(_upload_items(products, trace)):
+        window.append(item)
+        if item[0] == "materials":
+            window_rows += len(item[2])
+        if window_rows >= settings.BOM_UPLOAD_LOOKUP_ROWS:
+            await builder.resolve(window)
+            for event in builder.events(window):
+                yield event
+            window, window_rows = [], 0
+    if window:
+        await builder.resolve(window)
+        for event in builder.events(window):
+            yield event
+
+    # 上传只生成预览，BOM 由 confirm-create 写入数据库；这里只写解析缓存
+    progress(STAGE_CACHE)
+    if builder.parsed_products is not None:
+        parsed_products = builder.parsed_products
+        with trace.span(SPAN_CACHE, rows=len(parsed_products)):
+            await parse_cache.set_multi(content, MultiProductBOMParseResult(
+                products=parsed_products,
+                total_products=len(parsed_products),
+                total_materials=sum(p.product_info.material_count for p in parsed_products),
+                parse_warnings=[],
+            ), filename)
+        progress(STAGE_CACHE, cached=len(parsed_products))
+
+    yield {
+        "type": "summary",
+        "parseId": f"parse-{project_id}",
+        "status": "completed",
+        "priceBookVersion": lookup.version,
+        "summary": {
+            "total_materials": builder.material_count,
+            "matched_materials": builder.matched_materials,
+            "total_processes": builder.process_count,
+            "matched_processes": builder.matched_processes,
+            "total_products": len(builder.product_summaries),
+            "products": builder.product_summaries,
+            "subassembly_rollups": {
+                "computed": builder.std_rollup.computed,
+                "reused": builder.std_rollup.reused,
+            },
+        },
+    }
 
-        materials.append(
-            BOMMaterialResponse(
-                id=f"M-{idx + 1:03d}",
-                level=m.level,
-                part_number=m.part_number or "",
-                part_name=m.part_name or "",
-                version=m.version,
-                type=m.type,
-                stock_status=m.status,
-                material=m.material or price_data.get("material", ""),
-                supplier=m.supplier or price_data.get("supplier", ""),
-                quantity=m.quantity,
-                unit=m.unit,
-                unit_price=price_data.get("unit_price"),
-                vave_price=price_data.get("vave_price"),
-                has_history_data=price_data.get("has_history_data", False),
-                comments=m.comments,
-                status=status,
-            )
+
+async def _iter_in_thread(iterator: Iterator[tuple]) -> AsyncIterator[tuple]:
+    """在线程池中逐个取同步迭代器的元素（解析 CPU 密集，不阻塞事件循环）."""
+    done = object()
+    while True:
+        item = await asyncio.to_thread(next, iterator, done)
+        if item is done:
+            return
+        yield item
+
+
+def _upload_items(products, trace: PipelineTrace) -> Iterator[tuple]:
+    """产品流 → (类型, 产品, 物料批次) 序列：product / materials / product_end."""
+    for product in trace.timed_iter(SPAN_PARSE, products):
+        yield "product", product, None
+        for batch in trace.timed_iter(SPAN_PARSE, product.material_batches, rows=len):
+            yield "materials", product, batch
+        yield "product_end", product, None
+
+
+class _UploadEventBuilder:
+    """上传流水线的查价和事件组装（按窗口查价，价格和计数在整个上传中共享）."""
+
+    def __init__(
+        self,
+        lookup,
+        progress: ProgressCallback,
+        trace: PipelineTrace,
+        keep_parsed: bool,
+    ) -> None:
+        self.lookup = lookup
+        self.progress = progress
+        self.trace = trace
+        # 物料编码 → 历史价格、工艺名称 → 费率（未命中记为 {}，不再重复查询）
+        self.prices: dict[str, dict] = {}
+        self.rates: dict[str, dict] = {}
+        self.std_rollup = SubassemblyRollup(
+            lambda m: self.prices.get(m.part_number, {}).get("unit_price")
+        )
+        self.vave_rollup = SubassemblyRollup(
+            lambda m: self.prices.get(m.part_number, {}).get("vave_price")
+        )
+        self.material_count = 0
+        self.process_count = 0
+        self.matched_materials = 0
+        self.matched_processes = 0
+        self.product_summaries: list[dict] = []
+        # 仅在可缓存大小内保留解析行用于写缓存
+        self.parsed_products: list[ProductBOMResult] | None = [] if keep_parsed else None
+        self._tree_builder = BOMTreeBuilder()
+        self._parsed_materials: list = []
+
+    async def resolve(self, window: list[tuple]) -> None:
+        """一次查询窗口内尚未查询过的物料编码和工艺名称."""
+        material_codes = list(dict.fromkeys(
+            m.part_number
+            for kind, _, batch in window if kind == "materials"
+            for m in batch if m.part_number and m.part_number not in self.prices
+        ))
+        if material_codes:
+            with self.trace.span(SPAN_MATERIAL_LOOKUP, rows=len(material_codes)):
+                found = await self.lookup.lookup_materials(material_codes)
+            self.prices.update({code: found.get(code, {}) for code in material_codes})
+
+        process_names = list(dict.fromkeys(
+            p.name
+            for kind, product, _ in window if kind == "product_end"
+            for p in product.processes if p.name and p.name not in self.rates
+        ))
+        if process_names:
+            with self.trace.span(SPAN_PROCESS_LOOKUP, rows=len(process_names)):
+                found = await self.lookup.lookup_processes(process_names)
+            self.rates.update({name: found.get(name, {}) for name in process_names})
+
+        self.progress(
+            STAGE_LOOKUP,
+            rows_parsed=sum(len(batch) for kind, _, batch in window if kind == "materials"),
+            material_lookups=len(material_codes),
+            process_lookups=len(process_names),
         )
 
-    # 获取解析后的工艺数据
-    print(f"[DEBUG] Parsed processes from Excel: {len(all_processes)}")
+    def events(self, window: list[tuple]) -> Iterator[dict]:
+        """按解析顺序产出窗口内的事件（价格已由 resolve 查好）."""
+        for kind, product, batch in window:
+            info = product.product_info
+            if kind == "product":
+                self._tree_builder = BOMTreeBuilder()
+                self._parsed_materials = []
+                yield {
+                    "type": "product",
+                    "product_code": info.product_code,
+                    "product_name": info.product_name,
+                    "product_number": info.product_number,
+                    "customer_number": info.customer_number,
+                }
+            elif kind == "materials":
+                yield self._materials_event(info, batch)
+            else:
+                yield from self._product_end_events(product)
+
+    def _materials_event(self, info, batch) -> dict:
+        if self.parsed_products is not None:
+            self._parsed_materials.extend(batch)
+        items = []
+        with self.trace.span(SPAN_BUILD, rows=len(batch)):
+            for m in batch:
+                node = self._tree_builder.add(m)
+                response = _build_material_response(
+                    self.material_count, m, self.prices.get(m.part_number, {}),
+                    node.extended_quantity,
+                )
+                self.matched_materials += response.has_history_data
+                self.material_count += 1
+                items.append(response.model_dump(by_alias=True))
+        return {"type": "materials", "product_code": info.product_code, "items": items}
+
+    def _product_end_events(self, product) -> Iterator[dict]:
+        info = product.product_info
+        if product.processes:
+            items = []
+            with self.trace.span(SPAN_BUILD, rows=len(product.processes)):
+                for p in product.processes:
+                    response = _build_process_response(
+                        self.process_count, p, self.rates.get(p.name, {})
+                    )
+                    self.matched_processes += response.has_history_data
+                    self.process_count += 1
+                    items.append(response.model_dump(by_alias=True))
+            yield {"type": "processes", "product_code": info.product_code, "items": items}
+
+        if self.parsed_products is not None:
+            self.parsed_products.append(ProductBOMResult(
+                product_info=info,
+                materials=self._parsed_materials,
+                processes=product.processes,
+            ))
+
+        tree = self._tree_builder.build()
+        yield {
+            "type": "product_end",
+            "product_code": info.product_code,
+            "material_count": info.material_count,
+            "process_count": len(product.processes),
+            "material_std_cost": round(self.std_rollup.total_cost(tree), 4),
+            "material_vave_cost": round(self.vave_rollup.total_cost(tree), 4),
+        }
+        self.product_summaries.append({
+            "product_code": info.product_code,
+            "product_name": info.product_name,
+            "material_count": info.material_count,
+        })
+        self.progress(STAGE_PARSE, products_parsed=1)
 
-    # 查询工艺费率
-    process_names = [p.name for p in all_processes if p.name]
-    print(f"[DEBUG] Querying processes: {process_names}")
 
-    processes_with_rate = await to_thread(_query_processes_sync, process_names)
-    print(f"[DEBUG] Processes query time: {time.time() - start_time:.3f}s, found: {len(processes_with_rate)}")
+async def _run_upload_pipeline(
+    content: BOMSource,
+    filename: str | None,
+    project_id: str,
+    db: AsyncSession,
+    progress: ProgressCallback | None = None,
+    trace: PipelineTrace | None = None,
+) -> dict:
+    """执行 BOM 上传流水线，将事件流组装为完整的 JSON 响应内容.
 
-    # 构建工艺响应
-    processes = []
-    for idx, p in enumerate(all_processes):
-        rate_data = processes_with_rate.get(p.name, {})
-
-        # 计算工序总成本：费率 × 标准工时
-        standard_time = p.standard_time or 1.0
-        hourly_rate = rate_data.get("unit_price")
-        vave_hourly_rate = rate_data.get("vave_price")
-
-        unit_price = None
-        vave_price = None
-        if hourly_rate is not None:
-            unit_price = round(hourly_rate * standard_time, 2)
-        if vave_hourly_rate is not None:
-            vave_price = round(vave_hourly_rate * standard_time, 2)
-
-        processes.append(
-            BOMProcessResponse(
-                id=f"P-{idx + 1:03d}",
-                op_no=p.op_no or f"{idx + 1:03d}",
-                name=p.name,
-                work_center=p.work_center or rate_data.get("work_center", ""),
-                standard_time=standard_time,
-                unit_price=unit_price,
-                vave_price=vave_price,
-                has_history_data=rate_data.get("has_history_data", False),
-            )
+    Args:
+        content: 文件内容或落盘文件路径
+        filename: 文件名（用于识别 CSV/TSV/Arrow/Parquet）
+        project_id: 项目 ID
+        db: 数据库会话
+        progress: 进度回调 progress(stage, **计数器增量)，后台任务使用
+        trace: 分阶段计时（由调用方结束）
+
+    Returns:
+        dict: 上传接口响应内容
+    """
+    materials: list[dict] = []
+    processes: list[dict] = []
+    products_grouped = []
+    response = {}
+
+    async for event in _iter_upload_events(content, filename, project_id, db, progress, trace):
+        kind = event.pop("type")
+        if kind == "product":
+            # 按产品分组的数据（与汇总列表共享同一批字典）
+            group = {
+                **event,
+                "material_count": 0,
+                "process_count": 0,
+                "material_std_cost": 0.0,
+                "material_vave_cost": 0.0,
+                "materials": [],
+                "processes": [],
+            }
+            products_grouped.append(group)
+        elif kind == "materials":
+            materials.extend(event["items"])
+            group["materials"].extend(event["items"])
+        elif kind == "processes":
+            processes.extend(event["items"])
+            group["processes"].extend(event["items"])
+        elif kind == "product_end":
+            group["material_count"] = len(group["materials"])
+            group["process_count"] = len(group["processes"])
+            group["material_std_cost"] = event["material_std_cost"]
+            group["material_vave_cost"] = event["material_vave_cost"]
+        else:
+            response = event
+
+    return {
+        "parseId": response["parseId"],
+        "status": response["status"],
+        "priceBookVersion": response["priceBookVersion"],
+        "materials": materials,
+        "processes": processes,
+        "summary": response["summary"],
+        # 按产品分组的数据
+        "products_grouped": products_grouped,
+    }
+
+
+def _build_material_response(
+    idx: int, m, price_data: dict, extended_quantity: float | None = None
+) -> BOMMaterialResponse:
+    """构建单行物料响应，自动填充历史价格并判断状态灯."""
+    # 判断状态
+    if price_data.get("has_history_data"):
+        status = StatusLight.GREEN
+    elif m.comments:  # 有备注但无历史数据，可能需要AI估算
+        status = StatusLight.YELLOW
+    else:
+        status = StatusLight.RED
+
+    return BOMMaterialResponse(
+        id=f"M-{idx + 1:03d}",
+        level=m.level,
+        part_number=m.part_number or "",
+        part_name=m.part_name or "",
+        version=m.version,
+        type=m.type,
+        stock_status=m.status,
+        material=m.material or price_data.get("material", ""),
+        supplier=m.supplier or price_data.get("supplier", ""),
+        quantity=m.quantity,
+        extended_quantity=extended_quantity,
+        unit=m.unit,
+        unit_price=price_data.get("unit_price"),
+        vave_price=price_data.get("vave_price"),
+        has_history_data=price_data.get("has_history_data", False),
+        comments=m.comments,
+        status=status,
+    )
+
+
+def _build_process_response(idx: int, p, rate_data: dict) -> BOMProcessResponse:
+    """构建单行工艺响应，工序总成本 = 费率 × 标准工时."""
+    standard_time = p.standard_time or 1.0
+    hourly_rate = rate_data.get("unit_price")
+    vave_hourly_rate = rate_data.get("vave_price")
+
+    unit_price = None
+    vave_price = None
+    if hourly_rate is not None:
+        unit_price = round(hourly_rate * standard_time, 2)
+    if vave_hourly_rate is not None:
+        vave_price = round(vave_hourly_rate * standard_time, 2)
+
+    return BOMProcessResponse(
+        id=f"P-{idx + 1:03d}",
+        op_no=p.op_no or f"{idx + 1:03d}",
+        name=p.name,
+        work_center=p.work_center or rate_data.get("work_center", ""),
+        standard_time=standard_time,
+        unit_price=unit_price,
+        vave_price=vave_price,
+        has_history_data=rate_data.get("has_history_data", False),
+    )
+
+
+# ==================== 分块续传上传 ====================
+
+def _upload_error(exc: ChunkedUploadError) -> HTTPException:
+    """分块上传错误 → HTTP 错误（Upload-Offset 头给出可续传的偏移量）."""
+    headers = {"Upload-Offset": str(exc.offset)} if exc.offset is not None else None
+    return HTTPException(status_code=exc.status_code, detail=str(exc), headers=headers)
+
+
+@router.post("/uploads")
+async def create_bom_upload(body: BOMUploadInitRequest):
+    """创建分块上传.
+
+    大文件上传流程：
+    1. POST /bom/uploads 声明文件名、总大小和 SHA-256，返回 uploadId
+    2. PUT /bom/uploads/{uploadId}?offset=N 按顺序上传各块（请求体为原始字节，
+       可带 X-Chunk-SHA256 头校验本块）
+    3. 断线后 GET /bom/uploads/{uploadId} 查询已接收的 offset，从断点继续
+    4. POST /bom/uploads/{uploadId}/complete 校验并解析，响应与 POST /bom/upload 相同
+
+    Args:
+        body: 文件名、总大小和可选的 SHA-256
+
+    Returns:
+        上传状态（uploadId / offset / totalSize / status）
+    """
+    try:
+        status = ChunkedUploadStore().init(body.filename, body.total_size, body.sha256)
+    except ChunkedUploadError as exc:
+        raise _upload_error(exc)
+    return JSONResponse(status_code=201, content=status)
+
+
+@router.get("/uploads/{upload_id}")
+async def get_bom_upload(upload_id: str):
+    """查询分块上传状态（offset 为服务端已接收的字节数）."""
+    try:
+        status = ChunkedUploadStore().status(upload_id)
+    except ChunkedUploadError as exc:
+        raise _upload_error(exc)
+    return JSONResponse(content=status, headers={"Upload-Offset": str(status["offset"])})
+
+
+@router.put("/uploads/{upload_id}")
+async def append_bom_upload(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0, description="本块起始偏移量，必须等于已接收的字节数"),
+    chunk_sha256: str | None = Header(None, alias="X-Chunk-SHA256"),
+):
+    """上传一块数据.
+
+    请求体按到达顺序直接追加到落盘文件，不在内存中拼接。offset 与已接收字节数
+    不一致时返回 409（Upload-Offset 头给出正确偏移量）；校验失败时本块回滚并返回 422。
+
+    Args:
+        upload_id: 上传 ID
+        request: 请求对象（读取原始请求体）
+        offset: 本块起始偏移量
+        chunk_sha256: 本块的 SHA-256（可选）
+
+    Returns:
+        追加后的上传状态
+    """
+    try:
+        status = await ChunkedUploadStore().append(
+            upload_id, offset, request.stream(), chunk_sha256
         )
+    except ChunkedUploadError as exc:
+        raise _upload_error(exc)
+    return JSONResponse(content=status, headers={"Upload-Offset": str(status["offset"])})
 
-    print(f"[DEBUG] Total time: {time.time() - start_time:.3f}s")
 
-    # 按产品分组物料和工艺数据
-    # 注意：需要按产品顺序重新分配带价格的物料数据
-    products_grouped = []
-    global_material_idx = 0
-    global_process_idx = 0
-
-    for product in parse_result.products:
-        # 获取该产品的原始物料数量
-        product_material_count = len(product.materials)
-
-        # 从全局物料列表中取出该产品的物料（按顺序）
-        product_materials = []
-        for _ in range(product_material_count):
-            if global_material_idx < len(materials):
-                product_materials.append(materials[global_material_idx].model_dump(by_alias=True))
-                global_material_idx += 1
-
-        # 获取该产品的工艺
-        product_process_count = len(product.processes)
-        product_processes = []
-        for _ in range(product_process_count):
-            if global_process_idx < len(processes):
-                product_processes.append(processes[global_process_idx].model_dump(by_alias=True))
-                global_process_idx += 1
-
-        products_grouped.append({
-            "product_code": product.product_info.product_code,
-            "product_name": product.product_info.product_name,
-            "product_number": product.product_info.product_number,
-            "customer_number": product.product_info.customer_number,
-            "material_count": len(product_materials),
-            "process_count": len(product_processes),
-            "materials": product_materials,
-            "processes": product_processes,
-        })
+@router.post("/uploads/{upload_id}/complete")
+async def complete_bom_upload(
+    upload_id: str,
+    body: BOMUploadCompleteRequest,
+    request: Request,
+    mode: Literal["sync", "async"] = Query("sync", description="async 时立即返回任务 ID，后台执行"),
+    db: AsyncSession = Depends(get_db),
+):
+    """完成分块上传并解析 BOM.
+
+    校验总大小和 SHA-256 后将落盘文件的路径交给解析流水线（Excel 由 zipfile 按需
+    读取，CSV 流式解码，Arrow/Parquet 使用内存映射），文件不会整体读入内存。
+    mode 和 Accept 头的含义与 POST /bom/upload 相同；流水线结束后删除落盘文件。
+    同步完整 JSON 响应因文件过大返回 413 时不删除落盘文件，可带 mode=async 或
+    NDJSON Accept 头用同一 uploadId 重新 complete。
+
+    Args:
+        upload_id: 上传 ID
+        body: 关联的项目 ID
+        request: 请求对象（用于读取 Accept 头）
+        mode: sync=同步返回解析结果，async=后台任务
+        db: 数据库会话
+
+    Returns:
+        与 POST /bom/upload 相同
+    """
+    store = ChunkedUploadStore()
+    try:
+        _check_sync_response_size(request, mode, store.status(upload_id)["totalSize"])
+        path, filename = await store.complete(upload_id)
+    except ChunkedUploadError as exc:
+        raise _upload_error(exc)
+    return await _respond_upload(
+        request, path, filename, body.project_id, mode, db,
+        on_done=lambda: store.discard(upload_id),
+    )
+
+
+@router.get("/parse-cache/stats")
+async def get_parse_cache_stats():
+    """获取 BOM 解析结果缓存的命中/未命中计数."""
+    hits = parse_cache_stats["hits"]
+    misses = parse_cache_stats["misses"]
+    total = hits + misses
+    return JSONResponse(content={
+        "hits": hits,
+        "misses": misses,
+        "hitRate": round(hits / total, 4) if total else 0.0,
+    })
+
+
+@router.get("/pipeline/stats")
+async def get_pipeline_stats():
+    """上传流水线各阶段的耗时直方图（毫秒）和累计行数 / 字节数（进程内）."""
+    return JSONResponse(content=pipeline_metrics())
+
+
+@router.get("/lookup/stats")
+async def get_lookup_stats():
+    """获取主数据查询的规划计数（去重 / 缓存命中 / 数据库查询）、价格簿版本和连接池复用计数."""
+    return JSONResponse(content={
+        **connection_reuse_stats(),
+        "planner": lookup_planner_stats,
+        "priceBook": price_book_registry.stats(),
+    })
 
+
+# ==================== 后台导入任务 API ====================
+
+# SSE 心跳间隔（秒），防止代理在长时间无进度时断开连接
+JOB_EVENTS_KEEPALIVE = 15
+
+
+@router.get("/jobs/{job_id}")
+async def get_bom_import_job(job_id: str):
+    """查询 BOM 导入任务状态、阶段进度；任务完成后包含解析结果."""
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JSONResponse(content=job.to_dict(include_result=job.status == JOB_COMPLETED))
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_bom_import_job_events(job_id: str):
+    """以 Server-Sent Events 推送 BOM 导入任务进度.
+
+    每次进度变化推送一条 progress 事件；任务结束时推送 completed / failed 事件后关闭，
+    结果本身通过 GET /bom/jobs/{job_id} 获取。
+    """
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        version = -1
+        while True:
+            if job.version > version:
+                version = job.version
+                event = job.status if job.done else "progress"
+                yield f"event: {event}\ndata: {json.dumps(job.to_dict(), ensure_ascii=False)}\n\n"
+                if job.done:
+                    return
+            elif not await job_store.wait_for_change(job, version, JOB_EVENTS_KEEPALIVE):
+                yield ": keepalive\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ==================== 列映射模板 API ====================
+
+@router.get("/mapping-profiles")
+async def list_mapping_profiles(db: AsyncSession = Depends(get_db)):
+    """获取已保存的 BOM 列映射模板."""
+    profiles = await ColumnMappingProfileService(db).list_profiles()
+    return JSONResponse(content=[
+        ColumnMappingProfileResponse.model_validate(p).model_dump(by_alias=True, mode="json")
+        for p in profiles
+    ])
+
+
+@router.post("/mapping-profiles")
+async def save_mapping_profile(
+    data: ColumnMappingProfileCreate,
+    db: AsyncSession = Depends(get_db),
+):
+    """保存修正后的列映射模板.
+
+    按表头行签名保存，之后上传的相同表头格式的 BOM 直接使用该映射。
+
+    Args:
+        data: 模板名称、表头行单元格和列映射
+    """
+    try:
+        profile = await ColumnMappingProfileService(db).save_profile(data)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
     return JSONResponse(
-        content={
-            "parseId": f"parse-{project_id}",
-            "status": "completed",
-            "materials": [m.model_dump(by_alias=True) for m in materials],
-            "processes": [p.model_dump(by_alias=True) for p in processes],
-            "summary": {
-                "total_materials": len(materials),
-                "matched_materials": sum(1 for m in materials if m.has_history_data),
-                "total_processes": len(processes),
-                "matched_processes": sum(1 for p in processes if p.has_history_data),
-                "total_products": parse_result.total_products,
-                "products": [
-                    {
-                        "product_code": p.product_info.product_code,
-                        "product_name": p.product_info.product_name,
-                        "material_count": p.product_info.material_count,
-                    }
-                    for p in parse_result.products
-                ],
-            },
-            # 按产品分组的数据
-            "products_grouped": products_grouped,
-        }
+        content=ColumnMappingProfileResponse.model_validate(profile).model_dump(
+            by_alias=True, mode="json"
+        )
     )
 
 
+@router.delete("/mapping-profiles/{profile_id}")
+async def delete_mapping_profile(profile_id: str, db: AsyncSession = Depends(get_db)):
+    """删除列映射模板."""
+    if not await ColumnMappingProfileService(db).delete_profile(profile_id):
+        raise HTTPException(status_code=404, detail="Mapping profile not found")
+    return JSONResponse(content={"status": "success"})
+
+
 # ==================== 多产品 BOM 解析 API ====================
 
 @router.post("/parse-preview")
@@ -402,12 +903,18 @@ async def parse_bom_preview(
         project_id: 关联的项目 ID
 
     Returns:
-        BOMPreviewResponse: 包含所有产品的预览数据
+        BOMPreviewResponse: 包含所有产品的预览数据和 previewToken
     """
     content = await file.read()
 
-    parser = MultiProductBOMParser()
-    result = parser.parse_excel_file(content)
+    # 加载已保存的列映射模板（节流刷新）
+    await ColumnMappingProfileService(db).ensure_registry_loaded()
+
+    # 优先复用解析结果缓存；未命中时在线程中解析（多 sheet 时可由进程池并行）
+    result = await BOMParseCache(get_cache_service()).parse_multi(content, file.filename)
+
+    # 预览结果保存在服务端，confirm-create 只需回传令牌和用户修改
+    preview_token = await BOMPreviewStore(get_cache_service()).save(project_id, result)
 
     # 转换为 Schema 格式
     products_schema = []
@@ -458,6 +965,7 @@ async def parse_bom_preview(
 
     response = BOMPreviewResponse(
         project_id=project_id,
+        preview_token=preview_token,
         products=products_schema,
         total_products=result.total_products,
         total_materials=result.total_materials,
@@ -476,185 +984,182 @@ async def confirm_create_products(
 
     两步流程的第二步：确认 → 创建产品 + 物料
 
+    请求携带 previewToken 时从服务端读取 parse-preview 保存的解析结果，只应用
+    edits 中的少量修改（仅修改行经过校验），创建成功后令牌失效；
+    令牌不存在或过期返回 404，需重新预览。
+
+    新产品通过 BOMBulkWriter 按批 executemany 写入，响应中的 write_stats
+    给出写入行数、批次、提交次数和 rows/sec。
+
+    mode="merge" 时，项目中已存在相同 product_code 的产品按
+    (part_number, version, level) 增量合并新版本 BOM，只插入 / 更新 / 删除差异行。
+
     Args:
         request: 包含产品和物料数据的创建请求
 
     Returns:
-        创建结果摘要
+        创建结果摘要（合并的产品附带 changes 变更统计）
     """
     from app.models.project_product import ProjectProduct
-    from app.models.product_material import ProductMaterial
-    import uuid
-    from datetime import datetime
 
-    created_products = []
+    products = request.products
+    preview_store = BOMPreviewStore(get_cache_service())
+    if request.preview_token is not None:
+        preview = await preview_store.load(request.preview_token)
+        if preview is None:
+            raise HTTPException(status_code=404, detail="Preview not found or expired")
+        preview_project_id, result = preview
+        if preview_project_id != request.project_id:
+            raise HTTPException(status_code=400, detail="Preview belongs to another project")
+        try:
+            products = apply_material_edits(result.products, request.edits)
+        except BOMPreviewEditError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+
+    writer = BOMBulkWriter(db, request.batch_size, request.commit_rows)
+    # 写入前后各递增一次 BOM 修订号：批量写入中途提交时，成本汇总也不会把
+    # 不完整的 BOM 缓存在最终的修订号下
+    await bump_bom_revision(db, request.project_id)
+    new_products = []
+    merged_products = []
     total_materials = 0
 
-    for product_data in request.products:
-        # 1. 创建 ProjectProduct 记录
-        product_id = str(uuid.uuid4())
-        project_product = ProjectProduct(
-            id=product_id,
-            project_id=request.project_id,
-            product_name=product_data.product_info.product_name or product_data.product_info.product_code,
-            product_code=product_data.product_info.product_code,
-            product_version=product_data.product_info.product_version,
-            route_code=None,  # 工艺路线代码待后续添加
-            bom_file_path=None,
-            created_at=datetime.utcnow()
-        )
-        db.add(project_product)
-
-        # 先 flush 确保 ProjectProduct 插入到数据库（满足外键约束）
-        await db.flush()
-
-        # 2. 创建 ProductMaterial 记录
-        for material_data in product_data.materials:
-            material_id = str(uuid.uuid4())
-            product_material = ProductMaterial(
-                id=material_id,
-                project_product_id=product_id,
-                material_id=None,  # 关联到 materials 表的 ID（后续可匹配）
-                part_number=material_data.part_number,
-                material_level=int(material_data.level) if str(material_data.level).isdigit() else None,
-                version=material_data.version,
-                stock_status=material_data.status,
-                material_name=material_data.part_name,
-                material_type=material_data.type,
-                supplier=material_data.supplier,
-                quantity=float(material_data.quantity),
-                unit=material_data.unit,
-                std_cost=None,  # 待后续成本计算填充
-                vave_cost=None,
-                confidence=None,
-                remarks=material_data.comments,
-                created_at=datetime.utcnow()
+    for product_data in products:
+        info = product_data.product_info
+
+        # 版本合并模式：已存在同编码产品时只写入差异行
+        if request.mode == "merge":
+            result = await db.execute(
+                select(ProjectProduct)
+                .where(
+                    ProjectProduct.project_id == request.project_id,
+                    ProjectProduct.product_code == info.product_code,
+                )
+                .order_by(ProjectProduct.created_at.desc())
+                .limit(1)
             )
-            db.add(product_material)
-            total_materials += 1
-
-        created_products.append({
-            "id": product_id,
-            "product_code": product_data.product_info.product_code,
-            "product_name": product_data.product_info.product_name,
-            "material_count": len(product_data.materials)
-        })
+            existing = result.scalar_one_or_none()
+            if existing is not None:
+                existing.product_version = info.product_version
+                if info.product_name:
+                    existing.product_name = info.product_name
+                changes = await BOMRevisionMerger(db, writer).merge(
+                    existing.id, product_data.materials
+                )
+                total_materials += len(product_data.materials)
+                merged_products.append({
+                    "id": existing.id,
+                    "product_code": info.product_code,
+                    "product_version": info.product_version,
+                    "changes": changes,
+                })
+                continue
+
+        new_products.append(product_data)
+
+    # 新产品及物料走批量写入路径（Core insert executemany，客户端生成 UUID）
+    created_products = await writer.create_products(request.project_id, new_products)
+    total_materials += sum(p["material_count"] for p in created_products)
 
     # 提交所有更改
+    await bump_bom_revision(db, request.project_id)
     await db.commit()
+    if request.preview_token is not None:
+        await preview_store.delete(request.preview_token)
+
+    message = f"成功创建 {len(created_products)} 个产品，共 {total_materials} 条物料记录"
+    if merged_products:
+        written = sum(
+            p["changes"]["inserted"] + p["changes"]["updated"] + p["changes"]["deleted"]
+            for p in merged_products
+        )
+        message += f"；合并 {len(merged_products)} 个产品新版本，写入 {written} 条差异行"
 
     return JSONResponse(content={
         "status": "success",
-        "message": f"成功创建 {len(created_products)} 个产品，共 {total_materials} 条物料记录",
+        "message": message,
         "created_products": created_products,
-        "total_products": len(created_products),
-        "total_materials": total_materials
+        "merged_products": merged_products,
+        "total_products": len(created_products) + len(merged_products),
+        "total_materials": total_materials,
+        "write_stats": writer.stats.to_dict(),
     })
 
 
 @router.get("/products/{project_id}")
 async def get_project_bom_data(
     project_id: str,
+    request: Request,
+    cursor: str | None = Query(None, description="上一页返回的 nextCursor"),
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE, description="每页物料行数，指定时分页返回"),
+    product_id: str | None = Query(None, alias="productId", description="只读取指定产品"),
+    fields: str | None = Query(None, description="逗号分隔的行字段，如 partNumber,quantity,unitPrice"),
     db: AsyncSession = Depends(get_db)
 ):
     """获取项目中所有产品的 BOM 数据.
 
-    用于前端组件加载时恢复已保存的 BOM 数据
+    用于前端组件加载时恢复已保存的 BOM 数据。产品、物料行、工艺行各一条集合查询，
+    价格按全部去重物料编码一次批量查询。
+
+    请求头 Accept 含 application/x-ndjson 时按产品流式返回：每个产品一行
+    （type=product），最后一行为 type=summary。
+
+    指定 limit / cursor / productId 任一参数时分页返回：物料行按 (产品, 行) 键集游标
+    每页最多 limit 行，产品的工艺行随其第一页返回，nextCursor 为 null 表示已读完。
+    fields 只输出（并只查询）所列字段，同名字段同时作用于物料行和工艺行。
 
     Args:
         project_id: 项目 ID
+        request: 请求对象（用于读取 Accept 头）
+        cursor: 分页游标
+        limit: 每页物料行数
+        product_id: 只读取指定产品
+        fields: 字段投影
         db: 数据库会话
 
     Returns:
-        项目中所有产品的 BOM 数据（物料和工艺）
+        项目中所有产品的 BOM 数据（物料和工艺）；分页时附带 nextCursor
     """
-    from app.models.project_product import ProjectProduct
-    from app.models.product_material import ProductMaterial
-    from app.models.product_process import ProductProcess
-    from sqlalchemy import select
-
-    # 查询项目的所有产品
-    stmt = select(ProjectProduct).where(ProjectProduct.project_id == project_id)
-    result = await db.execute(stmt)
-    products = result.scalars().all()
-
-    products_data = []
-
-    for product in products:
-        # 查询该产品的物料
-        material_stmt = select(ProductMaterial).where(
-            ProductMaterial.project_product_id == product.id
+    try:
+        projection = FieldProjection.parse(fields)
+        page_cursor = PageCursor.decode(cursor) if cursor else None
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    if limit is not None or page_cursor is not None or product_id is not None:
+        page = await ProjectBOMService(db).get_page(
+            project_id,
+            limit=limit or DEFAULT_PAGE_SIZE,
+            cursor=page_cursor,
+            product_id=product_id,
+            projection=projection,
         )
-        material_result = await db.execute(material_stmt)
-        materials = material_result.scalars().all()
+        next_cursor = page["next_cursor"]
+        return JSONResponse(content={
+            "status": "success",
+            "projectId": project_id,
+            "products": page["products"],
+            "nextCursor": next_cursor.encode() if next_cursor else None,
+        })
 
-        # 查询该产品的工艺（如果表存在）
-        processes = []
-        try:
-            process_stmt = select(ProductProcess).where(
-                ProductProcess.project_product_id == product.id
-            )
-            process_result = await db.execute(process_stmt)
-            processes = process_result.scalars().all()
-        except Exception:
-            # 表可能不存在或查询失败，忽略
-            pass
+    if _wants_ndjson(request):
+        async def events():
+            async with AsyncSessionLocal() as stream_db:
+                total = 0
+                service = ProjectBOMService(stream_db)
+                async for product in service.iter_products(project_id, projection):
+                    total += 1
+                    yield {"type": "product", **product}
+                yield {
+                    "type": "summary",
+                    "status": "success",
+                    "projectId": project_id,
+                    "totalProducts": total,
+                }
 
-        # 转换物料数据为前端格式
-        materials_data = []
-        for idx, m in enumerate(materials):
-            # 尝试从 materials 表获取价格
-            price_data = {}
-            if m.material_id:
-                material_codes = [m.material_id]
-                price_lookup = await to_thread(_query_materials_sync, material_codes)
-                price_data = price_lookup.get(m.material_id, {})
-
-            materials_data.append({
-                "id": f"M-{idx + 1:03d}",
-                "level": str(m.material_level) if m.material_level is not None else "",
-                "partNumber": m.part_number or "",
-                "partName": m.material_name or "",
-                "version": m.version or "1.0",
-                "type": m.material_type or "I",
-                "stockStatus": m.stock_status or "N",
-                "material": price_data.get("material", ""),
-                "supplier": m.supplier or price_data.get("supplier", ""),
-                "quantity": float(m.quantity) if m.quantity is not None else 0,
-                "unit": m.unit or "PC",
-                "unitPrice": price_data.get("unit_price"),
-                "vavePrice": price_data.get("vave_price"),
-                "hasHistoryData": price_data.get("has_history_data", False),
-                "comments": m.remarks or "",
-                "status": "GREEN" if price_data.get("has_history_data") else "RED"
-            })
-
-        # 转换工艺数据为前端格式
-        processes_data = []
-        for idx, p in enumerate(processes):
-            processes_data.append({
-                "id": f"P-{idx + 1:03d}",
-                "opNo": str(p.sequence_order) if p.sequence_order is not None else f"{idx + 1:03d}",
-                "name": p.process_code or "",
-                "workCenter": "",
-                "standardTime": float(p.cycle_time_std or p.cycle_time or 0) / 3600,  # 转换为小时
-                "spec": p.remarks,
-                "unit": "件",
-                "quantity": 1,
-                "unitPrice": float(p.std_cost) if p.std_cost is not None else None,
-                "vavePrice": float(p.vave_cost) if p.vave_cost is not None else None,
-                "hasHistoryData": p.std_cost is not None,
-                "isOperationKnown": p.std_cost is not None
-            })
-
-        products_data.append({
-            "productId": product.id,
-            "productName": product.product_name,
-            "productCode": product.product_code,
-            "materials": materials_data,
-            "processes": processes_data,
-            "isParsed": len(materials_data) > 0 or len(processes_data) > 0
-        })
+        return StreamingResponse(_ndjson_lines(events()), media_type=NDJSON_MEDIA_TYPE)
+
+    products_data = await ProjectBOMService(db).get_products(project_id, projection)
 
     return JSONResponse(content={
         "status": "success",
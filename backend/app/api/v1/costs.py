@@ -1,15 +1,15 @@
 """成本计算 API 路由."""
 
-from decimal import Decimal
-from fastapi import APIRouter, Depends, Body
+from fastapi import APIRouter, Depends, Body, HTTPException
 from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, Field
 
 from app.db.session import get_db
 from app.services.calculation import DualTrackCalculator
+from app.services.cost_memo import cost_memo
+from app.services.project_cost_service import ProjectCostService
 from app.schemas.cost import CostCalculationResponse
-from app.schemas.common import PricePair
 
 router = APIRouter()
 
@@ -54,49 +54,47 @@ async def calculate_cost(
     Returns:
         双轨成本计算结果
     """
-    calculator = DualTrackCalculator(db)
+    # 整个 BOM 使用同一价格簿快照计算
+    breakdown = await DualTrackCalculator(db).calculate_many(
+        [(mat.code, mat.quantity) for mat in request.materials] if request else [],
+        [(proc.name, proc.cycle_time) for proc in request.processes] if request else [],
+    )
 
-    # 计算物料成本
-    material_std = Decimal("0")
-    material_vave = Decimal("0")
+    result = CostCalculationResponse(
+        product_id=product_id,
+        material_cost=breakdown.material_cost,
+        process_cost=breakdown.process_cost,
+        total_cost=breakdown.total_cost,
+        price_book_version=breakdown.price_book_version,
+    )
+    return JSONResponse(content=result.model_dump(mode="json", by_alias=True))
 
-    if request:
-        for mat in request.materials:
-            cost_pair = await calculator.calculate_material_cost(mat.code, mat.quantity)
-            material_std += cost_pair.std
-            material_vave += cost_pair.vave
 
-    # 计算工艺成本
-    process_std = Decimal("0")
-    process_vave = Decimal("0")
+@router.post("/projects/{project_id}/rollup")
+async def rollup_project_cost(
+    project_id: str,
+    db: AsyncSession = Depends(get_db),
+):
+    """计算项目全部产品的双轨成本并写入报价汇总.
 
-    if request:
-        for proc in request.processes:
-            cost_pair = await calculator.calculate_process_cost(proc.name, proc.cycle_time)
-            process_std += cost_pair.std
-            process_vave += cost_pair.vave
+    一次读取项目所有产品的物料和工艺行，逐产品及项目汇总，
+    QuoteSummary 的 total_std_cost / total_vave_cost 等字段同时更新。
 
-    # 计算总成本
-    total_std = material_std + process_std
-    total_vave = material_vave + process_vave
+    Args:
+        project_id: 项目 ID
+        db: 数据库会话
 
-    result = CostCalculationResponse(
-        product_id=product_id,
-        material_cost=_create_price_pair(material_std, material_vave),
-        process_cost=_create_price_pair(process_std, process_vave),
-        total_cost=_create_price_pair(total_std, total_vave),
-    )
+    Returns:
+        逐产品和项目的双轨成本
+    """
+    try:
+        result = await ProjectCostService(db).rollup(project_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     return JSONResponse(content=result.model_dump(mode="json", by_alias=True))
 
 
-def _create_price_pair(std: Decimal, vave: Decimal) -> PricePair:
-    """创建 PricePair，自动计算节省."""
-    savings = std - vave
-    savings_rate = float(savings / std) if std > 0 else 0.0
-
-    return PricePair(
-        std=std.quantize(Decimal("0.01")),
-        vave=vave.quantize(Decimal("0.01")),
-        savings=savings.quantize(Decimal("0.01")),
-        savings_rate=round(savings_rate, 4),
-    )
+@router.get("/memo/stats")
+async def get_cost_memo_stats():
+    """成本结果缓存统计（命中 / 未命中 / 版本变更清空 / 条目数）."""
+    return cost_memo.stats()
@@ -20,6 +20,7 @@ from app.schemas.material import (
 )
 from app.models.material import Material
 from app.models.process_rate import ProcessRate
+from app.services.price_book import price_book_registry
 
 
 router = APIRouter()
@@ -99,6 +100,8 @@ async def create_material(
 
     db.add(material)
     await db.commit()
+    # 价格簿下次读取时重建（BOM 页面、上传查价和成本计算均使用价格簿）
+    price_book_registry.invalidate()
     await db.refresh(material)
 
     response = MaterialResponse(
@@ -201,6 +204,7 @@ async def update_material(
         material.category = data.category
 
     await db.commit()
+    price_book_registry.invalidate()
     await db.refresh(material)
 
     response = MaterialResponse(
@@ -241,6 +245,7 @@ async def delete_material(
 
     await db.delete(material)
     await db.commit()
+    price_book_registry.invalidate()
 
     return JSONResponse(content={"message": "Material deleted successfully"})
 
@@ -301,6 +306,7 @@ async def create_process_rate(
 
     db.add(rate)
     await db.commit()
+    price_book_registry.invalidate()
     await db.refresh(rate)
 
     response = ProcessRateResponse(
@@ -30,7 +30,7 @@ from app.schemas.process_route import (
     ProcessRouteApprovalResponse,
 )
 from app.models.process_route import ProcessRoute, ProcessRouteItem
-from app.models.process_rate import ProcessRate
+from app.services.price_book import price_book_registry
 
 router = APIRouter()
 
@@ -83,6 +83,7 @@ def _item_to_response(item: ProcessRouteItem) -> ProcessRouteItemResponse:
         std_mhr_fix=item.std_mhr_fix,
         vave_mhr_var=item.vave_mhr_var,
         vave_mhr_fix=item.vave_mhr_fix,
+        price_book_version=item.price_book_version,
         efficiency_factor=item.efficiency_factor,
         remarks=item.remarks,
         std_cost=item.std_cost,
@@ -215,13 +216,10 @@ async def create_process_route(
     db.add(route)
     await db.flush()
 
-    # 创建工序明细
+    # 创建工序明细（费率快照取自同一价格簿版本）
+    book = await price_book_registry.get(db)
     for item_data in data.items:
-        # 查询工序费率获取快照数据
-        process_result = await db.execute(
-            select(ProcessRate).where(ProcessRate.process_code == item_data.process_code)
-        )
-        process_rate = process_result.scalar_one_or_none()
+        process_rate = book.process_by_code(item_data.process_code)
 
         item = ProcessRouteItem(
             route_id=route.id,
@@ -238,6 +236,7 @@ async def create_process_route(
             std_mhr_fix=process_rate.std_mhr_fix if process_rate else None,
             vave_mhr_var=process_rate.vave_mhr_var if process_rate else None,
             vave_mhr_fix=process_rate.vave_mhr_fix if process_rate else None,
+            price_book_version=book.version,
             equipment=process_rate.equipment if process_rate else None,
             remarks=item_data.remarks,
         )
@@ -364,12 +363,10 @@ async def update_process_route(
         await db.execute(
             select(ProcessRouteItem).where(ProcessRouteItem.route_id == route_id)
         )
-        # 重新创建工序
+        # 重新创建工序（费率快照取自同一价格簿版本）
+        book = await price_book_registry.get(db)
         for item_data in data.items:
-            process_result = await db.execute(
-                select(ProcessRate).where(ProcessRate.process_code == item_data.process_code)
-            )
-            process_rate = process_result.scalar_one_or_none()
+            process_rate = book.process_by_code(item_data.process_code)
 
             item = ProcessRouteItem(
                 route_id=route.id,
@@ -385,6 +382,7 @@ async def update_process_route(
                 std_mhr_fix=process_rate.std_mhr_fix if process_rate else None,
                 vave_mhr_var=process_rate.vave_mhr_var if process_rate else None,
                 vave_mhr_fix=process_rate.vave_mhr_fix if process_rate else None,
+                price_book_version=book.version,
                 equipment=process_rate.equipment if process_rate else None,
                 remarks=item_data.remarks,
             )
@@ -44,6 +44,7 @@ async def create_project_product(
         created_at=datetime.utcnow(),
     )
 
+    # BOM 修订号由 before_flush 钩子随本次写入递增
     db.add(project_product)
     await db.commit()
     await db.refresh(project_product)
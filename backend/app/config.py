@@ -32,6 +32,24 @@ class Settings(BaseSettings):
     REDIS_DB: int = 0
     REDIS_PASSWORD: str = ""
 
+    # BOM 解析
+    BOM_PARSE_WORKERS: int = 1  # 多产品 BOM 并行解析进程数（<=1 为串行，进程池全局共享）
+    BOM_PARSE_CACHE_DIR: str = ""  # 解析结果磁盘缓存目录（Redis 不可用时使用，空为系统临时目录）
+    BOM_PARSE_CACHE_MAX_BYTES: int = 50 * 1024 * 1024  # 超过该大小的文件不缓存解析结果
+    BOM_READER_BACKEND: str = "openpyxl"  # Excel 读取后端：openpyxl 或 xlsx（zipfile + iterparse 直读）
+    BOM_LOOKUP_CHUNK_SIZE: int = 1000  # 主数据查询每条 SQL 的 IN 列表长度
+    BOM_LOOKUP_CONCURRENCY: int = 4  # 主数据分块查询并发上限（不超过连接池容量）
+    BOM_LOOKUP_CACHE_SIZE: int = 100_000  # 主数据查询进程内缓存条目上限（0 为不缓存）
+    BOM_LOOKUP_CACHE_TTL: int = 300  # 主数据查询进程内缓存过期时间（秒，含未命中结果）
+    BOM_PRICE_BOOK_TTL: int = 300  # 价格簿最长使用时间（秒），其他 worker 的主数据变更在此时间内生效
+    BOM_COST_MEMO_SIZE: int = 10_000  # 成本计算结果进程内缓存条目上限（0 为不缓存）
+    BOM_INSERT_BATCH_SIZE: int = 5000  # confirm-create 每条 executemany 插入的行数
+    BOM_INSERT_COMMIT_ROWS: int = 0  # 每写入多少行提交一次（0 为整个请求一个事务）
+    BOM_UPLOAD_SPOOL_DIR: str = ""  # 分块上传落盘目录（多 worker 需共享，空为系统临时目录）
+    BOM_UPLOAD_TTL: int = 24 * 3600  # 未完成的分块上传保留时间（秒）
+    BOM_UPLOAD_LOOKUP_ROWS: int = 5000  # 上传流水线攒够多少行物料后统一查价一次（跨批次和产品）
+    BOM_SYNC_UPLOAD_MAX_BYTES: int = 20 * 1024 * 1024  # 同步完整 JSON 响应允许的最大文件（0 为不限制），更大的文件返回 413，需用 NDJSON 或 async
+
     # 阿里云 DashScope
     DASHSCOPE_API_KEY: str = "sk-test-key"
     DASHSCOPE_MODEL: str = "qwen-plus"
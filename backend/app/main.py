@@ -1,6 +1,8 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import get_settings
+from app.services.cache_service import get_cache_service
+from app.services.bom_parser import shutdown_parse_pool
 from app.api.v1 import projects, bom, costs, project_products, materials, investments, business_case, process_routes, process_rates
 
 settings = get_settings()
@@ -37,6 +39,18 @@ app.include_router(process_routes.router, prefix="/api/v1/process-routes", tags=
 app.include_router(process_rates.router, prefix="/api/v1/process-rates", tags=["process-rates"])  # 新增
 
 
+@app.on_event("shutdown")
+async def close_cache():
+    """关闭共享的 Redis 连接池."""
+    await get_cache_service().close()
+
+
+@app.on_event("shutdown")
+async def close_parse_pool():
+    """关闭 BOM 并行解析进程池."""
+    shutdown_parse_pool()
+
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "version": settings.APP_VERSION}
@@ -14,6 +14,7 @@ from app.models.quote_summary import QuoteSummary
 from app.models.investment_item import InvestmentItem, InvestmentType
 from app.models.amortization_strategy import AmortizationStrategy, AmortizationMode
 from app.models.business_case import BusinessCaseParams, BusinessCaseYears
+from app.models.column_mapping_profile import ColumnMappingProfile
 
 __all__ = [
     # 主数据表
@@ -37,4 +38,6 @@ __all__ = [
     # Business Case 相关
     "BusinessCaseParams",
     "BusinessCaseYears",
+    # BOM 导入配置
+    "ColumnMappingProfile",
 ]
@@ -0,0 +1,34 @@
+"""BOM 列映射模板表模型"""
+import uuid
+from sqlalchemy import String, DateTime, JSON
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from app.db.session import Base
+
+
+class ColumnMappingProfile(Base):
+    """BOM 列映射模板表
+
+    按表头行签名保存已确认的列映射，已知客户格式上传时直接命中，
+    不再依赖关键字检测
+    """
+
+    __tablename__ = "column_mapping_profiles"
+
+    id: Mapped[str] = mapped_column(
+        String(36), primary_key=True, default=lambda: str(uuid.uuid4())
+    )
+    name: Mapped[str] = mapped_column(String(100), nullable=False)
+    # 表头行签名（SHA-1，见 bom_parser.header_signature）
+    header_signature: Mapped[str] = mapped_column(String(40), nullable=False, unique=True, index=True)
+    # 原始表头单元格（便于展示和重新计算签名）
+    header_cells: Mapped[list] = mapped_column(JSON, nullable=False)
+    # 字段名 → 列序号（0 开始），字段同 ColumnMapping
+    mapping: Mapped[dict] = mapped_column(JSON, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+    def __repr__(self) -> str:
+        return f"<ColumnMappingProfile(id={self.id}, name={self.name})>"
@@ -171,6 +171,10 @@ class ProcessRouteItem(Base):
         Numeric(10, 2), nullable=True, comment='VAVE固定费率（快照）'
     )
 
+    price_book_version: Mapped[str | None] = mapped_column(
+        String(16), nullable=True, comment='费率快照所用价格簿版本'
+    )
+
     # 效率系数
     efficiency_factor: Mapped[float] = mapped_column(
         Numeric(4, 2), default=1.0, nullable=False, comment='效率系数'
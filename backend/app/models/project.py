@@ -46,6 +46,9 @@ class Project(Base):
     owner: Mapped[str | None] = mapped_column(String(50))  # 负责人（简化字段）
     remarks: Mapped[str | None] = mapped_column(Text)  # 备注
 
+    # BOM 修订号：产品 / 物料 / 工艺行写入时递增（成本汇总缓存键）
+    bom_revision: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
     updated_at: Mapped[datetime] = mapped_column(
         DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
@@ -2,8 +2,8 @@
 
 设计规范: docs/DATABASE_DESIGN.md
 """
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import BaseModel, Field, model_validator
+from typing import Any, Literal, Optional, List
 from decimal import Decimal
 from datetime import datetime
 from app.schemas.common import PricePair, StatusLight
@@ -167,6 +167,7 @@ class BOMMaterialResponse(BaseModel):
     material: Optional[str] = None
     supplier: Optional[str] = None
     quantity: Optional[float] = None
+    extended_quantity: Optional[float] = Field(None, alias="extendedQuantity")  # 展开数量（× 各级父项数量）
     unit: Optional[str] = "PC"  # 单位，从 BOM 文件解析
     unit_price: Optional[float] = Field(None, alias="unitPrice")
     vave_price: Optional[float] = Field(None, alias="vavePrice")
@@ -279,20 +280,119 @@ class MultiProductBOMParseResultSchema(BaseModel):
     model_config = {"by_alias": True, "populate_by_name": True}
 
 
+class BOMMaterialEdit(BaseModel):
+    """预览结果的单行修改（行号为预览中的原始位置）.
+
+    action:
+    - update: 用 values 覆盖该行的字段
+    - delete: 删除该行
+    - insert: 在该行之前插入 values 描述的新行（index 等于行数时追加）
+    """
+    product_code: str = Field(..., alias="productCode")
+    index: int = Field(..., ge=0)
+    action: Literal["update", "delete", "insert"] = "update"
+    values: dict[str, Any] = {}  # MaterialSchema 字段
+
+    model_config = {"by_alias": True, "populate_by_name": True}
+
+
 class BOMConfirmCreateRequest(BaseModel):
-    """确认创建产品请求."""
+    """确认创建产品请求.
+
+    产品数据二选一：
+    - previewToken: parse-preview 返回的令牌，服务端读取保存的预览结果，
+      edits 为用户在预览中做的少量修改
+    - products: 完整的产品 BOM（旧流程，整个 BOM 随请求回传）
+
+    mode:
+    - create: 每个产品新建 ProjectProduct 并插入全部物料（默认）
+    - merge: 项目中已存在相同 product_code 的产品时按版本增量合并，只写差异行
+
+    batch_size / commit_rows 覆盖配置 BOM_INSERT_BATCH_SIZE / BOM_INSERT_COMMIT_ROWS。
+    """
+    project_id: str = Field(..., alias="projectId")
+    products: Optional[List[ProductBOMResultSchema]] = None
+    preview_token: Optional[str] = Field(None, alias="previewToken")
+    edits: List[BOMMaterialEdit] = []
+    mode: Literal["create", "merge"] = "create"
+    batch_size: Optional[int] = Field(None, alias="batchSize", ge=1)  # 每条 executemany 的行数
+    commit_rows: Optional[int] = Field(None, alias="commitRows", ge=0)  # 分段提交行数，0 为单事务
+
+    model_config = {"by_alias": True, "populate_by_name": True}
+
+    @model_validator(mode="after")
+    def check_source(self) -> "BOMConfirmCreateRequest":
+        if (self.products is None) == (self.preview_token is None):
+            raise ValueError("Exactly one of products or previewToken is required")
+        if self.edits and self.preview_token is None:
+            raise ValueError("edits require previewToken")
+        return self
+
+
+class BOMUploadInitRequest(BaseModel):
+    """创建分块上传请求."""
+    filename: Optional[str] = None
+    total_size: int = Field(..., alias="totalSize", gt=0)  # 文件总字节数
+    sha256: Optional[str] = Field(None, pattern=r"^[0-9a-fA-F]{64}$")  # 整个文件的 SHA-256，complete 时校验
+
+    model_config = {"by_alias": True, "populate_by_name": True}
+
+
+class BOMUploadCompleteRequest(BaseModel):
+    """完成分块上传请求."""
     project_id: str = Field(..., alias="projectId")
-    products: List[ProductBOMResultSchema]
 
     model_config = {"by_alias": True, "populate_by_name": True}
 
 
 class BOMPreviewResponse(BaseModel):
-    """BOM 预览响应."""
+    """BOM 预览响应（previewToken 用于 confirm-create）."""
     project_id: str = Field(..., alias="projectId")
+    preview_token: Optional[str] = Field(None, alias="previewToken")
     products: List[ProductBOMResultSchema]
     total_products: int
     total_materials: int
     parse_warnings: List[str] = []
 
     model_config = {"by_alias": True, "populate_by_name": True}
+
+
+# ==================== 列映射模板 ====================
+
+class ColumnMappingSchema(BaseModel):
+    """列映射（字段 → 列序号，0 开始），字段同 bom_parser.ColumnMapping."""
+    level: int = Field(..., ge=0)
+    part_number: int = Field(..., alias="partNumber", ge=0)
+    part_name: int = Field(..., alias="partName", ge=0)
+    version: int = Field(..., ge=0)
+    type: int = Field(..., ge=0)
+    status: int = Field(..., ge=0)
+    material: int = Field(..., ge=0)
+    supplier: int = Field(..., ge=0)
+    quantity: int = Field(..., ge=0)
+    unit: int = Field(..., ge=0)
+    comments: int = Field(..., ge=0)
+
+    model_config = {"by_alias": True, "populate_by_name": True}
+
+
+class ColumnMappingProfileCreate(BaseModel):
+    """保存列映射模板请求（按表头签名覆盖已有模板）."""
+    name: str = Field(..., max_length=100)
+    header_cells: List[Optional[str]] = Field(..., alias="headerCells", min_length=1)
+    mapping: ColumnMappingSchema
+
+    model_config = {"by_alias": True, "populate_by_name": True}
+
+
+class ColumnMappingProfileResponse(BaseModel):
+    """列映射模板响应."""
+    id: str
+    name: str
+    header_signature: str = Field(..., alias="headerSignature")
+    header_cells: List[Optional[str]] = Field(..., alias="headerCells")
+    mapping: ColumnMappingSchema
+    created_at: datetime = Field(..., alias="createdAt")
+    updated_at: datetime = Field(..., alias="updatedAt")
+
+    model_config = {"from_attributes": True, "populate_by_name": True, "by_alias": True}
@@ -7,5 +7,32 @@ class CostCalculationResponse(BaseModel):
     material_cost: PricePair = Field(..., alias="materialCost")
     process_cost: PricePair = Field(..., alias="processCost")
     total_cost: PricePair = Field(..., alias="totalCost")
+    price_book_version: str | None = Field(None, alias="priceBookVersion")
+
+    model_config = {"populate_by_name": True, "by_alias": True}
+
+
+class ProductCostRollup(BaseModel):
+    """单个产品的双轨成本汇总."""
+    product_id: str = Field(..., alias="productId")
+    product_name: str | None = Field(None, alias="productName")
+    product_code: str | None = Field(None, alias="productCode")
+    material_count: int = Field(..., alias="materialCount")
+    process_count: int = Field(..., alias="processCount")
+    material_cost: PricePair = Field(..., alias="materialCost")
+    process_cost: PricePair = Field(..., alias="processCost")
+    total_cost: PricePair = Field(..., alias="totalCost")
+
+    model_config = {"populate_by_name": True, "by_alias": True}
+
+
+class ProjectCostRollupResponse(BaseModel):
+    """项目级双轨成本汇总（已写入 QuoteSummary）."""
+    project_id: str = Field(..., alias="projectId")
+    products: list[ProductCostRollup]
+    material_cost: PricePair = Field(..., alias="materialCost")
+    process_cost: PricePair = Field(..., alias="processCost")
+    total_cost: PricePair = Field(..., alias="totalCost")
+    price_book_version: str = Field(..., alias="priceBookVersion")
 
     model_config = {"populate_by_name": True, "by_alias": True}
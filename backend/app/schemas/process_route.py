@@ -73,6 +73,7 @@ class ProcessRouteItemResponse(ProcessRouteItemBase):
     std_mhr_fix: Optional[Decimal] = Field(None, description="标准固定费率")
     vave_mhr_var: Optional[Decimal] = Field(None, description="VAVE变动费率")
     vave_mhr_fix: Optional[Decimal] = Field(None, description="VAVE固定费率")
+    price_book_version: Optional[str] = Field(None, description="费率快照所用价格簿版本")
 
     # 计算成本
     std_cost: Decimal = Field(..., description="标准成本")
@@ -0,0 +1,159 @@
+"""BOM 批量写入服务.
+
+/bom/confirm-create 的写入路径：不构建 ORM 对象，按 batch_size 将行字典分批，
+每批一条 Core insert() executemany 语句；主键 UUID 在客户端生成。
+commit_rows > 0 时每写入约 commit_rows 行提交一次，缩短单个事务并释放 undo 日志，
+代价是中途失败时已提交的批次不会回滚。
+"""
+
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Iterator
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models.product_material import ProductMaterial
+from app.models.project_product import ProjectProduct
+from app.schemas.bom import ProductBOMResultSchema
+from app.services.bom_parser import ProductBOMResult, iter_batches
+from app.services.bom_revision import material_columns
+
+
+@dataclass
+class BulkWriteStats:
+    """批量写入统计."""
+    rows: int = 0
+    batches: int = 0
+    commits: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        """写入速率（行/秒）."""
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "rows_written": self.rows,
+            "batches": self.batches,
+            "commits": self.commits,
+            "elapsed_ms": round(self.elapsed * 1000, 1),
+            "rows_per_sec": round(self.rows_per_sec, 1),
+        }
+
+
+class BOMBulkWriter:
+    """BOM 批量写入服务."""
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        batch_size: int | None = None,
+        commit_rows: int | None = None,
+    ):
+        """初始化写入服务.
+
+        Args:
+            db: 数据库会话
+            batch_size: 每条 executemany 的行数，None 时取配置 BOM_INSERT_BATCH_SIZE
+            commit_rows: 每写入多少行提交一次，None 时取配置 BOM_INSERT_COMMIT_ROWS，0 为不分段提交
+        """
+        settings = get_settings()
+        self.db = db
+        self.batch_size = max(batch_size or settings.BOM_INSERT_BATCH_SIZE, 1)
+        self.commit_rows = (
+            commit_rows if commit_rows is not None else settings.BOM_INSERT_COMMIT_ROWS
+        )
+        self.stats = BulkWriteStats()
+        self._uncommitted = 0
+
+    async def insert_rows(self, model, rows: Iterable[dict]) -> int:
+        """分批插入行字典（同一批内各行的键必须一致）.
+
+        Args:
+            model: ORM 模型类
+            rows: 行字典迭代器，按批惰性消费
+
+        Returns:
+            int: 插入行数
+        """
+        start = time.perf_counter()
+        inserted = 0
+        statement = insert(model)
+        for batch in iter_batches(rows, self.batch_size):
+            await self.db.execute(statement, batch)
+            inserted += len(batch)
+            self.stats.batches += 1
+            self._uncommitted += len(batch)
+            if self.commit_rows and self._uncommitted >= self.commit_rows:
+                await self.db.commit()
+                self.stats.commits += 1
+                self._uncommitted = 0
+        self.stats.rows += inserted
+        self.stats.elapsed += time.perf_counter() - start
+        return inserted
+
+    async def create_products(
+        self, project_id: str, products: list[ProductBOMResultSchema | ProductBOMResult]
+    ) -> list[dict]:
+        """创建产品及其全部物料行.
+
+        Args:
+            project_id: 项目 ID
+            products: 待创建的产品 BOM（请求 Schema 或预览令牌对应的解析结果）
+
+        Returns:
+            list[dict]: 已创建产品摘要（id / product_code / product_name / material_count）
+        """
+        now = datetime.utcnow()
+        product_ids = [str(uuid.uuid4()) for _ in products]
+
+        # 先插入产品（满足物料行外键约束）
+        await self.insert_rows(ProjectProduct, (
+            {
+                "id": product_id,
+                "project_id": project_id,
+                "product_name": data.product_info.product_name or data.product_info.product_code,
+                "product_code": data.product_info.product_code,
+                "product_version": data.product_info.product_version,
+                "route_code": None,  # 工艺路线代码待后续添加
+                "bom_file_path": None,
+                "created_at": now,
+            }
+            for product_id, data in zip(product_ids, products)
+        ))
+
+        await self.insert_rows(ProductMaterial, self._material_rows(product_ids, products, now))
+
+        return [
+            {
+                "id": product_id,
+                "product_code": data.product_info.product_code,
+                "product_name": data.product_info.product_name,
+                "material_count": len(data.materials),
+            }
+            for product_id, data in zip(product_ids, products)
+        ]
+
+    @staticmethod
+    def _material_rows(
+        product_ids: list[str],
+        products: list[ProductBOMResultSchema | ProductBOMResult],
+        now: datetime,
+    ) -> Iterator[dict]:
+        for product_id, data in zip(product_ids, products):
+            for material in data.materials:
+                yield {
+                    "id": str(uuid.uuid4()),
+                    "project_product_id": product_id,
+                    "material_id": None,  # 关联到 materials 表的 ID（后续可匹配）
+                    "std_cost": None,  # 待后续成本计算填充
+                    "vave_cost": None,
+                    "confidence": None,
+                    "created_at": now,
+                    **material_columns(material),
+                }
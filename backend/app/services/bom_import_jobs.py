@@ -0,0 +1,196 @@
+"""BOM 后台导入任务.
+
+POST /bom/upload?mode=async 立即返回任务 ID，解析 → 查价 → 写解析缓存流水线在后台
+执行：解析逐批在线程池中进行，查价和写缓存在事件循环的后台任务中进行，因此解析期间
+仍可响应轮询和其他请求。各阶段进度和最终结果记录在任务上，客户端通过
+GET /bom/jobs/{id} 轮询或订阅 /bom/jobs/{id}/events（Server-Sent Events）。
+上传只生成预览，BOM 由 confirm-create 写入数据库。
+
+任务表保存在进程内：多 worker 部署时轮询请求需路由到创建任务的进程（粘性会话）。
+"""
+
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+# 已结束任务的保留时间（秒）
+JOB_RESULT_TTL = 3600
+
+# 任务表最多保留的任务数，超出时优先淘汰最早结束的任务
+MAX_JOBS = 200
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+# 流水线阶段
+STAGE_PARSE = "parse"
+STAGE_LOOKUP = "lookup"
+STAGE_CACHE = "cache"  # 写解析缓存（不写 BOM 表）
+
+
+@dataclass(eq=False)
+class BOMImportJob:
+    """BOM 导入任务."""
+    id: str
+    project_id: str
+    filename: str | None
+    status: str = JOB_PENDING
+    stage: str | None = None
+    progress: dict[str, int] = field(default_factory=lambda: {
+        "rows_parsed": 0,
+        "products_parsed": 0,
+        "material_lookups": 0,
+        "process_lookups": 0,
+        "cached": 0,
+    })
+    result: dict | None = None
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+    # 每次更新递增，SSE 订阅者据此判断是否有新进度
+    version: int = 0
+    _changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def done(self) -> bool:
+        """任务是否已结束（成功或失败）."""
+        return self.status in (JOB_COMPLETED, JOB_FAILED)
+
+    def to_dict(self, include_result: bool = False) -> dict:
+        """转换为 API 响应（camelCase）."""
+        data = {
+            "jobId": self.id,
+            "projectId": self.project_id,
+            "filename": self.filename,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": {
+                "rowsParsed": self.progress["rows_parsed"],
+                "productsParsed": self.progress["products_parsed"],
+                "materialLookups": self.progress["material_lookups"],
+                "processLookups": self.progress["process_lookups"],
+                "cached": self.progress["cached"],
+            },
+            "error": self.error,
+            "createdAt": self.created_at,
+            "updatedAt": self.updated_at,
+            "finishedAt": self.finished_at,
+        }
+        if include_result:
+            data["result"] = self.result
+        return data
+
+
+# 流水线进度回调：progress(stage, 计数器增量)
+ProgressCallback = Callable[..., None]
+
+
+class BOMImportJobStore:
+    """进程内 BOM 导入任务表."""
+
+    def __init__(self, ttl: float = JOB_RESULT_TTL, max_jobs: int = MAX_JOBS) -> None:
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self._jobs: dict[str, BOMImportJob] = {}
+        # 持有后台任务引用，防止运行中的 Task 被垃圾回收
+        self._tasks: set[asyncio.Task] = set()
+
+    def create(self, project_id: str, filename: str | None) -> BOMImportJob:
+        """创建待执行任务."""
+        self._evict()
+        job = BOMImportJob(id=str(uuid.uuid4()), project_id=project_id, filename=filename)
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> BOMImportJob | None:
+        """获取任务，不存在或已过期返回 None."""
+        self._evict()
+        return self._jobs.get(job_id)
+
+    def update(self, job: BOMImportJob, **changes: Any) -> None:
+        """更新任务字段并通知订阅者."""
+        for name, value in changes.items():
+            setattr(job, name, value)
+        self._touch(job)
+
+    def advance(self, job: BOMImportJob, stage: str, **counters: int) -> None:
+        """进入阶段并累加进度计数器."""
+        job.stage = stage
+        for name, value in counters.items():
+            job.progress[name] += value
+        self._touch(job)
+
+    async def wait_for_change(self, job: BOMImportJob, version: int, timeout: float) -> bool:
+        """等待任务版本超过 version，超时返回 False."""
+        while job.version <= version:
+            changed = job._changed
+            try:
+                await asyncio.wait_for(changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                return job.version > version
+        return True
+
+    def submit(
+        self,
+        job: BOMImportJob,
+        pipeline: Callable[[ProgressCallback], Awaitable[dict]],
+    ) -> asyncio.Task:
+        """在后台执行流水线.
+
+        Args:
+            job: 待执行任务
+            pipeline: 接收进度回调、返回最终结果的协程函数
+
+        Returns:
+            asyncio.Task: 后台任务
+        """
+        task = asyncio.create_task(self._run(job, pipeline))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run(
+        self,
+        job: BOMImportJob,
+        pipeline: Callable[[ProgressCallback], Awaitable[dict]],
+    ) -> None:
+        self.update(job, status=JOB_RUNNING)
+
+        def progress(stage: str, **counters: int) -> None:
+            self.advance(job, stage, **counters)
+
+        try:
+            result = await pipeline(progress)
+        except Exception as exc:  # noqa: BLE001 - 失败原因记录到任务上供客户端查询
+            self.update(job, status=JOB_FAILED, error=str(exc) or type(exc).__name__,
+                        finished_at=time.time())
+        else:
+            self.update(job, status=JOB_COMPLETED, result=result, finished_at=time.time())
+
+    def _touch(self, job: BOMImportJob) -> None:
+        job.version += 1
+        job.updated_at = time.time()
+        # 唤醒当前等待者，后续等待者使用新的 Event
+        changed, job._changed = job._changed, asyncio.Event()
+        changed.set()
+
+    def _evict(self) -> None:
+        """清理过期任务，任务数超限时淘汰最早结束的任务（运行中的任务不淘汰）."""
+        now = time.time()
+        finished = sorted(
+            (job for job in self._jobs.values() if job.done),
+            key=lambda job: job.finished_at or 0,
+        )
+        overflow = len(self._jobs) - self.max_jobs + 1
+        for job in finished:
+            if now - (job.finished_at or now) > self.ttl or overflow > 0:
+                del self._jobs[job.id]
+                overflow -= 1
+
+
+job_store = BOMImportJobStore()
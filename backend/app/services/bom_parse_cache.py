@@ -0,0 +1,230 @@
+"""BOM 解析结果缓存服务.
+
+以文件内容哈希 + 解析器版本为键缓存解析结果，同一文件在 parse-preview、
+upload 和重复上传之间只解析一次。优先使用 Redis，不可用时回退到本地磁盘。
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from asyncio import to_thread
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path, PurePath
+from typing import Optional
+
+from redis.exceptions import RedisError
+
+from app.config import Settings, get_settings
+from app.services.bom_parser import (
+    PARSER_VERSION,
+    BOMParser,
+    BOMParseResult,
+    MaterialBatch,
+    MultiProductBOMParser,
+    MultiProductBOMParseResult,
+    ParsedMaterial,
+    ParsedProcess,
+    ProductBOMResult,
+    ProductInfo,
+    mapping_registry,
+)
+from app.services.bom_source import BOMSource, source_sha256, source_size
+from app.services.bom_tabular import TabularBOMParser, is_tabular_file
+from app.services.cache_service import CacheService
+
+# 命中/未命中计数（进程内）
+parse_cache_stats = {"hits": 0, "misses": 0}
+
+
+def content_cache_key(file_content: BOMSource, kind: str) -> str:
+    """计算缓存键：解析器类型 + 解析器版本 + 列映射模板版本 + 文件内容 SHA-256."""
+    digest = source_sha256(file_content)
+    return f"{kind}:v{PARSER_VERSION}:m{mapping_registry.version}:{digest}"
+
+
+def multi_cache_kind(filename: str | None) -> str:
+    """多产品缓存类型：表格类文件的产品编码取自文件名，需计入缓存键.
+
+    文件名来自客户端，只以哈希形式进入缓存键（键也用作磁盘文件名）。
+    """
+    if is_tabular_file(filename):
+        name_digest = hashlib.sha256(PurePath(filename).name.encode("utf-8")).hexdigest()[:16]
+        return f"tabular-{name_digest}"
+    return "multi"
+
+
+def dump_parse_result(result: BOMParseResult) -> dict:
+    """单产品解析结果 → 可 JSON 序列化的字典（行以数组存储）."""
+    return {"materials": result.materials, "processes": result.processes}
+
+
+def load_parse_result(data: dict) -> BOMParseResult:
+    """字典 → 单产品解析结果."""
+    return BOMParseResult(
+        materials=[ParsedMaterial(*row) for row in data["materials"]],
+        processes=[ParsedProcess(*row) for row in data["processes"]],
+    )
+
+
+def dump_multi_result(result: MultiProductBOMParseResult) -> dict:
+    """多产品解析结果 → 可 JSON 序列化的字典（行以数组存储）."""
+    products = []
+    for product in result.products:
+        info = asdict(product.product_info)
+        if info["issue_date"] is not None:
+            info["issue_date"] = info["issue_date"].isoformat()
+        products.append({
+            "product_info": info,
+            "materials": list(product.materials),
+            "processes": product.processes,
+        })
+    return {
+        "products": products,
+        "total_products": result.total_products,
+        "total_materials": result.total_materials,
+        "parse_warnings": result.parse_warnings,
+    }
+
+
+def load_multi_result(data: dict) -> MultiProductBOMParseResult:
+    """字典 → 多产品解析结果."""
+    products = []
+    for product in data["products"]:
+        info = dict(product["product_info"])
+        if info["issue_date"] is not None:
+            info["issue_date"] = datetime.fromisoformat(info["issue_date"])
+        products.append(ProductBOMResult(
+            product_info=ProductInfo(**info),
+            materials=MaterialBatch(ParsedMaterial(*row) for row in product["materials"]),
+            processes=[ParsedProcess(*row) for row in product["processes"]],
+        ))
+    return MultiProductBOMParseResult(
+        products=products,
+        total_products=data["total_products"],
+        total_materials=data["total_materials"],
+        parse_warnings=data["parse_warnings"],
+    )
+
+
+class BOMParseCache:
+    """BOM 解析结果缓存.
+
+    Redis 读写失败时自动回退到 BOM_PARSE_CACHE_DIR 下的 JSON 文件。
+
+    Args:
+        cache: 共享的缓存服务（get_cache_service()）
+        settings: 应用配置
+    """
+
+    def __init__(self, cache: CacheService, settings: Settings | None = None) -> None:
+        self.settings = settings or get_settings()
+        self.cache = cache
+        self.cache_dir = Path(
+            self.settings.BOM_PARSE_CACHE_DIR
+            or os.path.join(tempfile.gettempdir(), "smartquote-bom-parse")
+        )
+
+    def cacheable(self, file_content: BOMSource) -> bool:
+        """文件是否在可缓存大小范围内."""
+        return source_size(file_content) <= self.settings.BOM_PARSE_CACHE_MAX_BYTES
+
+    async def get_multi(
+        self, file_content: BOMSource, filename: str | None = None
+    ) -> Optional[MultiProductBOMParseResult]:
+        """获取多产品解析结果缓存，同时记录命中/未命中."""
+        data = await self._get(content_cache_key(file_content, multi_cache_kind(filename)))
+        return load_multi_result(data) if data is not None else None
+
+    async def set_multi(
+        self,
+        file_content: BOMSource,
+        result: MultiProductBOMParseResult,
+        filename: str | None = None,
+    ) -> None:
+        """写入多产品解析结果缓存."""
+        if self.cacheable(file_content):
+            await self._set(
+                content_cache_key(file_content, multi_cache_kind(filename)),
+                dump_multi_result(result),
+            )
+
+    async def parse_multi(
+        self, file_content: BOMSource, filename: str | None = None
+    ) -> MultiProductBOMParseResult:
+        """获取或解析多产品 BOM（未命中时在线程中解析并写入缓存）.
+
+        Args:
+            file_content: 文件字节内容或文件路径
+            filename: 文件名，CSV/TSV/Arrow/Parquet 文件按扩展名走表格解析器
+        """
+        result = await self.get_multi(file_content, filename)
+        if result is None:
+            if is_tabular_file(filename):
+                result = await to_thread(TabularBOMParser().parse_file, file_content, filename)
+            else:
+                result = await to_thread(MultiProductBOMParser().parse_excel_file, file_content)
+            await self.set_multi(file_content, result, filename)
+        return result
+
+    async def parse_single(self, file_content: BOMSource) -> BOMParseResult:
+        """获取或解析单产品 BOM（未命中时在线程中解析并写入缓存）."""
+        key = content_cache_key(file_content, "single")
+        data = await self._get(key)
+        if data is not None:
+            return load_parse_result(data)
+
+        result = await to_thread(BOMParser().parse_excel_file, file_content)
+        if self.cacheable(file_content):
+            await self._set(key, dump_parse_result(result))
+        return result
+
+    async def _get(self, key: str) -> Optional[dict]:
+        """查询 Redis，不可用时查询磁盘缓存."""
+        data = None
+        if self.cache.available:
+            try:
+                data = await self.cache.get_bom_parse(key)
+            except (RedisError, OSError):
+                self.cache.mark_down()
+        if not self.cache.available:
+            data = await to_thread(self._disk_get, key)
+
+        parse_cache_stats["hits" if data is not None else "misses"] += 1
+        return data
+
+    async def _set(self, key: str, data: dict) -> None:
+        """写入 Redis，不可用时写入磁盘."""
+        if self.cache.available:
+            try:
+                await self.cache.set_bom_parse(key, data)
+                return
+            except (RedisError, OSError):
+                self.cache.mark_down()
+        await to_thread(self._disk_set, key, data)
+
+    def _disk_path(self, key: str) -> Path:
+        # 键只含类型、版本号和十六进制摘要；仍按字符白名单过滤，保证落在 cache_dir 内
+        safe = "".join(c if c.isalnum() or c in "-." else "_" for c in key)
+        return self.cache_dir / f"{safe}.json"
+
+    def _disk_get(self, key: str) -> Optional[dict]:
+        path = self._disk_path(key)
+        try:
+            if time.time() - path.stat().st_mtime > CacheService.TTL_BOM_PARSE:
+                path.unlink(missing_ok=True)
+                return None
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _disk_set(self, key: str, data: dict) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._disk_path(key)
+        # 先写临时文件再原子替换，避免并发读到半个文件
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
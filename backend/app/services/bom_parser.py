@@ -1,9 +1,92 @@
 """BOM 文件解析服务."""
 
-from typing import NamedTuple
-from dataclasses import dataclass
+import hashlib
+import threading
+from array import array
+from collections.abc import Sequence
+from typing import Callable, Iterable, Iterator, NamedTuple, TypeVar
+from dataclasses import dataclass, field
 from datetime import datetime
-from openpyxl import load_workbook
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import compress, islice, repeat
+from operator import is_
+
+from app.config import get_settings
+from app.services.bom_source import BOMSource
+from app.services.xlsx_reader import open_workbook
+
+T = TypeVar("T")
+
+# 解析器版本：解析输出发生变化时递增，使解析结果缓存失效
+PARSER_VERSION = "1"
+
+# 流式解析时每批的行数
+DEFAULT_BATCH_SIZE = 1000
+
+# 表头检测读取的行数（sheet 类型、列映射、产品元数据共用）
+HEAD_ROWS = 10
+
+
+def iter_batches(rows: Iterable[T], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[list[T]]:
+    """将行迭代器按固定大小分批.
+
+    Args:
+        rows: 任意行迭代器
+        batch_size: 每批行数
+
+    Yields:
+        list: 每批最多 batch_size 行
+    """
+    iterator = iter(rows)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+class SheetHead:
+    """工作表头部缓冲.
+
+    一次性读取 sheet 前 HEAD_ROWS 行，供 sheet 类型检测、列映射检测和产品元数据
+    提取共用；数据行从同一个行迭代器继续流式读取，避免 read_only 模式下每次随机
+    访问都从头重新扫描 sheet XML。
+    """
+
+    def __init__(self, worksheet, head_rows: int = HEAD_ROWS) -> None:
+        self.worksheet = worksheet
+        self._rows = worksheet.iter_rows(values_only=True)
+        self.rows: list[tuple] = list(islice(self._rows, head_rows))
+
+    @classmethod
+    def of(cls, source) -> "SheetHead":
+        """接受 SheetHead 或工作表对象，统一返回 SheetHead."""
+        return source if isinstance(source, cls) else cls(source)
+
+    @property
+    def max_row(self) -> int | None:
+        """工作表最大行号."""
+        return self.worksheet.max_row
+
+    def row(self, row_idx: int) -> tuple:
+        """获取头部缓冲中的一行（行号从 1 开始），超出范围返回空元组."""
+        if 1 <= row_idx <= len(self.rows):
+            return self.rows[row_idx - 1]
+        return ()
+
+    def iter_rows(self, min_row: int = 1) -> Iterator[tuple]:
+        """从 min_row 开始逐行产出：先取头部缓冲，再继续流式读取剩余行.
+
+        剩余行迭代器只能消费一次，再次调用时回退为重新读取工作表。
+        """
+        yield from self.rows[min_row - 1:]
+
+        tail, self._rows = self._rows, None
+        if tail is None:
+            tail = self.worksheet.iter_rows(
+                min_row=max(min_row, len(self.rows) + 1), values_only=True
+            )
+        else:
+            tail = islice(tail, max(0, min_row - len(self.rows) - 1), None)
+        yield from tail
 
 
 class ParsedMaterial(NamedTuple):
@@ -22,6 +105,113 @@ class ParsedMaterial(NamedTuple):
     comments: str
 
 
+# ParsedMaterial 中以字符串存储的字段及其下标
+_TEXT_FIELDS = tuple(name for name in ParsedMaterial._fields if name != "quantity")
+_QUANTITY_INDEX = ParsedMaterial._fields.index("quantity")
+
+
+class MaterialBatch(Sequence):
+    """紧凑的列式物料集合（struct-of-arrays）.
+
+    每个字符串字段存为 array('I') 下标列，指向集合内共享的去重字符串表
+    （"PC"、"I"、"N"、供应商名等重复值只保存一份）；数量存为 array('d')。
+    按下标或迭代访问时即时组装 ParsedMaterial，现有按行消费的代码无需修改。
+    """
+
+    __slots__ = ("_lookup", "_strings", "_columns", "quantities")
+
+    def __init__(self, materials: Iterable[ParsedMaterial] = ()) -> None:
+        self._lookup: dict[str, int] | None = {}
+        self._strings: list[str] = []
+        # 字段名 → 字符串表下标列
+        self._columns = {name: array("I") for name in _TEXT_FIELDS}
+        self.quantities = array("d")
+        self.extend(materials)
+        # 构建完成后释放编码字典（约占字符串表同等内存），再次追加时按需重建
+        self._lookup = None
+
+    def extend(self, materials: Iterable[ParsedMaterial]) -> None:
+        """按块追加物料（块内先转置为列再编码）."""
+        if self._lookup is None:
+            self._lookup = {value: idx for idx, value in enumerate(self._strings)}
+        lookup = self._lookup
+        if isinstance(materials, list):
+            chunks = (
+                materials[i:i + DEFAULT_BATCH_SIZE]
+                for i in range(0, len(materials), DEFAULT_BATCH_SIZE)
+            )
+        else:
+            chunks = iter_batches(materials, DEFAULT_BATCH_SIZE)
+
+        for chunk in chunks:
+            columns = dict(zip(ParsedMaterial._fields, zip(*chunk)))
+            for name in _TEXT_FIELDS:
+                values = columns[name]
+                codes = list(map(lookup.get, values))
+                if None in codes:
+                    # 本块首次出现的值按出现顺序批量编号，不逐值进入 Python 循环
+                    missing = dict.fromkeys(compress(values, map(is_, codes, repeat(None))))
+                    start = len(lookup)
+                    lookup.update(zip(missing, range(start, start + len(missing))))
+                    self._strings.extend(missing)
+                    codes = list(map(lookup.__getitem__, values))
+                self._columns[name].extend(codes)
+            self.quantities.extend(columns["quantity"])
+
+    def append(self, material: ParsedMaterial) -> None:
+        self.extend((material,))
+
+    def _iter_column(self, name: str) -> Iterator[str]:
+        return map(self._strings.__getitem__, self._columns[name])
+
+    def column(self, name: str) -> list:
+        """按字段名取整列值."""
+        if name == "quantity":
+            return self.quantities.tolist()
+        return list(self._iter_column(name))
+
+    def __len__(self) -> int:
+        return len(self.quantities)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return MaterialBatch(self[i] for i in range(*index.indices(len(self))))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("MaterialBatch index out of range")
+        values = [self._strings[self._columns[name][index]] for name in _TEXT_FIELDS]
+        values.insert(_QUANTITY_INDEX, self.quantities[index])
+        return ParsedMaterial(*values)
+
+    def __iter__(self) -> Iterator[ParsedMaterial]:
+        columns = [self._iter_column(name) for name in _TEXT_FIELDS]
+        columns.insert(_QUANTITY_INDEX, iter(self.quantities))
+        return map(ParsedMaterial, *columns)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, (str, bytes)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"<MaterialBatch(rows={len(self)}, strings={len(self._strings)})>"
+
+    def __reduce__(self):
+        # 进程池传输与缓存序列化只传列数据
+        return (_restore_material_batch, (self._strings, self._columns, self.quantities))
+
+
+def _restore_material_batch(strings, columns, quantities) -> MaterialBatch:
+    batch = MaterialBatch()
+    batch._strings = list(strings)
+    batch._columns = columns
+    batch.quantities = quantities
+    return batch
+
+
 class ParsedProcess(NamedTuple):
     """解析后的工艺行."""
 
@@ -55,6 +245,48 @@ class ColumnMapping(NamedTuple):
     comments: int
 
 
+def header_signature(row: Iterable) -> str | None:
+    """表头行签名：单元格去空白、转小写后拼接并取 SHA-1，空行返回 None.
+
+    同一客户格式的表头（不论大小写、多余空格、尾部空列）得到相同签名。
+    """
+    cells = [" ".join(str(cell).split()).lower() if cell is not None else "" for cell in row]
+    while cells and not cells[-1]:
+        cells.pop()
+    if not any(cells):
+        return None
+    return hashlib.sha1("\x1f".join(cells).encode("utf-8")).hexdigest()
+
+
+class ColumnMappingRegistry:
+    """列映射模板注册表（进程内缓存，数据源为 column_mapping_profiles 表）.
+
+    按表头签名查找 ColumnMapping。replace() 整体替换映射字典，
+    已创建的解析器持有旧字典快照，不受并发替换影响。
+    """
+
+    def __init__(self) -> None:
+        self._profiles: dict[str, ColumnMapping] = {}
+        self.version = "0"
+
+    def snapshot(self) -> dict[str, ColumnMapping]:
+        """当前映射字典（只读使用）."""
+        return self._profiles
+
+    def get(self, signature: str | None) -> ColumnMapping | None:
+        return self._profiles.get(signature) if signature else None
+
+    def replace(self, profiles: dict[str, ColumnMapping]) -> None:
+        """整体替换映射模板，并根据内容更新版本号（用于解析结果缓存键）."""
+        digest = hashlib.sha1(repr(sorted(profiles.items())).encode("utf-8")).hexdigest()
+        self._profiles = dict(profiles)
+        self.version = digest[:12] if profiles else "0"
+
+
+# 进程内共享的列映射模板注册表
+mapping_registry = ColumnMappingRegistry()
+
+
 class BOMParser:
     """BOM 文件解析器 - 支持智能列检测."""
 
@@ -88,42 +320,83 @@ class BOMParser:
         comments=13,
     )
 
-    def parse_excel_file(self, file_content: bytes) -> BOMParseResult:
+    def __init__(
+        self,
+        reader: str | None = None,
+        profiles: dict[str, ColumnMapping] | None = None,
+    ):
+        """初始化解析器.
+
+        Args:
+            reader: Excel 读取后端（"openpyxl" / "xlsx"），None 时取配置 BOM_READER_BACKEND
+            profiles: 表头签名 → 列映射模板，None 时取 mapping_registry 当前快照
+        """
+        self.reader = reader or get_settings().BOM_READER_BACKEND
+        self.profiles = profiles if profiles is not None else mapping_registry.snapshot()
+
+    def parse_excel_file(self, file_content: BOMSource) -> BOMParseResult:
         """解析 Excel BOM 文件（从内存）.
 
         Args:
-            file_content: Excel 文件的字节内容
+            file_content: Excel 文件的字节内容或文件路径
 
         Returns:
             BOMParseResult: 解析后的物料和工艺列表
         """
-        import io
-
-        wb = load_workbook(filename=io.BytesIO(file_content), read_only=True)
-
         materials: list[ParsedMaterial] = []
         processes: list[ParsedProcess] = []
 
-        for sheet_name in wb.sheetnames:
-            ws = wb[sheet_name]
-            sheet_type = self._detect_sheet_type(ws)
-
-            if sheet_type == "info":
-                # 跳过信息类 sheet
-                continue
-            elif sheet_type == "material":
-                # 智能检测列映射
-                header_row, mapping = self._detect_column_mapping(ws)
-                materials.extend(self._parse_material_sheet(ws, header_row, mapping))
-            elif sheet_type == "process":
-                processes.extend(self._parse_process_sheet(ws))
+        for sheet_type, batch in self.iter_excel_file(file_content):
+            if sheet_type == "material":
+                materials.extend(batch)
+            else:
+                processes.extend(batch)
 
         return BOMParseResult(materials=materials, processes=processes)
 
+    def iter_excel_file(
+        self, file_content: BOMSource, batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> Iterator[tuple[str, list[ParsedMaterial] | list[ParsedProcess]]]:
+        """流式解析 Excel BOM 文件，按批产出物料或工艺行.
+
+        Args:
+            file_content: Excel 文件的字节内容或文件路径
+            batch_size: 每批行数
+
+        Yields:
+            (sheet_type, batch): sheet_type 为 "material" 或 "process"
+        """
+        wb = open_workbook(file_content, self.reader)
+        try:
+            for sheet_name in wb.sheetnames:
+                # 头部只读取一次，检测与数据行解析共用
+                head = SheetHead(wb[sheet_name])
+                sheet_type = self._detect_sheet_type(head)
+
+                if sheet_type == "info":
+                    # 跳过信息类 sheet
+                    continue
+                elif sheet_type == "material":
+                    # 智能检测列映射
+                    header_row, mapping = self._detect_column_mapping(head)
+                    rows = self.iter_material_sheet(head, header_row, mapping)
+                elif sheet_type == "process":
+                    rows = self.iter_process_sheet(head)
+                else:
+                    continue
+
+                for batch in iter_batches(rows, batch_size):
+                    yield sheet_type, batch
+        finally:
+            wb.close()
+
     def _detect_sheet_type(self, worksheet) -> str:
         """检测工作表类型.
 
         通过关键字检测工作表包含物料还是工艺数据。
+
+        Args:
+            worksheet: 工作表对象或 SheetHead
         """
         keywords_material = ["物料", "material", "bom", "item", "零件", "bill of material"]
         keywords_process = ["工艺", "process", "operation", "工序", "op"]
@@ -131,7 +404,7 @@ class BOMParser:
         # 排除的信息类 sheet
         exclude_keywords = ["product info", "产品信息", "产品名称"]
 
-        for row in worksheet.iter_rows(min_row=1, max_row=10, values_only=True):
+        for row in SheetHead.of(worksheet).rows:
             if not row:
                 continue
             row_text = " ".join(str(cell).lower() for cell in row if cell)
@@ -154,12 +427,24 @@ class BOMParser:
     def _detect_column_mapping(self, worksheet) -> tuple[int, ColumnMapping]:
         """智能检测列映射和表头行位置.
 
+        Args:
+            worksheet: 工作表对象或 SheetHead
+
         Returns:
             (header_row, column_mapping): 表头行号和列映射
         """
+        head = SheetHead.of(worksheet)
+
+        # 已保存的列映射模板：表头签名命中即直接使用
+        if self.profiles:
+            for i, row in enumerate(head.rows, 1):
+                mapping = self.profiles.get(header_signature(row))
+                if mapping is not None:
+                    return i, mapping
+
         # 查找表头行（包含 "Part Number" 或 "零件号" 的行）
         header_row = 1
-        for i, row in enumerate(worksheet.iter_rows(min_row=1, max_row=10, values_only=True), 1):
+        for i, row in enumerate(head.rows, 1):
             row_text = " ".join(str(cell).lower() for cell in row if cell)
             if "part number" in row_text or "零件号" in row_text:
                 header_row = i
@@ -167,10 +452,10 @@ class BOMParser:
 
         # 检测列位置
         col_map = {}
-        for col_idx, cell in enumerate(worksheet[header_row]):
-            if cell.value is None:
+        for col_idx, value in enumerate(head.row(header_row)):
+            if value is None:
                 continue
-            cell_lower = str(cell.value).lower()
+            cell_lower = str(value).lower()
 
             if "part number" in cell_lower or "零件号" in cell_lower:
                 col_map["part_number"] = col_idx
@@ -224,47 +509,59 @@ class BOMParser:
             header_row: 表头行号
             mapping: 列映射配置
         """
-        materials = []
+        return list(self.iter_material_sheet(worksheet, header_row, mapping))
 
-        for row in worksheet.iter_rows(min_row=header_row + 1, values_only=True):
-            if not row or len(row) <= max(mapping.part_number, mapping.quantity):
-                continue
+    def iter_material_sheet(
+        self, worksheet, header_row: int, mapping: ColumnMapping
+    ) -> Iterator[ParsedMaterial]:
+        """逐行解析物料工作表（生成器，不缓存整表）.
 
-            # 获取零件号
-            part_number_cell = row[mapping.part_number] if mapping.part_number < len(row) else None
-            if not part_number_cell:
-                continue
+        Args:
+            worksheet: 工作表对象或 SheetHead
+            header_row: 表头行号
+            mapping: 列映射配置
+        """
+        for row in SheetHead.of(worksheet).iter_rows(min_row=header_row + 1):
+            material = self._row_to_material(row, mapping)
+            if material is not None:
+                yield material
+
+    def _row_to_material(self, row: tuple, mapping: ColumnMapping) -> ParsedMaterial | None:
+        """将一行原始值转换为物料，无效行返回 None."""
+        if not row or len(row) <= max(mapping.part_number, mapping.quantity):
+            return None
 
-            part_number = str(part_number_cell).strip()
-            # 跳过空值或表头行
-            if not part_number or part_number.lower() in ["", "none", "part number", "零件号"]:
-                continue
+        # 获取零件号
+        part_number_cell = row[mapping.part_number] if mapping.part_number < len(row) else None
+        if not part_number_cell:
+            return None
 
-            # 获取数量
-            quantity = 0
-            if mapping.quantity < len(row) and row[mapping.quantity] is not None:
-                try:
-                    quantity = float(row[mapping.quantity])
-                except (ValueError, TypeError):
-                    quantity = 0
-
-            materials.append(
-                ParsedMaterial(
-                    level=str(row[mapping.level] or "") if mapping.level < len(row) else "1",
-                    part_number=part_number,
-                    part_name=str(row[mapping.part_name] or "") if mapping.part_name < len(row) else "",
-                    version=str(row[mapping.version] or "1.0") if mapping.version < len(row) else "1.0",
-                    type=str(row[mapping.type] or "I") if mapping.type < len(row) else "I",
-                    status=str(row[mapping.status] or "N") if mapping.status < len(row) else "N",
-                    material=str(row[mapping.material] or "") if mapping.material < len(row) else "",
-                    supplier=str(row[mapping.supplier] or "") if mapping.supplier < len(row) else "",
-                    quantity=quantity,
-                    unit=str(row[mapping.unit] or "PC") if mapping.unit < len(row) else "PC",
-                    comments=str(row[mapping.comments] or "") if mapping.comments < len(row) else "",
-                )
-            )
+        part_number = str(part_number_cell).strip()
+        # 跳过空值或表头行
+        if not part_number or part_number.lower() in ["", "none", "part number", "零件号"]:
+            return None
 
-        return materials
+        # 获取数量
+        quantity = 0
+        if mapping.quantity < len(row) and row[mapping.quantity] is not None:
+            try:
+                quantity = float(row[mapping.quantity])
+            except (ValueError, TypeError):
+                quantity = 0
+
+        return ParsedMaterial(
+            level=str(row[mapping.level] or "") if mapping.level < len(row) else "1",
+            part_number=part_number,
+            part_name=str(row[mapping.part_name] or "") if mapping.part_name < len(row) else "",
+            version=str(row[mapping.version] or "1.0") if mapping.version < len(row) else "1.0",
+            type=str(row[mapping.type] or "I") if mapping.type < len(row) else "I",
+            status=str(row[mapping.status] or "N") if mapping.status < len(row) else "N",
+            material=str(row[mapping.material] or "") if mapping.material < len(row) else "",
+            supplier=str(row[mapping.supplier] or "") if mapping.supplier < len(row) else "",
+            quantity=quantity,
+            unit=str(row[mapping.unit] or "PC") if mapping.unit < len(row) else "PC",
+            comments=str(row[mapping.comments] or "") if mapping.comments < len(row) else "",
+        )
 
     def _parse_process_sheet(self, worksheet) -> list[ParsedProcess]:
         """解析工艺工作表.
@@ -276,17 +573,21 @@ class BOMParser:
         - Col 3: Standard Time (标准工时)
         - Col 4: Spec (规格说明)
         """
-        processes = []
+        return list(self.iter_process_sheet(worksheet))
+
+    def iter_process_sheet(self, worksheet) -> Iterator[ParsedProcess]:
+        """逐行解析工艺工作表（生成器，不缓存整表）."""
+        head = SheetHead.of(worksheet)
 
         # 查找表头行
         header_row = 1
-        for i, row in enumerate(worksheet.iter_rows(min_row=1, max_row=10, values_only=True), 1):
+        for i, row in enumerate(head.rows, 1):
             row_text = " ".join(str(cell).lower() for cell in row if cell)
             if "op no" in row_text or "工序号" in row_text or "operation" in row_text:
                 header_row = i
                 break
 
-        for row in worksheet.iter_rows(min_row=header_row + 1, values_only=True):
+        for row in head.iter_rows(min_row=header_row + 1):
             if not row or not row[0]:
                 continue
 
@@ -308,18 +609,14 @@ class BOMParser:
 
             spec = str(row[4]) if len(row) > 4 and row[4] else None
 
-            processes.append(
-                ParsedProcess(
-                    op_no=op_no,
-                    name=name,
-                    work_center=work_center,
-                    standard_time=standard_time,
-                    spec=spec,
-                )
+            yield ParsedProcess(
+                op_no=op_no,
+                name=name,
+                work_center=work_center,
+                standard_time=standard_time,
+                spec=spec,
             )
 
-        return processes
-
 
 # ==================== 多产品 BOM 解析 ====================
 
@@ -341,10 +638,22 @@ class ProductInfo:
 class ProductBOMResult:
     """单个产品的 BOM 解析结果."""
     product_info: ProductInfo
-    materials: list[ParsedMaterial]
+    materials: Sequence[ParsedMaterial]  # 解析器产出 MaterialBatch
     processes: list[ParsedProcess]
 
 
+@dataclass
+class ProductBOMStream:
+    """单个产品的流式解析结果.
+
+    物料按批惰性产出；product_info.material_count 随消费累加，
+    全部批次消费完毕后才是最终值。
+    """
+    product_info: ProductInfo
+    material_batches: Iterator[list[ParsedMaterial]]
+    processes: list[ParsedProcess] = field(default_factory=list)
+
+
 @dataclass
 class MultiProductBOMParseResult:
     """多产品 BOM 解析结果."""
@@ -353,6 +662,15 @@ class MultiProductBOMParseResult:
     total_materials: int
     parse_warnings: list[str]
 
+    def iter_products(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator["ProductBOMStream"]:
+        """以流式接口产出已解析的产品（与 MultiProductBOMParser.iter_products 对齐）."""
+        for product in self.products:
+            yield ProductBOMStream(
+                product_info=product.product_info,
+                material_batches=iter_batches(product.materials, batch_size),
+                processes=product.processes,
+            )
+
 
 class MultiProductBOMParser:
     """多产品 BOM 解析器.
@@ -360,57 +678,171 @@ class MultiProductBOMParser:
     用于解析包含多个产品的 BOM 文件，每个 sheet 代表一个产品。
     """
 
-    def __init__(self):
-        """初始化解析器."""
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        reader: str | None = None,
+        profiles: dict[str, ColumnMapping] | None = None,
+    ):
+        """初始化解析器.
+
+        Args:
+            max_workers: 并行解析进程数，None 时取配置 BOM_PARSE_WORKERS，<=1 为串行
+            reader: Excel 读取后端（"openpyxl" / "xlsx"），None 时取配置 BOM_READER_BACKEND
+            profiles: 表头签名 → 列映射模板，None 时取 mapping_registry 当前快照
+        """
         # 复用现有的 BOMParser 方法
-        self._base_parser = BOMParser()
+        self._base_parser = BOMParser(reader, profiles)
+        self.max_workers = (
+            max_workers if max_workers is not None else get_settings().BOM_PARSE_WORKERS
+        )
 
-    def parse_excel_file(self, file_content: bytes) -> MultiProductBOMParseResult:
+    def parse_excel_file(self, file_content: BOMSource) -> MultiProductBOMParseResult:
         """解析多产品 Excel BOM 文件.
 
+        max_workers > 1 且存在多个 sheet 时，按 sheet 分配到进程池并行解析，
+        结果按 sheet 原始顺序合并。
+
         Args:
-            file_content: Excel 文件的字节内容
+            file_content: Excel 文件的字节内容或文件路径
 
         Returns:
             MultiProductBOMParseResult: 解析后的多产品结果
         """
-        import io
+        wb = open_workbook(file_content, self._base_parser.reader)
+        sheet_names = wb.sheetnames
+        wb.close()
+
+        workers = min(self.max_workers, len(sheet_names))
+        if workers > 1:
+            results = self._parse_sheets_parallel(file_content, sheet_names, workers)
+        else:
+            results = [
+                result
+                for _, result in self._parse_sheets(file_content, list(enumerate(sheet_names)))
+            ]
 
-        wb = load_workbook(filename=io.BytesIO(file_content), read_only=True)
-        results = []
-        warnings = []
+        return MultiProductBOMParseResult(
+            products=results,
+            total_products=len(results),
+            total_materials=sum(r.product_info.material_count for r in results),
+            parse_warnings=[]
+        )
 
-        for sheet_name in wb.sheetnames:
-            ws = wb[sheet_name]
+    def _parse_sheets(
+        self, file_content: BOMSource, sheets: list[tuple[int, str]]
+    ) -> list[tuple[int, ProductBOMResult]]:
+        """只读打开工作簿并解析指定的 sheet.
 
-            # 检测 sheet 类型，跳过非物料 sheet
-            sheet_type = self._base_parser._detect_sheet_type(ws)
-            if sheet_type != "material":
-                continue
+        Args:
+            file_content: Excel 文件的字节内容或文件路径
+            sheets: (sheet 序号, sheet 名称) 列表
+
+        Returns:
+            (sheet 序号, 产品结果) 列表，非物料 sheet 不返回
+        """
+        wb = open_workbook(file_content, self._base_parser.reader)
+        results = []
+        try:
+            for sheet_idx, sheet_name in sheets:
+                head = SheetHead(wb[sheet_name])
+
+                # 检测 sheet 类型，跳过非物料 sheet
+                if self._base_parser._detect_sheet_type(head) != "material":
+                    continue
+
+                product_info = self._extract_product_metadata(head, sheet_name)
+                materials = MaterialBatch(self._iter_materials_for_product(head))
+                product_info.material_count = len(materials)
+
+                # 工艺路线暂为空
+                results.append((sheet_idx, ProductBOMResult(
+                    product_info=product_info,
+                    materials=materials,
+                    processes=[]
+                )))
+        finally:
+            wb.close()
+        return results
+
+    def _parse_sheets_parallel(
+        self, file_content: BOMSource, sheet_names: list[str], workers: int
+    ) -> list[ProductBOMResult]:
+        """在共享进程池中按 sheet 子集并行解析，并按 sheet 顺序合并.
+
+        并发数受进程池大小（BOM_PARSE_WORKERS）限制，多出的子集排队执行。
+        """
+        indexed = list(enumerate(sheet_names))
+        # 交错分配，避免大 sheet 集中在同一进程
+        assignments = [indexed[i::workers] for i in range(workers)]
+
+        pool = get_parse_pool()
+        futures = [
+            pool.submit(
+                _parse_sheets_worker,
+                file_content,
+                assigned,
+                self._base_parser.reader,
+                self._base_parser.profiles,
+            )
+            for assigned in assignments
+        ]
+        try:
+            merged = [item for future in futures for item in future.result()]
+        except BrokenProcessPool:
+            # 子进程异常退出后进程池不可再用，丢弃以便下次请求重建
+            shutdown_parse_pool()
+            raise
 
-            # 1. 提取产品元数据
-            product_info = self._extract_product_metadata(ws, sheet_name)
+        merged.sort(key=lambda item: item[0])
+        return [result for _, result in merged]
 
-            # 2. 解析物料列表
-            materials = self._parse_materials_for_product(ws)
-            product_info.material_count = len(materials)
+    def iter_products(
+        self, file_content: BOMSource, batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> Iterator[ProductBOMStream]:
+        """流式解析多产品 Excel BOM 文件.
 
-            # 3. 工艺路线暂为空
-            processes = []
-            product_info.process_count = 0
+        每个产品的物料按批惰性产出，调用方应在取下一个产品前消费完当前产品的批次。
 
-            results.append(ProductBOMResult(
-                product_info=product_info,
-                materials=materials,
-                processes=processes
-            ))
+        Args:
+            file_content: Excel 文件的字节内容或文件路径
+            batch_size: 每批行数
 
-        return MultiProductBOMParseResult(
-            products=results,
-            total_products=len(results),
-            total_materials=sum(r.product_info.material_count for r in results),
-            parse_warnings=warnings
-        )
+        Yields:
+            ProductBOMStream: 按 sheet 顺序产出的产品流
+        """
+        wb = open_workbook(file_content, self._base_parser.reader)
+        try:
+            for sheet_name in wb.sheetnames:
+                head = SheetHead(wb[sheet_name])
+
+                # 检测 sheet 类型，跳过非物料 sheet
+                sheet_type = self._base_parser._detect_sheet_type(head)
+                if sheet_type != "material":
+                    continue
+
+                # 1. 提取产品元数据
+                product_info = self._extract_product_metadata(head, sheet_name)
+
+                # 2. 物料按批惰性解析，工艺路线暂为空
+                yield ProductBOMStream(
+                    product_info=product_info,
+                    material_batches=self._count_batches(
+                        product_info,
+                        iter_batches(self._iter_materials_for_product(head), batch_size),
+                    ),
+                )
+        finally:
+            wb.close()
+
+    @staticmethod
+    def _count_batches(
+        product_info: ProductInfo, batches: Iterator[list[ParsedMaterial]]
+    ) -> Iterator[list[ParsedMaterial]]:
+        """透传批次，同时累加产品物料数."""
+        for batch in batches:
+            product_info.material_count += len(batch)
+            yield batch
 
     def _extract_product_metadata(self, worksheet, sheet_name: str) -> ProductInfo:
         """从 sheet 顶部提取产品元数据.
@@ -419,7 +851,12 @@ class MultiProductBOMParser:
         Row 2 (index 1): Product Name (col 5), Product Version (col 11) -> 值在 col 13
         Row 3 (index 2): Product Number (col 5) -> 值在 col 6, Customer Version (col 11) -> 值在 col 13
         Row 4 (index 3): Customer Number (col 5) -> 值在 col 6, Issue Date (col 11) -> 值在 col 13
+
+        Args:
+            worksheet: 工作表对象或 SheetHead
+            sheet_name: sheet 名称
         """
+        head = SheetHead.of(worksheet)
         product_code = sheet_name.strip()
         product_name = None
         product_number = None
@@ -428,10 +865,9 @@ class MultiProductBOMParser:
         customer_number = None
         issue_date = None
 
-        # 检查前 10 行，寻找包含关键标签的行
-        for row_idx in range(1, min(11, worksheet.max_row)):
-            row = worksheet[row_idx]
-            row_values = [cell.value for cell in row]
+        # 检查前 10 行（头部缓冲），寻找包含关键标签的行
+        for row_idx in range(1, min(HEAD_ROWS + 1, head.max_row)):
+            row_values = list(head.row(row_idx))
 
             for col_idx, cell_value in enumerate(row_values):
                 if cell_value and isinstance(cell_value, str):
@@ -517,11 +953,247 @@ class MultiProductBOMParser:
         """为单个产品解析物料.
 
         Args:
-            worksheet: 工作表对象
+            worksheet: 工作表对象或 SheetHead
 
         Returns:
             list[ParsedMaterial]: 物料列表
         """
+        return list(self._iter_materials_for_product(worksheet))
+
+    def _iter_materials_for_product(self, worksheet) -> Iterator[ParsedMaterial]:
+        """为单个产品逐行解析物料（生成器）."""
+        head = SheetHead.of(worksheet)
         # 使用现有的智能列检测
-        header_row, mapping = self._base_parser._detect_column_mapping(worksheet)
-        return self._base_parser._parse_material_sheet(worksheet, header_row, mapping)
+        header_row, mapping = self._base_parser._detect_column_mapping(head)
+        return self._base_parser.iter_material_sheet(head, header_row, mapping)
+
+
+def _parse_sheets_worker(
+    file_content: BOMSource,
+    sheets: list[tuple[int, str]],
+    reader: str,
+    profiles: dict[str, ColumnMapping],
+) -> list[tuple[int, ProductBOMResult]]:
+    """进程池 worker 入口（需为模块级函数以便序列化）.
+
+    子进程没有主进程的 mapping_registry，列映射模板随任务传入。
+    """
+    parser = MultiProductBOMParser(max_workers=1, reader=reader, profiles=profiles)
+    return parser._parse_sheets(file_content, sheets)
+
+
+_parse_pool: ProcessPoolExecutor | None = None
+_parse_pool_lock = threading.Lock()
+
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    """获取进程内共享的解析进程池（首次使用时按 BOM_PARSE_WORKERS 创建）.
+
+    上传解析在线程池中执行，可能并发调用，创建过程加锁。
+    """
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=max(get_settings().BOM_PARSE_WORKERS, 1)
+            )
+        return _parse_pool
+
+
+def shutdown_parse_pool() -> None:
+    """关闭共享解析进程池（应用关闭时调用），下次使用时重新创建."""
+    global _parse_pool
+    with _parse_pool_lock:
+        pool, _parse_pool = _parse_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+# ==================== BOM 层级结构 ====================
+
+# 虚拟根节点（产品本身）的层级，低于任何物料行（层级从 0 开始编号的 BOM 也适用）
+ROOT_LEVEL = -1
+
+
+def parse_bom_level(level: str | None) -> int:
+    """解析 BOM 层级列.
+
+    支持 "0"、"1"、"2" 等数字层级（从 0 编号的顶层总成保持为 0）和 ".1"、"..2"、
+    "..." 等点号缩进写法；负数按 0 处理，缺失或无法识别时按第 1 层处理。
+
+    Args:
+        level: 层级列原始值
+
+    Returns:
+        int: 层级（>= 0）
+    """
+    text = (level or "").strip()
+    digits = text.lstrip(".")
+    if digits.isdigit():
+        return int(digits)
+    if text and not digits:
+        return len(text)
+    if text.startswith("-") and text[1:].isdigit():
+        return 0
+    return 1
+
+
+@dataclass(slots=True, eq=False)
+class BOMNode:
+    """BOM 树节点.
+
+    extended_quantity 为展开数量：自身数量 × 各级父项数量，即每个产品实际消耗量；
+    subtree_hash 由零件号、版本及子项（数量, 子树哈希）计算，不含自身数量，
+    相同结构的子装配在不同父项下哈希相同。
+    """
+    index: int                        # 在物料列表中的下标，根节点为 -1
+    material: ParsedMaterial | None   # 根节点为 None
+    level: int
+    extended_quantity: float
+    parent: "BOMNode | None" = None
+    children: list["BOMNode"] = field(default_factory=list)
+    subtree_hash: str = ""
+
+    @property
+    def quantity(self) -> float:
+        """相对父项的用量（根节点为 1）."""
+        return self.material.quantity if self.material is not None else 1.0
+
+    @property
+    def is_assembly(self) -> bool:
+        """是否为装配（含子项）."""
+        return bool(self.children)
+
+
+@dataclass
+class BOMTree:
+    """单个产品的 BOM 树."""
+    root: BOMNode
+    nodes: list[BOMNode]  # 与物料列表顺序一致
+
+    def extended_quantities(self) -> list[float]:
+        """按物料顺序返回展开数量."""
+        return [node.extended_quantity for node in self.nodes]
+
+
+class BOMTreeBuilder:
+    """按层级列一次遍历构建 BOM 树.
+
+    物料按 BOM 文件顺序（先序）逐行加入：用栈维护当前祖先链，层级不大于当前行的
+    节点出栈并在出栈时计算子树哈希（此时其子项已全部确定）。展开数量只依赖祖先，
+    add 返回时即可用，可在流式解析中逐行使用。
+    """
+
+    def __init__(self) -> None:
+        self.root = BOMNode(index=-1, material=None, level=ROOT_LEVEL, extended_quantity=1.0)
+        self.nodes: list[BOMNode] = []
+        self._stack = [self.root]
+
+    def add(self, material: ParsedMaterial) -> BOMNode:
+        """加入一行物料，返回对应节点."""
+        level = parse_bom_level(material.level)
+        stack = self._stack
+        while stack[-1].level >= level:
+            self._close(stack.pop())
+
+        parent = stack[-1]
+        node = BOMNode(
+            index=len(self.nodes),
+            material=material,
+            level=level,
+            extended_quantity=parent.extended_quantity * material.quantity,
+            parent=parent,
+        )
+        parent.children.append(node)
+        self.nodes.append(node)
+        stack.append(node)
+        return node
+
+    def extend(self, materials: Iterable[ParsedMaterial]) -> None:
+        """按顺序加入多行物料."""
+        for material in materials:
+            self.add(material)
+
+    def build(self) -> BOMTree:
+        """结束构建，计算剩余节点的子树哈希并返回 BOM 树."""
+        stack = self._stack
+        while stack:
+            self._close(stack.pop())
+        return BOMTree(root=self.root, nodes=self.nodes)
+
+    @staticmethod
+    def _close(node: BOMNode) -> None:
+        material = node.material
+        digest = hashlib.sha1()
+        if material is not None:
+            digest.update(f"{material.part_number}\x1f{material.version}".encode("utf-8"))
+        for child in node.children:
+            digest.update(f"\x1e{child.quantity!r}\x1f{child.subtree_hash}".encode("utf-8"))
+        node.subtree_hash = digest.hexdigest()
+
+
+def build_bom_tree(materials: Iterable[ParsedMaterial]) -> BOMTree:
+    """根据层级列构建 BOM 树.
+
+    Args:
+        materials: 按 BOM 文件顺序排列的物料
+
+    Returns:
+        BOMTree: BOM 树（含展开数量与子树哈希）
+    """
+    builder = BOMTreeBuilder()
+    builder.extend(materials)
+    return builder.build()
+
+
+class SubassemblyRollup:
+    """按子树哈希缓存的子装配成本汇总.
+
+    单位成本 = 自身单价 + Σ 子项数量 × 子项单位成本；产品总成本即根节点单位成本，
+    等于 Σ 展开数量 × 单价。同一实例在一次上传内的多个产品间共享，
+    重复出现的子装配只计算一次。
+    """
+
+    def __init__(self, unit_price: Callable[[ParsedMaterial], float | None]) -> None:
+        """初始化汇总器.
+
+        Args:
+            unit_price: 物料单价函数，返回 None 视为 0
+        """
+        self.unit_price = unit_price
+        self._costs: dict[str, float] = {}
+        self.computed = 0
+        self.reused = 0
+
+    def unit_cost(self, node: BOMNode) -> float:
+        """计算节点（含子树）的单位成本."""
+        costs = self._costs
+        cached = costs.get(node.subtree_hash)
+        if cached is not None:
+            self.reused += 1
+            return cached
+
+        # 迭代式后序遍历，只展开未缓存的子树（避免深层 BOM 递归溢出）
+        order = []
+        pending = [node]
+        while pending:
+            current = pending.pop()
+            order.append(current)
+            pending.extend(c for c in current.children if c.subtree_hash not in costs)
+
+        for current in reversed(order):
+            if current.subtree_hash in costs:
+                self.reused += 1
+                continue
+            own = 0.0
+            if current.material is not None:
+                own = self.unit_price(current.material) or 0.0
+            costs[current.subtree_hash] = own + sum(
+                child.quantity * costs[child.subtree_hash] for child in current.children
+            )
+            self.computed += 1
+        return costs[node.subtree_hash]
+
+    def total_cost(self, tree: BOMTree) -> float:
+        """计算产品总成本."""
+        return self.unit_cost(tree.root)
@@ -0,0 +1,205 @@
+"""BOM 预览令牌.
+
+两步流程中 parse-preview 将解析结果保存在服务端并返回 previewToken；
+confirm-create 只需回传令牌和少量用户修改，不再重传整个 BOM，
+未修改的行也不再经过 Pydantic 逐行校验。
+
+预览结果优先保存在 Redis（多 worker 共享），不可用时回退到本地磁盘，
+过期时间 CacheService.TTL_BOM_PREVIEW。
+"""
+
+import json
+import os
+import string
+import tempfile
+import time
+import uuid
+from asyncio import to_thread
+from pathlib import Path
+from typing import Optional
+
+from pydantic import ValidationError
+from redis.exceptions import RedisError
+
+from app.config import Settings, get_settings
+from app.services.bom_parse_cache import dump_multi_result, load_multi_result
+from app.services.bom_parser import (
+    MultiProductBOMParseResult,
+    ParsedMaterial,
+    ProductBOMResult,
+)
+from app.services.cache_service import CacheService
+from app.schemas.bom import BOMMaterialEdit, MaterialSchema
+
+
+class BOMPreviewEditError(ValueError):
+    """用户修改无法应用（产品不存在、行号越界或字段校验失败）."""
+
+
+def apply_material_edits(
+    products: list[ProductBOMResult], edits: list[BOMMaterialEdit]
+) -> list[ProductBOMResult]:
+    """将用户修改应用到预览结果.
+
+    行号均指预览中的原始位置：update / delete 作用于该行，insert 插入到该行之前
+    （行号等于行数时追加到末尾）。只有修改涉及的行经过 MaterialSchema 校验。
+
+    Args:
+        products: 预览的产品解析结果
+        edits: 用户修改
+
+    Returns:
+        list[ProductBOMResult]: 应用修改后的产品（未修改的产品原样返回）
+
+    Raises:
+        BOMPreviewEditError: 修改无法应用
+    """
+    by_code = {p.product_info.product_code: p for p in products}
+    edits_by_product: dict[str, list[BOMMaterialEdit]] = {}
+    for edit in edits:
+        if edit.product_code not in by_code:
+            raise BOMPreviewEditError(f"Product {edit.product_code} not in preview")
+        edits_by_product.setdefault(edit.product_code, []).append(edit)
+
+    edited = []
+    for product in products:
+        product_edits = edits_by_product.get(product.product_info.product_code)
+        if not product_edits:
+            edited.append(product)
+            continue
+
+        materials = list(product.materials)
+        replaced: dict[int, ParsedMaterial | None] = {}
+        inserted: dict[int, list[ParsedMaterial]] = {}
+        for edit in product_edits:
+            limit = len(materials) if edit.action == "insert" else len(materials) - 1
+            if edit.index > limit:
+                raise BOMPreviewEditError(
+                    f"Line {edit.index} out of range for product {edit.product_code}"
+                )
+            if edit.action == "delete":
+                replaced[edit.index] = None
+            elif edit.action == "insert":
+                inserted.setdefault(edit.index, []).append(_validate_material({}, edit))
+            else:
+                base = replaced.get(edit.index) or materials[edit.index]
+                replaced[edit.index] = _validate_material(base._asdict(), edit)
+
+        rows = []
+        for idx, material in enumerate(materials):
+            rows.extend(inserted.get(idx, ()))
+            material = replaced.get(idx, material)
+            if material is not None:
+                rows.append(material)
+        rows.extend(inserted.get(len(materials), ()))
+
+        info = product.product_info
+        info.material_count = len(rows)
+        edited.append(ProductBOMResult(
+            product_info=info, materials=rows, processes=product.processes,
+        ))
+    return edited
+
+
+def _validate_material(base: dict, edit: BOMMaterialEdit) -> ParsedMaterial:
+    try:
+        schema = MaterialSchema.model_validate({**base, **edit.values})
+    except ValidationError as exc:
+        raise BOMPreviewEditError(
+            f"Invalid values for line {edit.index} of product {edit.product_code}: "
+            f"{exc.errors()[0]['msg']}"
+        ) from None
+    return ParsedMaterial(**schema.model_dump(by_alias=False))
+
+
+class BOMPreviewStore:
+    """BOM 预览结果存储.
+
+    Args:
+        cache: 共享的缓存服务（get_cache_service()）
+        settings: 应用配置
+    """
+
+    def __init__(self, cache: CacheService, settings: Settings | None = None) -> None:
+        self.settings = settings or get_settings()
+        self.cache = cache
+        self.preview_dir = Path(
+            self.settings.BOM_PARSE_CACHE_DIR
+            or os.path.join(tempfile.gettempdir(), "smartquote-bom-parse")
+        ) / "previews"
+
+    async def save(self, project_id: str, result: MultiProductBOMParseResult) -> str:
+        """保存预览结果.
+
+        Args:
+            project_id: 预览关联的项目 ID
+            result: 解析结果
+
+        Returns:
+            str: 预览令牌
+        """
+        token = uuid.uuid4().hex
+        data = {"project_id": project_id, "result": dump_multi_result(result)}
+        if self.cache.available:
+            try:
+                await self.cache.set_bom_preview(token, data)
+                return token
+            except (RedisError, OSError):
+                self.cache.mark_down()
+        await to_thread(self._disk_set, token, data)
+        return token
+
+    async def load(
+        self, token: str
+    ) -> Optional[tuple[str, MultiProductBOMParseResult]]:
+        """读取预览结果.
+
+        Args:
+            token: 预览令牌
+
+        Returns:
+            (项目 ID, 解析结果)；令牌无效或已过期时返回 None
+        """
+        if len(token) != 32 or not all(c in string.hexdigits for c in token):
+            return None
+        data = None
+        if self.cache.available:
+            try:
+                data = await self.cache.get_bom_preview(token)
+            except (RedisError, OSError):
+                self.cache.mark_down()
+        if data is None:
+            data = await to_thread(self._disk_get, token)
+        if data is None:
+            return None
+        return data["project_id"], load_multi_result(data["result"])
+
+    async def delete(self, token: str) -> None:
+        """删除预览结果（confirm-create 成功后令牌失效）."""
+        if self.cache.available:
+            try:
+                await self.cache.delete_bom_preview(token)
+            except (RedisError, OSError):
+                self.cache.mark_down()
+        self._disk_path(token).unlink(missing_ok=True)
+
+    def _disk_path(self, token: str) -> Path:
+        return self.preview_dir / f"{token}.json"
+
+    def _disk_get(self, token: str) -> Optional[dict]:
+        path = self._disk_path(token)
+        try:
+            if time.time() - path.stat().st_mtime > CacheService.TTL_BOM_PREVIEW:
+                path.unlink(missing_ok=True)
+                return None
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _disk_set(self, token: str, data: dict) -> None:
+        self.preview_dir.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再原子替换，避免并发读到半个文件
+        fd, tmp_path = tempfile.mkstemp(dir=self.preview_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self._disk_path(token))
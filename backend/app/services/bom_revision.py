@@ -0,0 +1,193 @@
+"""BOM 版本增量导入服务.
+
+客户发来已导入产品的新版本 BOM 时，按 (part_number, version, level) 将新行与
+product_materials 中已存储的行配对，比较行内容哈希，只对新增 / 修改 / 删除的
+差异行执行写入，未变化的行不产生任何写操作。
+"""
+
+import hashlib
+import uuid
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Iterable, Sequence
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.product_material import ProductMaterial
+from app.schemas.bom import MaterialSchema
+from app.services.bom_parser import ParsedMaterial
+
+# 参与内容哈希的列（匹配键之外的 BOM 原始数据列）
+HASHED_COLUMNS = (
+    "stock_status",
+    "material_name",
+    "material_type",
+    "supplier",
+    "quantity",
+    "unit",
+    "remarks",
+)
+
+# quantity 列精度为 Numeric(10, 3)，比较前按同样精度归一化
+QUANTITY_SCALE = Decimal("0.001")
+
+MatchKey = tuple[str, str, int | None]
+
+
+def material_columns(material: MaterialSchema | ParsedMaterial) -> dict:
+    """解析出的物料行 → product_materials 列值."""
+    level = str(material.level)
+    return {
+        "part_number": material.part_number,
+        "material_level": int(level) if level.isdigit() else None,
+        "version": material.version,
+        "stock_status": material.status,
+        "material_name": material.part_name,
+        "material_type": material.type,
+        "supplier": material.supplier,
+        "quantity": float(material.quantity),
+        "unit": material.unit,
+        "remarks": material.comments,
+    }
+
+
+def _normalize_quantity(value) -> str:
+    if value is None:
+        return ""
+    try:
+        return str(Decimal(str(value)).quantize(QUANTITY_SCALE))
+    except InvalidOperation:
+        return str(value)
+
+
+def match_key(columns: dict) -> MatchKey:
+    """行匹配键：(零件号, 版本, 层级)."""
+    return (
+        columns.get("part_number") or "",
+        columns.get("version") or "",
+        columns.get("material_level"),
+    )
+
+
+def content_hash(columns: dict) -> str:
+    """行内容哈希（None 与空字符串视为相同，数量按存储精度比较）."""
+    parts = [
+        _normalize_quantity(columns.get(name)) if name == "quantity"
+        else str(columns.get(name) or "")
+        for name in HASHED_COLUMNS
+    ]
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class BOMDelta:
+    """新旧 BOM 的差异行."""
+    inserts: list[dict] = field(default_factory=list)
+    updates: list[dict] = field(default_factory=list)  # 含 id
+    delete_ids: list[str] = field(default_factory=list)
+    unchanged: int = 0
+
+
+def diff_materials(stored: Iterable[dict], incoming: Iterable[dict]) -> BOMDelta:
+    """计算差异行.
+
+    同一匹配键出现多次（同一零件挂在不同子装配下）时按出现顺序一一配对。
+
+    Args:
+        stored: 已存储的行（需含 id 及 HASHED_COLUMNS / 匹配键列）
+        incoming: 新版本的行（material_columns 的输出）
+
+    Returns:
+        BOMDelta: 需要插入、更新、删除的行
+    """
+    stored_by_key: dict[MatchKey, deque[dict]] = defaultdict(deque)
+    for row in stored:
+        stored_by_key[match_key(row)].append(row)
+
+    delta = BOMDelta()
+    for row in incoming:
+        candidates = stored_by_key.get(match_key(row))
+        if not candidates:
+            delta.inserts.append(row)
+            continue
+
+        existing = candidates.popleft()
+        if content_hash(existing) == content_hash(row):
+            delta.unchanged += 1
+        else:
+            delta.updates.append({"id": existing["id"], **row})
+
+    delta.delete_ids = [row["id"] for rows in stored_by_key.values() for row in rows]
+    return delta
+
+
+class BOMRevisionMerger:
+    """BOM 版本增量合并服务."""
+
+    def __init__(self, db: AsyncSession, writer=None):
+        """初始化合并服务.
+
+        Args:
+            db: 数据库会话
+            writer: 可选的 BOMBulkWriter，新增行经其分批写入并计入写入统计
+        """
+        self.db = db
+        self.writer = writer
+
+    async def merge(
+        self, project_product_id: str, materials: Sequence[MaterialSchema | ParsedMaterial]
+    ) -> dict:
+        """将新版本物料合并到已存储的产品 BOM.
+
+        Args:
+            project_product_id: 已存在的项目产品 ID
+            materials: 新版本的物料行（请求 Schema 或解析结果行）
+
+        Returns:
+            变更摘要：inserted / updated / deleted / unchanged 行数
+        """
+        result = await self.db.execute(
+            select(
+                ProductMaterial.id,
+                ProductMaterial.part_number,
+                ProductMaterial.version,
+                ProductMaterial.material_level,
+                *(getattr(ProductMaterial, name) for name in HASHED_COLUMNS),
+            ).where(ProductMaterial.project_product_id == project_product_id)
+        )
+        stored = [dict(row) for row in result.mappings()]
+
+        delta = diff_materials(stored, (material_columns(m) for m in materials))
+
+        if delta.inserts:
+            now = datetime.utcnow()
+            rows = [
+                {
+                    "id": str(uuid.uuid4()),
+                    "project_product_id": project_product_id,
+                    "created_at": now,
+                    **row,
+                }
+                for row in delta.inserts
+            ]
+            if self.writer is not None:
+                await self.writer.insert_rows(ProductMaterial, rows)
+            else:
+                await self.db.execute(insert(ProductMaterial), rows)
+        if delta.updates:
+            # 按主键批量更新（executemany）
+            await self.db.execute(update(ProductMaterial), delta.updates)
+        if delta.delete_ids:
+            await self.db.execute(
+                delete(ProductMaterial).where(ProductMaterial.id.in_(delta.delete_ids))
+            )
+
+        return {
+            "inserted": len(delta.inserts),
+            "updated": len(delta.updates),
+            "deleted": len(delta.delete_ids),
+            "unchanged": delta.unchanged,
+        }
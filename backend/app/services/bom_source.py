@@ -0,0 +1,56 @@
+"""BOM 文件来源.
+
+解析器、解析缓存和上传流水线接受两种来源：
+- bytes: 普通上传读入内存的文件内容
+- os.PathLike: 分块上传落盘的文件路径，直接交给 zipfile / csv / pyarrow 按需读取，
+  不整体读入内存
+"""
+
+import hashlib
+import io
+import os
+from typing import BinaryIO, Union
+
+BOMSource = Union[bytes, os.PathLike]
+
+# 流式计算摘要时每次读取的字节数
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def is_path(source: BOMSource) -> bool:
+    """来源是否为文件路径."""
+    return isinstance(source, os.PathLike)
+
+
+def open_binary(source: BOMSource) -> BinaryIO:
+    """以只读二进制流打开来源（bytes 不复制，路径按需从磁盘读取）."""
+    if is_path(source):
+        return open(source, "rb")
+    return io.BytesIO(source)
+
+
+def read_head(source: BOMSource, size: int) -> bytes:
+    """读取来源开头的 size 个字节."""
+    if is_path(source):
+        with open(source, "rb") as f:
+            return f.read(size)
+    return source[:size]
+
+
+def source_size(source: BOMSource) -> int:
+    """来源的字节数."""
+    if is_path(source):
+        return os.path.getsize(source)
+    return len(source)
+
+
+def source_sha256(source: BOMSource) -> str:
+    """来源内容的 SHA-256（路径按块读取计算）."""
+    if not is_path(source):
+        return hashlib.sha256(source).hexdigest()
+    digest = hashlib.sha256()
+    with open(source, "rb") as f:
+        while chunk := f.read(READ_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
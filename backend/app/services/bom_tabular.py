@@ -0,0 +1,325 @@
+"""表格类 BOM 文件解析服务（CSV / TSV / Arrow IPC / Parquet）.
+
+PLM/ERP 导出的 BOM 通常是大体积的 CSV 或列式文件，直接解析即可，
+无需先转换成 xlsx。表头检测复用 BOMParser 的 ColumnMapping 智能列检测，
+输出与 Excel 解析相同的 ParsedMaterial / ProductBOMResult 结构。
+
+数据按块读取并按列转换：每块只取映射到的列，逐列做类型归一化后再组装
+ParsedMaterial，避免逐行逐字段的下标判断。Arrow/Parquet 依赖可选的
+pyarrow（pip install smartquote-backend[columnar]）。
+"""
+
+import codecs
+import csv
+import io
+import os
+from itertools import chain, islice
+from pathlib import PurePath
+from typing import Iterable, Iterator
+
+from app.services.bom_parser import (
+    DEFAULT_BATCH_SIZE,
+    HEAD_ROWS,
+    BOMParser,
+    ColumnMapping,
+    MaterialBatch,
+    MultiProductBOMParseResult,
+    ParsedMaterial,
+    ProductBOMResult,
+    ProductBOMStream,
+    ProductInfo,
+    SheetHead,
+    iter_batches,
+)
+from app.services.bom_source import BOMSource, is_path, open_binary, read_head, source_size
+
+CSV_EXTENSIONS = {".csv", ".txt"}
+TSV_EXTENSIONS = {".tsv", ".tab"}
+ARROW_EXTENSIONS = {".arrow", ".feather", ".ipc"}
+PARQUET_EXTENSIONS = {".parquet", ".pq"}
+TABULAR_EXTENSIONS = CSV_EXTENSIONS | TSV_EXTENSIONS | ARROW_EXTENSIONS | PARQUET_EXTENSIONS
+
+# 编码/分隔符探测读取的字节数
+SNIFF_BYTES = 64 * 1024
+
+# 与 BOMParser._row_to_material 一致的无效零件号
+_SKIP_PART_NUMBERS = {"", "none", "part number", "零件号"}
+
+
+def is_tabular_file(filename: str | None) -> bool:
+    """根据扩展名判断是否为表格类 BOM 文件."""
+    return bool(filename) and PurePath(filename).suffix.lower() in TABULAR_EXTENSIONS
+
+
+def _detect_encoding(head: bytes, total_size: int) -> str:
+    """探测文本编码：UTF-8（含 BOM）优先，失败回退 GB18030."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        decoder.decode(head, final=total_size <= SNIFF_BYTES)
+    except UnicodeDecodeError:
+        return "gb18030"
+    return "utf-8-sig"
+
+
+def _text_column(column: list, default: str) -> list[str]:
+    return [str(v or default) for v in column]
+
+
+def _quantity_column(column: list) -> list[float]:
+    quantities = []
+    for v in column:
+        if v is None:
+            quantities.append(0)
+            continue
+        try:
+            quantities.append(float(v))
+        except (ValueError, TypeError):
+            quantities.append(0)
+    return quantities
+
+
+class _RowSource:
+    """把行迭代器包装成 SheetHead 可用的工作表接口."""
+
+    def __init__(self, rows: Iterable[tuple]) -> None:
+        self._rows = rows
+        self.max_row = None
+
+    def iter_rows(self, min_row: int = 1, values_only: bool = True) -> Iterator[tuple]:
+        rows, self._rows = self._rows, ()
+        return islice(rows, min_row - 1, None)
+
+
+class TabularBOMParser:
+    """CSV / TSV / Arrow / Parquet BOM 解析器.
+
+    一个文件视为一个产品，产品编码取文件名（不含扩展名）。
+    """
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE):
+        """初始化解析器.
+
+        Args:
+            batch_size: 每块读取的行数
+        """
+        self.batch_size = batch_size
+        # 复用 BOMParser 的列映射检测
+        self._base_parser = BOMParser()
+
+    def parse_file(self, file_content: BOMSource, filename: str) -> MultiProductBOMParseResult:
+        """解析表格类 BOM 文件.
+
+        Args:
+            file_content: 文件字节内容或文件路径
+            filename: 文件名（用于判断格式和产品编码）
+
+        Returns:
+            MultiProductBOMParseResult: 与多产品 Excel 解析结果结构一致
+        """
+        results = []
+        for product in self.iter_products(file_content, filename):
+            materials = MaterialBatch()
+            for batch in product.material_batches:
+                materials.extend(batch)
+            results.append(ProductBOMResult(
+                product_info=product.product_info,
+                materials=materials,
+                processes=product.processes,
+            ))
+
+        return MultiProductBOMParseResult(
+            products=results,
+            total_products=len(results),
+            total_materials=sum(r.product_info.material_count for r in results),
+            parse_warnings=[],
+        )
+
+    def iter_products(
+        self, file_content: BOMSource, filename: str
+    ) -> Iterator[ProductBOMStream]:
+        """流式解析表格类 BOM 文件（与 MultiProductBOMParser.iter_products 对齐）.
+
+        Args:
+            file_content: 文件字节内容或文件路径
+            filename: 文件名（用于判断格式和产品编码）
+
+        Yields:
+            ProductBOMStream: 单个产品的物料批次流
+        """
+        path = PurePath(filename)
+        product_info = ProductInfo(
+            product_code=path.stem.strip(),
+            product_name=None,
+            product_number=None,
+            product_version="01",
+            customer_version="01",
+            customer_number=None,
+            issue_date=None,
+        )
+        yield ProductBOMStream(
+            product_info=product_info,
+            material_batches=self._count_batches(
+                self.iter_material_batches(file_content, filename), product_info
+            ),
+        )
+
+    def iter_material_batches(
+        self, file_content: BOMSource, filename: str
+    ) -> Iterator[list[ParsedMaterial]]:
+        """按块产出物料批次.
+
+        Args:
+            file_content: 文件字节内容或文件路径
+            filename: 文件名（用于判断格式）
+
+        Yields:
+            list[ParsedMaterial]: 每批物料
+        """
+        suffix = PurePath(filename).suffix.lower()
+        if suffix in ARROW_EXTENSIONS or suffix in PARQUET_EXTENSIONS:
+            chunks = self._iter_columnar_chunks(file_content, suffix)
+        elif suffix in TSV_EXTENSIONS:
+            chunks = self._iter_csv_chunks(file_content, "\t")
+        elif suffix in CSV_EXTENSIONS:
+            chunks = self._iter_csv_chunks(file_content, None)
+        else:
+            raise ValueError(f"不支持的 BOM 文件格式: {suffix or filename}")
+
+        for columns in chunks:
+            batch = self._materials_from_columns(columns)
+            if batch:
+                yield batch
+
+    # ==================== 块读取 ====================
+
+    def _iter_csv_chunks(
+        self, file_content: BOMSource, delimiter: str | None
+    ) -> Iterator[list[list]]:
+        """CSV/TSV 按块读取，返回映射后的列数据."""
+        head_bytes = read_head(file_content, SNIFF_BYTES)
+        encoding = _detect_encoding(head_bytes, source_size(file_content))
+        if delimiter is None:
+            sample = head_bytes.decode(encoding, errors="ignore")
+            try:
+                delimiter = csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+            except csv.Error:
+                delimiter = ","
+
+        text = io.TextIOWrapper(open_binary(file_content), encoding=encoding, newline="")
+        with text:
+            yield from self._iter_csv_reader_chunks(csv.reader(text, delimiter=delimiter))
+
+    def _iter_csv_reader_chunks(self, reader) -> Iterator[list[list]]:
+        """从 csv.reader 检测表头后按块产出映射列."""
+        head = SheetHead(_RowSource(reader))
+        header_row, mapping = self._base_parser._detect_column_mapping(head)
+
+        selected = list(mapping)
+        width = max(selected) + 1
+        # 表头之后的头部缓冲行 + 剩余行直接接 csv.reader，不经过逐行生成器
+        data_rows = chain(head.rows[header_row:], reader)
+        for rows in iter_batches(data_rows, self.batch_size):
+            # 短行补齐到映射所需宽度（Excel 行已由读取器补齐）
+            if min(map(len, rows)) < width:
+                rows = [row + [None] * (width - len(row)) for row in rows]
+            # CSV 空单元格为 ""，与 Excel 的 None 一样按空值处理（均为假值，float 失败取 0）
+            columns = list(zip(*rows))
+            yield [columns[idx] for idx in selected]
+
+    def _iter_columnar_chunks(self, file_content: BOMSource, suffix: str) -> Iterator[list[list]]:
+        """Arrow IPC / Parquet 按 RecordBatch 读取，只物化映射到的列."""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ValueError("解析 Arrow/Parquet BOM 文件需要安装 pyarrow") from exc
+
+        def open_source():
+            # 落盘文件使用内存映射，不读入内存
+            if is_path(file_content):
+                return pa.memory_map(os.fspath(file_content))
+            return pa.BufferReader(file_content)
+
+        source = open_source()
+        if suffix in PARQUET_EXTENSIONS:
+            record_batches = pq.ParquetFile(source).iter_batches(batch_size=self.batch_size)
+        else:
+            try:
+                ipc_reader = pa.ipc.open_file(source)
+                record_batches = (
+                    ipc_reader.get_batch(i) for i in range(ipc_reader.num_record_batches)
+                )
+            except pa.ArrowInvalid:
+                record_batches = iter(pa.ipc.open_stream(open_source()))
+
+        record_batches = iter(record_batches)
+        first = next(record_batches, None)
+        if first is None:
+            return
+
+        # 列名作为第 1 行，和前几行数据一起做表头检测（表头也可能在数据行中）
+        names = tuple(first.schema.names)
+        head_rows = [names] + [
+            tuple(row.values()) for row in first.slice(0, HEAD_ROWS - 1).to_pylist()
+        ]
+        header_row, mapping = self._base_parser._detect_column_mapping(
+            SheetHead(_RowSource(head_rows))
+        )
+
+        # 表头之前（含表头）的数据行跳过
+        skip = header_row - 1
+        for record_batch in chain([first], record_batches):
+            if skip:
+                dropped = min(skip, record_batch.num_rows)
+                record_batch = record_batch.slice(dropped)
+                skip -= dropped
+            if record_batch.num_rows == 0:
+                continue
+            yield [
+                record_batch.column(idx).to_pylist() if idx < record_batch.num_columns
+                else [None] * record_batch.num_rows
+                for idx in mapping
+            ]
+
+    # ==================== 列式转换 ====================
+
+    def _materials_from_columns(self, columns: list[list]) -> list[ParsedMaterial]:
+        """按列归一化后组装物料（规则与 BOMParser._row_to_material 一致）.
+
+        Args:
+            columns: 按 ColumnMapping 字段顺序排列的列数据
+        """
+        data = dict(zip(ColumnMapping._fields, columns))
+
+        # 先按零件号过滤无效行，其余列只转换保留下来的行
+        stripped = [str(v).strip() if v else "" for v in data["part_number"]]
+        keep = [i for i, v in enumerate(stripped) if v.lower() not in _SKIP_PART_NUMBERS]
+        if not keep:
+            return []
+        if len(keep) != len(stripped):
+            data = {name: [column[i] for i in keep] for name, column in data.items()}
+            stripped = [stripped[i] for i in keep]
+
+        return list(map(
+            ParsedMaterial,
+            _text_column(data["level"], ""),
+            stripped,
+            _text_column(data["part_name"], ""),
+            _text_column(data["version"], "1.0"),
+            _text_column(data["type"], "I"),
+            _text_column(data["status"], "N"),
+            _text_column(data["material"], ""),
+            _text_column(data["supplier"], ""),
+            _quantity_column(data["quantity"]),
+            _text_column(data["unit"], "PC"),
+            _text_column(data["comments"], ""),
+        ))
+
+    @staticmethod
+    def _count_batches(
+        batches: Iterator[list[ParsedMaterial]], product_info: ProductInfo
+    ) -> Iterator[list[ParsedMaterial]]:
+        """透传批次并累加产品物料数."""
+        for batch in batches:
+            product_info.material_count += len(batch)
+            yield batch
@@ -1,7 +1,9 @@
 """Redis 缓存服务."""
 
 import json
+import time
 import redis.asyncio as redis
+from functools import lru_cache
 from typing import Optional
 from app.config import Settings, get_settings
 
@@ -10,16 +12,32 @@ class CacheService:
     """Redis 缓存服务.
 
     用于缓存物料数据和工艺费率数据，减少数据库查询。
+    进程内共享一个实例（get_cache_service），复用同一个 Redis 连接池。
     """
 
     # 缓存过期时间（秒）
     TTL_MATERIAL = 3600  # 物料数据: 1 小时
     TTL_RATE = 3600  # 工艺费率: 1 小时
     TTL_LLM = 86400  # LLM 结果: 24 小时
+    TTL_BOM_PARSE = 3600  # BOM 解析结果: 1 小时
+    TTL_BOM_PREVIEW = 3600  # BOM 预览结果: 1 小时
+
+    # Redis 失败后跳过 Redis 的时长（秒），避免每次请求都等待连接重试
+    RETRY_INTERVAL = 30
 
     def __init__(self, settings: Settings | None = None) -> None:
         self.settings = settings or get_settings()
         self._redis: redis.Redis | None = None
+        self._down_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        """Redis 是否可用（最近一次失败后 RETRY_INTERVAL 秒内视为不可用）."""
+        return time.monotonic() >= self._down_until
+
+    def mark_down(self) -> None:
+        """记录 Redis 读写失败，RETRY_INTERVAL 秒内调用方直接走回退路径."""
+        self._down_until = time.monotonic() + self.RETRY_INTERVAL
 
     @property
     def redis(self) -> redis.Redis:
@@ -80,6 +98,46 @@ class CacheService:
         key = f"rate:{process_name}"
         await self.redis.setex(key, self.TTL_RATE, json.dumps(data))
 
+    async def get_many(self, prefix: str, keys: list[str]) -> dict[str, dict]:
+        """批量获取缓存（一次 MGET）.
+
+        Args:
+            prefix: 键前缀（material / rate）
+            keys: 键列表
+
+        Returns:
+            命中的键 → 数据字典
+        """
+        if not keys:
+            return {}
+        values = await self.redis.mget([f"{prefix}:{key}" for key in keys])
+        return {key: json.loads(value) for key, value in zip(keys, values) if value}
+
+    async def set_many(self, prefix: str, data: dict[str, dict], ttl: int) -> None:
+        """批量设置缓存（一次 pipeline 往返）.
+
+        Args:
+            prefix: 键前缀（material / rate）
+            data: 键 → 数据字典
+            ttl: 过期时间（秒）
+        """
+        if not data:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, value in data.items():
+                pipe.setex(f"{prefix}:{key}", ttl, json.dumps(value))
+            await pipe.execute()
+
+    async def delete_many(self, prefix: str, keys: list[str]) -> None:
+        """批量删除缓存（一次 DEL）.
+
+        Args:
+            prefix: 键前缀（material / rate）
+            keys: 键列表
+        """
+        if keys:
+            await self.redis.delete(*(f"{prefix}:{key}" for key in keys))
+
     async def get_llm_result(self, cache_key: str) -> Optional[dict]:
         """获取 LLM 结果缓存.
 
@@ -103,6 +161,61 @@ class CacheService:
         key = f"llm:{cache_key}"
         await self.redis.setex(key, self.TTL_LLM, json.dumps(data))
 
+    async def get_bom_parse(self, cache_key: str) -> Optional[dict]:
+        """获取 BOM 解析结果缓存.
+
+        Args:
+            cache_key: 缓存键（文件内容哈希 + 解析器版本）
+
+        Returns:
+            解析结果字典，不存在则返回 None
+        """
+        key = f"bom_parse:{cache_key}"
+        data = await self.redis.get(key)
+        return json.loads(data) if data else None
+
+    async def set_bom_parse(self, cache_key: str, data: dict) -> None:
+        """设置 BOM 解析结果缓存.
+
+        Args:
+            cache_key: 缓存键（文件内容哈希 + 解析器版本）
+            data: 解析结果数据
+        """
+        key = f"bom_parse:{cache_key}"
+        await self.redis.setex(key, self.TTL_BOM_PARSE, json.dumps(data))
+
+    async def get_bom_preview(self, token: str) -> Optional[dict]:
+        """获取 BOM 预览结果.
+
+        Args:
+            token: 预览令牌
+
+        Returns:
+            预览数据字典，不存在则返回 None
+        """
+        key = f"bom_preview:{token}"
+        data = await self.redis.get(key)
+        return json.loads(data) if data else None
+
+    async def set_bom_preview(self, token: str, data: dict) -> None:
+        """设置 BOM 预览结果.
+
+        Args:
+            token: 预览令牌
+            data: 预览数据（项目 ID + 解析结果）
+        """
+        key = f"bom_preview:{token}"
+        await self.redis.setex(key, self.TTL_BOM_PREVIEW, json.dumps(data))
+
+    async def delete_bom_preview(self, token: str) -> None:
+        """删除 BOM 预览结果.
+
+        Args:
+            token: 预览令牌
+        """
+        key = f"bom_preview:{token}"
+        await self.redis.delete(key)
+
     async def delete_material(self, item_code: str) -> None:
         """删除物料缓存.
 
@@ -134,3 +247,9 @@ class CacheService:
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """异步上下文管理器退出."""
         await self.close()
+
+
+@lru_cache()
+def get_cache_service() -> CacheService:
+    """进程内共享的缓存服务（应用关闭时关闭连接）."""
+    return CacheService()
@@ -1,21 +1,50 @@
 """双轨计价计算服务 - 核心算法."""
 
+from collections.abc import Sequence
+from dataclasses import dataclass, replace
 from decimal import Decimal
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models.material import Material
-from app.models.process_rate import ProcessRate
 from app.schemas.common import PricePair
+from app.services.cost_memo import cost_input_hash, cost_memo
+from app.services.lookup_planner import normalize_lookup_key
+from app.services.price_book import PriceBook, price_book_registry
+
+
+@dataclass
+class CostBreakdown:
+    """批量成本计算结果：逐行 PricePair 与汇总."""
+    materials: list[PricePair]
+    processes: list[PricePair]
+    material_cost: PricePair
+    process_cost: PricePair
+    total_cost: PricePair
+    # 计算所用价格簿版本（没有任何行、未使用价格簿时为 None）
+    price_book_version: str | None
 
 
 class DualTrackCalculator:
     """双轨计价计算器 - 核心算法.
 
-    实现标准成本与 VAVE 成本的双轨计算。
+    实现标准成本与 VAVE 成本的双轨计算。价格和费率取自价格簿快照，
+    同一个计算器的所有计算使用同一版本。结果按输入哈希缓存，并记录所用的
+    物料 / 工艺价格：输入和这些价格都未变化时不再计算（价格簿有效期内也不读数据库）。
     """
 
-    def __init__(self, db: AsyncSession) -> None:
+    def __init__(self, db: AsyncSession, price_book: PriceBook | None = None) -> None:
+        """初始化计算器.
+
+        Args:
+            db: 数据库会话（价格簿需要重建时用于加载）
+            price_book: 价格簿，None 时在首次计算时取当前价格簿
+        """
         self.db = db
+        self.price_book = price_book
+
+    async def get_price_book(self) -> PriceBook:
+        """本计算器使用的价格簿（首次调用时固定下来）."""
+        if self.price_book is None:
+            self.price_book = await price_book_registry.get(self.db)
+        return self.price_book
 
     async def calculate_material_cost(
         self,
@@ -36,20 +65,12 @@ class DualTrackCalculator:
         if not material_code:
             return self._zero_price_pair()
 
-        result = await self.db.execute(select(Material).where(Material.item_code == material_code))
-        material = result.scalar_one_or_none()
-
-        if material is None:
-            return self._zero_price_pair()
-
-        std_price = Decimal(str(material.std_price)) if material.std_price else Decimal("0")
-        vave_price = Decimal(str(material.vave_price)) if material.vave_price else std_price
-
-        quantity_dec = Decimal(str(quantity))
-        std_cost = std_price * quantity_dec
-        vave_cost = vave_price * quantity_dec
-
-        return self._create_price_pair(std_cost, vave_cost)
+        book = await self.get_price_book()
+        return self._memoized(
+            book, cost_input_hash("material", [(normalize_lookup_key(material_code), quantity)]),
+            lambda: self._material_price_pair(book.material(material_code), quantity),
+            [("material", material_code)],
+        )
 
     async def calculate_process_cost(
         self,
@@ -70,11 +91,107 @@ class DualTrackCalculator:
         if not process_name:
             return self._zero_price_pair()
 
-        result = await self.db.execute(
-            select(ProcessRate).where(ProcessRate.process_name == process_name)
+        book = await self.get_price_book()
+        return self._memoized(
+            book, cost_input_hash("process", [(normalize_lookup_key(process_name), cycle_time)]),
+            lambda: self._process_price_pair(book.process_by_name(process_name), cycle_time),
+            [("process_name", process_name)],
         )
-        rate = result.scalar_one_or_none()
 
+    async def calculate_many(
+        self,
+        materials: Sequence[tuple[str | None, float]] = (),
+        processes: Sequence[tuple[str | None, float]] = (),
+    ) -> CostBreakdown:
+        """批量计算整个 BOM 的双轨成本.
+
+        所有行使用同一价格簿快照，逐行结果与 calculate_material_cost /
+        calculate_process_cost 完全一致；汇总为逐行（已按分取整的）成本之和。
+
+        Args:
+            materials: (物料编码, 数量) 列表
+            processes: (工艺名称, 循环时间/小时) 列表
+
+        Returns:
+            CostBreakdown: 逐行成本、物料 / 工艺 / 总成本汇总及价格簿版本
+                （可能来自缓存，与其他调用共享，不可修改）
+        """
+        if not materials and not processes:
+            # 没有任何行时无需价格簿，也不访问数据库
+            zero = self._zero_price_pair()
+            return CostBreakdown(
+                materials=[],
+                processes=[],
+                material_cost=zero,
+                process_cost=zero,
+                total_cost=zero,
+                price_book_version=self.price_book.version if self.price_book else None,
+            )
+
+        book = await self.get_price_book()
+        key = cost_input_hash(
+            "many",
+            [(normalize_lookup_key(code), quantity) for code, quantity in materials],
+            [(normalize_lookup_key(name), cycle_time) for name, cycle_time in processes],
+        )
+        dependencies = [("material", code) for code, _ in materials if code]
+        dependencies += [("process_name", name) for name, _ in processes if name]
+        return self._memoized(
+            book, key, lambda: self._breakdown(book, materials, processes), dependencies,
+            restamp=lambda breakdown, version: replace(breakdown, price_book_version=version),
+        )
+
+    def _memoized(self, book: PriceBook, key: str, compute, dependencies, restamp=None):
+        """按输入哈希缓存计算结果，依赖的价格簿条目变化时重新计算."""
+        result = cost_memo.get(book, key, restamp)
+        if result is None:
+            result = compute()
+            cost_memo.set(book, key, result, dependencies)
+        return result
+
+    def _breakdown(self, book: PriceBook, materials, processes) -> CostBreakdown:
+        """逐行计算并汇总（calculate_many 未命中缓存时）."""
+        material_pairs = [
+            self._material_price_pair(book.material(code), quantity)
+            for code, quantity in materials
+        ]
+        process_pairs = [
+            self._process_price_pair(book.process_by_name(name), cycle_time)
+            for name, cycle_time in processes
+        ]
+
+        material_std = sum((p.std for p in material_pairs), Decimal("0"))
+        material_vave = sum((p.vave for p in material_pairs), Decimal("0"))
+        process_std = sum((p.std for p in process_pairs), Decimal("0"))
+        process_vave = sum((p.vave for p in process_pairs), Decimal("0"))
+
+        return CostBreakdown(
+            materials=material_pairs,
+            processes=process_pairs,
+            material_cost=self._create_price_pair(material_std, material_vave),
+            process_cost=self._create_price_pair(process_std, process_vave),
+            total_cost=self._create_price_pair(
+                material_std + process_std, material_vave + process_vave
+            ),
+            price_book_version=book.version,
+        )
+
+    def _material_price_pair(self, material, quantity: float) -> PricePair:
+        """物料行成本：Quantity * Price（VAVE 价缺失时取标准价）."""
+        if material is None:
+            return self._zero_price_pair()
+
+        std_price = Decimal(str(material.std_price)) if material.std_price else Decimal("0")
+        vave_price = Decimal(str(material.vave_price)) if material.vave_price else std_price
+
+        quantity_dec = Decimal(str(quantity))
+        std_cost = std_price * quantity_dec
+        vave_cost = vave_price * quantity_dec
+
+        return self._create_price_pair(std_cost, vave_cost)
+
+    def _process_price_pair(self, rate, cycle_time: float) -> PricePair:
+        """工艺行成本：CycleTime * HourlyRate（VAVE 轨乘效率系数）."""
         if rate is None:
             return self._zero_price_pair()
 
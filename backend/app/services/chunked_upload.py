@@ -0,0 +1,275 @@
+"""BOM 分块续传上传.
+
+大文件（数百 MB 的 BOM 工作簿）不再整体读入内存：客户端先 init 声明文件大小和
+SHA-256，再按偏移量分块 PUT，服务端将每块直接追加到临时目录下的文件；
+断线后通过 status 查询已接收的偏移量从断点继续。complete 校验大小和摘要后返回
+落盘文件的路径，解析器直接按路径读取（zipfile / csv / memory_map），不再复制到内存。
+
+上传状态以 JSON 旁路文件保存在 BOM_UPLOAD_SPOOL_DIR 下，多 worker 部署时任一进程
+都可以继续同一个上传：追加和完成都持有数据文件上的 flock 排他锁（跨进程、
+非阻塞），同一上传同时只有一个写入者，其余请求返回 409 由客户端按 offset 重试。
+整体 SHA-256 校验在线程池中计算，不阻塞事件循环。
+"""
+
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import string
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Iterator
+
+from app.config import get_settings
+from app.services.bom_source import source_sha256
+
+UPLOAD_PENDING = "pending"
+UPLOAD_COMPLETED = "completed"
+
+
+class ChunkedUploadError(Exception):
+    """分块上传错误（status_code 为对应的 HTTP 状态码）."""
+
+    status_code = 400
+
+    def __init__(self, message: str, offset: int | None = None):
+        super().__init__(message)
+        self.offset = offset
+
+
+class UploadNotFoundError(ChunkedUploadError):
+    """上传不存在或已过期."""
+    status_code = 404
+
+
+class UploadOffsetMismatchError(ChunkedUploadError):
+    """分块偏移量与服务端已接收的字节数不一致（客户端应从 offset 继续）."""
+    status_code = 409
+
+
+class UploadBusyError(ChunkedUploadError):
+    """同一上传正在被其他请求（可能在其他 worker 上）写入或完成."""
+    status_code = 409
+
+
+class UploadChecksumError(ChunkedUploadError):
+    """分块或整个文件的 SHA-256 校验失败."""
+    status_code = 422
+
+
+class ChunkedUploadStore:
+    """分块上传存储."""
+
+    def __init__(self, spool_dir: str | None = None, ttl: int | None = None):
+        """初始化存储.
+
+        Args:
+            spool_dir: 落盘目录，None 时取配置 BOM_UPLOAD_SPOOL_DIR（空为系统临时目录）
+            ttl: 未完成上传的保留时间（秒），None 时取配置 BOM_UPLOAD_TTL
+        """
+        settings = get_settings()
+        self.spool_dir = Path(
+            spool_dir
+            or settings.BOM_UPLOAD_SPOOL_DIR
+            or os.path.join(tempfile.gettempdir(), "smartquote-bom-uploads")
+        )
+        self.ttl = ttl if ttl is not None else settings.BOM_UPLOAD_TTL
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+
+    def init(self, filename: str | None, total_size: int, sha256: str | None = None) -> dict:
+        """创建上传.
+
+        Args:
+            filename: 原始文件名（用于识别 CSV/TSV/Arrow/Parquet）
+            total_size: 文件总字节数
+            sha256: 整个文件的 SHA-256（可选，complete 时校验）
+
+        Returns:
+            dict: 上传状态
+        """
+        if total_size <= 0:
+            raise ChunkedUploadError("totalSize must be positive")
+        self.cleanup()
+
+        upload_id = uuid.uuid4().hex
+        meta = {
+            "id": upload_id,
+            "filename": filename,
+            "total_size": total_size,
+            "sha256": sha256.lower() if sha256 else None,
+            "status": UPLOAD_PENDING,
+            "created_at": time.time(),
+        }
+        self.data_path(upload_id).touch()
+        self._write_meta(meta)
+        return self._status(meta)
+
+    def status(self, upload_id: str) -> dict:
+        """查询上传状态（offset 为已接收的字节数）."""
+        return self._status(self._read_meta(upload_id))
+
+    async def append(
+        self,
+        upload_id: str,
+        offset: int,
+        chunks: AsyncIterator[bytes],
+        chunk_sha256: str | None = None,
+    ) -> dict:
+        """在 offset 处追加一块数据.
+
+        Args:
+            upload_id: 上传 ID
+            offset: 本块起始偏移量，必须等于已接收的字节数
+            chunks: 请求体字节流（逐段写入磁盘，不整体缓存）
+            chunk_sha256: 本块的 SHA-256（可选，不匹配时回滚本块）
+
+        Returns:
+            dict: 追加后的上传状态
+        """
+        # 先校验上传 ID 和状态文件，再按 ID 打开数据文件
+        self._read_meta(upload_id)
+        with self._locked(upload_id, "r+b") as f:
+            # 持锁后重新读取状态和已接收字节数，其他 worker 可能刚写完或已完成
+            meta = self._read_meta(upload_id)
+            if meta["status"] == UPLOAD_COMPLETED:
+                raise ChunkedUploadError("upload already completed")
+            received = f.seek(0, os.SEEK_END)
+            if offset != received:
+                raise UploadOffsetMismatchError(
+                    f"offset {offset} does not match received size {received}", received
+                )
+
+            digest = hashlib.sha256()
+            size = received
+            try:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > meta["total_size"]:
+                        raise ChunkedUploadError("chunk exceeds declared totalSize", received)
+                    digest.update(chunk)
+                    f.write(chunk)
+                if chunk_sha256 and digest.hexdigest() != chunk_sha256.lower():
+                    raise UploadChecksumError("chunk checksum mismatch", received)
+                f.flush()
+            except BaseException:
+                # 本块作废，回到块起始位置，客户端可重传
+                f.truncate(received)
+                raise
+        return self._status(meta, size)
+
+    async def complete(self, upload_id: str) -> tuple[Path, str | None]:
+        """完成上传：校验大小和摘要（摘要在线程池中计算）.
+
+        Args:
+            upload_id: 上传 ID
+
+        Returns:
+            tuple: (落盘文件路径, 原始文件名)
+        """
+        # 先校验上传 ID 和状态文件，再按 ID 打开数据文件
+        self._read_meta(upload_id)
+        path = self.data_path(upload_id)
+        with self._locked(upload_id, "rb") as f:
+            meta = self._read_meta(upload_id)
+            if meta["status"] != UPLOAD_COMPLETED:
+                received = os.fstat(f.fileno()).st_size
+                if received != meta["total_size"]:
+                    raise UploadOffsetMismatchError(
+                        f"received {received} of {meta['total_size']} bytes", received
+                    )
+                if meta["sha256"] and await asyncio.to_thread(source_sha256, path) != meta["sha256"]:
+                    # 整个文件作废，需重新上传
+                    self.discard(upload_id)
+                    raise UploadChecksumError("file checksum mismatch")
+                meta["status"] = UPLOAD_COMPLETED
+                self._write_meta(meta)
+        return path, meta["filename"]
+
+    def discard(self, upload_id: str) -> None:
+        """删除上传的数据文件和状态文件."""
+        for path in (self.data_path(upload_id), self._meta_path(upload_id)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def cleanup(self) -> int:
+        """删除超过 TTL 未写入的上传.
+
+        已完成的上传交给解析流水线，由流水线结束时删除，这里不处理；正在追加或
+        完成（持有文件锁）的上传也跳过。
+
+        Returns:
+            int: 删除的上传数
+        """
+        expired = 0
+        deadline = time.time() - self.ttl
+        for meta_path in self.spool_dir.glob("*.json"):
+            upload_id = meta_path.stem
+            try:
+                meta = self._read_meta(upload_id)
+                # 数据文件每次追加都会更新修改时间
+                if (
+                    meta["status"] == UPLOAD_COMPLETED
+                    or self.data_path(upload_id).stat().st_mtime >= deadline
+                ):
+                    continue
+                with self._locked(upload_id, "rb"):
+                    self.discard(upload_id)
+                expired += 1
+            except (ChunkedUploadError, FileNotFoundError):
+                pass
+        return expired
+
+    @contextmanager
+    def _locked(self, upload_id: str, mode: str) -> Iterator[BinaryIO]:
+        """打开数据文件并持有排他 flock（非阻塞），已被占用时抛出 UploadBusyError."""
+        try:
+            f = open(self.data_path(upload_id), mode)
+        except FileNotFoundError:
+            raise UploadNotFoundError("Upload not found") from None
+        with f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                offset = os.fstat(f.fileno()).st_size
+                raise UploadBusyError("upload is being written by another request", offset) from None
+            yield f
+
+    def data_path(self, upload_id: str) -> Path:
+        """上传数据文件路径."""
+        return self.spool_dir / f"{upload_id}.part"
+
+    def _meta_path(self, upload_id: str) -> Path:
+        return self.spool_dir / f"{upload_id}.json"
+
+    def _read_meta(self, upload_id: str) -> dict:
+        # 上传 ID 直接拼接路径，只接受 uuid4().hex 格式
+        if len(upload_id) != 32 or not all(c in string.hexdigits for c in upload_id):
+            raise UploadNotFoundError("Upload not found")
+        try:
+            return json.loads(self._meta_path(upload_id).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            raise UploadNotFoundError("Upload not found") from None
+
+    def _write_meta(self, meta: dict) -> None:
+        # 先写临时文件再原子替换，避免其他进程读到半个 JSON
+        fd, tmp_path = tempfile.mkstemp(dir=self.spool_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path(meta["id"]))
+
+    def _status(self, meta: dict, offset: int | None = None) -> dict:
+        if offset is None:
+            offset = self.data_path(meta["id"]).stat().st_size
+        return {
+            "uploadId": meta["id"],
+            "filename": meta["filename"],
+            "totalSize": meta["total_size"],
+            "offset": offset,
+            "status": meta["status"],
+        }
@@ -0,0 +1,101 @@
+"""BOM 列映射模板服务.
+
+column_mapping_profiles 表是数据源，bom_parser.mapping_registry 是进程内缓存：
+解析前按 PROFILE_RELOAD_INTERVAL 节流从数据库刷新，保存 / 删除模板后立即刷新。
+"""
+
+import time
+import uuid
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.column_mapping_profile import ColumnMappingProfile
+from app.schemas.bom import ColumnMappingProfileCreate
+from app.services.bom_parser import ColumnMapping, header_signature, mapping_registry
+
+# 进程内缓存刷新间隔（秒），多个 worker 进程之间依赖该间隔收敛
+PROFILE_RELOAD_INTERVAL = 60
+
+_last_loaded_at: float | None = None
+
+
+class ColumnMappingProfileService:
+    """列映射模板服务."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def list_profiles(self) -> list[ColumnMappingProfile]:
+        """获取全部列映射模板."""
+        result = await self.db.execute(
+            select(ColumnMappingProfile).order_by(ColumnMappingProfile.name)
+        )
+        return list(result.scalars().all())
+
+    async def save_profile(self, data: ColumnMappingProfileCreate) -> ColumnMappingProfile:
+        """保存列映射模板（相同表头签名的模板被覆盖），并刷新进程内缓存."""
+        signature = header_signature(data.header_cells)
+        if signature is None:
+            raise ValueError("表头行不能为空")
+
+        mapping = data.mapping.model_dump(by_alias=False)
+        result = await self.db.execute(
+            select(ColumnMappingProfile).where(ColumnMappingProfile.header_signature == signature)
+        )
+        profile = result.scalar_one_or_none()
+        if profile is None:
+            profile = ColumnMappingProfile(
+                id=str(uuid.uuid4()),
+                header_signature=signature,
+                name=data.name,
+                header_cells=data.header_cells,
+                mapping=mapping,
+            )
+            self.db.add(profile)
+        else:
+            profile.name = data.name
+            profile.header_cells = data.header_cells
+            profile.mapping = mapping
+
+        await self.db.commit()
+        await self.db.refresh(profile)
+        await self.reload_registry()
+        return profile
+
+    async def delete_profile(self, profile_id: str) -> bool:
+        """删除列映射模板，并刷新进程内缓存."""
+        result = await self.db.execute(
+            delete(ColumnMappingProfile).where(ColumnMappingProfile.id == profile_id)
+        )
+        await self.db.commit()
+        await self.reload_registry()
+        return result.rowcount > 0
+
+    async def reload_registry(self) -> None:
+        """从数据库加载全部模板，整体替换进程内注册表."""
+        global _last_loaded_at
+
+        result = await self.db.execute(
+            select(ColumnMappingProfile.header_signature, ColumnMappingProfile.mapping)
+        )
+        mapping_registry.replace({
+            signature: ColumnMapping(**mapping) for signature, mapping in result.all()
+        })
+        _last_loaded_at = time.monotonic()
+
+    async def ensure_registry_loaded(self) -> None:
+        """按刷新间隔加载模板；数据库不可用时沿用现有缓存，不阻塞解析."""
+        global _last_loaded_at
+
+        if (
+            _last_loaded_at is not None
+            and time.monotonic() - _last_loaded_at < PROFILE_RELOAD_INTERVAL
+        ):
+            return
+        try:
+            await self.reload_registry()
+        except (SQLAlchemyError, OSError):
+            await self.db.rollback()
+            _last_loaded_at = time.monotonic()
@@ -0,0 +1,254 @@
+"""向量化双轨成本引擎（NumPy int64 定点数）.
+
+DualTrackCalculator 对每一行、每个属性都经过 Decimal(str(x))，重算大项目时
+是主要的 CPU 开销。本引擎把整个项目的输入放进 int64 定点数组，几次数组运算
+就得到逐行、逐产品和项目的双轨成本：
+
+- 数量、物料单价、工时（小时）精度 1e-4（FIXED_SCALE），工时也可以秒为单位
+  （time_scale=SECONDS_SCALE，1 秒即 1/3600 小时，无精度损失）
+- 小时费率（MHR）和效率系数为两位小数（RATE_SCALE），与数据库列一致
+- 每行成本按银行家舍入取整到分（与 Decimal.quantize 的默认舍入一致），
+  汇总为逐行分值之和，与 calculate_many 相同
+
+超出输入精度的值在转换时按十进制银行家舍入取整（不经过 float）；行成本分子超出 int64 范围时抛出
+OverflowError。需要可选依赖 numpy（pip install .[vector]）。
+"""
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+from decimal import Decimal
+
+try:
+    import numpy as np
+except ImportError:  # 可选依赖
+    np = None
+
+from app.schemas.common import PricePair
+from app.services.price_book import PriceBook
+
+FIXED_SCALE = 10_000   # 数量 / 物料单价 / 工时（小时）
+RATE_SCALE = 100       # 小时费率 / 效率系数
+SECONDS_SCALE = 3600   # 工时以秒表示时的 time_scale
+
+# int64 分子的安全上限（留出取整时 2 * 余数的余量）
+_INT64_LIMIT = 2 ** 62
+
+
+def vector_engine_available() -> bool:
+    """是否已安装 numpy."""
+    return np is not None
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("向量化成本引擎需要安装 numpy")
+
+
+def to_fixed(values, scale: int):
+    """数值序列 → int64 定点数组（None 视为 0）.
+
+    按十进制精确换算（不经过 float），超出精度的部分按银行家舍入取整，
+    与 Decimal 计算器的取值一致。
+
+    Args:
+        values: 数值序列（float / Decimal / int / None）
+        scale: 定点倍数
+
+    Returns:
+        np.ndarray: int64 数组
+    """
+    _require_numpy()
+    return np.array(
+        [
+            int((Decimal(str(v)) * scale).to_integral_value()) if v is not None else 0
+            for v in values
+        ],
+        dtype=np.int64,
+    )
+
+
+def to_int_array(values):
+    """整数序列（产品序号、秒数）→ int64 数组."""
+    _require_numpy()
+    return np.array(values, dtype=np.int64)
+
+
+def round_half_even_div(numerator, divisor: int):
+    """整数数组除以正整数，按银行家舍入取整."""
+    quotient, remainder = np.divmod(numerator, divisor)
+    twice = remainder * 2
+    round_up = (twice > divisor) | ((twice == divisor) & (quotient % 2 == 1))
+    return quotient + round_up
+
+
+def _checked_product(*arrays):
+    """逐元素相乘，乘积可能超出 int64 时抛出 OverflowError."""
+    estimate = np.ones(len(arrays[0]), dtype=np.float64)
+    for array in arrays:
+        estimate *= np.abs(array.astype(np.float64))
+    if len(estimate) and estimate.max() >= _INT64_LIMIT:
+        raise OverflowError("成本行超出定点数计算范围")
+    product = arrays[0]
+    for array in arrays[1:]:
+        product = product * array
+    return product
+
+
+@dataclass
+class CostArrays:
+    """项目成本输入（定点数组），每行带所属产品序号."""
+    product_count: int
+    material_product: "np.ndarray"
+    quantity: "np.ndarray"        # FIXED_SCALE
+    std_price: "np.ndarray"       # FIXED_SCALE
+    vave_price: "np.ndarray"      # FIXED_SCALE，缺失时已取标准价
+    process_product: "np.ndarray"
+    time: "np.ndarray"            # time_scale，标准工时
+    std_rate: "np.ndarray"        # RATE_SCALE
+    vave_rate: "np.ndarray"       # RATE_SCALE，缺失时已取标准费率
+    efficiency: "np.ndarray"      # RATE_SCALE，缺失时为 1.00
+    time_scale: int = FIXED_SCALE
+    vave_time: "np.ndarray | None" = None  # VAVE 工时，None 时与标准工时相同
+
+    @classmethod
+    def from_lines(
+        cls,
+        price_book: PriceBook,
+        products: Sequence[tuple[Sequence[tuple[str | None, float]], Sequence[tuple[str | None, float]]]],
+    ) -> "CostArrays":
+        """按价格簿为计算器格式的输入构建数组（取价规则与 DualTrackCalculator 一致）.
+
+        Args:
+            price_book: 价格簿
+            products: 每个产品的 ([(物料编码, 数量)], [(工艺名称, 工时/小时)])
+
+        Returns:
+            CostArrays: 工时以小时为单位（time_scale=FIXED_SCALE）
+        """
+        _require_numpy()
+        material_product, quantity, std_price, vave_price = [], [], [], []
+        process_product, time, std_rate, vave_rate, efficiency = [], [], [], [], []
+        for idx, (materials, processes) in enumerate(products):
+            for code, qty in materials:
+                entry = price_book.material(code) if code else None
+                std = (entry.std_price or 0) if entry is not None else 0
+                material_product.append(idx)
+                quantity.append(qty if entry is not None else 0)
+                std_price.append(std)
+                vave_price.append((entry.vave_price or std) if entry is not None else 0)
+            for name, hours in processes:
+                entry = price_book.process_by_name(name) if name else None
+                std = (entry.std_hourly_rate or 0) if entry is not None else 0
+                process_product.append(idx)
+                time.append(hours if entry is not None else 0)
+                std_rate.append(std)
+                vave_rate.append((entry.vave_hourly_rate or std) if entry is not None else 0)
+                efficiency.append((entry.efficiency_factor or 1) if entry is not None else 1)
+
+        return cls(
+            product_count=len(products),
+            material_product=np.array(material_product, dtype=np.int64),
+            quantity=to_fixed(quantity, FIXED_SCALE),
+            std_price=to_fixed(std_price, FIXED_SCALE),
+            vave_price=to_fixed(vave_price, FIXED_SCALE),
+            process_product=np.array(process_product, dtype=np.int64),
+            time=to_fixed(time, FIXED_SCALE),
+            std_rate=to_fixed(std_rate, RATE_SCALE),
+            vave_rate=to_fixed(vave_rate, RATE_SCALE),
+            efficiency=to_fixed(efficiency, RATE_SCALE),
+        )
+
+
+@dataclass
+class CostResult:
+    """向量化计算结果（单位：分）."""
+    material_std: "np.ndarray"   # 逐行
+    material_vave: "np.ndarray"
+    process_std: "np.ndarray"
+    process_vave: "np.ndarray"
+    product_material_std: "np.ndarray"  # 逐产品
+    product_material_vave: "np.ndarray"
+    product_process_std: "np.ndarray"
+    product_process_vave: "np.ndarray"
+
+    def product_pairs(self, idx: int) -> dict[str, PricePair]:
+        """单个产品的物料 / 工艺 / 总成本."""
+        material = (int(self.product_material_std[idx]), int(self.product_material_vave[idx]))
+        process = (int(self.product_process_std[idx]), int(self.product_process_vave[idx]))
+        return _pairs(material, process)
+
+    def project_pairs(self) -> dict[str, PricePair]:
+        """项目的物料 / 工艺 / 总成本."""
+        material = (int(self.material_std.sum()), int(self.material_vave.sum()))
+        process = (int(self.process_std.sum()), int(self.process_vave.sum()))
+        return _pairs(material, process)
+
+
+def compute_costs(arrays: CostArrays) -> CostResult:
+    """计算逐行、逐产品的双轨成本.
+
+    物料：Quantity × Price；工艺：Time × Rate（VAVE 轨再乘效率系数）。
+
+    Args:
+        arrays: 定点输入
+
+    Returns:
+        CostResult: 各级成本（分）
+    """
+    _require_numpy()
+    # 物料：q/1e4 × p/1e4 元 = q × p / 1e6 分
+    material_divisor = FIXED_SCALE * FIXED_SCALE // 100
+    material_std = round_half_even_div(
+        _checked_product(arrays.quantity, arrays.std_price), material_divisor
+    )
+    material_vave = round_half_even_div(
+        _checked_product(arrays.quantity, arrays.vave_price), material_divisor
+    )
+
+    # 工艺：t/ts × r/100 元 = t × r / ts 分；VAVE 轨再乘 e/100
+    process_std = round_half_even_div(
+        _checked_product(arrays.time, arrays.std_rate), arrays.time_scale
+    )
+    vave_time = arrays.time if arrays.vave_time is None else arrays.vave_time
+    process_vave = round_half_even_div(
+        _checked_product(vave_time, arrays.vave_rate, arrays.efficiency),
+        arrays.time_scale * RATE_SCALE,
+    )
+
+    def per_product(index, values):
+        totals = np.zeros(arrays.product_count, dtype=np.int64)
+        np.add.at(totals, index, values)
+        return totals
+
+    return CostResult(
+        material_std=material_std,
+        material_vave=material_vave,
+        process_std=process_std,
+        process_vave=process_vave,
+        product_material_std=per_product(arrays.material_product, material_std),
+        product_material_vave=per_product(arrays.material_product, material_vave),
+        product_process_std=per_product(arrays.process_product, process_std),
+        product_process_vave=per_product(arrays.process_product, process_vave),
+    )
+
+
+def cents_to_decimal(cents: int) -> Decimal:
+    """分 → 两位小数的 Decimal."""
+    return Decimal(cents).scaleb(-2)
+
+
+def price_pair_from_cents(std_cents: int, vave_cents: int) -> PricePair:
+    """由分值构建 PricePair（节省率与 DualTrackCalculator 相同）."""
+    std = cents_to_decimal(std_cents)
+    vave = cents_to_decimal(vave_cents)
+    savings = std - vave
+    savings_rate = float(savings / std) if std > 0 else 0.0
+    return PricePair(std=std, vave=vave, savings=savings, savings_rate=round(savings_rate, 4))
+
+
+def _pairs(material: tuple[int, int], process: tuple[int, int]) -> dict[str, PricePair]:
+    return {
+        "material_cost": price_pair_from_cents(*material),
+        "process_cost": price_pair_from_cents(*process),
+        "total_cost": price_pair_from_cents(material[0] + process[0], material[1] + process[1]),
+    }
@@ -0,0 +1,139 @@
+"""成本计算结果缓存.
+
+同一项目的成本页面会被反复打开，输入相同的计算重复执行。计算结果以
+“输入的规范化哈希”为键缓存在进程内（LRU），每个条目记录计算时的价格簿
+版本和所依赖的价格簿条目（物料 / 工艺）的价格字段：
+
+- 版本相同：直接命中
+- 版本不同（主数据变更后价格簿重建）：只在内存中比对依赖条目，价格未变则
+  沿用并更新版本；任一依赖变化则丢弃该条目。单个物料改价不会清空整个缓存
+
+缓存的结果与调用方共享，调用方不可修改。
+"""
+
+import hashlib
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from decimal import Decimal
+from typing import Any, NamedTuple
+
+from app.config import get_settings
+from app.services.price_book import PriceBook
+
+# 命中 / 未命中 / 版本变更后沿用 / 因依赖价格变化丢弃的计数（进程内）
+cost_memo_stats = {"hits": 0, "misses": 0, "revalidated": 0, "invalidations": 0}
+
+
+def _canonical(value) -> str:
+    """数值按值规范化（2 与 2.0 相同），字符串原样，None 单独编码."""
+    if value is None:
+        return "\x00"
+    if isinstance(value, str):
+        return value
+    return format(Decimal(str(value)).normalize(), "f")
+
+
+def cost_input_hash(kind: str, *sections: Iterable[tuple]) -> str:
+    """计算输入的规范化哈希.
+
+    Args:
+        kind: 计算类型（不同入口的相同输入互不命中）
+        sections: 若干组输入行，每行为值元组；行序和组序均参与哈希
+
+    Returns:
+        str: SHA-256 十六进制摘要
+    """
+    digest = hashlib.sha256(kind.encode())
+    for section in sections:
+        digest.update(b"\x1d")
+        for line in section:
+            digest.update("\x1f".join(map(_canonical, line)).encode())
+            digest.update(b"\x1e")
+    return digest.hexdigest()
+
+
+class _Entry(NamedTuple):
+    version: str
+    # (依赖类型, 键) → 计算时的 PriceBook.fingerprint
+    dependencies: dict
+    value: Any
+
+
+class CostMemo:
+    """按依赖的价格簿条目校验的 LRU 结果缓存."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+
+    def get(
+        self,
+        book: PriceBook,
+        key: str,
+        restamp: Callable[[Any, str], Any] | None = None,
+    ) -> Any | None:
+        """读取缓存结果；价格簿版本变化时按依赖条目重新校验.
+
+        Args:
+            book: 当前价格簿
+            key: 输入哈希
+            restamp: 沿用到新版本时更新结果中的版本号，(结果, 新版本) → 新结果
+
+        Returns:
+            缓存的结果，未命中时为 None
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry.version != book.version:
+            if all(
+                book.fingerprint(kind, dep_key) == fingerprint
+                for (kind, dep_key), fingerprint in entry.dependencies.items()
+            ):
+                value = restamp(entry.value, book.version) if restamp else entry.value
+                entry = _Entry(book.version, entry.dependencies, value)
+                self._entries[key] = entry
+                cost_memo_stats["revalidated"] += 1
+            else:
+                del self._entries[key]
+                cost_memo_stats["invalidations"] += 1
+                entry = None
+        if entry is None:
+            cost_memo_stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        cost_memo_stats["hits"] += 1
+        return entry.value
+
+    def set(
+        self,
+        book: PriceBook,
+        key: str,
+        value: Any,
+        dependencies: Iterable[tuple[str, str | None]] = (),
+    ) -> None:
+        """写入结果，超过容量时淘汰最久未使用的条目.
+
+        Args:
+            book: 计算所用的价格簿
+            key: 输入哈希
+            value: 计算结果
+            dependencies: 计算时查询过的 (依赖类型, 键)，类型同 PriceBook.fingerprint
+        """
+        if self.max_entries <= 0:
+            return
+        fingerprints = {
+            (kind, dep_key): book.fingerprint(kind, dep_key)
+            for kind, dep_key in dependencies
+        }
+        self._entries[key] = _Entry(book.version, fingerprints, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {**cost_memo_stats, "entries": len(self._entries)}
+
+
+cost_memo = CostMemo(get_settings().BOM_COST_MEMO_SIZE)
@@ -0,0 +1,205 @@
+"""BOM 主数据查询规划.
+
+BOM 流水线查询物料价格 / 工艺费率时经过三级：
+1. 规范化并去重键（去空白、统一大写，与 MySQL 默认的大小写不敏感排序规则一致）
+2. 进程内缓存（含未命中结果）→ Redis（一次 MGET）
+3. 剩余键交给 MasterDataLookupService 分块并发查询数据库，结果回填两级缓存
+
+最后按原始键扇出，每一行都能取到结果。计数写入 lookup_planner_stats。
+
+LookupPlanner 与 MasterDataLookupService 接口相同（lookup_materials / lookup_processes），
+可直接替换。返回的字典与缓存共享，调用方不可修改。
+
+上传查价、BOM 页面和成本计算都使用价格簿（app.services.price_book），保证显示的价格
+与成本所用版本一致；LookupPlanner 的缓存不随价格簿失效，不要再接到这些请求路径上。
+"""
+
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Sequence
+
+from redis.exceptions import RedisError
+
+from app.config import get_settings
+from app.services.cache_service import CacheService
+from app.services.master_data_lookup import MasterDataLookupService
+
+KIND_MATERIAL = "material"
+KIND_PROCESS = "rate"
+
+# 规划计数（进程内）
+lookup_planner_stats = {
+    "requested": 0,    # 请求的键数量（含重复）
+    "deduped": 0,      # 规范化去重后省去的键数量
+    "memory_hits": 0,  # 进程内缓存命中
+    "redis_hits": 0,   # Redis 命中
+    "db_fetched": 0,   # 交给数据库查询的键数量
+    "db_found": 0,     # 数据库命中的键数量
+}
+
+
+def normalize_lookup_key(key) -> str | None:
+    """规范化查询键（去空白、统一大写），空键返回 None."""
+    if key is None:
+        return None
+    key = str(key).strip().upper()
+    return key or None
+
+
+class LocalLookupCache:
+    """进程内 LRU 缓存（带过期时间），未命中的键以空字典缓存."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple[str, str], tuple[float, dict]] = OrderedDict()
+
+    def get_many(self, kind: str, keys: Sequence[str]) -> dict[str, dict]:
+        """批量读取未过期的条目."""
+        now = time.monotonic()
+        found = {}
+        for key in keys:
+            entry = self._entries.get((kind, key))
+            if entry is None:
+                continue
+            expires_at, value = entry
+            if expires_at < now:
+                del self._entries[(kind, key)]
+                continue
+            self._entries.move_to_end((kind, key))
+            found[key] = value
+        return found
+
+    def set_many(self, kind: str, data: dict[str, dict]) -> None:
+        """批量写入，超过容量时淘汰最久未使用的条目."""
+        if self.max_entries <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl
+        for key, value in data.items():
+            self._entries[(kind, key)] = (expires_at, value)
+            self._entries.move_to_end((kind, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, kind: str, keys: Sequence[str]) -> None:
+        for key in keys:
+            self._entries.pop((kind, key), None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+_settings = get_settings()
+local_lookup_cache = LocalLookupCache(
+    _settings.BOM_LOOKUP_CACHE_SIZE, _settings.BOM_LOOKUP_CACHE_TTL
+)
+
+
+class LookupPlanner:
+    """BOM 主数据查询规划."""
+
+    def __init__(
+        self,
+        cache: CacheService,
+        lookup: MasterDataLookupService | None = None,
+        local: LocalLookupCache | None = None,
+    ) -> None:
+        """初始化查询规划.
+
+        Args:
+            cache: 共享的缓存服务（get_cache_service()）
+            lookup: 数据库查询服务，None 时新建（使用共享引擎）
+            local: 进程内缓存，None 时使用进程共享的 local_lookup_cache
+        """
+        self.cache = cache
+        self.lookup = lookup or MasterDataLookupService()
+        self.local = local if local is not None else local_lookup_cache
+
+    async def lookup_materials(self, material_codes: Sequence[str]) -> dict[str, dict]:
+        """按物料编码批量查询历史价格.
+
+        Args:
+            material_codes: 物料编码列表（可含重复、空白和大小写差异）
+
+        Returns:
+            dict: 原始物料编码 → 价格字典（未命中的编码不出现）
+        """
+        return await self._resolve(KIND_MATERIAL, material_codes, self.lookup.lookup_materials)
+
+    async def lookup_processes(self, process_names: Sequence[str]) -> dict[str, dict]:
+        """按工艺编码或名称批量查询费率.
+
+        Args:
+            process_names: 工艺名称 / 编码列表
+
+        Returns:
+            dict: 原始工艺名称 / 编码 → 费率字典（未命中的键不出现）
+        """
+        return await self._resolve(KIND_PROCESS, process_names, self.lookup.lookup_processes)
+
+    async def invalidate(self, kind: str, keys: Sequence[str]) -> None:
+        """主数据变更后删除缓存条目（本进程缓存和 Redis）.
+
+        Args:
+            kind: KIND_MATERIAL 或 KIND_PROCESS
+            keys: 物料编码 / 工艺编码或名称
+        """
+        normalized = [k for k in map(normalize_lookup_key, keys) if k]
+        self.local.invalidate(kind, normalized)
+        if normalized and self.cache.available:
+            try:
+                await self.cache.delete_many(kind, normalized)
+            except (RedisError, OSError):
+                self.cache.mark_down()
+
+    async def _resolve(
+        self,
+        kind: str,
+        keys: Sequence[str],
+        fetch: Callable[[list[str]], Awaitable[dict[str, dict]]],
+    ) -> dict[str, dict]:
+        """规范化去重 → 进程内缓存 → Redis → 数据库，按原始键扇出结果."""
+        normalized = {}
+        for key in keys:
+            norm = normalize_lookup_key(key)
+            if norm is not None:
+                normalized[key] = norm
+        unique = list(dict.fromkeys(normalized.values()))
+        lookup_planner_stats["requested"] += len(keys)
+        lookup_planner_stats["deduped"] += len(keys) - len(unique)
+
+        found = self.local.get_many(kind, unique)
+        lookup_planner_stats["memory_hits"] += len(found)
+        remaining = [key for key in unique if key not in found]
+
+        if remaining and self.cache.available:
+            try:
+                cached = await self.cache.get_many(kind, remaining)
+            except (RedisError, OSError):
+                self.cache.mark_down()
+            else:
+                lookup_planner_stats["redis_hits"] += len(cached)
+                self.local.set_many(kind, cached)
+                found.update(cached)
+                remaining = [key for key in remaining if key not in cached]
+
+        if remaining:
+            lookup_planner_stats["db_fetched"] += len(remaining)
+            rows = {
+                normalize_lookup_key(key): value
+                for key, value in (await fetch(remaining)).items()
+            }
+            fetched = {key: rows.get(key, {}) for key in remaining}
+            hits = {key: value for key, value in fetched.items() if value}
+            lookup_planner_stats["db_found"] += len(hits)
+            # 未命中也写入进程内缓存，同一编码不再重复查询；Redis 只保存命中结果
+            self.local.set_many(kind, fetched)
+            found.update(fetched)
+            if hits and self.cache.available:
+                ttl = CacheService.TTL_MATERIAL if kind == KIND_MATERIAL else CacheService.TTL_RATE
+                try:
+                    await self.cache.set_many(kind, hits, ttl)
+                except (RedisError, OSError):
+                    self.cache.mark_down()
+
+        return {key: found[norm] for key, norm in normalized.items() if found.get(norm)}
@@ -0,0 +1,208 @@
+"""主数据批量查询服务（物料价格 / 工艺费率）.
+
+查询走应用共享的异步引擎连接池：超长的 IN (...) 列表按 BOM_LOOKUP_CHUNK_SIZE 分块，
+各块在 BOM_LOOKUP_CONCURRENCY 限定的并发预算内并行执行，每块从连接池借出一条连接。
+连接池事件计数写入 lookup_stats，供 /bom/lookup/stats 查看连接复用情况。
+"""
+
+import asyncio
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import QueuePool
+
+from app.config import get_settings
+from app.db.session import engine as default_engine
+from app.models.material import Material
+from app.models.process_rate import ProcessRate
+
+# 查询与连接池计数（进程内）
+lookup_stats = {
+    "lookups": 0,            # lookup_* 调用次数
+    "keys": 0,               # 查询的键数量
+    "chunks": 0,             # 实际执行的 SQL 语句数
+    "connections_opened": 0, # 新建的物理连接数
+    "checkouts": 0,          # 从连接池借出连接的次数
+}
+
+_instrumented_engines: set[int] = set()
+
+
+def _instrument(engine: AsyncEngine) -> None:
+    """为引擎注册连接池事件（每个引擎只注册一次）."""
+    sync_engine = engine.sync_engine
+    if id(sync_engine) in _instrumented_engines:
+        return
+    _instrumented_engines.add(id(sync_engine))
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        lookup_stats["connections_opened"] += 1
+
+    @event.listens_for(sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        lookup_stats["checkouts"] += 1
+
+
+def connection_reuse_stats() -> dict:
+    """连接复用统计：借出次数中复用已有连接的比例."""
+    checkouts = lookup_stats["checkouts"]
+    opened = lookup_stats["connections_opened"]
+    reused = max(checkouts - opened, 0)
+    return {
+        **lookup_stats,
+        "connections_reused": reused,
+        "reuse_rate": round(reused / checkouts, 4) if checkouts else 0.0,
+    }
+
+
+def _to_float(value) -> float | None:
+    return float(value) if value else None
+
+
+def material_price_row(row) -> dict:
+    """物料主数据行 → 价格字典."""
+    return {
+        "unit_price": _to_float(row.std_price),
+        "vave_price": _to_float(row.vave_price),
+        "supplier": row.supplier_tier or "",
+        "material": row.category or "",
+        "has_history_data": True,
+    }
+
+
+def process_rate_row(row) -> dict:
+    """工艺费率行 → 费率字典.
+
+    优先使用 MHR 拆分费率（变动 + 固定），缺失时回退到旧的小时费率字段。
+    """
+    if row.std_mhr_var is not None and row.std_mhr_fix is not None:
+        std_rate = float(row.std_mhr_var) + float(row.std_mhr_fix)
+    else:
+        std_rate = _to_float(row.std_hourly_rate)
+
+    if row.vave_mhr_var is not None and row.vave_mhr_fix is not None:
+        vave_rate = float(row.vave_mhr_var) + float(row.vave_mhr_fix)
+    else:
+        vave_rate = _to_float(row.vave_hourly_rate)
+
+    return {
+        "process_code": row.process_code,
+        "equipment": row.equipment or "",
+        "work_center": row.work_center or "",
+        "std_mhr_var": _to_float(row.std_mhr_var),
+        "std_mhr_fix": _to_float(row.std_mhr_fix),
+        "vave_mhr_var": _to_float(row.vave_mhr_var),
+        "vave_mhr_fix": _to_float(row.vave_mhr_fix),
+        "unit_price": std_rate,
+        "vave_price": vave_rate,
+        "has_history_data": True,
+    }
+
+
+class MasterDataLookupService:
+    """主数据批量查询服务."""
+
+    def __init__(
+        self,
+        engine: AsyncEngine | None = None,
+        chunk_size: int | None = None,
+        max_concurrency: int | None = None,
+    ) -> None:
+        """初始化查询服务.
+
+        Args:
+            engine: 异步引擎，None 时使用应用共享引擎
+            chunk_size: 每条 SQL 的 IN 列表长度，None 时取配置 BOM_LOOKUP_CHUNK_SIZE
+            max_concurrency: 并发查询上限，None 时取配置 BOM_LOOKUP_CONCURRENCY；
+                实际不超过连接池容量（pool_size + max_overflow）
+        """
+        settings = get_settings()
+        self.engine = engine or default_engine
+        self.chunk_size = max(chunk_size or settings.BOM_LOOKUP_CHUNK_SIZE, 1)
+        budget = max_concurrency or settings.BOM_LOOKUP_CONCURRENCY
+        pool = self.engine.sync_engine.pool
+        if isinstance(pool, QueuePool):
+            budget = min(budget, pool.size() + max(pool._max_overflow, 0))
+        self.max_concurrency = max(budget, 1)
+        _instrument(self.engine)
+
+    async def lookup_materials(self, material_codes: Sequence[str]) -> dict[str, dict]:
+        """按物料编码批量查询历史价格.
+
+        Args:
+            material_codes: 物料编码列表（重复编码只查询一次）
+
+        Returns:
+            dict: 物料编码 → 价格字典（未命中的编码不出现）
+        """
+        columns = (
+            Material.item_code, Material.std_price, Material.vave_price,
+            Material.supplier_tier, Material.category,
+        )
+        rows = await self._run_chunked(
+            material_codes,
+            lambda chunk: select(*columns).where(Material.item_code.in_(chunk)),
+        )
+        return {row.item_code: material_price_row(row) for row in rows}
+
+    async def lookup_processes(self, process_names: Sequence[str]) -> dict[str, dict]:
+        """按工艺编码或名称批量查询费率.
+
+        先按唯一的工艺编码查询，未命中的键再按工艺名称查询，每个键只绑定一次。
+
+        Args:
+            process_names: 工艺名称 / 编码列表
+
+        Returns:
+            dict: 命中的工艺编码或名称 → 费率字典
+        """
+        columns = (
+            ProcessRate.process_code, ProcessRate.process_name, ProcessRate.equipment,
+            ProcessRate.work_center, ProcessRate.std_mhr_var, ProcessRate.std_mhr_fix,
+            ProcessRate.vave_mhr_var, ProcessRate.vave_mhr_fix,
+            ProcessRate.std_hourly_rate, ProcessRate.vave_hourly_rate,
+        )
+        rows = await self._run_chunked(
+            process_names,
+            lambda chunk: select(*columns).where(ProcessRate.process_code.in_(chunk)),
+        )
+        rates = {row.process_code: process_rate_row(row) for row in rows}
+
+        remaining = [name for name in process_names if name and name not in rates]
+        if remaining:
+            rows = await self._run_chunked(
+                remaining,
+                lambda chunk: select(*columns).where(ProcessRate.process_name.in_(chunk)),
+            )
+            rates.update({row.process_name: process_rate_row(row) for row in rows})
+        return rates
+
+    async def _run_chunked(
+        self,
+        keys: Sequence[str],
+        build_query: Callable[[list[str]], Any],
+    ) -> list:
+        """按块并发执行查询，返回全部结果行."""
+        keys = list(dict.fromkeys(k for k in keys if k))
+        lookup_stats["lookups"] += 1
+        if not keys:
+            return []
+        lookup_stats["keys"] += len(keys)
+
+        chunks = [keys[i:i + self.chunk_size] for i in range(0, len(keys), self.chunk_size)]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch(chunk: list[str]) -> list:
+            async with semaphore:
+                async with self.engine.connect() as conn:
+                    result = await conn.execute(build_query(chunk))
+                    lookup_stats["chunks"] += 1
+                    return result.all()
+
+        if len(chunks) == 1:
+            return await fetch(chunks[0])
+        results = await asyncio.gather(*(fetch(chunk) for chunk in chunks))
+        return [row for rows in results for row in rows]
@@ -0,0 +1,191 @@
+"""BOM 上传流水线分阶段计时.
+
+每次上传创建一个 PipelineTrace，各阶段（读取、解析、物料查价、工艺查价、响应构建、
+写缓存）以 span 记录耗时、行数和字节数。同一阶段多次进入（如按批查价）时累加。
+
+trace 结束后：
+- 各阶段耗时写入进程内直方图 pipeline_histograms，供 /bom/pipeline/stats 汇总
+- server_timing() 生成 Server-Timing 响应头，浏览器开发者工具可直接查看
+"""
+
+import bisect
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+SPAN_READ = "read"
+SPAN_PARSE = "parse"
+SPAN_MATERIAL_LOOKUP = "material_lookup"
+SPAN_PROCESS_LOOKUP = "process_lookup"
+SPAN_BUILD = "build"
+SPAN_CACHE = "cache"
+SPAN_TOTAL = "total"
+
+# 直方图桶上界（毫秒），最后一个桶为 +Inf
+HISTOGRAM_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+@dataclass
+class Span:
+    """单个阶段的累计耗时与计数."""
+    name: str
+    duration: float = 0.0
+    rows: int = 0
+    bytes: int = 0
+    calls: int = 0
+
+    @property
+    def duration_ms(self) -> float:
+        return self.duration * 1000
+
+    def to_dict(self) -> dict:
+        return {
+            "duration_ms": round(self.duration_ms, 3),
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "calls": self.calls,
+        }
+
+
+class Histogram:
+    """固定桶直方图（累计计数、总和）."""
+
+    def __init__(self, buckets: tuple[float, ...] = HISTOGRAM_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_dict(self) -> dict:
+        # 与 Prometheus 一致的累计桶（le = 上界）
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {"count": self.count, "sum": round(self.sum, 3), "buckets": buckets}
+
+
+class StageMetrics:
+    """单个阶段的直方图（耗时 / 行数 / 字节数）."""
+
+    def __init__(self):
+        self.duration_ms = Histogram()
+        self.rows = 0
+        self.bytes = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "duration_ms": self.duration_ms.to_dict(),
+            "rows_total": self.rows,
+            "bytes_total": self.bytes,
+        }
+
+
+# 阶段名 → 指标（进程内）
+pipeline_histograms: dict[str, StageMetrics] = {}
+
+
+def pipeline_metrics() -> dict:
+    """各阶段直方图快照."""
+    return {name: metrics.to_dict() for name, metrics in pipeline_histograms.items()}
+
+
+class PipelineTrace:
+    """单次流水线的分阶段计时."""
+
+    def __init__(self):
+        self.spans: dict[str, Span] = {}
+        self._start = time.perf_counter()
+        self._finished = False
+
+    def _span(self, name: str) -> Span:
+        span = self.spans.get(name)
+        if span is None:
+            span = self.spans[name] = Span(name)
+        return span
+
+    @contextmanager
+    def span(self, name: str, rows: int = 0, bytes: int = 0) -> Iterator[Span]:
+        """记录一个阶段区间（可多次进入，累加）.
+
+        Args:
+            name: 阶段名
+            rows: 本次处理的行数（也可在区间内修改 span.rows）
+            bytes: 本次处理的字节数
+
+        Yields:
+            Span: 该阶段的累计记录
+        """
+        span = self._span(name)
+        span.rows += rows
+        span.bytes += bytes
+        span.calls += 1
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span.duration += time.perf_counter() - start
+
+    def timed_iter(
+        self,
+        name: str,
+        iterable: Iterable[T],
+        rows: Callable[[T], int] | None = None,
+    ) -> Iterator[T]:
+        """包装惰性迭代器，每次取下一个元素的耗时计入阶段 name.
+
+        流式解析器在迭代时才真正读取和解析，解析耗时只能这样计量。
+
+        Args:
+            name: 阶段名
+            iterable: 被计时的迭代器
+            rows: 元素 → 行数（如批次长度），None 时不计行数
+        """
+        span = self._span(name)
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                span.duration += time.perf_counter() - start
+                return
+            span.duration += time.perf_counter() - start
+            span.calls += 1
+            if rows is not None:
+                span.rows += rows(item)
+            yield item
+
+    def finish(self) -> None:
+        """结束 trace：记录总耗时并写入直方图（重复调用只记录一次）."""
+        if self._finished:
+            return
+        self._finished = True
+        total = self._span(SPAN_TOTAL)
+        total.duration = time.perf_counter() - self._start
+        total.calls = 1
+        for name, span in self.spans.items():
+            metrics = pipeline_histograms.get(name)
+            if metrics is None:
+                metrics = pipeline_histograms[name] = StageMetrics()
+            metrics.duration_ms.observe(span.duration_ms)
+            metrics.rows += span.rows
+            metrics.bytes += span.bytes
+
+    def server_timing(self) -> str:
+        """生成 Server-Timing 响应头的值."""
+        return ", ".join(
+            f"{name};dur={span.duration_ms:.1f}" for name, span in self.spans.items()
+        )
+
+    def to_dict(self) -> dict:
+        return {name: span.to_dict() for name, span in self.spans.items()}
@@ -0,0 +1,298 @@
+"""主数据价格簿.
+
+物料价格和工艺费率一天只变动几次，计算和上传却每次都要查询。价格簿把
+materials / process_rates 整表加载为进程内的只读快照：
+
+- 物料按编码索引，工艺按编码和名称索引（键规范化，与 MySQL 大小写不敏感一致）
+- 工艺行预先算好 MHR 合计（变动 + 固定）
+- version 为内容哈希，同样的主数据在各 worker 上得到同样的版本号，结果据此标记
+
+PriceBookRegistry 持有当前价格簿。主数据变更后标记失效，下一次读取时整表重建
+并原子替换引用；正在使用旧价格簿的请求不受影响。其他 worker 的变更最迟在
+BOM_PRICE_BOOK_TTL 秒后生效。
+"""
+
+import asyncio
+import hashlib
+import time
+from collections.abc import Iterable, Sequence
+from datetime import datetime
+from decimal import Decimal
+from types import MappingProxyType
+from typing import NamedTuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.db.session import AsyncSessionLocal
+from app.models.material import Material
+from app.models.process_rate import ProcessRate
+from app.services.lookup_planner import normalize_lookup_key
+from app.services.master_data_lookup import material_price_row, process_rate_row
+
+# 价格簿计数（进程内）
+price_book_stats = {
+    "builds": 0,         # 重建次数
+    "invalidations": 0,  # 主数据变更导致的失效次数
+}
+
+MATERIAL_COLUMNS = (
+    Material.item_code, Material.std_price, Material.vave_price,
+    Material.supplier_tier, Material.category,
+)
+PROCESS_COLUMNS = (
+    ProcessRate.process_code, ProcessRate.process_name, ProcessRate.equipment,
+    ProcessRate.work_center, ProcessRate.std_mhr_var, ProcessRate.std_mhr_fix,
+    ProcessRate.vave_mhr_var, ProcessRate.vave_mhr_fix,
+    ProcessRate.std_hourly_rate, ProcessRate.vave_hourly_rate,
+    ProcessRate.efficiency_factor,
+)
+
+
+def _mhr_total(var, fix) -> Decimal | None:
+    """MHR 合计 = var + fix（与 ProcessRate.std_mhr_total 一致）."""
+    if var is None and fix is None:
+        return None
+    return Decimal(str(var or 0)) + Decimal(str(fix or 0))
+
+
+class MaterialPrice(NamedTuple):
+    """物料价格条目."""
+    item_code: str
+    std_price: Decimal | None
+    vave_price: Decimal | None
+    # material_price_row 结果（BOM 流水线使用，调用方不可修改）
+    row: dict
+
+
+class ProcessPrice(NamedTuple):
+    """工艺费率条目."""
+    process_code: str
+    process_name: str
+    equipment: str | None
+    std_mhr_var: Decimal | None
+    std_mhr_fix: Decimal | None
+    vave_mhr_var: Decimal | None
+    vave_mhr_fix: Decimal | None
+    std_mhr_total: Decimal | None
+    vave_mhr_total: Decimal | None
+    std_hourly_rate: Decimal | None
+    vave_hourly_rate: Decimal | None
+    efficiency_factor: Decimal | None
+    # process_rate_row 结果（BOM 流水线使用，调用方不可修改）
+    row: dict
+
+
+class PriceBook:
+    """只读价格簿快照."""
+
+    def __init__(
+        self,
+        materials: Iterable,
+        processes: Iterable,
+        built_at: datetime | None = None,
+    ) -> None:
+        """由主数据行构建价格簿.
+
+        Args:
+            materials: 物料行（含 MATERIAL_COLUMNS 各列）
+            processes: 工艺费率行（含 PROCESS_COLUMNS 各列），按 id 排序；
+                同名工艺取第一条
+            built_at: 构建时间，默认当前时间
+        """
+        digest = hashlib.sha256()
+        by_material = {}
+        for row in materials:
+            entry = MaterialPrice(row.item_code, row.std_price, row.vave_price, material_price_row(row))
+            key = normalize_lookup_key(row.item_code)
+            if key is not None:
+                by_material[key] = entry
+            digest.update(repr(entry).encode())
+
+        by_code = {}
+        by_name = {}
+        for row in processes:
+            entry = ProcessPrice(
+                process_code=row.process_code,
+                process_name=row.process_name,
+                equipment=row.equipment,
+                std_mhr_var=row.std_mhr_var,
+                std_mhr_fix=row.std_mhr_fix,
+                vave_mhr_var=row.vave_mhr_var,
+                vave_mhr_fix=row.vave_mhr_fix,
+                std_mhr_total=_mhr_total(row.std_mhr_var, row.std_mhr_fix),
+                vave_mhr_total=_mhr_total(row.vave_mhr_var, row.vave_mhr_fix),
+                std_hourly_rate=row.std_hourly_rate,
+                vave_hourly_rate=row.vave_hourly_rate,
+                efficiency_factor=row.efficiency_factor,
+                row=process_rate_row(row),
+            )
+            code = normalize_lookup_key(row.process_code)
+            if code is not None:
+                by_code[code] = entry
+            name = normalize_lookup_key(row.process_name)
+            if name is not None:
+                by_name.setdefault(name, entry)
+            digest.update(repr(entry).encode())
+
+        self._materials = MappingProxyType(by_material)
+        self._by_code = MappingProxyType(by_code)
+        self._by_name = MappingProxyType(by_name)
+        self.version = digest.hexdigest()[:16]
+        self.built_at = built_at or datetime.utcnow()
+
+    @classmethod
+    async def load(cls, db: AsyncSession) -> "PriceBook":
+        """从数据库整表加载价格簿（物料、工艺费率各一条查询）."""
+        materials = (await db.execute(
+            select(*MATERIAL_COLUMNS).order_by(Material.id)
+        )).all()
+        processes = (await db.execute(
+            select(*PROCESS_COLUMNS).order_by(ProcessRate.id)
+        )).all()
+        return cls(materials, processes)
+
+    def material(self, item_code: str | None) -> MaterialPrice | None:
+        """按物料编码查询."""
+        return self._materials.get(normalize_lookup_key(item_code))
+
+    def process_by_code(self, process_code: str | None) -> ProcessPrice | None:
+        """按工艺编码查询."""
+        return self._by_code.get(normalize_lookup_key(process_code))
+
+    def process_by_name(self, process_name: str | None) -> ProcessPrice | None:
+        """按工艺名称查询（同名工艺取第一条）."""
+        return self._by_name.get(normalize_lookup_key(process_name))
+
+    def fingerprint(self, kind: str, key: str | None) -> tuple | None:
+        """条目的价格字段（不含 row），用于判断依赖它的缓存结果是否仍然有效.
+
+        Args:
+            kind: "material" / "process_code" / "process_name"
+            key: 物料编码 / 工艺编码 / 工艺名称
+
+        Returns:
+            tuple | None: 价格字段，条目不存在时为 None
+        """
+        lookup = {
+            "material": self.material,
+            "process_code": self.process_by_code,
+            "process_name": self.process_by_name,
+        }[kind]
+        entry = lookup(key)
+        return None if entry is None else tuple(entry[:-1])
+
+    async def lookup_materials(self, material_codes: Sequence[str]) -> dict[str, dict]:
+        """按物料编码批量查询历史价格（与 LookupPlanner 接口相同）.
+
+        Args:
+            material_codes: 物料编码列表
+
+        Returns:
+            dict: 物料编码 → 价格字典（未命中的编码不出现）
+        """
+        found = {}
+        for code in material_codes:
+            entry = self.material(code)
+            if entry is not None:
+                found[code] = entry.row
+        return found
+
+    async def lookup_processes(self, process_names: Sequence[str]) -> dict[str, dict]:
+        """按工艺编码或名称批量查询费率（先编码后名称，与 LookupPlanner 接口相同）.
+
+        Args:
+            process_names: 工艺名称 / 编码列表
+
+        Returns:
+            dict: 命中的工艺编码或名称 → 费率字典
+        """
+        found = {}
+        for key in process_names:
+            entry = self.process_by_code(key) or self.process_by_name(key)
+            if entry is not None:
+                found[key] = entry.row
+        return found
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "built_at": self.built_at.isoformat(),
+            "materials": len(self._materials),
+            "processes": len(self._by_code),
+        }
+
+
+class PriceBookRegistry:
+    """当前价格簿的持有者（进程内共享）.
+
+    invalidate() 递增代数；加载期间发生失效时，加载到的价格簿只用于本次调用，
+    不设置有效期，避免旧行覆盖掉失效标记。
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._book: PriceBook | None = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def current(self) -> PriceBook | None:
+        """当前价格簿（可能已失效），未加载时为 None."""
+        return self._book
+
+    async def get(self, db: AsyncSession | None = None) -> PriceBook:
+        """获取有效的价格簿，失效或过期时重建.
+
+        Args:
+            db: 用于加载的数据库会话，None 时新开会话
+
+        Returns:
+            PriceBook: 价格簿快照（调用方在整个计算中应只使用这一份）
+        """
+        book = self._book
+        if book is not None and time.monotonic() < self._expires_at:
+            return book
+        async with self._lock:
+            # 等待锁期间可能已被其他请求重建
+            if self._book is not None and time.monotonic() < self._expires_at:
+                return self._book
+            generation = self._generation
+            if db is None:
+                async with AsyncSessionLocal() as session:
+                    book = await PriceBook.load(session)
+            else:
+                book = await PriceBook.load(db)
+            self.swap(book, generation)
+            return book
+
+    def swap(self, book: PriceBook, generation: int | None = None) -> None:
+        """原子替换当前价格簿.
+
+        Args:
+            book: 新价格簿
+            generation: 开始加载时的代数；此后发生过失效则不设置有效期
+        """
+        self._book = book
+        if generation is None or generation == self._generation:
+            self._expires_at = time.monotonic() + self.ttl
+        else:
+            self._expires_at = 0.0
+        price_book_stats["builds"] += 1
+
+    def invalidate(self) -> None:
+        """主数据变更后标记失效，下一次 get() 重建（包括正在加载中的价格簿）."""
+        self._generation += 1
+        self._expires_at = 0.0
+        price_book_stats["invalidations"] += 1
+
+    def stats(self) -> dict:
+        return {
+            **price_book_stats,
+            "current": self._book.stats() if self._book is not None else None,
+        }
+
+
+price_book_registry = PriceBookRegistry(get_settings().BOM_PRICE_BOOK_TTL)
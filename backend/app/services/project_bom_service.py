@@ -0,0 +1,449 @@
+"""项目 BOM 数据读取服务.
+
+GET /bom/products/{project_id} 的数据来源：固定几条集合查询（产品、全部工艺行、
+去重物料编码、全部物料行）加一次批量价格查询，往返次数与产品数、行数无关。
+价格取自价格簿（与成本计算、上传查价同一快照），BOM 页面显示的价格与成本结果一致。
+
+分页读取按 (产品 ID, 物料行 ID) 键集游标取下一页物料行，fields 投影只查询所需列，
+价格只查询本页的物料编码，首页延迟与项目规模无关。
+"""
+
+import base64
+import binascii
+import json
+from collections import defaultdict
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.product_material import ProductMaterial
+from app.models.product_process import ProductProcess
+from app.models.project_product import ProjectProduct
+from app.services.price_book import PriceBook, price_book_registry
+
+# 物料行读取的列（只取前端需要的字段）
+MATERIAL_COLUMNS = (
+    ProductMaterial.project_product_id,
+    ProductMaterial.material_id,
+    ProductMaterial.part_number,
+    ProductMaterial.material_level,
+    ProductMaterial.version,
+    ProductMaterial.stock_status,
+    ProductMaterial.material_name,
+    ProductMaterial.material_type,
+    ProductMaterial.supplier,
+    ProductMaterial.quantity,
+    ProductMaterial.unit,
+    ProductMaterial.remarks,
+)
+
+# 工艺行读取的列
+PROCESS_COLUMNS = (
+    ProductProcess.project_product_id,
+    ProductProcess.process_code,
+    ProductProcess.sequence_order,
+    ProductProcess.cycle_time_std,
+    ProductProcess.cycle_time,
+    ProductProcess.std_cost,
+    ProductProcess.vave_cost,
+    ProductProcess.remarks,
+)
+
+
+# 物料行前端字段 → (所需列, 取值函数 (序号, 行, 价格) → 值)
+MATERIAL_FIELDS = {
+    "id": ((), lambda idx, m, price: f"M-{idx + 1:03d}"),
+    "level": (
+        (ProductMaterial.material_level,),
+        lambda idx, m, price: str(m.material_level) if m.material_level is not None else "",
+    ),
+    "partNumber": ((ProductMaterial.part_number,), lambda idx, m, price: m.part_number or ""),
+    "partName": ((ProductMaterial.material_name,), lambda idx, m, price: m.material_name or ""),
+    "version": ((ProductMaterial.version,), lambda idx, m, price: m.version or "1.0"),
+    "type": ((ProductMaterial.material_type,), lambda idx, m, price: m.material_type or "I"),
+    "stockStatus": ((ProductMaterial.stock_status,), lambda idx, m, price: m.stock_status or "N"),
+    "material": ((), lambda idx, m, price: price.get("material", "")),
+    "supplier": (
+        (ProductMaterial.supplier,),
+        lambda idx, m, price: m.supplier or price.get("supplier", ""),
+    ),
+    "quantity": (
+        (ProductMaterial.quantity,),
+        lambda idx, m, price: float(m.quantity) if m.quantity is not None else 0,
+    ),
+    "unit": ((ProductMaterial.unit,), lambda idx, m, price: m.unit or "PC"),
+    "unitPrice": ((), lambda idx, m, price: price.get("unit_price")),
+    "vavePrice": ((), lambda idx, m, price: price.get("vave_price")),
+    "hasHistoryData": ((), lambda idx, m, price: price.get("has_history_data", False)),
+    "comments": ((ProductMaterial.remarks,), lambda idx, m, price: m.remarks or ""),
+    "status": (
+        (), lambda idx, m, price: "GREEN" if price.get("has_history_data") else "RED"
+    ),
+}
+
+# 需要查询历史价格的物料字段
+MATERIAL_PRICE_FIELDS = frozenset({
+    "material", "supplier", "unitPrice", "vavePrice", "hasHistoryData", "status",
+})
+
+# 工艺行前端字段 → 取值函数 (序号, 行) → 值
+PROCESS_FIELDS = {
+    "id": lambda idx, p: f"P-{idx + 1:03d}",
+    "opNo": lambda idx, p: (
+        str(p.sequence_order) if p.sequence_order is not None else f"{idx + 1:03d}"
+    ),
+    "name": lambda idx, p: p.process_code or "",
+    "workCenter": lambda idx, p: "",
+    "standardTime": lambda idx, p: float(p.cycle_time_std or p.cycle_time or 0) / 3600,  # 转换为小时
+    "spec": lambda idx, p: p.remarks,
+    "unit": lambda idx, p: "件",
+    "quantity": lambda idx, p: 1,
+    "unitPrice": lambda idx, p: float(p.std_cost) if p.std_cost is not None else None,
+    "vavePrice": lambda idx, p: float(p.vave_cost) if p.vave_cost is not None else None,
+    "hasHistoryData": lambda idx, p: p.std_cost is not None,
+    "isOperationKnown": lambda idx, p: p.std_cost is not None,
+}
+
+# 分页读取的默认 / 最大每页物料行数
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+
+def material_line_data(
+    idx: int, m, price_data: dict, fields: Sequence[str] | None = None
+) -> dict:
+    """物料行 → 前端格式（fields 为 None 时输出全部字段）."""
+    return {
+        name: MATERIAL_FIELDS[name][1](idx, m, price_data)
+        for name in (fields or MATERIAL_FIELDS)
+    }
+
+
+def process_line_data(idx: int, p, fields: Sequence[str] | None = None) -> dict:
+    """工艺行 → 前端格式（fields 为 None 时输出全部字段）."""
+    return {name: PROCESS_FIELDS[name](idx, p) for name in (fields or PROCESS_FIELDS)}
+
+
+@dataclass(frozen=True)
+class FieldProjection:
+    """fields= 投影：物料行和工艺行各自输出的字段."""
+    material_fields: tuple[str, ...] | None = None
+    process_fields: tuple[str, ...] | None = None
+
+    @classmethod
+    def parse(cls, fields: str | None) -> "FieldProjection":
+        """解析逗号分隔的字段列表（同名字段同时作用于物料行和工艺行）.
+
+        Raises:
+            ValueError: 含有未知字段
+        """
+        if not fields:
+            return cls()
+        names = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+        unknown = [n for n in names if n not in MATERIAL_FIELDS and n not in PROCESS_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return cls(
+            material_fields=tuple(n for n in names if n in MATERIAL_FIELDS),
+            process_fields=tuple(n for n in names if n in PROCESS_FIELDS),
+        )
+
+    @property
+    def needs_prices(self) -> bool:
+        """是否需要查询历史价格."""
+        return self.material_fields is None or any(
+            name in MATERIAL_PRICE_FIELDS for name in self.material_fields
+        )
+
+    def material_columns(self) -> tuple:
+        """物料行需要查询的列（始终包含产品 ID；查价时包含 material_id）."""
+        if self.material_fields is None:
+            return MATERIAL_COLUMNS
+        columns = [ProductMaterial.project_product_id]
+        if self.needs_prices:
+            columns.append(ProductMaterial.material_id)
+        for name in self.material_fields:
+            columns.extend(c for c in MATERIAL_FIELDS[name][0] if c not in columns)
+        return tuple(columns)
+
+
+@dataclass(frozen=True)
+class PageCursor:
+    """分页游标：上一页最后一行的 (产品 ID, 物料行 ID) 及该产品下一行的序号."""
+    product_id: str
+    material_id: str
+    index: int
+
+    def encode(self) -> str:
+        data = json.dumps([self.product_id, self.material_id, self.index])
+        return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii")
+
+    @classmethod
+    def decode(cls, cursor: str) -> "PageCursor":
+        """解析游标.
+
+        Raises:
+            ValueError: 游标格式无效
+        """
+        try:
+            product_id, material_id, index = json.loads(base64.urlsafe_b64decode(cursor))
+        except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+            raise ValueError("Invalid cursor") from None
+        if not isinstance(index, int) or index < 0:
+            raise ValueError("Invalid cursor")
+        return cls(str(product_id), str(material_id), index)
+
+
+class ProjectBOMService:
+    """项目 BOM 数据读取服务."""
+
+    def __init__(self, db: AsyncSession, lookup: PriceBook | None = None):
+        """初始化服务.
+
+        Args:
+            db: 数据库会话
+            lookup: 价格查询（lookup_materials 接口），None 时在首次查价时取当前价格簿
+        """
+        self.db = db
+        self.lookup = lookup
+
+    async def get_lookup(self) -> PriceBook:
+        """本服务使用的价格簿（首次调用时固定下来）."""
+        if self.lookup is None:
+            self.lookup = await price_book_registry.get(self.db)
+        return self.lookup
+
+    async def get_products(
+        self, project_id: str, projection: FieldProjection | None = None
+    ) -> list[dict]:
+        """获取项目中所有产品的 BOM 数据（物料和工艺，物料附带历史价格）.
+
+        Args:
+            project_id: 项目 ID
+            projection: 字段投影，None 时输出全部字段
+
+        Returns:
+            list[dict]: 每个产品的前端格式数据
+        """
+        return [product async for product in self.iter_products(project_id, projection)]
+
+    async def iter_products(
+        self, project_id: str, projection: FieldProjection | None = None
+    ) -> AsyncIterator[dict]:
+        """按产品逐个产出 BOM 数据.
+
+        物料行以服务端游标按 (产品 ID, 行 ID) 顺序流式读取，同一时刻只持有一个产品的行；
+        工艺行（每个产品几十道工序）和去重物料编码先整体读取，价格一次批量查询。
+
+        Args:
+            project_id: 项目 ID
+            projection: 字段投影，None 时输出全部字段
+
+        Yields:
+            dict: 单个产品的前端格式数据（按产品 ID 排序）
+        """
+        projection = projection or FieldProjection()
+        products = await self._load_products(
+            ProjectProduct.project_id == project_id
+        )
+        if not products:
+            return
+
+        product_ids = select(ProjectProduct.id).where(ProjectProduct.project_id == project_id)
+        processes_by_product = await self._load_processes(product_ids)
+
+        # 所有产品去重后的物料编码只做一次批量价格查询
+        prices = {}
+        if projection.needs_prices:
+            result = await self.db.execute(
+                select(ProductMaterial.material_id)
+                .where(
+                    ProductMaterial.project_product_id.in_(product_ids),
+                    ProductMaterial.material_id.is_not(None),
+                )
+                .distinct()
+            )
+            lookup = await self.get_lookup()
+            prices = await lookup.lookup_materials(result.scalars().all())
+
+        # 物料行按产品 ID 排序流式读取，与产品列表归并
+        rows = await self.db.stream(
+            select(*projection.material_columns())
+            .where(ProductMaterial.project_product_id.in_(product_ids))
+            .order_by(ProductMaterial.project_product_id, ProductMaterial.id)
+        )
+        rows = aiter(rows)
+        pending = await anext(rows, None)
+        for product in products:
+            materials = []
+            while pending is not None and pending.project_product_id <= product.id:
+                if pending.project_product_id == product.id:
+                    materials.append(pending)
+                pending = await anext(rows, None)
+
+            materials_data = [
+                material_line_data(
+                    idx, m, self._price(prices, m, projection), projection.material_fields
+                )
+                for idx, m in enumerate(materials)
+            ]
+            processes_data = [
+                process_line_data(idx, p, projection.process_fields)
+                for idx, p in enumerate(processes_by_product.pop(product.id, ()))
+            ]
+            yield {
+                "productId": product.id,
+                "productName": product.product_name,
+                "productCode": product.product_code,
+                "materials": materials_data,
+                "processes": processes_data,
+                "isParsed": len(materials_data) > 0 or len(processes_data) > 0,
+            }
+
+    async def get_page(
+        self,
+        project_id: str,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: PageCursor | None = None,
+        product_id: str | None = None,
+        projection: FieldProjection | None = None,
+    ) -> dict:
+        """按键集游标读取一页物料行.
+
+        物料行按 (产品 ID, 行 ID) 排序，每页最多 limit 行，可跨越多个产品；
+        每个产品的工艺行随其第一页返回。查询条件只依赖游标位置，价格只查询本页
+        出现的物料编码，首页与末页的延迟都与项目总行数无关。
+
+        Args:
+            project_id: 项目 ID
+            limit: 每页物料行数
+            cursor: 上一页返回的游标，None 时从头开始
+            product_id: 只读取指定产品
+            projection: 字段投影，None 时输出全部字段
+
+        Returns:
+            dict: products（本页涉及的产品及其物料行）和 next_cursor（无更多数据时为 None）
+        """
+        projection = projection or FieldProjection()
+        limit = min(max(limit, 1), MAX_PAGE_SIZE)
+
+        product_filter = [ProjectProduct.project_id == project_id]
+        if product_id is not None:
+            product_filter.append(ProjectProduct.id == product_id)
+        product_ids = select(ProjectProduct.id).where(*product_filter)
+
+        material_filter = [ProductMaterial.project_product_id.in_(product_ids)]
+        if cursor is not None:
+            material_filter.append(
+                tuple_(ProductMaterial.project_product_id, ProductMaterial.id)
+                > tuple_(cursor.product_id, cursor.material_id)
+            )
+        # 多取一行判断是否还有下一页
+        result = await self.db.execute(
+            select(*projection.material_columns(), ProductMaterial.id.label("row_id"))
+            .where(*material_filter)
+            .order_by(ProductMaterial.project_product_id, ProductMaterial.id)
+            .limit(limit + 1)
+        )
+        rows = result.all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        # 本页覆盖的产品范围：游标所在产品之后（含）到最后一行所在产品（无下一页时到末尾），
+        # 范围内没有物料行的产品也会返回
+        if cursor is not None:
+            product_filter.append(ProjectProduct.id >= cursor.product_id)
+        if has_more:
+            product_filter.append(ProjectProduct.id <= rows[-1].project_product_id)
+        products = await self._load_products(*product_filter)
+
+        # 工艺行只随产品的第一页返回
+        first_page_ids = [
+            p.id for p in products if cursor is None or p.id != cursor.product_id
+        ]
+        processes_by_product = (
+            await self._load_processes(first_page_ids) if first_page_ids else {}
+        )
+        first_page_ids = set(first_page_ids)
+
+        prices = {}
+        if projection.needs_prices:
+            lookup = await self.get_lookup()
+            prices = await lookup.lookup_materials(
+                list(dict.fromkeys(r.material_id for r in rows if r.material_id))
+            )
+
+        rows_by_product = defaultdict(list)
+        for row in rows:
+            rows_by_product[row.project_product_id].append(row)
+
+        products_data = []
+        for product in products:
+            continued = cursor is not None and product.id == cursor.product_id
+            if continued and product.id not in rows_by_product:
+                # 游标所在产品的行已在上一页读完
+                continue
+            start = cursor.index if continued else 0
+            data = {
+                "productId": product.id,
+                "productName": product.product_name,
+                "productCode": product.product_code,
+                "materials": [
+                    material_line_data(
+                        start + offset, m, self._price(prices, m, projection),
+                        projection.material_fields,
+                    )
+                    for offset, m in enumerate(rows_by_product.get(product.id, ()))
+                ],
+            }
+            if product.id in first_page_ids:
+                data["processes"] = [
+                    process_line_data(idx, p, projection.process_fields)
+                    for idx, p in enumerate(processes_by_product.get(product.id, ()))
+                ]
+            products_data.append(data)
+
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            index = len(rows_by_product[last.project_product_id])
+            if cursor is not None and last.project_product_id == cursor.product_id:
+                index += cursor.index
+            next_cursor = PageCursor(last.project_product_id, last.row_id, index)
+
+        return {"products": products_data, "next_cursor": next_cursor}
+
+    async def _load_products(self, *conditions) -> list:
+        result = await self.db.execute(
+            select(
+                ProjectProduct.id, ProjectProduct.product_name, ProjectProduct.product_code
+            )
+            .where(*conditions)
+            .order_by(ProjectProduct.id)
+        )
+        return result.all()
+
+    async def _load_processes(self, product_ids) -> dict[str, list]:
+        """读取工艺行并按产品分组（表可能不存在或查询失败，忽略）."""
+        processes_by_product = defaultdict(list)
+        try:
+            result = await self.db.execute(
+                select(*PROCESS_COLUMNS)
+                .where(ProductProcess.project_product_id.in_(product_ids))
+                .order_by(ProductProcess.project_product_id, ProductProcess.sequence_order)
+            )
+            for row in result.all():
+                processes_by_product[row.project_product_id].append(row)
+        except SQLAlchemyError:
+            await self.db.rollback()
+        return processes_by_product
+
+    @staticmethod
+    def _price(prices: dict, m, projection: FieldProjection) -> dict:
+        if not projection.needs_prices or not m.material_id:
+            return {}
+        return prices.get(m.material_id, {})
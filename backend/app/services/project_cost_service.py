@@ -0,0 +1,328 @@
+"""项目级成本汇总服务.
+
+一次读取项目全部产品的 product_materials 和 product_processes（各一条查询），
+按价格簿计算逐产品和项目的双轨成本，最后一次写入 QuoteSummary，
+前端不再需要为每个产品单独调用 /cost/calculate。
+
+- 物料：数量 × 单价，单价按 material_id（未关联时按零件号）从价格簿取
+- 工艺：工时（秒）/ 3600 × MHR，MHR 优先取工序上的快照，缺失时取价格簿；
+  VAVE 工时缺失时取标准工时，VAVE 费率缺失时取标准费率；VAVE 轨再乘价格簿中
+  该工艺的效率系数（快照 MHR 只是费率，不含效率系数），与 DualTrackCalculator 一致
+
+安装 numpy 时走向量化成本引擎，否则逐行 Decimal 计算，两者结果逐分一致。
+
+结果按 (项目 ID, projects.bom_revision) 缓存。修订号的递增集中处理：经 ORM 写入
+（add / 修改 / delete）项目产品、物料或工艺行时由 before_flush 钩子自动递增；不经过
+flush 的 Core 批量语句（BOMBulkWriter / BOMRevisionMerger）由调用方显式调用
+bump_bom_revision。命中时与修订号一起读取 QuoteSummary 的成本字段（一条查询），
+一致时不再读取行数据、计算或写入；汇总行被删除或改动过时按缓存结果重写。
+主数据变更只让依赖的物料 / 工艺价格变化的结果失效。
+"""
+
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.product_material import ProductMaterial
+from app.models.product_process import ProductProcess
+from app.models.project import Project
+from app.models.project_product import ProjectProduct
+from app.models.quote_summary import QuoteSummary
+from app.schemas.cost import ProductCostRollup, ProjectCostRollupResponse
+from app.services.cost_engine import (
+    FIXED_SCALE,
+    RATE_SCALE,
+    SECONDS_SCALE,
+    CostArrays,
+    compute_costs,
+    price_pair_from_cents,
+    to_fixed,
+    to_int_array,
+    vector_engine_available,
+)
+from app.services.cost_memo import cost_input_hash, cost_memo
+from app.services.price_book import PriceBook, ProcessPrice, price_book_registry
+
+
+async def bump_bom_revision(db: AsyncSession, project_id: str) -> None:
+    """递增项目 BOM 修订号（与 BOM 行写入在同一事务中提交）.
+
+    经 ORM 写入的行由 before_flush 钩子自动处理；不经过 flush 的 Core
+    insert / update / delete 语句写入项目产品、物料或工艺行时必须调用，
+    否则成本汇总会返回旧结果。
+    """
+    await db.execute(
+        update(Project)
+        .where(Project.id == project_id)
+        .values(bom_revision=Project.bom_revision + 1)
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def _bump_bom_revision_on_flush(session: Session, flush_context, instances) -> None:
+    """ORM 新增、修改或删除项目产品 / 物料 / 工艺行时，在同一 flush 中递增所属项目的修订号."""
+    project_ids = set()
+    product_ids = set()
+    for obj in (*session.new, *session.deleted, *session.dirty):
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        if isinstance(obj, ProjectProduct):
+            project_ids.add(obj.project_id)
+        elif isinstance(obj, (ProductMaterial, ProductProcess)):
+            product_ids.add(obj.project_product_id)
+    product_ids.discard(None)
+    if product_ids:
+        project_ids.update(session.execute(
+            select(ProjectProduct.project_id).where(ProjectProduct.id.in_(product_ids))
+        ).scalars())
+    project_ids.discard(None)
+    if project_ids:
+        session.execute(
+            update(Project)
+            .where(Project.id.in_(project_ids))
+            .values(bom_revision=Project.bom_revision + 1)
+        )
+
+
+def _book_rate(entry: ProcessPrice | None, track: str):
+    """价格簿中的费率：MHR 合计，缺失时取小时费率."""
+    if entry is None:
+        return None
+    if track == "std":
+        return entry.std_mhr_total if entry.std_mhr_total is not None else entry.std_hourly_rate
+    return entry.vave_mhr_total if entry.vave_mhr_total is not None else entry.vave_hourly_rate
+
+
+class ProjectCostService:
+    """项目级成本汇总服务."""
+
+    def __init__(self, db: AsyncSession, price_book: PriceBook | None = None):
+        self.db = db
+        self.price_book = price_book
+
+    async def rollup(self, project_id: str) -> ProjectCostRollupResponse:
+        """计算项目全部产品的双轨成本并写入 QuoteSummary.
+
+        BOM 修订号和依赖价格都未变化时直接返回缓存结果（只读取修订号和汇总行）；
+        QuoteSummary 与缓存结果不一致（被删除或改动）时重写。
+
+        Args:
+            project_id: 项目 ID
+
+        Returns:
+            ProjectCostRollupResponse: 逐产品和项目汇总
+
+        Raises:
+            ValueError: 项目不存在
+        """
+        current = (await self.db.execute(
+            select(
+                Project.bom_revision, QuoteSummary.total_std_cost, QuoteSummary.total_vave_cost,
+            )
+            .outerjoin(QuoteSummary, QuoteSummary.project_id == Project.id)
+            .where(Project.id == project_id)
+        )).first()
+        if current is None:
+            raise ValueError("Project not found")
+        revision = current.bom_revision
+
+        book = self.price_book or await price_book_registry.get(self.db)
+        key = cost_input_hash("project", [(project_id, revision)])
+        cached = cost_memo.get(
+            book, key,
+            restamp=lambda result, version: result.model_copy(
+                update={"price_book_version": version}
+            ),
+        )
+        if cached is not None:
+            total = cached.total_cost
+            if (current.total_std_cost, current.total_vave_cost) != (total.std, total.vave):
+                await self._upsert_summary(project_id, total.std, total.vave)
+            return cached
+
+        products = (await self.db.execute(
+            select(ProjectProduct.id, ProjectProduct.product_name, ProjectProduct.product_code)
+            .where(ProjectProduct.project_id == project_id)
+            .order_by(ProjectProduct.id)
+        )).all()
+        product_ids = select(ProjectProduct.id).where(ProjectProduct.project_id == project_id)
+
+        materials = (await self.db.execute(
+            select(
+                ProductMaterial.project_product_id, ProductMaterial.material_id,
+                ProductMaterial.part_number, ProductMaterial.quantity,
+            )
+            .where(ProductMaterial.project_product_id.in_(product_ids))
+            .order_by(ProductMaterial.project_product_id, ProductMaterial.id)
+        )).all()
+        processes = (await self.db.execute(
+            select(
+                ProductProcess.project_product_id, ProductProcess.process_code,
+                ProductProcess.cycle_time_std, ProductProcess.cycle_time_vave,
+                ProductProcess.cycle_time, ProductProcess.std_mhr, ProductProcess.vave_mhr,
+            )
+            .where(ProductProcess.project_product_id.in_(product_ids))
+            .order_by(ProductProcess.project_product_id, ProductProcess.id)
+        )).all()
+
+        result = self._compute(project_id, book, products, materials, processes)
+        await self._upsert_summary(project_id, result.total_cost.std, result.total_cost.vave)
+
+        # 提交成功后才缓存；工艺依赖按编码记录（有快照 MHR 的行不受影响，多记无害）
+        dependencies = [("material", m.material_id or m.part_number) for m in materials]
+        dependencies += [("process_code", p.process_code) for p in processes]
+        cost_memo.set(book, key, result, dependencies)
+        return result
+
+    def _compute(
+        self, project_id: str, book: PriceBook, products: list, materials: list, processes: list
+    ) -> ProjectCostRollupResponse:
+        """计算逐产品和项目的双轨成本."""
+        product_index = {product.id: idx for idx, product in enumerate(products)}
+
+        material_lines = [
+            (product_index[m.project_product_id], *self._material_inputs(m, book))
+            for m in materials
+        ]
+        process_lines = [
+            (product_index[p.project_product_id], *self._process_inputs(p, book))
+            for p in processes
+        ]
+        if vector_engine_available():
+            cents = self._vector_cents(len(products), material_lines, process_lines)
+        else:
+            cents = self._decimal_cents(len(products), material_lines, process_lines)
+
+        material_counts = [0] * len(products)
+        for line in material_lines:
+            material_counts[line[0]] += 1
+        process_counts = [0] * len(products)
+        for line in process_lines:
+            process_counts[line[0]] += 1
+
+        product_costs = []
+        for idx, product in enumerate(products):
+            material_std, material_vave, process_std, process_vave = cents[idx]
+            product_costs.append(ProductCostRollup(
+                product_id=product.id,
+                product_name=product.product_name,
+                product_code=product.product_code,
+                material_count=material_counts[idx],
+                process_count=process_counts[idx],
+                material_cost=price_pair_from_cents(material_std, material_vave),
+                process_cost=price_pair_from_cents(process_std, process_vave),
+                total_cost=price_pair_from_cents(
+                    material_std + process_std, material_vave + process_vave
+                ),
+            ))
+
+        totals = [sum(column) for column in zip(*cents)] or [0, 0, 0, 0]
+        material_std, material_vave, process_std, process_vave = totals
+        return ProjectCostRollupResponse(
+            project_id=project_id,
+            products=product_costs,
+            material_cost=price_pair_from_cents(material_std, material_vave),
+            process_cost=price_pair_from_cents(process_std, process_vave),
+            total_cost=price_pair_from_cents(
+                material_std + process_std, material_vave + process_vave
+            ),
+            price_book_version=book.version,
+        )
+
+    @staticmethod
+    def _material_inputs(m, book: PriceBook) -> tuple:
+        """物料行 → (数量, 标准单价, VAVE 单价)，未命中价格簿时为零."""
+        entry = book.material(m.material_id or m.part_number)
+        if entry is None:
+            return 0, 0, 0
+        std_price = entry.std_price or 0
+        return m.quantity or 0, std_price, entry.vave_price or std_price
+
+    @staticmethod
+    def _process_inputs(p, book: PriceBook) -> tuple:
+        """工艺行 → (标准工时秒, VAVE 工时秒, 标准 MHR, VAVE MHR, VAVE 效率系数)."""
+        entry = book.process_by_code(p.process_code)
+        std_rate = p.std_mhr if p.std_mhr is not None else _book_rate(entry, "std")
+        vave_rate = p.vave_mhr if p.vave_mhr is not None else _book_rate(entry, "vave")
+        std_seconds = p.cycle_time_std or p.cycle_time or 0
+        return (
+            std_seconds,
+            p.cycle_time_vave or std_seconds,
+            std_rate or 0,
+            vave_rate or std_rate or 0,
+            (entry.efficiency_factor if entry is not None else None) or 1,
+        )
+
+    @staticmethod
+    def _vector_cents(product_count: int, material_lines: list, process_lines: list) -> list:
+        """向量化计算逐产品 (物料 std, 物料 vave, 工艺 std, 工艺 vave) 分值."""
+        materials = list(zip(*material_lines)) or [(), (), (), ()]
+        processes = list(zip(*process_lines)) or [(), (), (), (), (), ()]
+        result = compute_costs(CostArrays(
+            product_count=product_count,
+            material_product=to_int_array(materials[0]),
+            quantity=to_fixed(materials[1], FIXED_SCALE),
+            std_price=to_fixed(materials[2], FIXED_SCALE),
+            vave_price=to_fixed(materials[3], FIXED_SCALE),
+            process_product=to_int_array(processes[0]),
+            time=to_int_array(processes[1]),
+            vave_time=to_int_array(processes[2]),
+            std_rate=to_fixed(processes[3], RATE_SCALE),
+            vave_rate=to_fixed(processes[4], RATE_SCALE),
+            efficiency=to_fixed(processes[5], RATE_SCALE),
+            time_scale=SECONDS_SCALE,
+        ))
+        return [
+            tuple(map(int, row)) for row in zip(
+                result.product_material_std, result.product_material_vave,
+                result.product_process_std, result.product_process_vave,
+            )
+        ]
+
+    @staticmethod
+    def _decimal_cents(product_count: int, material_lines: list, process_lines: list) -> list:
+        """逐行 Decimal 计算（未安装 numpy 时），取整规则与向量化引擎相同."""
+        cent = Decimal("0.01")
+        cents = [[0, 0, 0, 0] for _ in range(product_count)]
+        for idx, quantity, std_price, vave_price in material_lines:
+            quantity = Decimal(str(quantity))
+            cents[idx][0] += int((quantity * Decimal(str(std_price))).quantize(cent) * 100)
+            cents[idx][1] += int((quantity * Decimal(str(vave_price))).quantize(cent) * 100)
+        for idx, std_seconds, vave_seconds, std_rate, vave_rate, efficiency in process_lines:
+            # 先乘后除：结果恰为半分时也能精确舍入
+            std = Decimal(std_seconds) * Decimal(str(std_rate)) / SECONDS_SCALE
+            vave = (
+                Decimal(vave_seconds) * Decimal(str(vave_rate)) * Decimal(str(efficiency))
+                / SECONDS_SCALE
+            )
+            cents[idx][2] += int(std.quantize(cent) * 100)
+            cents[idx][3] += int(vave.quantize(cent) * 100)
+        return [tuple(row) for row in cents]
+
+    async def _upsert_summary(self, project_id: str, std: Decimal, vave: Decimal) -> None:
+        """写入 QuoteSummary 的成本字段（不存在时插入，存在时更新），只提交一次."""
+        savings = std - vave
+        values = {
+            "total_std_cost": std,
+            "total_vave_cost": vave,
+            "total_savings": savings,
+            "savings_rate": (savings / std * 100).quantize(Decimal("0.01")) if std > 0 else Decimal("0"),
+            "updated_at": datetime.utcnow(),
+        }
+        existing = await self.db.execute(
+            select(QuoteSummary.id).where(QuoteSummary.project_id == project_id)
+        )
+        if existing.scalar_one_or_none() is None:
+            await self.db.execute(insert(QuoteSummary).values(
+                id=str(uuid.uuid4()), project_id=project_id,
+                created_at=values["updated_at"], **values,
+            ))
+        else:
+            await self.db.execute(
+                update(QuoteSummary).where(QuoteSummary.project_id == project_id).values(**values)
+            )
+        await self.db.commit()
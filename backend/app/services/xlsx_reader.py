@@ -0,0 +1,336 @@
+"""XLSX 底层读取后端.
+
+直接用 zipfile + ElementTree.iterparse 读取 sheet XML 和共享字符串表，
+逐行产出纯值元组，不创建 openpyxl 单元格对象。接口与 openpyxl 只读模式
+iter_rows(values_only=True) 保持一致（行号对齐、缺失行/列补 None），
+可直接替换 BOMParser 使用的工作簿对象。
+
+值转换规则与 openpyxl 只读模式一致：
+- 共享字符串 / 行内字符串 → str
+- 数字 → int 或 float；日期格式单元格 → datetime / timedelta
+- 布尔 → bool；公式 → "=..." 文本（共享公式按位置平移）
+"""
+
+import io
+import posixpath
+import zipfile
+from typing import Iterator
+from xml.etree.ElementTree import fromstring, iterparse
+
+from openpyxl import load_workbook
+from openpyxl.formula.translate import Translator
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils.cell import column_index_from_string, range_boundaries
+from openpyxl.utils.datetime import (
+    CALENDAR_MAC_1904,
+    CALENDAR_WINDOWS_1900,
+    from_excel,
+    from_ISO8601,
+)
+
+from app.services.bom_source import BOMSource, is_path
+
+# 可选的读取后端
+READER_OPENPYXL = "openpyxl"
+READER_XLSX = "xlsx"
+
+NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+WORKSHEET_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"
+
+TAG_ROW = f"{NS_MAIN}row"
+TAG_CELL = f"{NS_MAIN}c"
+TAG_VALUE = f"{NS_MAIN}v"
+TAG_FORMULA = f"{NS_MAIN}f"
+TAG_INLINE = f"{NS_MAIN}is"
+TAG_TEXT = f"{NS_MAIN}t"
+TAG_RUN = f"{NS_MAIN}r"
+TAG_SI = f"{NS_MAIN}si"
+TAG_DIMENSION = f"{NS_MAIN}dimension"
+TAG_SHEET_DATA = f"{NS_MAIN}sheetData"
+
+_DIGITS = "0123456789"
+
+
+def open_workbook(file_content: BOMSource, reader: str = READER_OPENPYXL):
+    """按指定后端只读打开工作簿.
+
+    Args:
+        file_content: Excel 文件的字节内容或文件路径
+        reader: 读取后端，"openpyxl" 或 "xlsx"
+
+    Returns:
+        支持 sheetnames / [sheet_name] / close() 的工作簿对象
+    """
+    if reader == READER_XLSX:
+        return XlsxWorkbook(file_content)
+    if reader == READER_OPENPYXL:
+        source = file_content if is_path(file_content) else io.BytesIO(file_content)
+        return load_workbook(filename=source, read_only=True)
+    raise ValueError(f"未知的 Excel 读取后端: {reader}")
+
+
+def _text_content(node) -> str:
+    """提取 <si>/<is> 节点的纯文本（直接 <t> + 富文本 <r><t>，忽略注音）."""
+    snippets = []
+    for child in node:
+        if child.tag == TAG_TEXT:
+            snippets.append(child.text or "")
+        elif child.tag == TAG_RUN:
+            t = child.find(TAG_TEXT)
+            if t is not None and t.text is not None:
+                snippets.append(t.text)
+    return "".join(snippets)
+
+
+def _cast_number(value: str) -> int | float:
+    """数字字符串 → int 或 float（与 openpyxl 规则一致）."""
+    if "." in value or "E" in value or "e" in value:
+        return float(value)
+    return int(value)
+
+
+class XlsxWorkbook:
+    """基于 zipfile 的只读工作簿."""
+
+    def __init__(self, file_content: BOMSource) -> None:
+        self._archive = zipfile.ZipFile(
+            file_content if is_path(file_content) else io.BytesIO(file_content)
+        )
+        self._sheet_paths: dict[str, str] = {}
+        self.epoch = CALENDAR_WINDOWS_1900
+        self._read_workbook()
+        self.shared_strings = self._read_shared_strings()
+        self.date_formats, self.timedelta_formats = self._read_date_styles()
+
+    @property
+    def sheetnames(self) -> list[str]:
+        return list(self._sheet_paths)
+
+    def __getitem__(self, sheet_name: str) -> "XlsxWorksheet":
+        return XlsxWorksheet(self, sheet_name, self._sheet_paths[sheet_name])
+
+    def open_part(self, path: str):
+        return self._archive.open(path)
+
+    def close(self) -> None:
+        self._archive.close()
+
+    def _read_workbook(self) -> None:
+        """读取 sheet 名称顺序及其 XML 路径."""
+        rels = fromstring(self._archive.read("xl/_rels/workbook.xml.rels"))
+        targets = {}
+        for rel in rels.iter(f"{NS_PKG_REL}Relationship"):
+            if rel.get("Type") != WORKSHEET_REL_TYPE:
+                continue
+            target = rel.get("Target")
+            if target.startswith("/"):
+                path = target.lstrip("/")
+            else:
+                path = posixpath.normpath(posixpath.join("xl", target))
+            targets[rel.get("Id")] = path
+
+        workbook = fromstring(self._archive.read("xl/workbook.xml"))
+        pr = workbook.find(f"{NS_MAIN}workbookPr")
+        if pr is not None and pr.get("date1904") in ("1", "true"):
+            self.epoch = CALENDAR_MAC_1904
+
+        for sheet in workbook.iter(f"{NS_MAIN}sheet"):
+            rel_id = sheet.get(f"{NS_REL}id")
+            if rel_id in targets:
+                self._sheet_paths[sheet.get("name")] = targets[rel_id]
+
+    def _read_shared_strings(self) -> list[str]:
+        try:
+            src = self._archive.open("xl/sharedStrings.xml")
+        except KeyError:
+            return []
+        strings = []
+        with src:
+            for _, node in iterparse(src):
+                if node.tag == TAG_SI:
+                    strings.append(_text_content(node).replace("x005F_", ""))
+                    node.clear()
+        return strings
+
+    def _read_date_styles(self) -> tuple[set[int], set[int]]:
+        """找出数字格式为日期/时长的单元格样式序号."""
+        try:
+            styles = fromstring(self._archive.read("xl/styles.xml"))
+        except KeyError:
+            return set(), set()
+
+        custom = {}
+        num_fmts = styles.find(f"{NS_MAIN}numFmts")
+        if num_fmts is not None:
+            for fmt in num_fmts:
+                custom[int(fmt.get("numFmtId"))] = fmt.get("formatCode")
+
+        date_formats, timedelta_formats = set(), set()
+        cell_xfs = styles.find(f"{NS_MAIN}cellXfs")
+        if cell_xfs is None:
+            return date_formats, timedelta_formats
+        for idx, xf in enumerate(cell_xfs):
+            fmt_id = int(xf.get("numFmtId", 0))
+            fmt = custom.get(fmt_id) or BUILTIN_FORMATS.get(fmt_id)
+            if fmt is None:
+                continue
+            if is_date_format(fmt):
+                date_formats.add(idx)
+            if is_timedelta_format(fmt):
+                timedelta_formats.add(idx)
+        return date_formats, timedelta_formats
+
+
+class XlsxWorksheet:
+    """基于 iterparse 的只读工作表."""
+
+    def __init__(self, workbook: XlsxWorkbook, title: str, path: str) -> None:
+        self.parent = workbook
+        self.title = title
+        self._path = path
+        self.min_column = self.min_row = 1
+        self.max_column = self.max_row = None
+        self._read_dimension()
+
+    def _read_dimension(self) -> None:
+        with self.parent.open_part(self._path) as src:
+            for _, node in iterparse(src):
+                if node.tag == TAG_DIMENSION:
+                    ref = node.get("ref")
+                    if ref:
+                        (self.min_column, self.min_row,
+                         self.max_column, self.max_row) = range_boundaries(ref)
+                    return
+                if node.tag == TAG_SHEET_DATA:
+                    return
+
+    def iter_rows(
+        self,
+        min_row: int | None = None,
+        max_row: int | None = None,
+        min_col: int | None = None,
+        max_col: int | None = None,
+        values_only: bool = True,
+    ) -> Iterator[tuple]:
+        """逐行产出值元组，行为与 openpyxl 只读模式 values_only=True 一致."""
+        if not values_only:
+            raise ValueError("XlsxWorksheet 仅支持 values_only=True")
+
+        min_col = min_col or 1
+        min_row = min_row or 1
+        max_col = max_col or self.max_column
+        max_row = max_row or self.max_row
+
+        empty_row = []
+        if max_col is not None:
+            empty_row = (None,) * (max_col + 1 - min_col)
+
+        counter = min_row
+        idx = 1
+        for idx, cells in self._iter_sheet_rows():
+            if max_row is not None and idx > max_row:
+                break
+
+            # 补齐缺失的行
+            for _ in range(counter, idx):
+                counter += 1
+                yield empty_row
+
+            if counter <= idx:
+                counter += 1
+                yield self._build_row(cells, min_col, max_col)
+
+        if max_row is not None and max_row < idx:
+            for _ in range(counter, max_row + 1):
+                yield empty_row
+
+    @staticmethod
+    def _build_row(cells: list[tuple[int, object]], min_col: int, max_col: int | None) -> tuple:
+        if not cells and not max_col:
+            return ()
+        max_col = max_col or cells[-1][0]
+        row = [None] * (max_col + 1 - min_col)
+        for column, value in cells:
+            if min_col <= column <= max_col:
+                row[column - min_col] = value
+        return tuple(row)
+
+    def _iter_sheet_rows(self) -> Iterator[tuple[int, list[tuple[int, object]]]]:
+        """解析 sheet XML，逐行产出 (行号, [(列号, 值), ...])."""
+        shared_strings = self.parent.shared_strings
+        date_formats = self.parent.date_formats
+        timedelta_formats = self.parent.timedelta_formats
+        epoch = self.parent.epoch
+        shared_formulae: dict[str, Translator] = {}
+        column_cache: dict[str, int] = {}
+
+        row_counter = 0
+        with self.parent.open_part(self._path) as src:
+            for _, row in iterparse(src):
+                if row.tag != TAG_ROW:
+                    continue
+
+                r = row.get("r")
+                row_counter = int(float(r)) if r is not None else row_counter + 1
+                col_counter = 0
+                cells = []
+
+                for c in row:
+                    if c.tag != TAG_CELL:
+                        continue
+                    coordinate = c.get("r")
+                    if coordinate:
+                        letters = coordinate.rstrip(_DIGITS)
+                        column = column_cache.get(letters)
+                        if column is None:
+                            column = column_cache[letters] = column_index_from_string(letters)
+                        col_counter = column
+                    else:
+                        col_counter += 1
+                        column = col_counter
+
+                    data_type = c.get("t", "n")
+                    formula = c.find(TAG_FORMULA)
+                    if formula is not None:
+                        value = self._parse_formula(formula, coordinate, shared_formulae)
+                    elif data_type == "inlineStr":
+                        inline = c.find(TAG_INLINE)
+                        value = _text_content(inline) if inline is not None else None
+                    else:
+                        value = c.findtext(TAG_VALUE) or None
+                        if value is not None:
+                            if data_type == "n":
+                                value = _cast_number(value)
+                                style_id = int(c.get("s", 0))
+                                if style_id in date_formats:
+                                    try:
+                                        value = from_excel(
+                                            value, epoch,
+                                            timedelta=style_id in timedelta_formats,
+                                        )
+                                    except (OverflowError, ValueError):
+                                        value = "#VALUE!"
+                            elif data_type == "s":
+                                value = shared_strings[int(value)]
+                            elif data_type == "b":
+                                value = bool(int(value))
+                            elif data_type == "d":
+                                value = from_ISO8601(value)
+                    cells.append((column, value))
+
+                row.clear()
+                yield row_counter, cells
+
+    @staticmethod
+    def _parse_formula(formula, coordinate: str | None, shared_formulae: dict) -> str:
+        """公式单元格 → "=..." 文本，共享公式按单元格位置平移."""
+        value = "=" + (formula.text or "")
+        if formula.get("t") == "shared":
+            idx = formula.get("si")
+            if idx in shared_formulae:
+                return shared_formulae[idx].translate_formula(coordinate)
+            if value != "=":
+                shared_formulae[idx] = Translator(value, coordinate)
+        return value
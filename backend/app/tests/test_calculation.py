@@ -2,9 +2,28 @@
 
 import pytest
 from decimal import Decimal
-from unittest.mock import AsyncMock, MagicMock, patch
+from types import SimpleNamespace
 
 from app.services.calculation import DualTrackCalculator
+from app.services.price_book import PriceBook, price_book_registry
+
+
+def _material(item_code, std_price, vave_price=None):
+    """物料主数据行."""
+    return SimpleNamespace(
+        item_code=item_code, std_price=std_price, vave_price=vave_price,
+        supplier_tier=None, category=None,
+    )
+
+
+def _rate(process_name, std_rate, vave_rate=None, efficiency=None, process_code=None):
+    """工艺费率主数据行（只有旧的小时费率字段）."""
+    return SimpleNamespace(
+        process_code=process_code or f"PR-{process_name}", process_name=process_name,
+        equipment=None, work_center=None,
+        std_mhr_var=None, std_mhr_fix=None, vave_mhr_var=None, vave_mhr_fix=None,
+        std_hourly_rate=std_rate, vave_hourly_rate=vave_rate, efficiency_factor=efficiency,
+    )
 
 
 @pytest.mark.asyncio
@@ -31,95 +50,52 @@ class TestDualTrackCalculation:
 
     async def test_material_not_found(self):
         """测试物料不存在."""
-        with patch("app.services.calculation.select"):
-            async def mock_execute(*args, **kwargs):
-                mock_result = AsyncMock()
-                mock_result.scalar_one_or_none = MagicMock(return_value=None)
-                return mock_result
-
-            db = AsyncMock()
-            db.execute = mock_execute
+        calc = DualTrackCalculator(None, PriceBook([], []))
+        result = await calc.calculate_material_cost("NONEXISTENT", 10)
 
-            calc = DualTrackCalculator(db)
-            result = await calc.calculate_material_cost("NONEXISTENT", 10)
-
-            assert result.std == Decimal("0.00")
-            assert result.vave == Decimal("0.00")
+        assert result.std == Decimal("0.00")
+        assert result.vave == Decimal("0.00")
 
     async def test_material_cost_calculation(self):
         """测试物料成本计算."""
-        mock_material = MagicMock()
-        mock_material.std_price = Decimal("100.00")
-        mock_material.vave_price = Decimal("85.00")
-
-        with patch("app.services.calculation.select"):
-            async def mock_execute(*args, **kwargs):
-                mock_result = AsyncMock()
-                mock_result.scalar_one_or_none = MagicMock(return_value=mock_material)
-                return mock_result
-
-            db = AsyncMock()
-            db.execute = mock_execute
+        book = PriceBook([_material("TEST-001", Decimal("100.00"), Decimal("85.00"))], [])
 
-            calc = DualTrackCalculator(db)
-            result = await calc.calculate_material_cost("TEST-001", 10)
+        calc = DualTrackCalculator(None, book)
+        result = await calc.calculate_material_cost("TEST-001", 10)
 
-            assert result.std == Decimal("1000.00")  # 100 * 10
-            assert result.vave == Decimal("850.00")  # 85 * 10
-            assert result.savings == Decimal("150.00")
-            assert result.savings_rate == 0.15
+        assert result.std == Decimal("1000.00")  # 100 * 10
+        assert result.vave == Decimal("850.00")  # 85 * 10
+        assert result.savings == Decimal("150.00")
+        assert result.savings_rate == 0.15
 
     async def test_material_cost_no_vave_price(self):
         """测试物料成本计算 - 无 VAVE 价格."""
-        mock_material = MagicMock()
-        mock_material.std_price = Decimal("100.00")
-        mock_material.vave_price = None
+        book = PriceBook([_material("TEST-001", Decimal("100.00"))], [])
 
-        with patch("app.services.calculation.select"):
+        calc = DualTrackCalculator(None, book)
+        result = await calc.calculate_material_cost("TEST-001", 10)
 
-            async def mock_execute(*args, **kwargs):
-                mock_result = AsyncMock()
-                mock_result.scalar_one_or_none = MagicMock(return_value=mock_material)
-                return mock_result
-
-            db = AsyncMock()
-            db.execute = mock_execute
-
-            calc = DualTrackCalculator(db)
-            result = await calc.calculate_material_cost("TEST-001", 10)
-
-            # VAVE 价格应等于标准价格
-            assert result.std == Decimal("1000.00")
-            assert result.vave == Decimal("1000.00")
-            assert result.savings == Decimal("0.00")
+        # VAVE 价格应等于标准价格
+        assert result.std == Decimal("1000.00")
+        assert result.vave == Decimal("1000.00")
+        assert result.savings == Decimal("0.00")
 
     async def test_process_cost_calculation(self):
         """测试工艺成本计算."""
-        mock_rate = MagicMock()
-        # 模拟 std_hourly_rate = std_mhr + std_labor = 45 + 30 = 75
-        mock_rate.std_hourly_rate = Decimal("75.00")
-        # 模拟 vave_hourly_rate = vave_mhr + vave_labor = 42 + 28 = 70
-        mock_rate.vave_hourly_rate = Decimal("70.00")
-        mock_rate.efficiency_factor = Decimal("0.95")
-
-        with patch("app.services.calculation.select"):
+        # std_hourly_rate = std_mhr + std_labor = 45 + 30 = 75
+        # vave_hourly_rate = vave_mhr + vave_labor = 42 + 28 = 70
+        book = PriceBook([], [
+            _rate("重力铸造", Decimal("75.00"), Decimal("70.00"), Decimal("0.95")),
+        ])
 
-            async def mock_execute(*args, **kwargs):
-                mock_result = AsyncMock()
-                mock_result.scalar_one_or_none = MagicMock(return_value=mock_rate)
-                return mock_result
+        calc = DualTrackCalculator(None, book)
+        result = await calc.calculate_process_cost("重力铸造", 2.5)
 
-            db = AsyncMock()
-            db.execute = mock_execute
-
-            calc = DualTrackCalculator(db)
-            result = await calc.calculate_process_cost("重力铸造", 2.5)
-
-            # 标准成本 = 2.5 * (45 + 30) = 2.5 * 75 = 187.5
-            # VAVE成本 = 2.5 * (42 + 28) * 0.95 = 2.5 * 70 * 0.95 = 166.25
-            assert result.std == Decimal("187.50")
-            assert result.vave == Decimal("166.25")
-            assert result.savings == Decimal("21.25")
+        # 标准成本 = 2.5 * (45 + 30) = 2.5 * 75 = 187.5
+        # VAVE成本 = 2.5 * (42 + 28) * 0.95 = 2.5 * 70 * 0.95 = 166.25
+        assert result.std == Decimal("187.50")
+        assert result.vave == Decimal("166.25")
+        assert result.savings == Decimal("21.25")
 
     def test_savings_calculation(self):
         """测试节省率计算."""
@@ -130,3 +106,69 @@ class TestDualTrackCalculation:
 
         assert savings == Decimal("15.00")
         assert savings_rate == 0.15  # 15/100 = 0.15
+
+
+@pytest.mark.asyncio
+class TestCalculateMany:
+    """批量成本计算测试."""
+
+    MATERIALS = [
+        _material("MAT-A", Decimal("10.005"), Decimal("9.5")),
+        _material("MAT-B", Decimal("3.33")),
+    ]
+    RATES = [
+        _rate("焊接", Decimal("200"), Decimal("180"), Decimal("0.9"), process_code="PR-1"),
+        _rate("焊接", Decimal("999"), process_code="PR-2"),
+    ]
+
+    def _calc(self):
+        return DualTrackCalculator(None, PriceBook(self.MATERIALS, self.RATES))
+
+    async def test_lines_and_version(self):
+        """未命中和空编码按零计价，同名工艺取第一条费率，结果标记价格簿版本."""
+        calc = self._calc()
+        result = await calc.calculate_many(
+            [("MAT-A", 1), ("mat-a ", 2), ("MAT-B", 3), (None, 4), ("MISSING", 5)],
+            [("焊接", 0.5), ("MISSING", 1)],
+        )
+
+        assert len(result.materials) == 5
+        assert result.materials[1].std == Decimal("20.01")
+        assert result.materials[3].std == Decimal("0.00")
+        assert result.materials[4].std == Decimal("0.00")
+        assert result.processes[0].std == Decimal("100.00")
+        assert result.price_book_version == calc.price_book.version
+
+    async def test_matches_per_line_calculation(self):
+        """逐行结果和汇总与逐行计算一致（汇总为已取整行成本之和）."""
+        calc = self._calc()
+        result = await calc.calculate_many([("MAT-A", 3), ("MAT-B", 7)], [("焊接", 0.333)])
+
+        expected_materials = [
+            await calc.calculate_material_cost("MAT-A", 3),
+            await calc.calculate_material_cost("MAT-B", 7),
+        ]
+        expected_process = await calc.calculate_process_cost("焊接", 0.333)
+
+        assert result.materials == expected_materials
+        assert result.processes == [expected_process]
+        assert result.material_cost.std == sum(p.std for p in expected_materials)
+        assert result.material_cost.vave == sum(p.vave for p in expected_materials)
+        assert result.total_cost.std == result.material_cost.std + expected_process.std
+        assert result.total_cost.vave == result.material_cost.vave + expected_process.vave
+
+    async def test_empty_input(self):
+        result = await self._calc().calculate_many()
+
+        assert result.total_cost.std == Decimal("0.00")
+
+    async def test_empty_input_skips_price_book(self, monkeypatch):
+        """没有任何行时不加载价格簿（无需数据库）."""
+        async def unavailable(db=None):
+            raise AssertionError("price book should not be loaded")
+
+        monkeypatch.setattr(price_book_registry, "get", unavailable)
+        result = await DualTrackCalculator(None).calculate_many([], [])
+
+        assert result.total_cost.std == Decimal("0.00")
+        assert result.price_book_version is None
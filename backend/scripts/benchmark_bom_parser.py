@@ -0,0 +1,96 @@
+"""BOM 解析器单 sheet 头部读取基准测试.
+
+对比两种方式解析同一多产品工作簿的单 sheet 耗时：
+- rescan: 旧访问模式，sheet 类型检测、列映射检测（含 worksheet[header_row]）
+  和产品元数据提取（worksheet[row_idx] × 10）各自从头读取 sheet
+- head:   SheetHead 头部缓冲，前 N 行只读取一次，数据行从同一迭代器继续读取
+
+并对比两种 Excel 读取后端（openpyxl / xlsx）完整解析整个工作簿的耗时。
+
+运行方式: cd backend && python -m scripts.benchmark_bom_parser [sheets] [rows]
+"""
+import io
+import sys
+import os
+import time
+
+# 添加项目路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from openpyxl import Workbook, load_workbook
+
+from app.services.bom_parser import MultiProductBOMParser, SheetHead
+from app.services.xlsx_reader import READER_OPENPYXL, READER_XLSX
+
+
+def build_workbook(sheets: int, rows: int) -> bytes:
+    """生成 W04 格式的多产品 BOM 工作簿."""
+    wb = Workbook()
+    wb.remove(wb.active)
+    for s in range(sheets):
+        ws = wb.create_sheet(f"PRD-{s:04d}")
+        ws.append([None] * 14)
+        ws.append([None] * 5 + ["Product Name", f"产品{s}"] + [None] * 4 + ["Product Version", None, "02"])
+        ws.append([None] * 5 + ["Product Number", f"PN{s}"] + [None] * 4 + ["Customer Version", None, "01"])
+        ws.append([None] * 5 + ["Customer Number", f"C{s}"] + [None] * 4 + ["Issue Date", None, "2026-01-01"])
+        ws.append(["Bill of Material"])
+        ws.append(["Level", None, None, None, "Part Number", "Part Name", "Ver.", "Typ", "St",
+                   "Material", "Supplier", "Qty", "Unit", "Comments"])
+        for i in range(rows):
+            ws.append(["1", None, None, None, f"P{s}-{i:06d}", f"零件{i}", "01", "I", "N",
+                       "钢", "供应商A", 1 + i % 5, "PC", ""])
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+def parse_sheet_rescan(parser: MultiProductBOMParser, ws, sheet_name: str) -> int:
+    """旧访问模式：每个检测器各自重新读取 sheet 头部."""
+    base = parser._base_parser
+    base._detect_sheet_type(ws)
+    header_row, mapping = base._detect_column_mapping(ws)
+    ws[header_row]
+    for row_idx in range(1, min(11, ws.max_row)):
+        ws[row_idx]
+    parser._extract_product_metadata(ws, sheet_name)
+    return sum(1 for _ in base.iter_material_sheet(ws, header_row, mapping))
+
+
+def parse_sheet_head(parser: MultiProductBOMParser, ws, sheet_name: str) -> int:
+    """头部缓冲模式：前 N 行只读取一次."""
+    head = SheetHead(ws)
+    parser._base_parser._detect_sheet_type(head)
+    parser._extract_product_metadata(head, sheet_name)
+    return sum(1 for _ in parser._iter_materials_for_product(head))
+
+
+def run(sheets: int = 20, rows: int = 200) -> None:
+    content = build_workbook(sheets, rows)
+    parser = MultiProductBOMParser(max_workers=1)
+
+    for label, parse_sheet in (("rescan", parse_sheet_rescan), ("head", parse_sheet_head)):
+        wb = load_workbook(filename=io.BytesIO(content), read_only=True)
+        start = time.perf_counter()
+        total = 0
+        for sheet_name in wb.sheetnames:
+            total += parse_sheet(parser, wb[sheet_name], sheet_name)
+        elapsed = time.perf_counter() - start
+        wb.close()
+        print(
+            f"{label:>6}: {sheets} sheets × {rows} rows, {total} materials, "
+            f"{elapsed * 1000 / sheets:.2f} ms/sheet"
+        )
+
+    for reader in (READER_OPENPYXL, READER_XLSX):
+        start = time.perf_counter()
+        result = MultiProductBOMParser(max_workers=1, reader=reader).parse_excel_file(content)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{reader:>8}: {result.total_materials} materials, "
+            f"{elapsed * 1000 / sheets:.2f} ms/sheet"
+        )
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    run(*args)
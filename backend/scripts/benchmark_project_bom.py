@@ -0,0 +1,174 @@
+"""项目 BOM 读取（GET /bom/products/{project_id}）基准测试.
+
+50 个产品 × 20k 物料行的项目，对比两种读取方式的数据库往返次数与耗时：
+- n+1: 旧实现，每个产品各查一次物料和工艺，每个带 material_id 的物料行单独查一次价格
+- set: ProjectBOMService，固定几条集合查询（物料行流式读取）+ 一次批量（分块）价格查询
+
+数据库以模拟会话代替，每次往返固定延迟 RTT（默认 1ms），用于衡量往返次数对延迟的
+影响；行数据的传输与解析成本两种方式相同，不计入。
+
+运行方式: cd backend && python -m scripts.benchmark_project_bom [products] [lines] [rtt_ms] [max_ms]
+"""
+import asyncio
+import sys
+import os
+import time
+from contextlib import asynccontextmanager
+from decimal import Decimal
+from types import SimpleNamespace
+
+# 添加项目路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import create_engine
+
+from app.services.master_data_lookup import MasterDataLookupService
+from app.services.project_bom_service import (
+    ProjectBOMService, material_line_data, process_line_data,
+)
+
+
+def build_project(products: int, lines: int) -> dict:
+    """生成项目数据：每个产品 lines / products 行物料、10 道工序."""
+    per_product = lines // products
+    product_rows = [
+        SimpleNamespace(id=f"prod-{p:03d}", product_name=f"产品{p}", product_code=f"PRD-{p:03d}")
+        for p in range(products)
+    ]
+    material_rows = [
+        SimpleNamespace(
+            project_product_id=product.id, material_id=f"M-{(p * per_product + i) % 5000:05d}",
+            part_number=f"P-{i:05d}", material_level=1 + i % 3, version="01",
+            stock_status="N", material_name=f"零件{i}", material_type="I",
+            supplier="供应商A", quantity=Decimal("2.000"), unit="PC", remarks="",
+        )
+        for p, product in enumerate(product_rows)
+        for i in range(per_product)
+    ]
+    process_rows = [
+        SimpleNamespace(
+            project_product_id=product.id, process_code=f"OP{i * 10}", sequence_order=i,
+            cycle_time_std=60, cycle_time=None, std_cost=Decimal("1.5"),
+            vave_cost=None, remarks=None,
+        )
+        for product in product_rows
+        for i in range(10)
+    ]
+    return {"products": product_rows, "materials": material_rows, "processes": process_rows}
+
+
+class SimulatedDB:
+    """模拟数据库：会话与引擎共享往返计数，每次 execute 休眠 RTT."""
+
+    def __init__(self, data: dict, rtt: float):
+        self.data = data
+        self.rtt = rtt
+        self.round_trips = 0
+        self.sync_engine = create_engine("sqlite://")
+
+    async def execute(self, statement):
+        self.round_trips += 1
+        await asyncio.sleep(self.rtt)
+        table = statement.get_final_froms()[0].name
+        params = list(statement.compile().params.values())
+        # 旧实现按单个产品 ID 过滤；集合查询的参数是项目 ID（子查询）
+        per_product = bool(params) and str(params[0]).startswith("prod-")
+        if table == "project_products":
+            rows = self.data["products"]
+        elif table == "product_materials":
+            rows = self.data["materials"]
+            if per_product:
+                rows = [r for r in rows if r.project_product_id == params[0]]
+        elif table == "product_processes":
+            rows = self.data["processes"]
+            if per_product:
+                rows = [r for r in rows if r.project_product_id == params[0]]
+        else:  # materials 价格查询
+            rows = [
+                SimpleNamespace(item_code=code, std_price=Decimal("1.2"), vave_price=None,
+                                supplier_tier=None, category="钢")
+                for code in params[0]
+            ]
+        if statement._distinct:  # SELECT DISTINCT material_id
+            ids = list(dict.fromkeys(r.material_id for r in rows if r.material_id))
+            return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: ids))
+        return SimpleNamespace(all=lambda: rows, scalars=lambda: SimpleNamespace(all=lambda: rows))
+
+    async def stream(self, statement):
+        result = await self.execute(statement)
+
+        async def rows():
+            for row in result.all():
+                yield row
+
+        return rows()
+
+    async def rollback(self):
+        pass
+
+    @asynccontextmanager
+    async def connect(self):
+        yield self
+
+
+async def load_n_plus_1(db: SimulatedDB, lookup: MasterDataLookupService, project_id: str):
+    """旧实现的查询模式."""
+    from sqlalchemy import select
+    from app.models.product_material import ProductMaterial
+    from app.models.product_process import ProductProcess
+    from app.models.project_product import ProjectProduct
+
+    products = (await db.execute(
+        select(ProjectProduct).where(ProjectProduct.project_id == project_id)
+    )).scalars().all()
+    products_data = []
+    for product in products:
+        materials = (await db.execute(
+            select(ProductMaterial).where(ProductMaterial.project_product_id == product.id)
+        )).scalars().all()
+        processes = (await db.execute(
+            select(ProductProcess).where(ProductProcess.project_product_id == product.id)
+        )).scalars().all()
+        materials_data = []
+        for idx, m in enumerate(materials):
+            price_data = {}
+            if m.material_id:
+                price_data = (await lookup.lookup_materials([m.material_id])).get(m.material_id, {})
+            materials_data.append(material_line_data(idx, m, price_data))
+        products_data.append({
+            "productId": product.id,
+            "materials": materials_data,
+            "processes": [process_line_data(idx, p) for idx, p in enumerate(processes)],
+        })
+    return products_data
+
+
+async def main():
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    lines = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    rtt = (float(sys.argv[3]) if len(sys.argv) > 3 else 1.0) / 1000
+    max_ms = float(sys.argv[4]) if len(sys.argv) > 4 else 1000.0
+
+    data = build_project(products, lines)
+    print(f"项目: {products} 个产品, {len(data['materials'])} 行物料, RTT {rtt * 1000:.1f}ms")
+
+    results = {}
+    for name in ("n+1", "set"):
+        db = SimulatedDB(data, rtt)
+        lookup = MasterDataLookupService(db)
+        start = time.perf_counter()
+        if name == "n+1":
+            loaded = await load_n_plus_1(db, lookup, "project-1")
+        else:
+            loaded = await ProjectBOMService(db, lookup).get_products("project-1")
+        elapsed = (time.perf_counter() - start) * 1000
+        results[name] = elapsed
+        lines_loaded = sum(len(p["materials"]) for p in loaded)
+        print(f"  {name:4s}: {elapsed:9.1f} ms, {db.round_trips:6d} 次往返, {lines_loaded} 行")
+
+    print(f"加速比: {results['n+1'] / results['set']:.1f}x")
+    assert results["set"] <= max_ms, f"集合查询耗时 {results['set']:.1f}ms 超过 {max_ms:.0f}ms"
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,15 +2,23 @@
 import pytest
 import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
+from sqlalchemy import create_engine
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from datetime import datetime
 from decimal import Decimal
 from typing import AsyncGenerator, Generator
 import uuid
 
+from redis.exceptions import ConnectionError as RedisConnectionError
+
 from app.main import app
 from app.db.session import Base, get_db
 from app.models import Project, Material, ProcessRate, ProjectStatus
+from app.models.product_material import ProductMaterial
+from app.models.product_process import ProductProcess
+from app.models.project_product import ProjectProduct
+from app.models.quote_summary import QuoteSummary
+from app.services.cache_service import CacheService
 
 
 # 测试数据库 URL
@@ -28,6 +36,111 @@ async_session = async_sessionmaker(
 )
 
 
+class FakeRedisCache(CacheService):
+    """内存版 CacheService（键与 Redis 相同，如 material:A-1），fail=True 时模拟 Redis 不可用.
+
+    可用状态（available / mark_down）沿用 CacheService 的实现。
+    """
+
+    def __init__(self, data: dict | None = None, fail: bool = False):
+        super().__init__()
+        self.data = dict(data or {})
+        self.fail = fail
+
+    def _check(self) -> None:
+        if self.fail:
+            raise RedisConnectionError("redis down")
+
+    async def _get(self, key: str):
+        self._check()
+        return self.data.get(key)
+
+    async def _set(self, key: str, value) -> None:
+        self._check()
+        self.data[key] = value
+
+    async def _delete(self, key: str) -> None:
+        self._check()
+        self.data.pop(key, None)
+
+    async def get_many(self, prefix, keys):
+        self._check()
+        return {k: self.data[f"{prefix}:{k}"] for k in keys if f"{prefix}:{k}" in self.data}
+
+    async def set_many(self, prefix, data, ttl):
+        self._check()
+        self.data.update({f"{prefix}:{k}": v for k, v in data.items()})
+
+    async def delete_many(self, prefix, keys):
+        for key in keys:
+            await self._delete(f"{prefix}:{key}")
+
+    async def get_bom_parse(self, cache_key):
+        return await self._get(f"bom_parse:{cache_key}")
+
+    async def set_bom_parse(self, cache_key, data):
+        await self._set(f"bom_parse:{cache_key}", data)
+
+    async def get_bom_preview(self, token):
+        return await self._get(f"bom_preview:{token}")
+
+    async def set_bom_preview(self, token, data):
+        await self._set(f"bom_preview:{token}", data)
+
+    async def delete_bom_preview(self, token):
+        await self._delete(f"bom_preview:{token}")
+
+
+@pytest.fixture
+def fake_cache() -> FakeRedisCache:
+    """内存版缓存服务."""
+    return FakeRedisCache()
+
+
+@pytest.fixture
+def unavailable_cache() -> FakeRedisCache:
+    """Redis 不可用的缓存服务."""
+    return FakeRedisCache(fail=True)
+
+
+class SQLiteSession:
+    """在内存 SQLite 上同步执行语句的会话（项目 / 产品 / BOM 行 / 报价汇总表），
+    记录语句数和提交次数."""
+
+    def __init__(self):
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(self.engine, tables=[
+            Project.__table__, ProjectProduct.__table__, ProductMaterial.__table__,
+            ProductProcess.__table__, QuoteSummary.__table__,
+        ])
+        self.conn = self.engine.connect()
+        self.statements = 0
+        self.commits = 0
+
+    async def execute(self, statement, params=None):
+        self.statements += 1
+        return self.conn.execute(statement, params)
+
+    async def commit(self):
+        self.commits += 1
+        self.conn.commit()
+
+    async def rollback(self):
+        self.conn.rollback()
+
+    def close(self) -> None:
+        self.conn.close()
+        self.engine.dispose()
+
+
+@pytest.fixture
+def sqlite_session() -> Generator[SQLiteSession, None, None]:
+    """内存 SQLite 会话（无需 MySQL 即可验证真实 SQL）."""
+    session = SQLiteSession()
+    yield session
+    session.close()
+
+
 @pytest.fixture(scope="session")
 def event_loop() -> Generator:
     """创建事件循环（session 作用域）"""
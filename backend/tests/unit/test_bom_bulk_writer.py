@@ -0,0 +1,69 @@
+"""BOM 批量写入服务单元测试."""
+
+from app.schemas.bom import MaterialSchema, ProductBOMResultSchema, ProductInfoSchema
+from app.services.bom_bulk_writer import BOMBulkWriter
+
+
+class FakeSession:
+    """记录 executemany 批次和提交."""
+
+    def __init__(self):
+        self.batches = []
+        self.commits = 0
+
+    async def execute(self, statement, params=None):
+        self.batches.append((statement.table.name, list(params)))
+
+    async def commit(self):
+        self.commits += 1
+
+
+def make_product(code: str, lines: int) -> ProductBOMResultSchema:
+    return ProductBOMResultSchema(
+        product_info=ProductInfoSchema(product_code=code, product_name=f"产品{code}"),
+        materials=[
+            MaterialSchema(
+                level="1", part_number=f"{code}-{i}", part_name="零件", version="01",
+                type="I", status="N", material="", supplier="", quantity=1,
+                unit="PC", comments="",
+            )
+            for i in range(lines)
+        ],
+        processes=[],
+    )
+
+
+class TestBOMBulkWriter:
+    """批量写入测试."""
+
+    async def test_rows_are_written_in_executemany_batches(self):
+        db = FakeSession()
+        writer = BOMBulkWriter(db, batch_size=4, commit_rows=0)
+
+        created = await writer.create_products("project-1", [make_product("A", 7), make_product("B", 3)])
+
+        tables = [(table, len(rows)) for table, rows in db.batches]
+        assert tables == [
+            ("project_products", 2),
+            ("product_materials", 4),
+            ("product_materials", 4),
+            ("product_materials", 2),
+        ]
+        material_rows = [row for table, rows in db.batches if table == "product_materials" for row in rows]
+        assert len({row["id"] for row in material_rows}) == 10
+        assert {row["project_product_id"] for row in material_rows} == {p["id"] for p in created}
+        assert [p["material_count"] for p in created] == [7, 3]
+        assert db.commits == 0
+        assert writer.stats.rows == 12
+        assert writer.stats.to_dict()["rows_per_sec"] > 0
+
+    async def test_chunked_commits(self):
+        db = FakeSession()
+        writer = BOMBulkWriter(db, batch_size=5, commit_rows=10)
+
+        await writer.create_products("project-1", [make_product("A", 25)])
+
+        # 1 个产品批次 + 5 个物料批次（共 26 行），每累计 >= 10 行提交一次
+        assert db.commits == 2
+        assert writer.stats.commits == 2
+        assert writer.stats.batches == 6
@@ -0,0 +1,81 @@
+"""BOM 后台导入任务单元测试."""
+
+import asyncio
+
+from app.services.bom_import_jobs import (
+    JOB_COMPLETED,
+    JOB_FAILED,
+    STAGE_LOOKUP,
+    STAGE_PARSE,
+    BOMImportJobStore,
+)
+
+
+class TestBOMImportJobStore:
+    """进程内任务表测试."""
+
+    async def test_pipeline_progress_and_result(self):
+        """流水线进度累加，完成后保存结果."""
+        store = BOMImportJobStore()
+        job = store.create("p1", "bom.xlsx")
+
+        async def pipeline(progress):
+            progress(STAGE_PARSE, rows_parsed=10)
+            progress(STAGE_LOOKUP, rows_parsed=5, material_lookups=3)
+            return {"status": "completed"}
+
+        await store.submit(job, pipeline)
+
+        assert job.status == JOB_COMPLETED
+        assert job.stage == STAGE_LOOKUP
+        assert job.progress["rows_parsed"] == 15
+        assert job.progress["material_lookups"] == 3
+        assert job.to_dict(include_result=True)["result"] == {"status": "completed"}
+        assert store.get(job.id) is job
+
+    async def test_pipeline_failure_is_recorded(self):
+        store = BOMImportJobStore()
+        job = store.create("p1", None)
+
+        async def pipeline(progress):
+            raise ValueError("文件格式错误")
+
+        await store.submit(job, pipeline)
+
+        assert job.status == JOB_FAILED
+        assert job.error == "文件格式错误"
+        assert job.finished_at is not None
+
+    async def test_wait_for_change_wakes_subscribers(self):
+        """订阅者在进度更新时被唤醒，无更新时超时返回 False."""
+        store = BOMImportJobStore()
+        job = store.create("p1", None)
+        version = job.version
+
+        assert await store.wait_for_change(job, version, timeout=0.01) is False
+
+        waiter = asyncio.create_task(store.wait_for_change(job, version, timeout=5))
+        await asyncio.sleep(0)
+        store.advance(job, STAGE_PARSE, rows_parsed=1)
+
+        assert await waiter is True
+
+    async def test_finished_jobs_are_evicted(self):
+        """已结束任务超过保留时间或数量上限时被清理，运行中的任务保留."""
+        store = BOMImportJobStore(ttl=3600, max_jobs=2)
+        running = store.create("p1", None)
+        finished = store.create("p1", None)
+        store.update(finished, status=JOB_COMPLETED, finished_at=1.0)
+
+        newest = store.create("p1", None)
+
+        assert store.get(finished.id) is None
+        assert store.get(running.id) is running
+        assert store.get(newest.id) is newest
+
+    async def test_expired_jobs_are_evicted(self):
+        store = BOMImportJobStore(ttl=0)
+        job = store.create("p1", None)
+        store.update(job, status=JOB_COMPLETED, finished_at=1.0)
+
+        assert store.get(job.id) is None
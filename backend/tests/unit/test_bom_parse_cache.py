@@ -0,0 +1,114 @@
+"""BOM 解析结果缓存单元测试."""
+
+import os
+import pytest
+
+from app.config import Settings
+from app.services.bom_parser import MultiProductBOMParser, BOMParser
+from app.services.bom_parse_cache import (
+    BOMParseCache,
+    content_cache_key,
+    dump_multi_result,
+    load_multi_result,
+    parse_cache_stats,
+)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+BOM_FILES_DIR = os.path.join(PROJECT_ROOT, "tests", "files")
+
+
+@pytest.fixture
+def bom_content():
+    """读取多产品 BOM 测试文件."""
+    with open(os.path.join(BOM_FILES_DIR, "W04_BOM_.xlsx"), "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def settings(tmp_path):
+    return Settings(BOM_PARSE_CACHE_DIR=str(tmp_path))
+
+
+class TestCacheKey:
+    """缓存键测试."""
+
+    def test_key_depends_on_content_and_kind(self):
+        """不同内容或解析器类型生成不同的键."""
+        assert content_cache_key(b"a", "multi") == content_cache_key(b"a", "multi")
+        assert content_cache_key(b"a", "multi") != content_cache_key(b"b", "multi")
+        assert content_cache_key(b"a", "multi") != content_cache_key(b"a", "single")
+
+
+class TestSerialization:
+    """解析结果序列化测试."""
+
+    def test_multi_result_roundtrip(self, bom_content):
+        """多产品解析结果序列化后可完整还原."""
+        import json
+
+        result = MultiProductBOMParser(max_workers=1).parse_excel_file(bom_content)
+
+        restored = load_multi_result(json.loads(json.dumps(dump_multi_result(result))))
+
+        assert restored == result
+
+
+class TestBOMParseCache:
+    """缓存读写与计数测试."""
+
+    async def test_parse_multi_hits_after_first_parse(self, bom_content, settings, fake_cache):
+        """第二次解析同一文件命中缓存."""
+        cache = BOMParseCache(cache=fake_cache, settings=settings)
+        hits, misses = parse_cache_stats["hits"], parse_cache_stats["misses"]
+
+        first = await cache.parse_multi(bom_content)
+        second = await cache.parse_multi(bom_content)
+
+        assert second == first
+        assert parse_cache_stats["misses"] == misses + 1
+        assert parse_cache_stats["hits"] == hits + 1
+
+    async def test_falls_back_to_disk_when_redis_unavailable(
+        self, bom_content, settings, tmp_path, unavailable_cache
+    ):
+        """Redis 不可用时写入并读取磁盘缓存."""
+        cache = BOMParseCache(cache=unavailable_cache, settings=settings)
+
+        first = await cache.parse_single(bom_content)
+        hits = parse_cache_stats["hits"]
+        second = await cache.parse_single(bom_content)
+
+        assert second == first == BOMParser().parse_excel_file(bom_content)
+        assert parse_cache_stats["hits"] == hits + 1
+        assert len(list(tmp_path.glob("*.json"))) == 1
+
+    async def test_oversized_file_is_not_cached(self, bom_content, tmp_path, fake_cache):
+        """超过大小上限的文件不写缓存."""
+        settings = Settings(BOM_PARSE_CACHE_DIR=str(tmp_path), BOM_PARSE_CACHE_MAX_BYTES=10)
+        cache = BOMParseCache(cache=fake_cache, settings=settings)
+
+        await cache.parse_multi(bom_content)
+
+        assert fake_cache.data == {}
+
+    async def test_skips_redis_after_failure(self, bom_content, settings, unavailable_cache):
+        """Redis 失败后在重试间隔内直接使用磁盘缓存."""
+        cache = BOMParseCache(cache=unavailable_cache, settings=settings)
+        await cache.parse_multi(bom_content)
+        unavailable_cache.fail = False
+
+        await cache.parse_multi(bom_content)
+
+        assert not unavailable_cache.available
+        assert unavailable_cache.data == {}
+
+    async def test_disk_cache_stays_in_cache_dir(self, settings, tmp_path, unavailable_cache):
+        """带路径分隔符的文件名不会让磁盘缓存写出 cache_dir."""
+        cache = BOMParseCache(cache=unavailable_cache, settings=settings)
+        content = "Part Number,Qty\nP-1,2\n".encode()
+
+        first = await cache.parse_multi(content, "../../outside/bom.csv")
+        second = await cache.parse_multi(content, "../../outside/bom.csv")
+
+        assert second == first
+        assert [p.parent for p in tmp_path.rglob("*.json")] == [tmp_path]
@@ -668,3 +668,405 @@ class TestRealBOMFilesMultiple:
             result = parser.parse_excel_file(content)
 
             assert len(result.materials) > 0, f"{bom_path} 应该包含物料"
+
+
+class TestBOMParserStreaming:
+    """流式解析模式测试."""
+
+    @pytest.fixture
+    def large_bom_content(self):
+        """生成包含 2500 行物料的 BOM 文件."""
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "BOM"
+        ws.append(["Level", "Part Number", "Part Name", "Ver.", "Typ", "St", "Material", "Supplier", "Qty", "Unit", "Comments"])
+        for i in range(2500):
+            ws.append(["1", f"PN-{i:05d}", f"零件{i}", "01", "I", "N", "钢", "供应商A", i % 7 + 1, "PC", ""])
+
+        output = BytesIO()
+        wb.save(output)
+        return output.getvalue()
+
+    def test_iter_batches_splits_rows(self):
+        """iter_batches 按固定大小分批，最后一批可不足."""
+        from app.services.bom_parser import iter_batches
+
+        batches = list(iter_batches(range(7), 3))
+
+        assert batches == [[0, 1, 2], [3, 4, 5], [6]]
+
+    def test_iter_excel_file_yields_bounded_batches(self, large_bom_content):
+        """流式解析每批不超过 batch_size."""
+        parser = BOMParser()
+
+        batches = list(parser.iter_excel_file(large_bom_content, batch_size=1000))
+
+        assert [len(batch) for _, batch in batches] == [1000, 1000, 500]
+        assert all(sheet_type == "material" for sheet_type, _ in batches)
+
+    def test_streaming_matches_list_api(self, large_bom_content):
+        """流式结果与列表 API 完全一致."""
+        parser = BOMParser()
+
+        streamed = [m for _, batch in parser.iter_excel_file(large_bom_content, batch_size=300) for m in batch]
+
+        assert streamed == parser.parse_excel_file(large_bom_content).materials
+
+    def test_multi_product_stream_counts_materials(self, large_bom_content):
+        """多产品流式解析在消费完批次后累加物料数."""
+        from app.services.bom_parser import MultiProductBOMParser
+
+        parser = MultiProductBOMParser()
+        streams = parser.iter_products(large_bom_content, batch_size=1000)
+        product = next(streams)
+
+        assert product.product_info.material_count == 0
+        total = sum(len(batch) for batch in product.material_batches)
+
+        assert total == 2500
+        assert product.product_info.material_count == 2500
+
+
+class TestMultiProductParallelParsing:
+    """多产品 BOM 进程池并行解析测试."""
+
+    @pytest.fixture
+    def multi_product_content(self):
+        """读取多产品 BOM 测试文件."""
+        bom_path = os.path.join(BOM_FILES_DIR, "W04_BOM_.xlsx")
+        if not os.path.exists(bom_path):
+            pytest.skip("多产品 BOM 测试文件不存在")
+        with open(bom_path, "rb") as f:
+            return f.read()
+
+    def test_parallel_result_matches_serial(self, multi_product_content):
+        """并行解析结果与串行一致，且保持 sheet 顺序."""
+        from app.services.bom_parser import MultiProductBOMParser
+
+        serial = MultiProductBOMParser(max_workers=1).parse_excel_file(multi_product_content)
+        parallel = MultiProductBOMParser(max_workers=3).parse_excel_file(multi_product_content)
+
+        assert parallel == serial
+        assert parallel.total_products > 1
+
+    def test_pool_shared_across_parses(self, multi_product_content, monkeypatch):
+        """多次解析复用同一个进程池，关闭后下次使用重新创建."""
+        from app.services import bom_parser
+        from app.services.bom_parser import MultiProductBOMParser
+
+        monkeypatch.setattr(bom_parser.get_settings(), "BOM_PARSE_WORKERS", 2)
+        bom_parser.shutdown_parse_pool()
+        try:
+            first = MultiProductBOMParser(max_workers=2).parse_excel_file(multi_product_content)
+            pool = bom_parser.get_parse_pool()
+            second = MultiProductBOMParser(max_workers=2).parse_excel_file(multi_product_content)
+
+            assert second == first
+            assert bom_parser.get_parse_pool() is pool
+            assert pool._max_workers == 2
+        finally:
+            bom_parser.shutdown_parse_pool()
+        assert bom_parser._parse_pool is None
+
+    def test_worker_count_defaults_to_settings(self):
+        """未指定 max_workers 时使用配置值."""
+        from app.config import get_settings
+        from app.services.bom_parser import MultiProductBOMParser
+
+        assert MultiProductBOMParser().max_workers == get_settings().BOM_PARSE_WORKERS
+
+
+class TestSheetHead:
+    """工作表头部缓冲测试."""
+
+    @pytest.fixture
+    def worksheet(self):
+        """生成 25 行的只读工作表."""
+        wb = Workbook()
+        ws = wb.active
+        for i in range(1, 26):
+            ws.append([f"R{i}", i])
+        output = BytesIO()
+        wb.save(output)
+        from openpyxl import load_workbook
+        return load_workbook(BytesIO(output.getvalue()), read_only=True).active
+
+    def test_head_buffers_first_rows(self, worksheet):
+        """头部缓冲只保存前 N 行."""
+        from app.services.bom_parser import SheetHead
+
+        head = SheetHead(worksheet, head_rows=10)
+
+        assert len(head.rows) == 10
+        assert head.row(1) == ("R1", 1)
+        assert head.row(11) == ()
+
+    def test_iter_rows_continues_after_head(self, worksheet):
+        """数据行从头部之后继续流式读取，行号对齐."""
+        from app.services.bom_parser import SheetHead
+
+        head = SheetHead(worksheet, head_rows=10)
+
+        assert [r[1] for r in head.iter_rows(min_row=4)] == list(range(4, 26))
+
+    def test_iter_rows_min_row_beyond_head(self, worksheet):
+        """min_row 超过头部时跳过对应行."""
+        from app.services.bom_parser import SheetHead
+
+        head = SheetHead(worksheet, head_rows=5)
+
+        assert [r[1] for r in head.iter_rows(min_row=12)] == list(range(12, 26))
+
+    def test_iter_rows_second_call_rereads(self, worksheet):
+        """剩余行迭代器消费后再次调用仍返回完整数据."""
+        from app.services.bom_parser import SheetHead
+
+        head = SheetHead(worksheet, head_rows=5)
+        first = list(head.iter_rows(min_row=2))
+
+        assert list(head.iter_rows(min_row=2)) == first
+
+
+class TestColumnMappingProfiles:
+    """列映射模板（按表头签名）测试."""
+
+    HEADER = ["编号", "料号", "描述", "修订", "类别", "状态", "材质", "厂商", "用量", "计量", "说明"]
+
+    @pytest.fixture
+    def custom_content(self):
+        """关键字检测无法识别的客户表头格式."""
+        wb = Workbook()
+        ws = wb.active
+        ws.append(["BOM"])
+        ws.append(self.HEADER)
+        ws.append(["1", "P-001", "壳体", "A", "I", "N", "铝", "供应商A", 3, "PC", ""])
+        output = BytesIO()
+        wb.save(output)
+        return output.getvalue()
+
+    @pytest.fixture
+    def profiles(self):
+        from app.services.bom_parser import ColumnMapping, header_signature
+
+        mapping = ColumnMapping(*range(11))
+        return {header_signature(self.HEADER): mapping}
+
+    def test_signature_normalizes_case_and_whitespace(self):
+        """签名忽略大小写、多余空白和尾部空列."""
+        from app.services.bom_parser import header_signature
+
+        assert header_signature(["Part  Number", " Qty "]) == header_signature(["part number", "QTY", None, ""])
+        assert header_signature(["Part Number"]) != header_signature(["Part Name"])
+        assert header_signature([None, ""]) is None
+
+    def test_profile_overrides_detection(self, custom_content, profiles):
+        """表头签名命中模板时使用模板映射."""
+        default = BOMParser(profiles={}).parse_excel_file(custom_content)
+        result = BOMParser(profiles=profiles).parse_excel_file(custom_content)
+
+        # 关键字检测失败时回退默认映射，表头行被误当作物料
+        assert default.materials[0].part_number == "料号"
+        assert len(result.materials) == 1
+        assert result.materials[0].part_number == "P-001"
+        assert result.materials[0].quantity == 3.0
+        assert result.materials[0].version == "A"
+
+    def test_parallel_workers_receive_profiles(self, custom_content, profiles):
+        """进程池 worker 使用传入的模板."""
+        from app.services.bom_parser import MultiProductBOMParser
+
+        wb = Workbook()
+        for name in ("A", "B"):
+            ws = wb.create_sheet(name)
+            ws.append(["Bill of Material"])
+            ws.append(self.HEADER)
+            ws.append(["1", f"P-{name}", "", "", "", "", "", "", 1, "PC", ""])
+        output = BytesIO()
+        wb.save(output)
+
+        result = MultiProductBOMParser(max_workers=2, profiles=profiles).parse_excel_file(output.getvalue())
+
+        assert [p.materials[0].part_number for p in result.products] == ["P-A", "P-B"]
+
+    def test_registry_replace_changes_version(self, profiles):
+        """注册表替换后版本号变化，解析器默认使用注册表快照."""
+        from app.services.bom_parser import ColumnMappingRegistry
+
+        registry = ColumnMappingRegistry()
+        assert registry.version == "0"
+
+        registry.replace(profiles)
+
+        assert registry.version != "0"
+        assert registry.get(next(iter(profiles))) == next(iter(profiles.values()))
+        assert registry.get(None) is None
+
+
+class TestMaterialBatch:
+    """紧凑列式物料集合测试."""
+
+    @pytest.fixture
+    def materials(self):
+        return [
+            ParsedMaterial(
+                level=str(1 + i % 3), part_number=f"P-{i:03d}", part_name=f"零件{i}",
+                version="01", type="I", status="N", material="钢",
+                supplier=f"供应商{i % 2}", quantity=float(i % 4), unit="PC", comments="",
+            )
+            for i in range(25)
+        ]
+
+    def test_row_view_matches_parsed_materials(self, materials):
+        """按下标、负下标、切片和迭代访问与原列表一致."""
+        from app.services.bom_parser import MaterialBatch
+
+        batch = MaterialBatch(materials)
+
+        assert len(batch) == 25
+        assert list(batch) == materials
+        assert batch == materials
+        assert batch[3] == materials[3]
+        assert batch[-1] == materials[-1]
+        assert batch[5:8] == materials[5:8]
+        assert batch[3].part_number == "P-003"
+        with pytest.raises(IndexError):
+            batch[25]
+
+    def test_repeated_values_are_interned(self, materials):
+        """重复字符串只保存一份，数量存为 array('d')."""
+        from app.services.bom_parser import MaterialBatch
+
+        batch = MaterialBatch(materials)
+
+        # 25 个零件号 + 25 个名称 + 层级/版本/类型/状态/材料/供应商/单位/备注的去重值
+        assert len(batch._strings) < 25 * 2 + 15
+        assert batch.quantities.typecode == "d"
+        assert batch.column("supplier") == [m.supplier for m in materials]
+        assert batch.column("quantity") == [m.quantity for m in materials]
+
+    def test_extend_and_pickle(self, materials):
+        """构建后继续追加，序列化后可还原."""
+        import pickle
+        from app.services.bom_parser import MaterialBatch
+
+        batch = MaterialBatch(materials[:10])
+        batch.extend(materials[10:])
+        batch.append(materials[0])
+
+        restored = pickle.loads(pickle.dumps(batch))
+
+        assert restored == materials + materials[:1]
+
+    def test_multi_product_results_use_batches(self):
+        """多产品解析结果以 MaterialBatch 存储物料."""
+        from app.services.bom_parser import MaterialBatch, MultiProductBOMParser
+
+        bom_path = os.path.join(BOM_FILES_DIR, "W04_BOM_.xlsx")
+        with open(bom_path, "rb") as f:
+            result = MultiProductBOMParser(max_workers=1).parse_excel_file(f.read())
+
+        assert all(isinstance(p.materials, MaterialBatch) for p in result.products)
+        assert sum(len(p.materials) for p in result.products) == result.total_materials
+
+
+class TestBOMTree:
+    """BOM 层级树与成本汇总测试."""
+
+    @staticmethod
+    def make(level: str, part_number: str, quantity: float) -> ParsedMaterial:
+        return ParsedMaterial(
+            level=level, part_number=part_number, part_name="", version="01",
+            type="I", status="N", material="", supplier="", quantity=quantity,
+            unit="PC", comments="",
+        )
+
+    @pytest.fixture
+    def materials(self):
+        """两个父项下重复出现同一子装配 SUB（含两个零件）."""
+        return [
+            self.make("1", "A", 2),
+            self.make("2", "SUB", 3),
+            self.make("3", "X", 4),
+            self.make("3", "Y", 1),
+            self.make("1", "B", 1),
+            self.make("2", "SUB", 5),
+            self.make("3", "X", 4),
+            self.make("3", "Y", 1),
+            self.make("1", "C", 10),
+        ]
+
+    def test_parse_level(self):
+        from app.services.bom_parser import parse_bom_level
+
+        assert parse_bom_level("2") == 2
+        assert parse_bom_level("..3") == 3
+        assert parse_bom_level("...") == 3
+        assert parse_bom_level("") == 1
+        assert parse_bom_level("abc") == 1
+        assert parse_bom_level("0") == 0
+        assert parse_bom_level("-1") == 0
+
+    def test_zero_based_levels(self, materials):
+        """从 0 编号的 BOM：0 级顶层总成是 1 级行的父项，展开数量乘以总成数量."""
+        from app.services.bom_parser import build_bom_tree
+
+        tree = build_bom_tree([self.make("0", "TOP", 2), *materials])
+
+        assert [c.material.part_number for c in tree.root.children] == ["TOP"]
+        assert [c.material.part_number for c in tree.nodes[0].children] == ["A", "B", "C"]
+        assert tree.extended_quantities() == [2, 4, 12, 48, 12, 2, 10, 40, 10, 20]
+
+    def test_links_and_extended_quantities(self, materials):
+        from app.services.bom_parser import build_bom_tree
+
+        tree = build_bom_tree(materials)
+
+        assert [c.material.part_number for c in tree.root.children] == ["A", "B", "C"]
+        assert tree.nodes[2].parent is tree.nodes[1]
+        assert tree.nodes[1].parent is tree.nodes[0]
+        # X: 2 × 3 × 4 / 1 × 5 × 4
+        assert tree.extended_quantities() == [2, 6, 24, 6, 1, 5, 20, 5, 10]
+
+    def test_repeated_subassembly_shares_hash(self, materials):
+        from app.services.bom_parser import build_bom_tree
+
+        tree = build_bom_tree(materials)
+
+        assert tree.nodes[1].subtree_hash == tree.nodes[5].subtree_hash
+        assert tree.nodes[0].subtree_hash != tree.nodes[4].subtree_hash
+
+    def test_rollup_matches_flat_extended_sum_and_memoizes(self, materials):
+        from app.services.bom_parser import SubassemblyRollup, build_bom_tree
+
+        prices = {"X": 1.5, "Y": 2.0, "C": 0.1}
+        calls = []
+
+        def unit_price(m):
+            calls.append(m.part_number)
+            return prices.get(m.part_number)
+
+        tree = build_bom_tree(materials)
+        rollup = SubassemblyRollup(unit_price)
+        total = rollup.total_cost(tree)
+
+        flat = sum(
+            node.extended_quantity * prices.get(node.material.part_number, 0)
+            for node in tree.nodes
+        )
+        assert total == pytest.approx(flat)
+        # SUB 子树（SUB/X/Y）只计算一次
+        assert calls.count("SUB") == 1
+        assert calls.count("X") == 1
+
+        # 同一次上传中的另一个产品复用已汇总的子装配
+        rollup.total_cost(build_bom_tree(materials[4:8]))
+        assert calls.count("SUB") == 1
+        assert rollup.reused > 0
+
+    def test_deep_bom_does_not_recurse(self):
+        from app.services.bom_parser import SubassemblyRollup, build_bom_tree
+
+        deep = [self.make(str(i + 1), f"P{i}", 1) for i in range(5000)]
+        tree = build_bom_tree(deep)
+
+        assert SubassemblyRollup(lambda m: 1.0).total_cost(tree) == 5000
@@ -0,0 +1,131 @@
+"""BOM 预览令牌单元测试."""
+
+import pytest
+
+from app.config import Settings
+from app.schemas.bom import BOMConfirmCreateRequest, BOMMaterialEdit
+from app.services.bom_parser import (
+    MaterialBatch,
+    MultiProductBOMParseResult,
+    ParsedMaterial,
+    ParsedProcess,
+    ProductBOMResult,
+    ProductInfo,
+)
+from app.services.bom_preview_store import (
+    BOMPreviewEditError,
+    BOMPreviewStore,
+    apply_material_edits,
+)
+from app.services.bom_revision import material_columns
+
+
+def material(part_number: str, quantity: float = 1.0) -> ParsedMaterial:
+    return ParsedMaterial("1", part_number, "零件", "01", "I", "N", "", "", quantity, "PC", "")
+
+
+def product(code: str, *part_numbers: str) -> ProductBOMResult:
+    return ProductBOMResult(
+        product_info=ProductInfo(
+            product_code=code, product_name=None, product_number=None,
+            product_version="01", customer_version="01", customer_number=None,
+            issue_date=None, material_count=len(part_numbers),
+        ),
+        materials=MaterialBatch(material(p) for p in part_numbers),
+        processes=[ParsedProcess("10", "焊接", "WC1", 0.5, None)],
+    )
+
+
+def preview_result() -> MultiProductBOMParseResult:
+    return MultiProductBOMParseResult(
+        products=[product("P1", "A", "B", "C"), product("P2", "X")],
+        total_products=2,
+        total_materials=4,
+        parse_warnings=[],
+    )
+
+
+def edit(**data) -> BOMMaterialEdit:
+    return BOMMaterialEdit.model_validate(data)
+
+
+class TestApplyMaterialEdits:
+    """用户修改应用测试."""
+
+    def test_update_delete_insert_by_original_index(self):
+        preview = preview_result().products
+        products = apply_material_edits(preview, [
+            edit(productCode="P1", index=0, values={"quantity": 3}),
+            edit(productCode="P1", index=1, action="delete"),
+            edit(productCode="P1", index=2, action="insert", values={
+                "level": "2", "partNumber": "NEW", "partName": "新零件", "version": "01",
+                "type": "B", "status": "N", "material": "", "supplier": "",
+                "quantity": 2, "unit": "PC", "comments": "",
+            }),
+            edit(productCode="P1", index=3, action="insert", values=material("END")._asdict()),
+        ])
+
+        p1, p2 = products
+        assert [m.part_number for m in p1.materials] == ["A", "NEW", "C", "END"]
+        assert p1.materials[0].quantity == 3.0
+        assert p1.product_info.material_count == 4
+        assert material_columns(p1.materials[1])["material_level"] == 2
+        # 未修改的产品原样返回
+        assert p2 is preview[1]
+
+    def test_invalid_edits(self):
+        with pytest.raises(BOMPreviewEditError):
+            apply_material_edits(preview_result().products, [edit(productCode="P9", index=0)])
+        with pytest.raises(BOMPreviewEditError):
+            apply_material_edits(preview_result().products, [edit(productCode="P2", index=1)])
+        with pytest.raises(BOMPreviewEditError):
+            apply_material_edits(
+                preview_result().products,
+                [edit(productCode="P2", index=0, values={"quantity": "many"})],
+            )
+
+
+class TestBOMPreviewStore:
+    """预览结果存储测试."""
+
+    async def test_save_load_delete(self, tmp_path, fake_cache):
+        store = BOMPreviewStore(fake_cache, Settings(BOM_PARSE_CACHE_DIR=str(tmp_path)))
+
+        token = await store.save("project-1", preview_result())
+        project_id, result = await store.load(token)
+
+        assert project_id == "project-1"
+        assert [p.product_info.product_code for p in result.products] == ["P1", "P2"]
+        assert [m.part_number for m in result.products[0].materials] == ["A", "B", "C"]
+
+        await store.delete(token)
+        assert await store.load(token) is None
+
+    async def test_falls_back_to_disk_when_redis_unavailable(self, tmp_path, unavailable_cache):
+        store = BOMPreviewStore(unavailable_cache, Settings(BOM_PARSE_CACHE_DIR=str(tmp_path)))
+
+        token = await store.save("project-1", preview_result())
+
+        assert (tmp_path / "previews" / f"{token}.json").exists()
+        assert (await store.load(token))[1].total_materials == 4
+
+    async def test_invalid_token(self, tmp_path, fake_cache):
+        store = BOMPreviewStore(fake_cache, Settings(BOM_PARSE_CACHE_DIR=str(tmp_path)))
+        assert await store.load("../../etc/passwd") is None
+
+
+class TestConfirmCreateRequest:
+    def test_requires_exactly_one_source(self):
+        with pytest.raises(ValueError):
+            BOMConfirmCreateRequest.model_validate({"projectId": "p1"})
+        with pytest.raises(ValueError):
+            BOMConfirmCreateRequest.model_validate(
+                {"projectId": "p1", "products": [], "previewToken": "a" * 32}
+            )
+
+        request = BOMConfirmCreateRequest.model_validate(
+            {"projectId": "p1", "previewToken": "a" * 32, "edits": [
+                {"productCode": "P1", "index": 0, "action": "delete"},
+            ]}
+        )
+        assert request.edits[0].action == "delete"
@@ -0,0 +1,104 @@
+"""BOM 版本增量导入单元测试."""
+
+from decimal import Decimal
+
+from app.schemas.bom import MaterialSchema
+from app.services.bom_revision import (
+    content_hash,
+    diff_materials,
+    material_columns,
+)
+
+
+def make_material(part_number: str, quantity: float = 1, **overrides) -> MaterialSchema:
+    data = {
+        "level": "1",
+        "part_number": part_number,
+        "part_name": f"零件{part_number}",
+        "version": "01",
+        "type": "I",
+        "status": "N",
+        "material": "",
+        "supplier": "供应商A",
+        "quantity": quantity,
+        "unit": "PC",
+        "comments": "",
+        **overrides,
+    }
+    return MaterialSchema(**data)
+
+
+def stored_row(row_id: str, material: MaterialSchema) -> dict:
+    """模拟数据库读出的行（数量为 Decimal）."""
+    columns = material_columns(material)
+    columns["quantity"] = Decimal(str(columns["quantity"])).quantize(Decimal("0.001"))
+    return {"id": row_id, **columns}
+
+
+class TestContentHash:
+    """行内容哈希测试."""
+
+    def test_db_representation_matches_parsed(self):
+        """数据库中的 Decimal 数量、None 值与解析行哈希一致."""
+        parsed = material_columns(make_material("P-1", quantity=2, comments=""))
+        stored = {**parsed, "quantity": Decimal("2.000"), "remarks": None}
+
+        assert content_hash(stored) == content_hash(parsed)
+
+    def test_changed_quantity_changes_hash(self):
+        a = material_columns(make_material("P-1", quantity=2))
+        b = material_columns(make_material("P-1", quantity=3))
+
+        assert content_hash(a) != content_hash(b)
+
+
+class TestDiffMaterials:
+    """差异计算测试."""
+
+    def test_only_delta_rows_are_written(self):
+        """新增、修改、删除分别识别，未变化的行不写入."""
+        old = [make_material(f"P-{i}") for i in range(100)]
+        stored = [stored_row(f"id-{i}", m) for i, m in enumerate(old)]
+
+        new = list(old)
+        new[5] = make_material("P-5", quantity=9)          # 修改
+        new[7] = make_material("P-7", supplier="供应商B")    # 修改
+        del new[10]                                          # 删除 P-10
+        new.append(make_material("P-NEW"))                   # 新增
+
+        delta = diff_materials(stored, [material_columns(m) for m in new])
+
+        assert [row["part_number"] for row in delta.inserts] == ["P-NEW"]
+        assert {row["id"] for row in delta.updates} == {"id-5", "id-7"}
+        assert delta.updates[0]["quantity"] == 9
+        assert delta.delete_ids == ["id-10"]
+        assert delta.unchanged == 97
+
+    def test_version_or_level_change_is_delete_plus_insert(self):
+        """匹配键（版本 / 层级）变化视为删除旧行 + 插入新行."""
+        stored = [stored_row("id-1", make_material("P-1", version="01"))]
+
+        delta = diff_materials(stored, [material_columns(make_material("P-1", version="02"))])
+
+        assert len(delta.inserts) == 1
+        assert delta.delete_ids == ["id-1"]
+        assert delta.updates == []
+
+    def test_duplicate_keys_pair_in_order(self):
+        """同一零件出现多次时按顺序配对."""
+        stored = [
+            stored_row("id-a", make_material("P-1", quantity=1)),
+            stored_row("id-b", make_material("P-1", quantity=2)),
+        ]
+        incoming = [
+            material_columns(make_material("P-1", quantity=1)),
+            material_columns(make_material("P-1", quantity=5)),
+            material_columns(make_material("P-1", quantity=7)),
+        ]
+
+        delta = diff_materials(stored, incoming)
+
+        assert delta.unchanged == 1
+        assert [row["id"] for row in delta.updates] == ["id-b"]
+        assert [row["quantity"] for row in delta.inserts] == [7]
+        assert delta.delete_ids == []
@@ -0,0 +1,159 @@
+"""表格类 BOM 文件（CSV / TSV / Arrow / Parquet）解析单元测试."""
+
+import csv
+import io
+import os
+
+import pytest
+from openpyxl import load_workbook
+
+from app.services.bom_parser import MultiProductBOMParser, ParsedMaterial
+from app.services.bom_parse_cache import multi_cache_kind
+from app.services.bom_tabular import TabularBOMParser, is_tabular_file
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+BOM_FILES_DIR = os.path.join(PROJECT_ROOT, "tests", "files")
+
+HEADER = ["Level", "Part Number", "Part Name", "Ver.", "Typ", "St",
+          "Material", "Supplier", "Qty", "Unit", "Comments"]
+
+
+def to_csv(rows: list[list], delimiter: str = ",", encoding: str = "utf-8") -> bytes:
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter=delimiter)
+    for row in rows:
+        writer.writerow(["" if v is None else v for v in row])
+    return buf.getvalue().encode(encoding)
+
+
+@pytest.fixture
+def multi_product_content():
+    """读取多产品 BOM 测试文件."""
+    with open(os.path.join(BOM_FILES_DIR, "W04_BOM_.xlsx"), "rb") as f:
+        return f.read()
+
+
+class TestTabularFileDetection:
+    """文件类型识别测试."""
+
+    def test_is_tabular_file(self):
+        assert is_tabular_file("bom.csv")
+        assert is_tabular_file("BOM.TSV")
+        assert is_tabular_file("bom.parquet")
+        assert is_tabular_file("bom.arrow")
+        assert not is_tabular_file("bom.xlsx")
+        assert not is_tabular_file(None)
+
+    def test_cache_kind_includes_filename(self):
+        """表格类文件的缓存键包含文件名（产品编码来源），Excel 不包含."""
+        assert multi_cache_kind("a.csv") != multi_cache_kind("b.csv")
+        assert multi_cache_kind("a.xlsx") == multi_cache_kind(None) == "multi"
+
+    def test_cache_kind_never_contains_raw_filename(self):
+        """客户端文件名只以哈希形式进入缓存键."""
+        kind = multi_cache_kind("../../etc/a:b.csv")
+        assert "/" not in kind and ".." not in kind and ":" not in kind
+
+
+class TestCSVParsing:
+    """CSV / TSV 解析测试."""
+
+    def test_matches_excel_parse(self, multi_product_content):
+        """把每个产品 sheet 导出为 CSV 后解析，物料与 Excel 解析结果一致."""
+        excel_result = MultiProductBOMParser(max_workers=1).parse_excel_file(multi_product_content)
+        expected = {p.product_info.product_code: p.materials for p in excel_result.products}
+        wb = load_workbook(filename=io.BytesIO(multi_product_content), read_only=True)
+
+        for sheet_name in wb.sheetnames:
+            content = to_csv([list(r) for r in wb[sheet_name].iter_rows(values_only=True)])
+            # 小批量以覆盖跨块读取
+            result = TabularBOMParser(batch_size=3).parse_file(content, f"{sheet_name}.csv")
+
+            product = result.products[0]
+            assert product.product_info.product_code == sheet_name.strip()
+            assert product.materials == expected[sheet_name.strip()]
+            assert product.product_info.material_count == len(product.materials)
+
+    def test_tsv_and_gbk_encoding(self):
+        """TSV 分隔符与 GBK 编码文件."""
+        content = to_csv(
+            [HEADER, ["1", "P-001", "壳体", "01", "I", "N", "铝", "供应商A", "2", "PC", "备注"]],
+            delimiter="\t",
+            encoding="gbk",
+        )
+
+        result = TabularBOMParser().parse_file(content, "壳体.tsv")
+
+        assert result.products[0].materials == [ParsedMaterial(
+            level="1", part_number="P-001", part_name="壳体", version="01", type="I",
+            status="N", material="铝", supplier="供应商A", quantity=2.0, unit="PC",
+            comments="备注",
+        )]
+
+    def test_defaults_and_invalid_rows(self):
+        """空单元格取默认值，短行补齐，无零件号行和无效数量按 Excel 规则处理."""
+        content = to_csv([
+            ["导出自 PLM"],
+            HEADER,
+            ["", "P-001", "", "", "", "", "", "", "abc"],
+            ["1", "", "无零件号"],
+            ["2", " P-002 ", "支架", "", "", "", "", "", ""],
+        ])
+
+        materials = TabularBOMParser().parse_file(content, "bom.csv").products[0].materials
+
+        assert [m.part_number for m in materials] == ["P-001", "P-002"]
+        assert materials[0].quantity == 0
+        assert materials[0].version == "1.0"
+        assert materials[0].unit == "PC"
+        assert materials[1].level == "2"
+
+    def test_iter_products_streams_batches(self):
+        """流式接口按批产出，物料计数随消费累加."""
+        rows = [HEADER] + [["1", f"P-{i:03d}", "", "", "", "", "", "", "1"] for i in range(10)]
+
+        product = next(TabularBOMParser(batch_size=4).iter_products(to_csv(rows), "bom.csv"))
+        batches = list(product.material_batches)
+
+        assert [len(b) for b in batches] == [4, 4, 2]
+        assert product.product_info.material_count == 10
+
+    def test_unsupported_extension(self):
+        with pytest.raises(ValueError):
+            TabularBOMParser().parse_file(b"", "bom.doc")
+
+
+class TestColumnarParsing:
+    """Arrow IPC / Parquet 解析测试（需要 pyarrow）."""
+
+    def test_parquet_and_arrow(self):
+        pa = pytest.importorskip("pyarrow")
+        import pyarrow.parquet as pq
+
+        table = pa.table({
+            "Level": ["1", "2"],
+            "Part Number": ["P-001", "P-002"],
+            "Part Name": ["壳体", None],
+            "Ver.": ["01", "02"],
+            "Typ": ["I", "P"],
+            "St": ["N", "N"],
+            "Material": ["铝", ""],
+            "Supplier": ["供应商A", ""],
+            "Qty": [2, 1.5],
+            "Unit": ["PC", "KG"],
+            "Comments": ["", ""],
+        })
+        parquet = io.BytesIO()
+        pq.write_table(table, parquet)
+        arrow = io.BytesIO()
+        with pa.ipc.new_file(arrow, table.schema) as writer:
+            writer.write_table(table)
+
+        from_parquet = TabularBOMParser().parse_file(parquet.getvalue(), "bom.parquet")
+        from_arrow = TabularBOMParser().parse_file(arrow.getvalue(), "bom.arrow")
+
+        assert from_parquet == from_arrow
+        materials = from_parquet.products[0].materials
+        assert [m.part_number for m in materials] == ["P-001", "P-002"]
+        assert [m.quantity for m in materials] == [2.0, 1.5]
+        assert materials[1].part_name == ""
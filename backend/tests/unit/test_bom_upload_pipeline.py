@@ -0,0 +1,169 @@
+"""BOM 上传流水线（线程解析、查价窗口、同步响应大小限制）单元测试."""
+
+import asyncio
+import os
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+import app.api.v1.bom as bom
+from app.services.bom_parser import MultiProductBOMParser
+from app.services.chunked_upload import ChunkedUploadStore
+from app.services.price_book import PriceBook, PriceBookRegistry
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+BOM_FILES_DIR = os.path.join(PROJECT_ROOT, "tests", "files")
+
+
+@pytest.fixture
+def multi_product_content():
+    """读取多产品 BOM 测试文件."""
+    with open(os.path.join(BOM_FILES_DIR, "W04_BOM_.xlsx"), "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def lookup_calls(monkeypatch, fake_cache, multi_product_content):
+    """使用内存缓存和固定价格簿，记录每次物料查询的编码数."""
+    async def no_profiles(self):
+        pass
+
+    monkeypatch.setattr(bom.ColumnMappingProfileService, "ensure_registry_loaded", no_profiles)
+    monkeypatch.setattr(bom, "get_cache_service", lambda: fake_cache)
+
+    result = MultiProductBOMParser(max_workers=1).parse_excel_file(multi_product_content)
+    codes = [m.part_number for p in result.products for m in p.materials if m.part_number]
+    book = PriceBook([
+        SimpleNamespace(item_code=code, std_price=Decimal("1.5"), vave_price=Decimal("1.2"),
+                        supplier_tier=None, category=None)
+        for code in codes[::3]
+    ], [])
+    calls = []
+    lookup_materials = book.lookup_materials
+
+    async def counting(material_codes):
+        calls.append(len(material_codes))
+        return await lookup_materials(material_codes)
+
+    book.lookup_materials = counting
+    registry = PriceBookRegistry(300)
+    registry.swap(book)
+    monkeypatch.setattr(bom, "price_book_registry", registry)
+    return calls
+
+
+async def _events(content) -> list[dict]:
+    return [event async for event in bom._iter_upload_events(content, "W04_BOM_.xlsx", "p1", None)]
+
+
+class TestUploadLookupWindow:
+    """跨批次查价测试."""
+
+    async def test_single_lookup_across_batches_and_products(self, multi_product_content, lookup_calls):
+        events = await _events(multi_product_content)
+
+        assert len(lookup_calls) == 1
+        assert sum(e["type"] == "product" for e in events) > 1
+        assert sum(e["type"] == "materials" for e in events) > 1
+        assert events[0]["type"] == "product"
+        assert events[-1]["type"] == "summary"
+        assert events[-1]["summary"]["matched_materials"] > 0
+
+    async def test_window_bounds_buffered_rows(self, multi_product_content, lookup_calls, monkeypatch):
+        expected = await _events(multi_product_content)
+        lookup_calls.clear()
+
+        monkeypatch.setattr(bom.settings, "BOM_UPLOAD_LOOKUP_ROWS", 1)
+        events = await _events(multi_product_content)
+
+        # 每批单独查价，事件与一次性查价完全相同；已查询过的编码不再重复查询
+        assert len(lookup_calls) > 1
+        assert sum(lookup_calls) == len({
+            m["partNumber"] for e in events if e["type"] == "materials"
+            for m in e["items"] if m["partNumber"]
+        })
+        assert events == expected
+
+
+class TestParseOffLoop:
+    """解析在线程池中进行的测试."""
+
+    async def test_parse_does_not_block_event_loop(self):
+        def slow_batches():
+            for i in range(3):
+                time.sleep(0.05)
+                yield i
+
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        try:
+            items = [item async for item in bom._iter_in_thread(slow_batches())]
+        finally:
+            task.cancel()
+
+        assert items == [0, 1, 2]
+        # 解析期间事件循环仍在调度其他协程
+        assert ticks >= 5
+
+    async def test_upload_progress_reports_cache_stage(self, multi_product_content, lookup_calls):
+        stages = []
+        async for _ in bom._iter_upload_events(
+            multi_product_content, "W04_BOM_.xlsx", "p1", None,
+            progress=lambda stage, **counters: stages.append((stage, counters)),
+        ):
+            pass
+
+        # 上传只写解析缓存，进度阶段不再报告 persist
+        assert any(stage == "cache" and counters.get("cached") for stage, counters in stages)
+        assert all(stage != "persist" for stage, _ in stages)
+
+
+class TestSyncUploadSizeLimit:
+    """同步完整 JSON 响应的文件大小限制测试."""
+
+    def test_limit_applies_only_to_sync_json(self, monkeypatch):
+        monkeypatch.setattr(bom.settings, "BOM_SYNC_UPLOAD_MAX_BYTES", 10)
+        json_request = SimpleNamespace(headers={})
+        ndjson_request = SimpleNamespace(headers={"accept": bom.NDJSON_MEDIA_TYPE})
+
+        with pytest.raises(HTTPException) as exc_info:
+            bom._check_sync_response_size(json_request, "sync", 11)
+        assert exc_info.value.status_code == 413
+
+        bom._check_sync_response_size(json_request, "sync", 10)
+        bom._check_sync_response_size(json_request, "async", 11)
+        bom._check_sync_response_size(ndjson_request, "sync", 11)
+        monkeypatch.setattr(bom.settings, "BOM_SYNC_UPLOAD_MAX_BYTES", 0)
+        bom._check_sync_response_size(json_request, "sync", 11)
+
+    async def test_rejected_chunked_upload_keeps_spool(self, monkeypatch, tmp_path):
+        """413 不删除分块上传的落盘文件，同一 uploadId 可改用 async 重新 complete."""
+        monkeypatch.setattr(bom.settings, "BOM_SYNC_UPLOAD_MAX_BYTES", 10)
+        monkeypatch.setattr(bom.settings, "BOM_UPLOAD_SPOOL_DIR", str(tmp_path))
+        store = ChunkedUploadStore()
+        upload_id = store.init("bom.csv", 11)["uploadId"]
+
+        async def body():
+            yield b"x" * 11
+
+        await store.append(upload_id, 0, body())
+
+        with pytest.raises(HTTPException) as exc_info:
+            await bom.complete_bom_upload(
+                upload_id, SimpleNamespace(project_id="p1"), SimpleNamespace(headers={}),
+                mode="sync", db=None,
+            )
+
+        assert exc_info.value.status_code == 413
+        assert store.status(upload_id)["offset"] == 11
+        assert store.data_path(upload_id).exists()
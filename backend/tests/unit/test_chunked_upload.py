@@ -0,0 +1,186 @@
+"""BOM 分块续传上传单元测试."""
+
+import asyncio
+import hashlib
+import os
+
+import pytest
+
+from app.services.bom_source import read_head, source_sha256, source_size
+from app.services.bom_tabular import TabularBOMParser
+from app.services.chunked_upload import (
+    UPLOAD_COMPLETED,
+    ChunkedUploadError,
+    ChunkedUploadStore,
+    UploadBusyError,
+    UploadChecksumError,
+    UploadNotFoundError,
+    UploadOffsetMismatchError,
+)
+
+
+async def _stream(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+def _sha(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class TestChunkedUploadStore:
+    """分块上传存储测试."""
+
+    async def test_resume_and_complete(self, tmp_path):
+        """分块追加、从查询到的 offset 续传，完成后返回落盘路径."""
+        data = b"0123456789" * 100
+        store = ChunkedUploadStore(str(tmp_path))
+        upload = store.init("bom.csv", len(data), _sha(data))
+        upload_id = upload["uploadId"]
+        assert upload["offset"] == 0
+
+        status = await store.append(upload_id, 0, _stream(data[:300], data[300:400]))
+        assert status["offset"] == 400
+
+        # 新实例（模拟另一个 worker）读取同一个上传
+        store = ChunkedUploadStore(str(tmp_path))
+        offset = store.status(upload_id)["offset"]
+        await store.append(upload_id, offset, _stream(data[offset:]), _sha(data[offset:]))
+
+        path, filename = await store.complete(upload_id)
+        assert filename == "bom.csv"
+        assert path.read_bytes() == data
+        assert store.status(upload_id)["status"] == UPLOAD_COMPLETED
+
+        store.discard(upload_id)
+        assert not path.exists()
+        with pytest.raises(UploadNotFoundError):
+            store.status(upload_id)
+
+    async def test_offset_mismatch(self, tmp_path):
+        store = ChunkedUploadStore(str(tmp_path))
+        upload_id = store.init(None, 10)["uploadId"]
+        await store.append(upload_id, 0, _stream(b"abcd"))
+
+        with pytest.raises(UploadOffsetMismatchError) as exc_info:
+            await store.append(upload_id, 0, _stream(b"abcd"))
+        assert exc_info.value.offset == 4
+        assert exc_info.value.status_code == 409
+
+    async def test_chunk_checksum_mismatch_rolls_back(self, tmp_path):
+        """分块校验失败时回滚到块起始位置."""
+        store = ChunkedUploadStore(str(tmp_path))
+        upload_id = store.init(None, 10)["uploadId"]
+        await store.append(upload_id, 0, _stream(b"abcd"))
+
+        with pytest.raises(UploadChecksumError):
+            await store.append(upload_id, 4, _stream(b"efgh"), _sha(b"xxxx"))
+        assert store.status(upload_id)["offset"] == 4
+
+    async def test_chunk_exceeding_total_size(self, tmp_path):
+        store = ChunkedUploadStore(str(tmp_path))
+        upload_id = store.init(None, 4)["uploadId"]
+
+        with pytest.raises(ChunkedUploadError):
+            await store.append(upload_id, 0, _stream(b"abc", b"de"))
+        assert store.status(upload_id)["offset"] == 0
+
+    async def test_complete_validation(self, tmp_path):
+        """未传完不能完成；整体摘要不符时上传作废."""
+        store = ChunkedUploadStore(str(tmp_path))
+        upload_id = store.init(None, 4, _sha(b"abcd"))["uploadId"]
+        await store.append(upload_id, 0, _stream(b"ab"))
+        with pytest.raises(UploadOffsetMismatchError):
+            await store.complete(upload_id)
+
+        await store.append(upload_id, 2, _stream(b"xx"))
+        with pytest.raises(UploadChecksumError):
+            await store.complete(upload_id)
+        with pytest.raises(UploadNotFoundError):
+            store.status(upload_id)
+
+    async def test_concurrent_append_is_rejected(self, tmp_path):
+        """同一上传同时只有一个写入者（文件锁，跨 worker 生效），其余请求返回 409."""
+        store = ChunkedUploadStore(str(tmp_path))
+        upload_id = store.init(None, 8)["uploadId"]
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def slow_body():
+            yield b"abcd"
+            started.set()
+            await release.wait()
+
+        first = asyncio.create_task(store.append(upload_id, 0, slow_body()))
+        await started.wait()
+        # 另一个存储实例（模拟另一个 worker）在同一 offset 写入
+        with pytest.raises(UploadBusyError) as exc_info:
+            await ChunkedUploadStore(str(tmp_path)).append(upload_id, 0, _stream(b"wxyz"))
+        assert exc_info.value.status_code == 409
+        with pytest.raises(UploadBusyError):
+            await store.complete(upload_id)
+
+        release.set()
+        assert (await first)["offset"] == 4
+        await store.append(upload_id, 4, _stream(b"efgh"))
+        path, _ = await store.complete(upload_id)
+        assert path.read_bytes() == b"abcdefgh"
+
+    def test_invalid_upload_id(self, tmp_path):
+        store = ChunkedUploadStore(str(tmp_path))
+        with pytest.raises(UploadNotFoundError):
+            store.status("../../etc/passwd")
+
+    def test_cleanup_expired(self, tmp_path):
+        store = ChunkedUploadStore(str(tmp_path), ttl=60)
+        upload_id = store.init(None, 4)["uploadId"]
+        old = os.path.getmtime(store.data_path(upload_id)) - 120
+        os.utime(store.data_path(upload_id), (old, old))
+
+        assert store.cleanup() == 1
+        assert list(tmp_path.iterdir()) == []
+
+    async def test_cleanup_skips_completed_and_busy_uploads(self, tmp_path):
+        """已完成（流水线仍在解析）和正在写入的上传不被清理."""
+        store = ChunkedUploadStore(str(tmp_path), ttl=60)
+        completed_id = store.init(None, 4)["uploadId"]
+        await store.append(completed_id, 0, _stream(b"abcd"))
+        await store.complete(completed_id)
+        busy_id = store.init(None, 4)["uploadId"]
+        for upload_id in (completed_id, busy_id):
+            old = os.path.getmtime(store.data_path(upload_id)) - 120
+            os.utime(store.data_path(upload_id), (old, old))
+
+        with store._locked(busy_id, "rb"):
+            assert store.cleanup() == 0
+        assert store.status(completed_id)["status"] == UPLOAD_COMPLETED
+        assert store.status(busy_id)["offset"] == 0
+
+        assert store.cleanup() == 1
+        assert store.status(completed_id)["status"] == UPLOAD_COMPLETED
+
+
+class TestPathSource:
+    """解析器直接读取落盘文件."""
+
+    def test_source_helpers(self, tmp_path):
+        data = b"part,qty\n" * 1000
+        path = tmp_path / "bom.csv"
+        path.write_bytes(data)
+
+        assert source_size(path) == len(data)
+        assert source_sha256(path) == _sha(data)
+        assert read_head(path, 8) == data[:8]
+
+    def test_tabular_parse_from_path(self, tmp_path):
+        data = (
+            "Level,Part Number,Part Name,Quantity,Unit\n"
+            "1,P-001,Bracket,2,PC\n"
+            "2,P-002,Screw,4,PC\n"
+        ).encode("utf-8")
+        path = tmp_path / "upload.part"
+        path.write_bytes(data)
+
+        from_path = TabularBOMParser().parse_file(path, "bom.csv")
+        from_bytes = TabularBOMParser().parse_file(data, "bom.csv")
+        assert from_path.total_materials == from_bytes.total_materials == 2
+        assert [m.part_number for m in from_path.products[0].materials] == ["P-001", "P-002"]
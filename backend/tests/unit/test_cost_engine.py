@@ -0,0 +1,164 @@
+"""向量化成本引擎单元测试."""
+
+import random
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.calculation import DualTrackCalculator
+from app.services.cost_engine import (
+    SECONDS_SCALE,
+    CostArrays,
+    compute_costs,
+    round_half_even_div,
+    to_fixed,
+)
+from app.services.price_book import PriceBook
+
+# cost_engine 本身可在无 numpy 时导入，放在所有导入之后跳过整个模块
+np = pytest.importorskip("numpy")
+
+
+# 两两相乘常落在恰好半分上的值（如 0.5 × 0.03 = 0.015），用于覆盖银行家舍入
+TIE_VALUES = [Decimal(v) for v in ("0.5", "1.5", "2.5", "0.25", "0.01", "0.03", "0.05", "0.07", "0.9")]
+
+
+def random_decimal(rng: random.Random, places: int, high: int) -> Decimal:
+    """随机定点小数；小值和易产生半分的值多出现，以覆盖舍入边界."""
+    roll = rng.random()
+    if roll < 0.3:
+        return rng.choice(TIE_VALUES)
+    if roll < 0.5:
+        return Decimal(rng.randint(0, 200)).scaleb(-places)
+    return Decimal(rng.randint(0, high * 10 ** places)).scaleb(-places)
+
+
+def random_price_book(rng: random.Random) -> PriceBook:
+    materials = [
+        SimpleNamespace(
+            item_code=f"MAT-{i}",
+            std_price=random_decimal(rng, 4, 500) if rng.random() > 0.05 else None,
+            vave_price=random_decimal(rng, 4, 500) if rng.random() > 0.3 else None,
+            supplier_tier=None, category=None,
+        )
+        for i in range(40)
+    ]
+    rates = [
+        SimpleNamespace(
+            process_code=f"PR-{i}", process_name=f"工艺{i}", equipment=None, work_center=None,
+            std_mhr_var=None, std_mhr_fix=None, vave_mhr_var=None, vave_mhr_fix=None,
+            std_hourly_rate=random_decimal(rng, 2, 300) if rng.random() > 0.05 else None,
+            vave_hourly_rate=random_decimal(rng, 2, 300) if rng.random() > 0.3 else None,
+            efficiency_factor=random_decimal(rng, 2, 2) if rng.random() > 0.2 else None,
+        )
+        for i in range(15)
+    ]
+    return PriceBook(materials, rates)
+
+
+def random_products(rng: random.Random) -> list:
+    products = []
+    for _ in range(rng.randint(1, 6)):
+        materials = [
+            (rng.choice([f"MAT-{rng.randint(0, 45)}", None]), float(random_decimal(rng, 3, 50)))
+            for _ in range(rng.randint(0, 30))
+        ]
+        processes = [
+            (f"工艺{rng.randint(0, 17)}", float(random_decimal(rng, 4, 5)))
+            for _ in range(rng.randint(0, 8))
+        ]
+        products.append((materials, processes))
+    return products
+
+
+class TestRounding:
+    def test_half_even(self):
+        numerator = np.array([5, 15, 25, -5, -15, 14, 16], dtype=np.int64)
+        assert round_half_even_div(numerator, 10).tolist() == [0, 2, 2, 0, -2, 1, 2]
+
+    def test_to_fixed_is_exact_for_decimal_inputs(self):
+        values = [Decimal("10.005"), 0.1, None, Decimal("123456.7891")]
+        assert to_fixed(values, 10_000).tolist() == [100050, 1000, 0, 1234567891]
+
+    def test_to_fixed_rounds_like_decimal(self):
+        """超出精度的值按十进制银行家舍入（0.545 × 100 在 float 中为 54.50000000000001）."""
+        assert to_fixed([Decimal("0.545"), Decimal("0.535"), 0.545], 100).tolist() == [54, 54, 54]
+
+
+class TestVectorCostEngine:
+    """与 Decimal 路径逐分一致的性质测试."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("seed", range(25))
+    async def test_matches_decimal_path(self, seed):
+        rng = random.Random(seed)
+        book = random_price_book(rng)
+        products = random_products(rng)
+
+        result = compute_costs(CostArrays.from_lines(book, products))
+        calc = DualTrackCalculator(None, book)
+
+        material_line = process_line = 0
+        project = {"material_cost": [0, 0], "process_cost": [0, 0]}
+        for idx, (materials, processes) in enumerate(products):
+            expected = await calc.calculate_many(materials, processes)
+
+            for pair in expected.materials:
+                assert result.material_std[material_line] == int(pair.std * 100)
+                assert result.material_vave[material_line] == int(pair.vave * 100)
+                material_line += 1
+            for pair in expected.processes:
+                assert result.process_std[process_line] == int(pair.std * 100)
+                assert result.process_vave[process_line] == int(pair.vave * 100)
+                process_line += 1
+
+            pairs = result.product_pairs(idx)
+            assert pairs["material_cost"] == expected.material_cost
+            assert pairs["process_cost"] == expected.process_cost
+            assert pairs["total_cost"] == expected.total_cost
+            project["material_cost"][0] += expected.material_cost.std
+            project["material_cost"][1] += expected.material_cost.vave
+            project["process_cost"][0] += expected.process_cost.std
+            project["process_cost"][1] += expected.process_cost.vave
+
+        totals = result.project_pairs()
+        assert totals["material_cost"].std == project["material_cost"][0]
+        assert totals["material_cost"].vave == project["material_cost"][1]
+        assert totals["process_cost"].std == project["process_cost"][0]
+        assert totals["process_cost"].vave == project["process_cost"][1]
+
+    def test_cycle_time_in_seconds(self):
+        """以秒为单位的工时与 Decimal(秒) × 费率 / 3600 一致."""
+        rng = random.Random(7)
+        seconds = [rng.randint(0, 7200) for _ in range(500)]
+        rates = [random_decimal(rng, 2, 300) for _ in range(500)]
+        arrays = CostArrays(
+            product_count=1,
+            material_product=np.zeros(0, dtype=np.int64),
+            quantity=np.zeros(0, dtype=np.int64),
+            std_price=np.zeros(0, dtype=np.int64),
+            vave_price=np.zeros(0, dtype=np.int64),
+            process_product=np.zeros(len(seconds), dtype=np.int64),
+            time=np.array(seconds, dtype=np.int64),
+            std_rate=to_fixed(rates, 100),
+            vave_rate=to_fixed(rates, 100),
+            efficiency=to_fixed([1] * len(seconds), 100),
+            time_scale=SECONDS_SCALE,
+        )
+
+        result = compute_costs(arrays)
+
+        for line, (sec, rate) in enumerate(zip(seconds, rates)):
+            expected = (Decimal(sec) * rate / 3600).quantize(Decimal("0.01"))
+            assert result.process_std[line] == int(expected * 100)
+
+    def test_overflow_is_reported(self):
+        book = PriceBook([SimpleNamespace(
+            item_code="MAT", std_price=Decimal("999999.9999"), vave_price=None,
+            supplier_tier=None, category=None,
+        )], [])
+        arrays = CostArrays.from_lines(book, [([("MAT", 1e12)], [])])
+
+        with pytest.raises(OverflowError):
+            compute_costs(arrays)
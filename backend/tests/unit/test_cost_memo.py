@@ -0,0 +1,117 @@
+"""成本结果缓存单元测试."""
+
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.calculation import DualTrackCalculator
+from app.services.cost_memo import CostMemo, cost_input_hash, cost_memo, cost_memo_stats
+from app.services.price_book import PriceBook
+
+
+def price_book(std_price: str = "10") -> PriceBook:
+    return PriceBook(
+        [SimpleNamespace(item_code="MAT-1", std_price=Decimal(std_price), vave_price=Decimal("8"),
+                         supplier_tier=None, category=None)],
+        [SimpleNamespace(
+            process_code="OP10", process_name="焊接", equipment=None, work_center=None,
+            std_mhr_var=None, std_mhr_fix=None, vave_mhr_var=None, vave_mhr_fix=None,
+            std_hourly_rate=Decimal("60"), vave_hourly_rate=Decimal("50"),
+            efficiency_factor=Decimal("0.9"),
+        )],
+    )
+
+
+@pytest.fixture(autouse=True)
+def clear_cost_memo():
+    cost_memo.clear()
+    yield
+    cost_memo.clear()
+
+
+class TestCostInputHash:
+    def test_numbers_are_normalized(self):
+        assert cost_input_hash("many", [("MAT-1", 2)]) == cost_input_hash("many", [("MAT-1", 2.0)])
+        assert cost_input_hash("many", [("MAT-1", 2)]) == cost_input_hash("many", [("MAT-1", Decimal("2.00"))])
+
+    def test_order_kind_and_sections_matter(self):
+        lines = [("A", 1), ("B", 2)]
+        assert cost_input_hash("many", lines) != cost_input_hash("many", lines[::-1])
+        assert cost_input_hash("many", lines) != cost_input_hash("project", lines)
+        assert cost_input_hash("many", lines, []) != cost_input_hash("many", [], lines)
+        assert cost_input_hash("many", [("A", None)]) != cost_input_hash("many", [("A", "")])
+
+
+class TestCostMemo:
+    def test_lru_eviction(self):
+        memo, book = CostMemo(max_entries=2), price_book()
+        memo.set(book, "a", 1)
+        memo.set(book, "b", 2)
+        memo.get(book, "a")
+        memo.set(book, "c", 3)
+
+        assert memo.get(book, "b") is None
+        assert (memo.get(book, "a"), memo.get(book, "c")) == (1, 3)
+
+    def test_new_version_revalidates_dependencies(self):
+        memo = CostMemo(max_entries=10)
+        memo.set(price_book(), "uses-mat", 1, [("material", "MAT-1")])
+        memo.set(price_book(), "uses-rate", 2, [("process_name", "焊接")])
+        revalidated, invalidations = cost_memo_stats["revalidated"], cost_memo_stats["invalidations"]
+
+        repriced = price_book("12")
+        assert memo.get(repriced, "uses-mat") is None
+        assert memo.get(repriced, "uses-rate", lambda value, version: (value, version)) == (
+            2, repriced.version
+        )
+        assert cost_memo_stats["invalidations"] == invalidations + 1
+        assert cost_memo_stats["revalidated"] == revalidated + 1
+        assert memo.stats()["entries"] == 1
+
+    def test_disabled_when_size_is_zero(self):
+        memo = CostMemo(max_entries=0)
+        memo.set(price_book(), "a", 1)
+        assert memo.get(price_book(), "a") is None
+
+
+class TestCalculatorMemo:
+    async def test_hit_across_calculators_with_same_book_content(self):
+        lines = ([("MAT-1", 3)], [("焊接", 0.5)])
+        first = await DualTrackCalculator(None, price_book()).calculate_many(*lines)
+        hits = cost_memo_stats["hits"]
+
+        second = await DualTrackCalculator(None, price_book()).calculate_many(
+            [("mat-1", 3.0)], [("焊接", 0.5)]
+        )
+
+        assert second is first
+        assert cost_memo_stats["hits"] == hits + 1
+
+    async def test_price_change_misses(self):
+        lines = ([("MAT-1", 3)], [])
+        before = await DualTrackCalculator(None, price_book("10")).calculate_many(*lines)
+        after = await DualTrackCalculator(None, price_book("12")).calculate_many(*lines)
+
+        assert before.material_cost.std == Decimal("30.00")
+        assert after.material_cost.std == Decimal("36.00")
+        assert after.price_book_version != before.price_book_version
+
+    async def test_unrelated_price_change_reuses_result(self):
+        before = await DualTrackCalculator(None, price_book()).calculate_many([("MAT-1", 3)])
+        book = price_book()
+        book.version = "other-version"  # 同样的价格、不同的版本（如其他物料变更）
+
+        after = await DualTrackCalculator(None, book).calculate_many([("MAT-1", 3)])
+
+        assert after.material_cost == before.material_cost
+        assert after.price_book_version == "other-version"
+        assert before.price_book_version == price_book().version
+
+    async def test_single_line_methods(self):
+        calc = DualTrackCalculator(None, price_book())
+        assert (await calc.calculate_material_cost("MAT-1", 2)).std == Decimal("20.00")
+        hits = cost_memo_stats["hits"]
+        assert (await calc.calculate_material_cost("MAT-1", 2)).std == Decimal("20.00")
+        assert (await calc.calculate_process_cost("焊接", 2)).std == Decimal("120.00")
+        assert cost_memo_stats["hits"] == hits + 1
@@ -0,0 +1,107 @@
+"""BOM 主数据查询规划单元测试."""
+
+from app.services.lookup_planner import (
+    KIND_MATERIAL,
+    LocalLookupCache,
+    LookupPlanner,
+    lookup_planner_stats,
+)
+
+
+class FakeLookup:
+    """模拟数据库查询：记录每次查询的键."""
+
+    def __init__(self, known: set[str]):
+        self.known = known
+        self.calls = []
+
+    async def lookup_materials(self, codes):
+        self.calls.append(list(codes))
+        return {code: {"unit_price": 1.0, "has_history_data": True} for code in codes if code in self.known}
+
+    async def lookup_processes(self, names):
+        self.calls.append(list(names))
+        return {}
+
+
+def counters() -> dict:
+    return dict(lookup_planner_stats)
+
+
+class TestLookupPlanner:
+    """规范化去重、分级缓存和扇出测试."""
+
+    async def test_dedups_and_fans_out_to_original_keys(self, fake_cache):
+        """空白和大小写不同的编码只查询一次，结果扇出到每个原始键."""
+        lookup = FakeLookup({"A-1", "B-2"})
+        planner = LookupPlanner(fake_cache, lookup, LocalLookupCache(100, 60))
+        before = counters()
+
+        result = await planner.lookup_materials(["A-1", " a-1", "B-2", "A-1", "", None, "C-3"])
+
+        assert lookup.calls == [["A-1", "B-2", "C-3"]]
+        assert set(result) == {"A-1", " a-1", "B-2"}
+        assert result[" a-1"] is result["A-1"]
+        assert lookup_planner_stats["requested"] - before["requested"] == 7
+        assert lookup_planner_stats["deduped"] - before["deduped"] == 4
+        assert lookup_planner_stats["db_fetched"] - before["db_fetched"] == 3
+        assert lookup_planner_stats["db_found"] - before["db_found"] == 2
+
+    async def test_cache_tiers(self, fake_cache):
+        """进程内缓存（含未命中）优先，其次 Redis，最后数据库；数据库结果回填两级缓存."""
+        lookup = FakeLookup({"A-1"})
+        redis = fake_cache
+        redis.data["material:R-1"] = {"unit_price": 2.0, "has_history_data": True}
+        planner = LookupPlanner(redis, lookup, LocalLookupCache(100, 60))
+
+        first = await planner.lookup_materials(["A-1", "R-1", "X-9"])
+        assert lookup.calls == [["A-1", "X-9"]]
+        assert first["R-1"]["unit_price"] == 2.0
+        assert "X-9" not in first
+        # Redis 只保存命中结果
+        assert "material:A-1" in redis.data and "material:X-9" not in redis.data
+
+        before = counters()
+        second = await planner.lookup_materials(["A-1", "R-1", "X-9"])
+        assert second == first
+        assert len(lookup.calls) == 1
+        assert lookup_planner_stats["memory_hits"] - before["memory_hits"] == 3
+
+    async def test_redis_failure_falls_back_to_database(self, unavailable_cache):
+        lookup = FakeLookup({"A-1"})
+        planner = LookupPlanner(unavailable_cache, lookup, LocalLookupCache(100, 60))
+
+        result = await planner.lookup_materials(["A-1"])
+
+        assert set(result) == {"A-1"}
+        assert not unavailable_cache.available
+
+    async def test_invalidate_drops_local_entry(self, fake_cache):
+        lookup = FakeLookup(set())
+        redis = fake_cache
+        planner = LookupPlanner(redis, lookup, LocalLookupCache(100, 60))
+
+        assert await planner.lookup_materials(["NEW-1"]) == {}
+        lookup.known.add("NEW-1")
+        redis.data["material:NEW-1"] = {}  # 模拟旧的 Redis 条目
+        await planner.invalidate(KIND_MATERIAL, ["new-1"])
+
+        assert "material:NEW-1" not in redis.data
+        assert set(await planner.lookup_materials(["NEW-1"])) == {"NEW-1"}
+        assert lookup.calls == [["NEW-1"], ["NEW-1"]]
+
+
+class TestLocalLookupCache:
+    def test_lru_eviction(self):
+        cache = LocalLookupCache(max_entries=2, ttl=60)
+        cache.set_many("material", {"A": {}, "B": {}})
+        cache.get_many("material", ["A"])
+        cache.set_many("material", {"C": {}})
+
+        assert set(cache.get_many("material", ["A", "B", "C"])) == {"A", "C"}
+
+    def test_expired_entries_are_dropped(self):
+        cache = LocalLookupCache(max_entries=10, ttl=-1)
+        cache.set_many("material", {"A": {"unit_price": 1.0}})
+
+        assert cache.get_many("material", ["A"]) == {}
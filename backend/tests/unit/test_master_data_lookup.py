@@ -0,0 +1,118 @@
+"""主数据批量查询服务单元测试."""
+
+import asyncio
+from contextlib import asynccontextmanager
+from decimal import Decimal
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+
+from app.services.master_data_lookup import (
+    MasterDataLookupService,
+    lookup_stats,
+    process_rate_row,
+)
+
+
+class FakeEngine:
+    """模拟异步引擎：记录每条语句的参数和并发连接数."""
+
+    def __init__(self, rows_for):
+        self.sync_engine = create_engine("sqlite://")
+        self.rows_for = rows_for
+        self.statements = []
+        self.active = 0
+        self.max_active = 0
+
+    @asynccontextmanager
+    async def connect(self):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            yield self
+        finally:
+            self.active -= 1
+
+    async def execute(self, statement):
+        params = statement.compile().params
+        keys = [v for value in params.values() for v in value]
+        self.statements.append(keys)
+        await asyncio.sleep(0)
+        return SimpleNamespace(all=lambda: self.rows_for(keys))
+
+
+def material_rows(keys):
+    return [
+        SimpleNamespace(
+            item_code=k, std_price=Decimal("1.5"), vave_price=None,
+            supplier_tier=None, category="钢",
+        )
+        for k in keys
+    ]
+
+
+class TestMasterDataLookupService:
+    """分块并发查询测试."""
+
+    async def test_chunks_run_within_concurrency_budget(self):
+        """超长编码列表去重后分块，并发数不超过预算，结果合并."""
+        engine = FakeEngine(material_rows)
+        service = MasterDataLookupService(engine, chunk_size=10, max_concurrency=2)
+        codes = [f"M-{i % 35}" for i in range(70)]
+
+        result = await service.lookup_materials(codes)
+
+        assert len(result) == 35
+        assert [len(keys) for keys in engine.statements] == [10, 10, 10, 5]
+        assert engine.max_active == 2
+        assert result["M-3"] == {
+            "unit_price": 1.5, "vave_price": None, "supplier": "",
+            "material": "钢", "has_history_data": True,
+        }
+
+    async def test_empty_keys_skip_database(self):
+        engine = FakeEngine(material_rows)
+        chunks_before = lookup_stats["chunks"]
+
+        assert await MasterDataLookupService(engine).lookup_materials(["", None]) == {}
+        assert engine.statements == []
+        assert lookup_stats["chunks"] == chunks_before
+
+    async def test_processes_match_code_then_name(self):
+        """先按工艺编码查询，未命中的键再按名称查询，每个键只绑定一次."""
+        rates = [
+            SimpleNamespace(
+                process_code=code, process_name=name, equipment=None, work_center=None,
+                std_mhr_var=None, std_mhr_fix=None, vave_mhr_var=None, vave_mhr_fix=None,
+                std_hourly_rate=Decimal("10"), vave_hourly_rate=None,
+            )
+            for code, name in (("OP10", "冲压"), ("OP20", "焊接"))
+        ]
+        # 第一条语句按编码匹配，第二条按名称匹配
+        engine = FakeEngine(lambda keys: [
+            r for r in rates
+            if (r.process_code if len(engine.statements) == 1 else r.process_name) in keys
+        ])
+
+        result = await MasterDataLookupService(engine).lookup_processes(["OP10", "焊接"])
+
+        assert engine.statements == [["OP10", "焊接"], ["焊接"]]
+        assert set(result) == {"OP10", "焊接"}
+        assert result["焊接"]["process_code"] == "OP20"
+
+class TestProcessRateRow:
+    """工艺费率转换测试."""
+
+    def test_prefers_split_mhr_rates(self):
+        row = SimpleNamespace(
+            process_code="OP10", process_name="焊接", equipment=None, work_center="WC1",
+            std_mhr_var=Decimal("30"), std_mhr_fix=Decimal("20"),
+            vave_mhr_var=None, vave_mhr_fix=None,
+            std_hourly_rate=Decimal("99"), vave_hourly_rate=Decimal("45"),
+        )
+
+        data = process_rate_row(row)
+
+        assert data["unit_price"] == 50.0
+        assert data["vave_price"] == 45.0
+        assert data["equipment"] == ""
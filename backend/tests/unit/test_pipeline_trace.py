@@ -0,0 +1,62 @@
+"""上传流水线分阶段计时单元测试."""
+
+from app.services.pipeline_trace import (
+    SPAN_BUILD,
+    SPAN_PARSE,
+    SPAN_TOTAL,
+    Histogram,
+    PipelineTrace,
+    pipeline_histograms,
+)
+
+
+class TestPipelineTrace:
+    """PipelineTrace 测试."""
+
+    def test_spans_accumulate(self):
+        """同一阶段多次进入时累加行数、字节数和次数."""
+        trace = PipelineTrace()
+        with trace.span(SPAN_BUILD, rows=3):
+            pass
+        with trace.span(SPAN_BUILD, rows=2, bytes=10) as span:
+            span.rows += 1
+
+        build = trace.spans[SPAN_BUILD]
+        assert build.rows == 6
+        assert build.bytes == 10
+        assert build.calls == 2
+        assert build.duration >= 0
+
+    def test_timed_iter(self):
+        """惰性迭代的每批耗时和行数计入阶段."""
+        trace = PipelineTrace()
+        batches = [[1, 2], [3], [4, 5, 6]]
+
+        assert list(trace.timed_iter(SPAN_PARSE, iter(batches), rows=len)) == batches
+        assert trace.spans[SPAN_PARSE].rows == 6
+        assert trace.spans[SPAN_PARSE].calls == 3
+
+    def test_finish_records_histograms_once(self):
+        before = pipeline_histograms[SPAN_TOTAL].duration_ms.count if SPAN_TOTAL in pipeline_histograms else 0
+        trace = PipelineTrace()
+        with trace.span(SPAN_BUILD, rows=4):
+            pass
+        trace.finish()
+        trace.finish()
+
+        assert pipeline_histograms[SPAN_TOTAL].duration_ms.count == before + 1
+        header = trace.server_timing()
+        assert f"{SPAN_BUILD};dur=" in header
+        assert f"{SPAN_TOTAL};dur=" in header
+
+
+class TestHistogram:
+    def test_cumulative_buckets(self):
+        histogram = Histogram(buckets=(1, 10))
+        for value in (0.5, 1, 5, 50):
+            histogram.observe(value)
+
+        data = histogram.to_dict()
+        assert data["count"] == 4
+        assert data["sum"] == 56.5
+        assert data["buckets"] == {"1": 2, "10": 3, "+Inf": 4}
@@ -0,0 +1,165 @@
+"""主数据价格簿单元测试."""
+
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.price_book import PriceBook, PriceBookRegistry
+
+
+def material_row(item_code, std_price, vave_price=None):
+    return SimpleNamespace(
+        item_code=item_code, std_price=std_price, vave_price=vave_price,
+        supplier_tier="A", category="steel",
+    )
+
+
+def rate_row(process_code, process_name, std_var=None, std_fix=None, std_hourly=None):
+    return SimpleNamespace(
+        process_code=process_code, process_name=process_name,
+        equipment="EQ", work_center=None,
+        std_mhr_var=std_var, std_mhr_fix=std_fix, vave_mhr_var=None, vave_mhr_fix=None,
+        std_hourly_rate=std_hourly, vave_hourly_rate=None, efficiency_factor=Decimal("1.0"),
+    )
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    """按查询的表返回主数据行，记录查询次数."""
+
+    def __init__(self, materials, rates):
+        self.materials = materials
+        self.rates = rates
+        self.executed = 0
+
+    async def execute(self, stmt):
+        self.executed += 1
+        return FakeResult(self.rates if "process_rates" in str(stmt) else self.materials)
+
+
+class TestPriceBook:
+    """PriceBook 测试."""
+
+    def test_lookups_are_normalized(self):
+        book = PriceBook(
+            [material_row("MAT-001", Decimal("10"), Decimal("8"))],
+            [rate_row("PR-01", "焊接", std_hourly=Decimal("50"))],
+        )
+
+        assert book.material(" mat-001 ").std_price == Decimal("10")
+        assert book.material(None) is None
+        assert book.process_by_code("pr-01").process_name == "焊接"
+        assert book.process_by_name("焊接").process_code == "PR-01"
+
+    def test_mhr_totals_precomputed(self):
+        book = PriceBook([], [
+            rate_row("PR-01", "焊接", Decimal("30"), Decimal("20"), Decimal("99")),
+            rate_row("PR-02", "喷涂", std_hourly=Decimal("40")),
+        ])
+
+        welding = book.process_by_code("PR-01")
+        assert welding.std_mhr_total == Decimal("50")
+        assert welding.vave_mhr_total is None
+        assert welding.row["unit_price"] == 50.0
+        # 无 MHR 拆分时流水线回退到小时费率
+        assert book.process_by_code("PR-02").row["unit_price"] == 40.0
+
+    def test_same_name_keeps_first_rate(self):
+        book = PriceBook([], [
+            rate_row("PR-01", "焊接", std_hourly=Decimal("50")),
+            rate_row("PR-02", "焊接", std_hourly=Decimal("60")),
+        ])
+
+        assert book.process_by_name("焊接").process_code == "PR-01"
+        assert book.process_by_code("PR-02").std_hourly_rate == Decimal("60")
+
+    @pytest.mark.asyncio
+    async def test_lookup_interface(self):
+        """与 LookupPlanner 接口一致：按原始键返回，工艺先编码后名称."""
+        book = PriceBook(
+            [material_row("MAT-001", Decimal("10"))],
+            [
+                rate_row("焊接", "其他工艺", std_hourly=Decimal("70")),
+                rate_row("PR-02", "焊接", std_hourly=Decimal("60")),
+            ],
+        )
+
+        materials = await book.lookup_materials(["mat-001", "MISSING"])
+        assert set(materials) == {"mat-001"}
+        assert materials["mat-001"]["unit_price"] == 10.0
+
+        processes = await book.lookup_processes(["焊接", "PR-02", "MISSING"])
+        assert processes["焊接"]["process_code"] == "焊接"
+        assert processes["PR-02"]["process_code"] == "PR-02"
+        assert "MISSING" not in processes
+
+    def test_version_follows_content(self):
+        rows = [material_row("MAT-001", Decimal("10"))]
+
+        assert PriceBook(rows, []).version == PriceBook(rows, []).version
+        assert PriceBook(rows, []).version != PriceBook(
+            [material_row("MAT-001", Decimal("11"))], []
+        ).version
+
+
+class TestPriceBookRegistry:
+    """PriceBookRegistry 测试."""
+
+    @pytest.mark.asyncio
+    async def test_reuses_until_invalidated(self):
+        session = FakeSession([material_row("MAT-001", Decimal("10"))], [])
+        registry = PriceBookRegistry(ttl=300)
+
+        first = await registry.get(session)
+        assert await registry.get(session) is first
+        assert session.executed == 2
+
+        session.materials = [material_row("MAT-001", Decimal("12"))]
+        registry.invalidate()
+        second = await registry.get(session)
+
+        assert second is not first
+        assert registry.current is second
+        assert second.version != first.version
+        # 已取得的旧快照不受替换影响
+        assert first.material("MAT-001").std_price == Decimal("10")
+        assert second.material("MAT-001").std_price == Decimal("12")
+
+    @pytest.mark.asyncio
+    async def test_expired_book_is_rebuilt(self):
+        session = FakeSession([], [])
+        registry = PriceBookRegistry(ttl=0)
+
+        first = await registry.get(session)
+        second = await registry.get(session)
+
+        assert second is not first
+        assert session.executed == 4
+
+    @pytest.mark.asyncio
+    async def test_invalidation_during_load_is_kept(self):
+        """加载期间提交的主数据变更：本次加载结果不被视为有效，下一次 get() 重建."""
+        registry = PriceBookRegistry(ttl=300)
+
+        class InvalidatingSession(FakeSession):
+            async def execute(self, stmt):
+                if self.executed == 0:
+                    registry.invalidate()
+                return await super().execute(stmt)
+
+        session = InvalidatingSession([material_row("MAT-001", Decimal("10"))], [])
+        stale = await registry.get(session)
+        session.materials = [material_row("MAT-001", Decimal("12"))]
+        fresh = await registry.get(session)
+
+        assert fresh is not stale
+        assert fresh.material("MAT-001").std_price == Decimal("12")
+        assert await registry.get(session) is fresh
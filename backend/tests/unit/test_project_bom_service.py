@@ -0,0 +1,239 @@
+"""项目 BOM 读取服务单元测试."""
+
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import insert
+
+from app.models.product_material import ProductMaterial
+from app.models.product_process import ProductProcess
+from app.models.project_product import ProjectProduct
+from app.services.price_book import PriceBook, price_book_registry
+from app.services.project_bom_service import (
+    FieldProjection,
+    PageCursor,
+    ProjectBOMService,
+)
+
+
+class FakeSession:
+    """按表名返回预置行，并记录执行的语句."""
+
+    def __init__(self, rows_by_table: dict):
+        self.rows_by_table = rows_by_table
+        self.tables = []
+
+    async def execute(self, statement):
+        table = statement.get_final_froms()[0].name
+        self.tables.append(table)
+        rows = self.rows_by_table.get(table, [])
+        if statement._distinct:
+            # SELECT DISTINCT material_id
+            ids = list(dict.fromkeys(r.material_id for r in rows if r.material_id))
+            return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: ids))
+        return SimpleNamespace(all=lambda: rows)
+
+    async def stream(self, statement):
+        table = statement.get_final_froms()[0].name
+        self.tables.append(f"stream:{table}")
+
+        async def rows():
+            for row in self.rows_by_table.get(table, []):
+                yield row
+
+        return rows()
+
+    async def rollback(self):
+        pass
+
+
+class FakeLookup:
+    def __init__(self):
+        self.calls = []
+
+    async def lookup_materials(self, codes):
+        self.calls.append(sorted(codes))
+        return {"M-1": {"unit_price": 2.5, "has_history_data": True}}
+
+
+def material(product_id: str, material_id: str | None, part_number: str):
+    return SimpleNamespace(
+        project_product_id=product_id, material_id=material_id, part_number=part_number,
+        material_level=1, version="01", stock_status="N", material_name="零件",
+        material_type="I", supplier=None, quantity=Decimal("2.000"), unit="PC", remarks=None,
+    )
+
+
+class TestProjectBOMService:
+    """集合查询读取测试."""
+
+    async def test_fixed_queries_and_single_price_lookup(self):
+        """产品数、行数增加时查询次数不变，价格只批量查询一次."""
+        products = [
+            SimpleNamespace(id=f"prod-{i}", product_name=f"产品{i}", product_code=f"P{i}")
+            for i in range(3)
+        ]
+        materials = [
+            material("prod-0", "M-1", "A"),
+            material("prod-0", None, "B"),
+            material("prod-1", "M-1", "C"),
+            material("prod-1", "M-2", "D"),
+        ]
+        processes = [
+            SimpleNamespace(
+                project_product_id="prod-1", process_code="OP10", sequence_order=1,
+                cycle_time_std=3600, cycle_time=None, std_cost=Decimal("5"),
+                vave_cost=None, remarks=None,
+            )
+        ]
+        db = FakeSession({
+            "project_products": products,
+            "product_materials": materials,
+            "product_processes": processes,
+        })
+        lookup = FakeLookup()
+
+        data = await ProjectBOMService(db, lookup).get_products("project-1")
+
+        assert db.tables == [
+            "project_products", "product_processes", "product_materials",
+            "stream:product_materials",
+        ]
+        assert lookup.calls == [["M-1", "M-2"]]
+        assert [len(p["materials"]) for p in data] == [2, 2, 0]
+        assert [m["partNumber"] for m in data[1]["materials"]] == ["C", "D"]
+        assert data[0]["materials"][0]["unitPrice"] == 2.5
+        assert data[0]["materials"][0]["status"] == "GREEN"
+        assert data[0]["materials"][1]["status"] == "RED"
+        assert data[1]["processes"][0]["standardTime"] == 1.0
+        assert data[2]["isParsed"] is False
+
+    async def test_prices_come_from_price_book(self, monkeypatch):
+        """未指定查询时使用当前价格簿，与成本计算的价格一致."""
+        book = PriceBook([SimpleNamespace(
+            item_code="M-1", std_price=Decimal("3.5"), vave_price=None,
+            supplier_tier=None, category=None,
+        )], [])
+
+        async def current(db=None):
+            return book
+
+        monkeypatch.setattr(price_book_registry, "get", current)
+        db = FakeSession({
+            "project_products": [SimpleNamespace(id="prod-0", product_name="产品", product_code="P0")],
+            "product_materials": [material("prod-0", "m-1", "A")],
+        })
+
+        data = await ProjectBOMService(db).get_products("project-1")
+
+        assert data[0]["materials"][0]["unitPrice"] == 3.5
+
+    async def test_iter_products_streams_per_product(self):
+        """流式接口按产品逐个产出，与一次性读取结果一致."""
+        products = [SimpleNamespace(id=f"prod-{i}", product_name="", product_code="") for i in range(2)]
+        materials = [material("prod-0", None, "A"), material("prod-1", None, "B")]
+        db = FakeSession({"project_products": products, "product_materials": materials})
+        service = ProjectBOMService(db, FakeLookup())
+
+        streamed = [p async for p in service.iter_products("project-1")]
+
+        assert [p["productId"] for p in streamed] == ["prod-0", "prod-1"]
+        assert [p["materials"][0]["partNumber"] for p in streamed] == ["A", "B"]
+
+    async def test_empty_project_runs_one_query(self):
+        db = FakeSession({})
+
+        assert await ProjectBOMService(db, FakeLookup()).get_products("project-1") == []
+        assert db.tables == ["project_products"]
+
+
+@pytest.fixture
+async def paged_db(sqlite_session):
+    """3 个产品：prod-0 有 5 行物料和 1 道工序，prod-1 无物料，prod-2 有 2 行物料."""
+    db = sqlite_session
+    await db.execute(insert(ProjectProduct), [
+        {"id": f"prod-{i}", "project_id": "project-1", "product_name": f"产品{i}",
+         "product_code": f"P{i}"}
+        for i in range(3)
+    ])
+    await db.execute(insert(ProductMaterial), [
+        {"id": f"m-{product}-{i}", "project_product_id": f"prod-{product}",
+         "material_id": "M-1" if i == 0 else None, "part_number": f"{product}-{i}",
+         "quantity": Decimal("1")}
+        for product, lines in ((0, 5), (2, 2))
+        for i in range(lines)
+    ])
+    await db.execute(insert(ProductProcess), [
+        {"id": "op-1", "project_product_id": "prod-0", "process_code": "OP10",
+         "sequence_order": 1, "std_cost": Decimal("5")},
+    ])
+    return db
+
+
+class TestProjectBOMPagination:
+    """键集分页与字段投影测试."""
+
+    async def test_pages_cover_all_lines_once(self, paged_db):
+        service = ProjectBOMService(paged_db, FakeLookup())
+        pages = []
+        cursor = None
+        while True:
+            page = await service.get_page("project-1", limit=3, cursor=cursor)
+            pages.append(page["products"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+            cursor = PageCursor.decode(cursor.encode())
+
+        lines = [
+            (p["productId"], m["id"], m["partNumber"])
+            for products in pages for p in products for m in p["materials"]
+        ]
+        assert lines == [
+            ("prod-0", "M-001", "0-0"), ("prod-0", "M-002", "0-1"), ("prod-0", "M-003", "0-2"),
+            ("prod-0", "M-004", "0-3"), ("prod-0", "M-005", "0-4"),
+            ("prod-2", "M-001", "2-0"), ("prod-2", "M-002", "2-1"),
+        ]
+        # 无物料的产品也会返回；工艺行只随产品的第一页返回
+        assert [[p["productId"] for p in products] for products in pages] == [
+            ["prod-0"], ["prod-0", "prod-1", "prod-2"], ["prod-2"],
+        ]
+        assert pages[0][0]["processes"][0]["name"] == "OP10"
+        assert "processes" not in pages[1][0]
+        assert pages[1][1]["processes"] == []
+
+    async def test_projection_selects_only_requested_columns(self, paged_db):
+        lookup = FakeLookup()
+        service = ProjectBOMService(paged_db, lookup)
+        projection = FieldProjection.parse("id,partNumber,name")
+
+        page = await service.get_page("project-1", limit=2, projection=projection)
+
+        assert projection.material_columns() == (
+            ProductMaterial.project_product_id, ProductMaterial.part_number,
+        )
+        assert page["products"][0]["materials"] == [
+            {"id": "M-001", "partNumber": "0-0"}, {"id": "M-002", "partNumber": "0-1"},
+        ]
+        assert page["products"][0]["processes"] == [{"id": "P-001", "name": "OP10"}]
+        # 未请求价格字段时不查价
+        assert lookup.calls == []
+
+    async def test_single_product_with_prices(self, paged_db):
+        lookup = FakeLookup()
+        service = ProjectBOMService(paged_db, lookup)
+
+        page = await service.get_page("project-1", limit=10, product_id="prod-0")
+
+        assert [p["productId"] for p in page["products"]] == ["prod-0"]
+        assert page["products"][0]["materials"][0]["unitPrice"] == 2.5
+        assert page["next_cursor"] is None
+        # 只查询本页出现的物料编码
+        assert lookup.calls == [["M-1"]]
+
+    def test_invalid_fields_and_cursor(self):
+        with pytest.raises(ValueError):
+            FieldProjection.parse("partNumber,unknown")
+        with pytest.raises(ValueError):
+            PageCursor.decode("not-a-cursor")
@@ -0,0 +1,246 @@
+"""项目级成本汇总服务单元测试."""
+
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+import app.services.project_cost_service as project_cost_service
+from app.models.product_material import ProductMaterial
+from app.models.product_process import ProductProcess
+from app.models.project import Project
+from app.models.project_product import ProjectProduct
+from app.models.quote_summary import QuoteSummary
+from app.services.cost_memo import cost_memo, cost_memo_stats
+from app.services.price_book import PriceBook
+from app.services.project_cost_service import ProjectCostService, bump_bom_revision
+
+
+def price_book(
+    mat_1_price: str = "10.5", extra_materials: tuple = (), efficiency: Decimal | None = None,
+) -> PriceBook:
+    return PriceBook(
+        [
+            SimpleNamespace(item_code="MAT-1", std_price=Decimal(mat_1_price), vave_price=Decimal("9"),
+                            supplier_tier=None, category=None),
+            SimpleNamespace(item_code="PART-2", std_price=Decimal("2.25"), vave_price=None,
+                            supplier_tier=None, category=None),
+            *(
+                SimpleNamespace(item_code=code, std_price=Decimal("1"), vave_price=None,
+                                supplier_tier=None, category=None)
+                for code in extra_materials
+            ),
+        ],
+        [SimpleNamespace(
+            process_code="OP10", process_name="焊接", equipment=None, work_center=None,
+            std_mhr_var=Decimal("60"), std_mhr_fix=Decimal("30"), vave_mhr_var=None,
+            vave_mhr_fix=None, std_hourly_rate=None, vave_hourly_rate=Decimal("72"),
+            efficiency_factor=efficiency,
+        )],
+    )
+
+
+@pytest.fixture(autouse=True)
+def clear_cost_memo():
+    cost_memo.clear()
+    yield
+    cost_memo.clear()
+
+
+@pytest.fixture
+async def project_db(sqlite_session):
+    """prod-a：2 行物料（一行只有零件号）+ 2 道工序；prod-b：1 行未知物料."""
+    db = sqlite_session
+    await db.execute(insert(Project), [{
+        "id": "project-1", "asac_number": "A", "customer_number": "C", "product_version": "1",
+        "customer_version": "1", "client_name": "客户", "project_name": "项目",
+        "annual_volume": 1000, "products": [], "owners": {}, "status": "draft",
+    }])
+    await db.execute(insert(ProjectProduct), [
+        {"id": "prod-a", "project_id": "project-1", "product_name": "产品A", "product_code": "PA"},
+        {"id": "prod-b", "project_id": "project-1", "product_name": "产品B", "product_code": "PB"},
+    ])
+    await db.execute(insert(ProductMaterial), [
+        {"id": "m1", "project_product_id": "prod-a", "material_id": "MAT-1",
+         "part_number": "X", "quantity": Decimal("2")},
+        {"id": "m2", "project_product_id": "prod-a", "material_id": None,
+         "part_number": "part-2", "quantity": Decimal("3")},
+        {"id": "m3", "project_product_id": "prod-b", "material_id": None,
+         "part_number": "UNKNOWN", "quantity": Decimal("5")},
+    ])
+    await db.execute(insert(ProductProcess), [
+        # 快照 MHR：1800 秒 × 100 = 50.00；VAVE 1200 秒 × 80 = 26.67
+        {"id": "op-1", "project_product_id": "prod-a", "process_code": "OP10",
+         "sequence_order": 1, "cycle_time_std": 1800, "cycle_time_vave": 1200,
+         "std_mhr": Decimal("100"), "vave_mhr": Decimal("80")},
+        # 无快照取价格簿：3600 秒 × (60 + 30) = 90.00；VAVE 无 MHR 拆分取小时费率 72
+        {"id": "op-2", "project_product_id": "prod-a", "process_code": "OP10",
+         "sequence_order": 2, "cycle_time_std": 3600, "cycle_time_vave": None,
+         "std_mhr": None, "vave_mhr": None},
+    ])
+    return db
+
+
+class TestProjectCostRollup:
+    """项目成本汇总测试."""
+
+    @pytest.mark.parametrize("vectorized", [True, False])
+    async def test_rollup_and_summary(self, project_db, monkeypatch, vectorized):
+        if vectorized:
+            pytest.importorskip("numpy")
+        else:
+            monkeypatch.setattr(project_cost_service, "vector_engine_available", lambda: False)
+
+        result = await ProjectCostService(project_db, price_book()).rollup("project-1")
+
+        prod_a, prod_b = result.products
+        # 物料：2 × 10.5 + 3 × 2.25 = 27.75；VAVE 2 × 9 + 3 × 2.25 = 24.75
+        assert prod_a.material_cost.std == Decimal("27.75")
+        assert prod_a.material_cost.vave == Decimal("24.75")
+        assert prod_a.process_cost.std == Decimal("140.00")
+        assert prod_a.process_cost.vave == Decimal("98.67")
+        assert (prod_a.material_count, prod_a.process_count) == (2, 2)
+        assert prod_b.total_cost.std == Decimal("0.00")
+        assert result.total_cost.std == Decimal("167.75")
+        assert result.total_cost.vave == Decimal("123.42")
+        assert result.price_book_version == price_book().version
+
+        summary = project_db.conn.execute(select(QuoteSummary)).one()
+        assert summary.total_std_cost == Decimal("167.75")
+        assert summary.total_vave_cost == Decimal("123.42")
+        assert summary.total_savings == Decimal("44.33")
+        assert summary.savings_rate == Decimal("26.43")
+        assert project_db.commits == 1
+
+    @pytest.mark.parametrize("vectorized", [True, False])
+    async def test_vave_process_cost_applies_efficiency(self, project_db, monkeypatch, vectorized):
+        """VAVE 工艺成本乘价格簿效率系数（快照 MHR 也一样），与 /cost/calculate 一致."""
+        if vectorized:
+            pytest.importorskip("numpy")
+        else:
+            monkeypatch.setattr(project_cost_service, "vector_engine_available", lambda: False)
+
+        result = await ProjectCostService(project_db, price_book(efficiency=Decimal("0.9"))).rollup(
+            "project-1"
+        )
+
+        # 1200 秒 × 80 × 0.9 = 24.00；3600 秒 × 72 × 0.9 = 64.80
+        assert result.products[0].process_cost.vave == Decimal("88.80")
+        assert result.products[0].process_cost.std == Decimal("140.00")
+
+    async def test_bulk_reads_and_single_summary_row(self, project_db):
+        service = ProjectCostService(project_db, price_book())
+        await service.rollup("project-1")
+        cost_memo.clear()
+        statements = project_db.statements
+        await service.rollup("project-1")
+
+        # 修订号、产品、物料、工艺、汇总查询 + 写入，与产品数无关
+        assert project_db.statements - statements == 6
+        assert len(project_db.conn.execute(select(QuoteSummary)).all()) == 1
+
+    async def test_missing_project(self, project_db):
+        with pytest.raises(ValueError):
+            await ProjectCostService(project_db, price_book()).rollup("missing")
+
+    async def test_memo_hit_reads_only_the_revision(self, project_db):
+        service = ProjectCostService(project_db, price_book())
+        first = await service.rollup("project-1")
+        hits, statements, commits = cost_memo_stats["hits"], project_db.statements, project_db.commits
+
+        assert await service.rollup("project-1") is first
+        assert cost_memo_stats["hits"] == hits + 1
+        assert project_db.statements - statements == 1
+        assert project_db.commits == commits
+
+    async def test_memoized_until_bom_revision_changes(self, project_db):
+        service = ProjectCostService(project_db, price_book())
+        await service.rollup("project-1")
+
+        await project_db.execute(insert(ProductMaterial), [
+            {"id": "m4", "project_product_id": "prod-b", "material_id": "MAT-1",
+             "part_number": "Y", "quantity": Decimal("1")},
+        ])
+        await bump_bom_revision(project_db, "project-1")
+        changed = await service.rollup("project-1")
+
+        assert changed.total_cost.std == Decimal("178.25")
+        summary = project_db.conn.execute(select(QuoteSummary)).one()
+        assert summary.total_std_cost == Decimal("178.25")
+
+    async def test_price_changes_only_drop_dependent_results(self, project_db):
+        first = await ProjectCostService(project_db, price_book()).rollup("project-1")
+
+        # 与本项目无关的物料变更：沿用结果，只更新价格簿版本
+        unrelated = price_book(extra_materials=("OTHER",))
+        statements = project_db.statements
+        reused = await ProjectCostService(project_db, unrelated).rollup("project-1")
+        assert project_db.statements - statements == 1
+        assert reused.total_cost == first.total_cost
+        assert reused.price_book_version == unrelated.version != first.price_book_version
+
+        # 本项目使用的物料改价：重新计算
+        repriced = await ProjectCostService(project_db, price_book("11.5")).rollup("project-1")
+        assert repriced.total_cost.std == first.total_cost.std + Decimal("2.00")
+
+    async def test_memo_hit_rewrites_missing_summary(self, project_db):
+        service = ProjectCostService(project_db, price_book())
+        first = await service.rollup("project-1")
+        project_db.conn.execute(delete(QuoteSummary))
+        hits = cost_memo_stats["hits"]
+
+        assert await service.rollup("project-1") is first
+        assert cost_memo_stats["hits"] == hits + 1
+        summary = project_db.conn.execute(select(QuoteSummary)).one()
+        assert summary.total_std_cost == first.total_cost.std
+
+
+class TestBOMRevisionHook:
+    """ORM 写入 BOM 行时自动递增修订号."""
+
+    @staticmethod
+    def revision(db) -> int:
+        return db.conn.execute(
+            select(Project.bom_revision).where(Project.id == "project-1")
+        ).scalar_one()
+
+    async def test_orm_writes_bump_revision(self, project_db):
+        session = Session(bind=project_db.conn)
+        start = self.revision(project_db)
+
+        session.add(ProductProcess(
+            id="op-3", project_product_id="prod-b", process_code="OP10", sequence_order=1,
+        ))
+        session.flush()
+        assert self.revision(project_db) == start + 1
+
+        material = session.get(ProductMaterial, "m1")
+        material.quantity = Decimal("4")
+        session.flush()
+        assert self.revision(project_db) == start + 2
+
+        # 未改变任何值的对象不递增
+        material.quantity = Decimal("4")
+        session.flush()
+        session.delete(session.get(ProductMaterial, "m3"))
+        session.flush()
+        assert self.revision(project_db) == start + 3
+
+        session.delete(session.get(ProjectProduct, "prod-b"))
+        session.flush()
+        assert self.revision(project_db) == start + 4
+        session.close()
+
+    async def test_rollup_sees_orm_edits(self, project_db):
+        service = ProjectCostService(project_db, price_book())
+        first = await service.rollup("project-1")
+
+        session = Session(bind=project_db.conn)
+        session.get(ProductMaterial, "m1").quantity = Decimal("3")
+        session.commit()
+        session.close()
+
+        changed = await service.rollup("project-1")
+        assert changed.total_cost.std == first.total_cost.std + Decimal("10.50")
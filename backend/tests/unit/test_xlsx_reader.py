@@ -0,0 +1,121 @@
+"""XLSX 底层读取后端单元测试.
+
+以 openpyxl 只读模式为基准，校验逐行输出与解析结果完全一致。
+"""
+
+import glob
+import os
+from datetime import date, datetime, time
+from io import BytesIO
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+from app.services.bom_parser import BOMParser, MultiProductBOMParser
+from app.services.xlsx_reader import XlsxWorkbook, open_workbook
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+BOM_FILES_DIR = os.path.join(PROJECT_ROOT, "tests", "files")
+
+# 排除 Excel 锁文件（~$xxx.xlsx）
+BOM_FILES = [
+    path for path in sorted(glob.glob(os.path.join(BOM_FILES_DIR, "*.xlsx")))
+    if not os.path.basename(path).startswith("~$")
+]
+
+
+def read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def openpyxl_rows(content: bytes) -> dict[str, list[tuple]]:
+    wb = load_workbook(filename=BytesIO(content), read_only=True)
+    try:
+        return {name: list(wb[name].iter_rows(values_only=True)) for name in wb.sheetnames}
+    finally:
+        wb.close()
+
+
+def xlsx_rows(content: bytes) -> dict[str, list[tuple]]:
+    wb = XlsxWorkbook(content)
+    try:
+        return {name: list(wb[name].iter_rows(values_only=True)) for name in wb.sheetnames}
+    finally:
+        wb.close()
+
+
+class TestXlsxReaderRows:
+    """逐行输出与 openpyxl 一致性测试."""
+
+    @pytest.mark.parametrize("path", BOM_FILES, ids=os.path.basename)
+    def test_rows_match_openpyxl(self, path):
+        """测试 BOM 文件每个 sheet 的行值与 openpyxl 完全一致."""
+        content = read_file(path)
+
+        assert xlsx_rows(content) == openpyxl_rows(content)
+
+    def test_value_types_match_openpyxl(self):
+        """数字、布尔、日期、公式、空行空列的转换与 openpyxl 一致."""
+        wb = Workbook()
+        ws = wb.active
+        ws.append([1, 2.5, "文本", True, datetime(2026, 1, 2, 3, 4), date(2025, 5, 5),
+                   time(3, 4), "=A1+B1", None, 1e20])
+        ws["A3"] = "=SUM(A1:B1)"
+        ws["C5"] = "gap"
+        output = BytesIO()
+        wb.save(output)
+        content = output.getvalue()
+
+        rows = xlsx_rows(content)
+
+        assert rows == openpyxl_rows(content)
+        assert rows[ws.title][1] == (None,) * 10
+
+    def test_min_row_and_max_row(self):
+        """min_row / max_row 截取与 openpyxl 一致."""
+        content = read_file(os.path.join(BOM_FILES_DIR, "bom.xlsx"))
+        expected_wb = load_workbook(filename=BytesIO(content), read_only=True)
+        wb = XlsxWorkbook(content)
+        sheet_name = wb.sheetnames[0]
+
+        actual = list(wb[sheet_name].iter_rows(min_row=3, max_row=8, values_only=True))
+        expected = list(expected_wb[sheet_name].iter_rows(min_row=3, max_row=8, values_only=True))
+
+        assert actual == expected
+        assert wb[sheet_name].max_row == expected_wb[sheet_name].max_row
+
+    def test_unknown_reader_raises(self):
+        """未知读取后端报错."""
+        with pytest.raises(ValueError):
+            open_workbook(b"", reader="unknown")
+
+
+class TestParserWithXlsxReader:
+    """解析器切换读取后端后结果一致."""
+
+    @pytest.mark.parametrize("path", BOM_FILES, ids=os.path.basename)
+    def test_single_product_result_matches(self, path):
+        """单产品解析结果与 openpyxl 后端一致."""
+        content = read_file(path)
+
+        assert (
+            BOMParser(reader="xlsx").parse_excel_file(content)
+            == BOMParser(reader="openpyxl").parse_excel_file(content)
+        )
+
+    @pytest.mark.parametrize("path", BOM_FILES, ids=os.path.basename)
+    def test_multi_product_result_matches(self, path):
+        """多产品解析结果与 openpyxl 后端一致."""
+        content = read_file(path)
+
+        assert (
+            MultiProductBOMParser(max_workers=1, reader="xlsx").parse_excel_file(content)
+            == MultiProductBOMParser(max_workers=1, reader="openpyxl").parse_excel_file(content)
+        )
+
+    def test_reader_defaults_to_settings(self):
+        """未指定 reader 时使用配置值."""
+        from app.config import get_settings
+
+        assert BOMParser().reader == get_settings().BOM_READER_BACKEND